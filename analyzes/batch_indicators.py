@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+from analyzes.indicator_cache import _window_fingerprint, indicator_cache
+
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def _span_to_alpha(span: float) -> float:
+    # Та же арифметика, что у pandas ewm(span=...): span -> com -> alpha.
+    return 1.0 / (1.0 + (span - 1.0) / 2.0)
+
+
+def _period_to_alpha(period: float) -> float:
+    # pandas ewm(alpha=1/period) тоже переводит alpha в com и обратно.
+    alpha = 1.0 / period
+    return 1.0 / (1.0 + (1.0 - alpha) / alpha)
+
+
+def batch_ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """ewm(alpha, adjust=False) по каждой строке матрицы (symbols × bars) через scipy.signal.lfilter.
+
+    Рекурсия y[t] = alpha·x[t] + (1 - alpha)·y[t-1] начинается с первого не-NaN значения строки, как в pandas.
+    Строки группируются по позиции первого значения, так что вызовов lfilter столько, сколько разных
+    стартов; строки с NaN внутри ряда (редкость) досчитываются pandas.
+    """
+    values = np.asarray(values, dtype=float)
+    rows, bars = values.shape
+    out = np.full((rows, bars), np.nan)
+    if bars == 0:
+        return out
+
+    valid = ~np.isnan(values)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), bars)
+    interior_nan = (~valid & (np.arange(bars) >= first[:, None])).any(axis=1)
+
+    for offset in np.unique(first[~interior_nan]):
+        if offset >= bars:
+            continue
+        group = np.flatnonzero((first == offset) & ~interior_nan)
+        x = values[group, offset:]
+        zi = (1.0 - alpha) * x[:, :1]
+        out[group, offset:], _ = lfilter([alpha], [1.0, alpha - 1.0], x, axis=1, zi=zi)
+
+    for row in np.flatnonzero(interior_nan):
+        out[row] = pd.Series(values[row]).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
+def batch_ema(values: np.ndarray, period: int) -> np.ndarray:
+    return batch_ewm(values, _span_to_alpha(period))
+
+
+def batch_rma(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's moving average по строкам."""
+    return batch_ewm(values, _period_to_alpha(period))
+
+
+def batch_sma(values: np.ndarray, period: int) -> np.ndarray:
+    """rolling(period).mean() по строкам: первые period-1 баров — NaN."""
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= period:
+        out[:, period - 1:] = sliding_window_view(values, period, axis=1).mean(axis=2)
+    return out
+
+
+def _shift_right(values: np.ndarray) -> np.ndarray:
+    shifted = np.empty_like(values)
+    shifted[:, 0] = np.nan
+    shifted[:, 1:] = values[:, :-1]
+    return shifted
+
+
+def batch_true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = _shift_right(close)
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def batch_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    return batch_rma(batch_true_range(high, low, close), period)
+
+
+def batch_adx(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    period: int = 14,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(plus_di, minus_di, adx) по строкам — та же формула, что adx_components в trend_filter_12h_v2."""
+    up_move = high - _shift_right(high)
+    down_move = _shift_right(low) - low
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+    atr_rma = batch_rma(batch_true_range(high, low, close), period)
+    atr_rma[atr_rma == 0] = np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        plus_di = 100 * batch_rma(plus_dm, period) / atr_rma
+        minus_di = 100 * batch_rma(minus_dm, period) / atr_rma
+        di_sum = plus_di + minus_di
+        di_sum[di_sum == 0] = np.nan
+        dx = 100 * np.abs(plus_di - minus_di) / di_sum
+    return plus_di, minus_di, batch_rma(dx, period)
+
+
+def batch_rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI по Уайлдеру по строкам — та же формула, что rsi в setup_filter_4h."""
+    delta = close - _shift_right(close)
+    avg_gain = batch_rma(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0)), period)
+    avg_loss = batch_rma(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0)), period)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+        rsi_values = 100 - (100 / (1 + rs))
+    rsi_values[(avg_loss == 0) & (avg_gain > 0)] = 100.0
+    rsi_values[(avg_loss == 0) & (avg_gain == 0)] = 50.0
+    return rsi_values
+
+
+def batch_obv(
+    close: np.ndarray,
+    volume: np.ndarray,
+    ma_period: int = 20,
+    fast_ema_period: int = 10,
+    slow_ema_period: int = 30,
+) -> dict[str, np.ndarray]:
+    """obv / obv_ma / obv_ema_fast / obv_ema_slow по строкам — те же колонки, что у OBV в IndicatorEngine."""
+    delta = close - _shift_right(close)
+    signed_volume = np.where(delta > 0, volume, np.where(delta < 0, -volume, 0.0))
+    obv = np.cumsum(signed_volume, axis=1)
+    return {
+        "obv": obv,
+        "obv_ma": batch_sma(obv, ma_period),
+        "obv_ema_fast": batch_ema(obv, fast_ema_period),
+        "obv_ema_slow": batch_ema(obv, slow_ema_period),
+    }
+
+
+@dataclass(slots=True)
+class IndicatorBatch:
+    """Выровненные окна нескольких символов одного таймфрейма: строки матриц — символы, столбцы — свечи."""
+
+    symbols: list[str]
+    frames: list[pd.DataFrame]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+
+def stack_frames(frames: dict[str, pd.DataFrame]) -> list[IndicatorBatch]:
+    """Складывает окна символов в матрицы symbols × bars.
+
+    В одну матрицу попадают только окна с одинаковыми первой/последней свечой и длиной;
+    символы с другой историей (новые листинги, пропуски) образуют свои группы.
+    """
+    groups: dict[tuple[int, int, int], list[tuple[str, pd.DataFrame]]] = {}
+    for symbol, df in frames.items():
+        if df is None or df.empty:
+            continue
+        first_ts, last_ts, rows, _ = _window_fingerprint(df)
+        groups.setdefault((first_ts, last_ts, rows), []).append((symbol, df))
+
+    batches = []
+    for members in groups.values():
+        arrays = {
+            column: np.vstack([df[column].to_numpy(dtype=float) for _, df in members])
+            for column in OHLCV_COLUMNS
+        }
+        batches.append(
+            IndicatorBatch(
+                symbols=[symbol for symbol, _ in members],
+                frames=[df for _, df in members],
+                **arrays,
+            )
+        )
+    return batches
+
+
+def prime_filter_indicators(frames: dict[str, pd.DataFrame], timeframe: str, config: Any) -> int:
+    """Считает индикаторы фильтра для всего набора символов пакетно и кладет их в общий IndicatorCache.
+
+    config — конфиг trend_filter_12h / setup_filter_4h / entry_trigger_1h: берутся периоды EMA/ATR/ADX
+    и, если есть, RSI, MA объема и OBV. Ключи совпадают с теми, что читает фильтр, поэтому последующий
+    вызов фильтра по тому же окну берет готовые серии вместо поштучного расчета.
+    Значения равны полному пересчету по окну (compute_full_indicator) с точностью до округления.
+
+    Прогретые ключи имеют приоритет и при включенном IndicatorEngine: фильтр по этому окну читает
+    пакетные серии, а движок считает только символы вне пакета. Значения движка отличаются от
+    пакетных лишь округлением (оба равны пересчету по окну), решения фильтра не меняются.
+    Возвращает число символов, для которых индикаторы положены в кэш.
+    """
+    ema_periods = sorted({config.ema_fast_period, config.ema_mid_period, config.ema_slow_period})
+    rsi_period = getattr(config, "rsi_period", None)
+    volume_ma_period = getattr(config, "volume_ma_period", None)
+    obv_params = None
+    if getattr(config, "obv_ma_period", None):
+        obv_params = {
+            "ma_period": config.obv_ma_period,
+            "fast_ema_period": config.obv_fast_ema_period,
+            "slow_ema_period": config.obv_slow_ema_period,
+        }
+
+    primed = 0
+    for batch in stack_frames(frames):
+        emas = {period: batch_ema(batch.close, period) for period in ema_periods}
+        atr_values = batch_atr(batch.high, batch.low, batch.close, config.atr_period)
+        plus_di, minus_di, adx_values = batch_adx(batch.high, batch.low, batch.close, config.adx_period)
+        rsi_values = batch_rsi(batch.close, rsi_period) if rsi_period else None
+        volume_ma = batch_sma(batch.volume, volume_ma_period) if volume_ma_period else None
+        obv_values = batch_obv(batch.close, batch.volume, **obv_params) if obv_params else None
+
+        for row, (symbol, df) in enumerate(zip(batch.symbols, batch.frames)):
+            index = df.index
+            items = [
+                ("ema", {"period": period}, pd.DataFrame({"ema": values[row]}, index=index))
+                for period, values in emas.items()
+            ]
+            items.append(("atr", {"period": config.atr_period}, pd.DataFrame({"atr": atr_values[row]}, index=index)))
+            items.append(
+                (
+                    "adx",
+                    {"period": config.adx_period},
+                    pd.DataFrame({"plus_di": plus_di[row], "minus_di": minus_di[row], "adx": adx_values[row]}, index=index),
+                )
+            )
+            if rsi_values is not None:
+                items.append(("rsi", {"period": rsi_period}, pd.DataFrame({"rsi": rsi_values[row]}, index=index)))
+            if volume_ma is not None:
+                items.append(("volume_ma", {"period": volume_ma_period}, pd.Series(volume_ma[row], index=index)))
+            if obv_values is not None:
+                items.append(
+                    ("obv", obv_params, pd.DataFrame({column: values[row] for column, values in obv_values.items()}, index=index))
+                )
+            indicator_cache.put_many(symbol, timeframe, df, items)
+            primed += 1
+    return primed
@@ -1,22 +1,30 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Any
 
 import pandas as pd
 
+from analyzes.filter_result import CompactFilterResult, ConditionFlags
+from analyzes.indicator_cache import indicator_cache
 from analyzes.rsi_analyzer import RSIAnalyzer
-from analyzes.setup_filter_4h import SetupFilter4hResult, rsi
+from analyzes.setup_filter_4h import SetupFilter4hResult
 from analyzes.trend_filter_12h_v2 import (
-    adx_components,
-    atr,
-    ema,
     evaluate_market_structure,
     find_confirmed_swings,
     validate_ohlcv_dataframe,
 )
+from ohlcv_bundle import OHLCVBundle, as_filter_frame
 
 
+HARD_CONDITION_KEYS: tuple[str, ...] = (
+    "setup_passed",
+    "reclaim_structure_ok",
+    "ema_stack_ok",
+    "not_overextended",
+    "risk_model_valid",
+)
+
 SOFT_CONDITION_KEYS: tuple[str, ...] = (
     "reclaimed_ema20",
     "bullish_momentum",
@@ -59,7 +67,7 @@ class EntryTrigger1hConfig:
 
 
 @dataclass(slots=True)
-class EntryTrigger1hResult:
+class EntryTrigger1hResult(CompactFilterResult):
     passed: bool
     hard_passed: bool
     soft_score: int
@@ -72,7 +80,11 @@ class EntryTrigger1hResult:
     take_profit: float | None
     risk_percent: float | None
     reward_risk: float | None
-    details: dict[str, Any]
+    config: EntryTrigger1hConfig
+    hard: ConditionFlags
+    soft: ConditionFlags
+    # Диагностика для details (свеча, паттерн, уровни, риск-модель, структура); при detailed=False — None
+    extra: dict[str, Any] | None = None
 
 
 def bullish_candle_pattern(last: pd.Series, prev: pd.Series) -> tuple[str | None, int]:
@@ -126,14 +138,25 @@ def resolve_trigger_state(
     return "trigger_building"
 
 
-def build_rsi_divergence_confirmation(data: pd.DataFrame, config: EntryTrigger1hConfig) -> dict[str, Any]:
+def build_rsi_divergence_confirmation(
+    data: pd.DataFrame,
+    config: EntryTrigger1hConfig,
+    symbol: str | None = None,
+) -> dict[str, Any]:
     """Считает только RSI divergence как дополнительное soft-confirmation для 1H trigger."""
     analyzer = RSIAnalyzer(
         default_period=config.rsi_period,
         default_lookback=config.rsi_divergence_lookback,
         default_pivot_window=config.rsi_divergence_pivot_window,
     )
-    _, rsi_series = analyzer.calculate_rsi(data[["close"]], period=config.rsi_period)
+    _, rsi_series = indicator_cache.get(
+        symbol,
+        "60",
+        data,
+        "rsi_analyzer",
+        lambda: analyzer.calculate_rsi(data[["close"]], period=config.rsi_period),
+        period=config.rsi_period,
+    )
     divergence = analyzer._detect_rsi_divergence(
         data[["close"]],
         rsi_series,
@@ -148,15 +171,179 @@ def build_rsi_divergence_confirmation(data: pd.DataFrame, config: EntryTrigger1h
     }
 
 
-def entry_trigger_1h(
+def evaluate_risk_model(
+    entry_price: float,
+    atr_value: float | None,
+    stop_anchor: float,
+    recent_high: float,
+    config: EntryTrigger1hConfig,
+) -> dict[str, Any]:
+    """Стоп за опорным минимумом с буфером ATR, цель по min_reward_risk и проверка места до цели."""
+    risk_model: dict[str, Any] = {
+        "stop_loss": None,
+        "take_profit": None,
+        "reward_risk": None,
+        "risk_percent": None,
+        "risk_model_valid": False,
+        "room_to_target_ok": False,
+    }
+    if atr_value and atr_value > 0:
+        stop_loss = float(stop_anchor - config.stop_buffer_atr * atr_value)
+        risk_model["stop_loss"] = stop_loss
+        risk = entry_price - stop_loss
+        if risk > 0:
+            take_profit = float(entry_price + risk * config.min_reward_risk)
+            reward = take_profit - entry_price
+            reward_risk = float(reward / risk) if risk > 0 else None
+            risk_model["take_profit"] = take_profit
+            risk_model["reward_risk"] = reward_risk
+            risk_model["risk_percent"] = float(risk / entry_price * 100)
+            risk_model["room_to_target_ok"] = recent_high <= take_profit
+            risk_model["risk_model_valid"] = bool(reward_risk is not None and reward_risk >= config.min_reward_risk)
+    return risk_model
+
+
+def _short_circuit_rejection(
     df: pd.DataFrame,
+    config: EntryTrigger1hConfig,
+    setup_result: SetupFilter4hResult,
+    symbol: str | None,
+    detailed: bool,
+) -> EntryTrigger1hResult | None:
+    """
+    Все hard-условия (EMA/ATR, свинги и риск-модель) — те же, что в полном режиме, поэтому reason
+    отказа совпадает с ним; объем и структура — только если от них зависит trigger_state.
+    RSI, дивергенции, ADX и свечной паттерн не считаются. None — hard-условия пройдены, нужен полный расчет.
+    """
+    close = float(df["close"].iloc[-1])
+    ema_fast = float(indicator_cache.get(symbol, "60", df, "ema", period=config.ema_fast_period)["ema"].iloc[-1])
+    ema_mid = float(indicator_cache.get(symbol, "60", df, "ema", period=config.ema_mid_period)["ema"].iloc[-1])
+    ema_slow = float(indicator_cache.get(symbol, "60", df, "ema", period=config.ema_slow_period)["ema"].iloc[-1])
+    atr_now = indicator_cache.get(symbol, "60", df, "atr", period=config.atr_period)["atr"].iloc[-1]
+    atr_value = float(atr_now) if pd.notna(atr_now) else None
+
+    current_extension_atr = None
+    if atr_value and atr_value > 0:
+        current_extension_atr = float((close - ema_mid) / atr_value)
+
+    reclaimed_ema20 = bool(close > ema_mid)
+    hard_conditions = {
+        "setup_passed": True,
+        "reclaim_structure_ok": bool(reclaimed_ema20 and close > ema_slow),
+        "ema_stack_ok": bool(ema_fast > ema_mid > ema_slow),
+        "not_overextended": bool(
+            current_extension_atr is not None and current_extension_atr <= config.max_extension_from_ema20_atr
+        ),
+    }
+    soft_conditions = {"reclaimed_ema20": reclaimed_ema20}
+
+    swing_highs, swing_lows = find_confirmed_swings(
+        df,
+        left_bars=config.swing_left_bars,
+        right_bars=config.swing_right_bars,
+    )
+    recent = df.iloc[-config.local_level_lookback :]
+    recent_high = float(recent["high"].max())
+    recent_low = float(recent["low"].min())
+    stop_anchor = min(recent_low, swing_lows[-1].price) if swing_lows else recent_low
+    risk_model = evaluate_risk_model(close, atr_value, stop_anchor, recent_high, config)
+    hard_conditions["risk_model_valid"] = risk_model["risk_model_valid"]
+    if all(hard_conditions.values()):
+        return None
+
+    if hard_conditions["reclaim_structure_ok"] and hard_conditions["not_overextended"]:
+        # Дальше trigger_state зависит от структуры и объема.
+        structure = evaluate_market_structure(
+            swing_highs=swing_highs,
+            swing_lows=swing_lows,
+            last_close=close,
+            last_pos=len(df) - 1,
+        )
+        recent_high_before_last = float(recent["high"].iloc[:-1].max()) if len(recent) > 1 else recent_high
+        volume_ma = indicator_cache.get(
+            symbol,
+            "60",
+            df,
+            "volume_ma",
+            lambda: df["volume"].rolling(config.volume_ma_period).mean(),
+            period=config.volume_ma_period,
+        ).iloc[-1]
+        volume_ratio = None
+        if pd.notna(volume_ma) and volume_ma > 0:
+            volume_ratio = float(df["volume"].iloc[-1] / volume_ma)
+        soft_conditions["volume_supportive"] = bool(volume_ratio is not None and volume_ratio >= config.min_volume_ratio)
+        soft_conditions["breakout_or_bullish_structure"] = bool(
+            close > recent_high_before_last or structure["higher_lows"]
+        )
+        soft_conditions["room_to_target_ok"] = risk_model["room_to_target_ok"]
+
+    soft_score = sum(int(v) for v in soft_conditions.values())
+    trigger_state = resolve_trigger_state(
+        setup_passed=True,
+        hard_conditions=hard_conditions,
+        soft_conditions=soft_conditions,
+    )
+    hard = ConditionFlags.from_mapping(HARD_CONDITION_KEYS, hard_conditions)
+
+    extra = None
+    if detailed:
+        extra = {
+            "setup_context": {
+                "setup_state": setup_result.setup_state,
+                "setup_reason": setup_result.reason,
+            },
+            "last_candle": {
+                "close": close,
+                "ema_fast": ema_fast,
+                "ema_mid": ema_mid,
+                "ema_slow": ema_slow,
+                "atr": atr_value,
+                "current_extension_atr": current_extension_atr,
+            },
+            "trigger_state": trigger_state,
+        }
+
+    return EntryTrigger1hResult(
+        passed=False,
+        hard_passed=False,
+        soft_score=soft_score,
+        soft_score_max=len(SOFT_CONDITION_KEYS),
+        reason=f"1h trigger rejected: hard conditions failed: {hard.failed()}",
+        trigger_state=trigger_state,
+        action="SKIP",
+        entry_price=None,
+        stop_loss=None,
+        take_profit=None,
+        risk_percent=None,
+        reward_risk=None,
+        config=config,
+        hard=hard,
+        soft=ConditionFlags.from_mapping(SOFT_CONDITION_KEYS, soft_conditions),
+        extra=extra,
+    )
+
+
+def entry_trigger_1h(
+    df: pd.DataFrame | OHLCVBundle,
     setup_result: SetupFilter4hResult,
     config: EntryTrigger1hConfig | None = None,
+    symbol: str | None = None,
+    short_circuit: bool = False,
+    detailed: bool = True,
 ) -> EntryTrigger1hResult:
-    """Ищет точный long trigger на 1H после подтвержденного 4H setup."""
+    """Ищет точный long trigger на 1H после подтвержденного 4H setup.
+
+    df — закрытые 1H свечи: DataFrame или OHLCVBundle (frame() поверх его массивов, без копий).
+    Если передан symbol, EMA/ATR/RSI/ADX берутся через IndicatorCache из IndicatorEngine
+    (рекурсии дописываются по новым свечам, чтение окна — векторное O(window)).
+    short_circuit=True: при невыполненном hard-условии SKIP возвращается без RSI/дивергенций/ADX;
+    passed, action, trigger_state и reason совпадают с полным режимом, непосчитанные soft-условия помечены пропущенными.
+    detailed=False: без диагностических секций (свеча, паттерн, уровни, риск-модель, структура).
+    """
     if config is None:
         config = EntryTrigger1hConfig()
 
+    df = as_filter_frame(df)
     validate_ohlcv_dataframe(df)
 
     required_rows = max(config.min_required_rows, config.ema_slow_period + config.local_level_lookback + 10)
@@ -174,10 +361,12 @@ def entry_trigger_1h(
             take_profit=None,
             risk_percent=None,
             reward_risk=None,
-            details={
+            config=config,
+            hard=ConditionFlags.skipped(HARD_CONDITION_KEYS),
+            soft=ConditionFlags.skipped(SOFT_CONDITION_KEYS),
+            extra={
                 "required_rows": required_rows,
                 "actual_rows": len(df),
-                "config": asdict(config),
             },
         )
 
@@ -195,22 +384,37 @@ def entry_trigger_1h(
             take_profit=None,
             risk_percent=None,
             reward_risk=None,
-            details={
-                "config": asdict(config),
+            config=config,
+            hard=ConditionFlags.skipped(HARD_CONDITION_KEYS),
+            soft=ConditionFlags.skipped(SOFT_CONDITION_KEYS),
+            extra={
                 "setup_state": setup_result.setup_state,
                 "setup_reason": setup_result.reason,
             },
         )
 
-    data = df.copy()
-    data["ema_fast"] = ema(data["close"], config.ema_fast_period)
-    data["ema_mid"] = ema(data["close"], config.ema_mid_period)
-    data["ema_slow"] = ema(data["close"], config.ema_slow_period)
-    data["atr"] = atr(data, config.atr_period)
-    data["rsi"] = rsi(data["close"], config.rsi_period)
-    data["volume_ma"] = data["volume"].rolling(config.volume_ma_period).mean()
+    if short_circuit:
+        rejection = _short_circuit_rejection(df, config, setup_result, symbol, detailed)
+        if rejection is not None:
+            return rejection
+
+    # Поверхностная копия: новые колонки не трогают df, сами OHLCV-массивы не копируются (copy-on-write).
+    data = df.copy(deep=False)
+    data["ema_fast"] = indicator_cache.get(symbol, "60", data, "ema", period=config.ema_fast_period)["ema"]
+    data["ema_mid"] = indicator_cache.get(symbol, "60", data, "ema", period=config.ema_mid_period)["ema"]
+    data["ema_slow"] = indicator_cache.get(symbol, "60", data, "ema", period=config.ema_slow_period)["ema"]
+    data["atr"] = indicator_cache.get(symbol, "60", data, "atr", period=config.atr_period)["atr"]
+    data["rsi"] = indicator_cache.get(symbol, "60", data, "rsi", period=config.rsi_period)["rsi"]
+    adx_df = indicator_cache.get(symbol, "60", data, "adx", period=config.adx_period)
+    data["volume_ma"] = indicator_cache.get(
+        symbol,
+        "60",
+        data,
+        "volume_ma",
+        lambda: data["volume"].rolling(config.volume_ma_period).mean(),
+        period=config.volume_ma_period,
+    )
 
-    adx_df = adx_components(data, config.adx_period)
     data = pd.concat([data, adx_df], axis=1)
 
     last = data.iloc[-1]
@@ -262,30 +466,20 @@ def entry_trigger_1h(
     rsi_constructive = bool(
         pd.notna(last["rsi"]) and config.min_rsi_for_entry <= last["rsi"] <= config.max_rsi_for_entry
     )
-    rsi_confirmation = build_rsi_divergence_confirmation(data, config)
+    rsi_confirmation = build_rsi_divergence_confirmation(data, config, symbol=symbol)
 
     last_confirmed_low = swing_lows[-1] if swing_lows else None
     stop_anchor = recent_low
     if last_confirmed_low is not None:
         stop_anchor = min(stop_anchor, last_confirmed_low.price)
 
-    stop_loss = None
-    take_profit = None
-    reward_risk = None
-    risk_percent = None
-    risk_model_valid = False
-    room_to_target_ok = False
-
-    if atr_value and atr_value > 0:
-        stop_loss = float(stop_anchor - config.stop_buffer_atr * atr_value)
-        risk = entry_price - stop_loss
-        if risk > 0:
-            take_profit = float(entry_price + risk * config.min_reward_risk)
-            reward = take_profit - entry_price
-            reward_risk = float(reward / risk) if risk > 0 else None
-            risk_percent = float(risk / entry_price * 100)
-            room_to_target_ok = recent_high <= take_profit
-            risk_model_valid = bool(reward_risk is not None and reward_risk >= config.min_reward_risk)
+    risk_model = evaluate_risk_model(entry_price, atr_value, stop_anchor, recent_high, config)
+    stop_loss = risk_model["stop_loss"]
+    take_profit = risk_model["take_profit"]
+    reward_risk = risk_model["reward_risk"]
+    risk_percent = risk_model["risk_percent"]
+    risk_model_valid = risk_model["risk_model_valid"]
+    room_to_target_ok = risk_model["room_to_target_ok"]
 
     reclaim_structure_ok = bool(reclaimed_ema20 and price_above_ema50)
     not_overextended = bool(
@@ -337,57 +531,53 @@ def entry_trigger_1h(
             )
             action = "WAIT_BETTER"
 
-    details: dict[str, Any] = {
-        "config": asdict(config),
-        "setup_context": {
-            "setup_state": setup_result.setup_state,
-            "setup_reason": setup_result.reason,
-        },
-        "last_candle": {
-            "open": float(last["open"]),
-            "high": float(last["high"]),
-            "low": float(last["low"]),
-            "close": float(last["close"]),
-            "ema_fast": float(last["ema_fast"]),
-            "ema_mid": float(last["ema_mid"]),
-            "ema_slow": float(last["ema_slow"]),
-            "atr": float(last["atr"]) if pd.notna(last["atr"]) else None,
-            "rsi": float(last["rsi"]) if pd.notna(last["rsi"]) else None,
-            "plus_di": float(last["plus_di"]) if pd.notna(last["plus_di"]) else None,
-            "minus_di": float(last["minus_di"]) if pd.notna(last["minus_di"]) else None,
-            "adx": float(last["adx"]) if pd.notna(last["adx"]) else None,
-            "volume": float(last["volume"]),
-            "volume_ma": float(last["volume_ma"]) if pd.notna(last["volume_ma"]) else None,
-            "volume_ratio": volume_ratio,
-            "current_extension_atr": current_extension_atr,
-        },
-        "hard_conditions": hard_conditions,
-        "soft_conditions": soft_conditions,
-        "soft_condition_keys": SOFT_CONDITION_KEYS,
-        "soft_score_required": config.min_soft_conditions_passed,
-        "soft_score_actual": soft_score,
-        "pattern": {
-            "name": pattern_name,
-            "strength": pattern_strength,
-        },
-        "rsi_confirmation": rsi_confirmation,
-        "local_levels": {
-            "recent_high": recent_high,
-            "recent_high_before_last": recent_high_before_last,
-            "recent_low": recent_low,
-            "breakout_of_recent_high": breakout_of_recent_high,
-        },
-        "risk_model": {
-            "entry_price": entry_price,
-            "stop_loss": stop_loss,
-            "take_profit": take_profit,
-            "reward_risk": reward_risk,
-            "risk_percent": risk_percent,
-            "risk_model_valid": risk_model_valid,
-        },
-        "structure": structure,
-        "trigger_state": trigger_state,
-    }
+    extra = None
+    if detailed:
+        extra = {
+            "setup_context": {
+                "setup_state": setup_result.setup_state,
+                "setup_reason": setup_result.reason,
+            },
+            "last_candle": {
+                "open": float(last["open"]),
+                "high": float(last["high"]),
+                "low": float(last["low"]),
+                "close": float(last["close"]),
+                "ema_fast": float(last["ema_fast"]),
+                "ema_mid": float(last["ema_mid"]),
+                "ema_slow": float(last["ema_slow"]),
+                "atr": float(last["atr"]) if pd.notna(last["atr"]) else None,
+                "rsi": float(last["rsi"]) if pd.notna(last["rsi"]) else None,
+                "plus_di": float(last["plus_di"]) if pd.notna(last["plus_di"]) else None,
+                "minus_di": float(last["minus_di"]) if pd.notna(last["minus_di"]) else None,
+                "adx": float(last["adx"]) if pd.notna(last["adx"]) else None,
+                "volume": float(last["volume"]),
+                "volume_ma": float(last["volume_ma"]) if pd.notna(last["volume_ma"]) else None,
+                "volume_ratio": volume_ratio,
+                "current_extension_atr": current_extension_atr,
+            },
+            "pattern": {
+                "name": pattern_name,
+                "strength": pattern_strength,
+            },
+            "rsi_confirmation": rsi_confirmation,
+            "local_levels": {
+                "recent_high": recent_high,
+                "recent_high_before_last": recent_high_before_last,
+                "recent_low": recent_low,
+                "breakout_of_recent_high": breakout_of_recent_high,
+            },
+            "risk_model": {
+                "entry_price": entry_price,
+                "stop_loss": stop_loss,
+                "take_profit": take_profit,
+                "reward_risk": reward_risk,
+                "risk_percent": risk_percent,
+                "risk_model_valid": risk_model_valid,
+            },
+            "structure": structure,
+            "trigger_state": trigger_state,
+        }
 
     return EntryTrigger1hResult(
         passed=passed,
@@ -402,5 +592,8 @@ def entry_trigger_1h(
         take_profit=take_profit if passed else None,
         risk_percent=risk_percent if passed else None,
         reward_risk=reward_risk if passed else None,
-        details=details,
+        config=config,
+        hard=ConditionFlags.from_mapping(HARD_CONDITION_KEYS, hard_conditions),
+        soft=ConditionFlags.from_mapping(SOFT_CONDITION_KEYS, soft_conditions),
+        extra=extra,
     )
\ No newline at end of file
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import numpy as np
+
+# Значения флагов условий.
+CONDITION_FAILED = 0
+CONDITION_PASSED = 1
+CONDITION_SKIPPED = -1
+
+
+@dataclass(slots=True, eq=False)
+class ConditionFlags:
+    """Флаги условий фильтра: общий кортеж ключей и int8-массив (1 — выполнено, 0 — нет, -1 — не проверялось)."""
+
+    keys: tuple[str, ...]
+    values: np.ndarray
+
+    @classmethod
+    def from_mapping(cls, keys: tuple[str, ...], conditions: dict[str, bool]) -> ConditionFlags:
+        values = np.array(
+            [int(bool(conditions[key])) if key in conditions else CONDITION_SKIPPED for key in keys],
+            dtype=np.int8,
+        )
+        return cls(keys, values)
+
+    @classmethod
+    def skipped(cls, keys: tuple[str, ...]) -> ConditionFlags:
+        return cls(keys, np.full(len(keys), CONDITION_SKIPPED, dtype=np.int8))
+
+    @property
+    def any_skipped(self) -> bool:
+        return bool((self.values == CONDITION_SKIPPED).any())
+
+    @property
+    def any_evaluated(self) -> bool:
+        return bool((self.values != CONDITION_SKIPPED).any())
+
+    def passed_count(self) -> int:
+        return int((self.values == CONDITION_PASSED).sum())
+
+    def skipped_keys(self) -> list[str]:
+        return [key for key, value in zip(self.keys, self.values) if value == CONDITION_SKIPPED]
+
+    def failed(self) -> list[str]:
+        return [key for key, value in zip(self.keys, self.values) if value == CONDITION_FAILED]
+
+    def to_dict(self) -> dict[str, bool]:
+        """Проверенные условия в виде {ключ: bool} в порядке keys."""
+        return {key: bool(value) for key, value in zip(self.keys, self.values) if value != CONDITION_SKIPPED}
+
+
+class CompactFilterResult:
+    """Общая часть результатов фильтров 12H/4H/1H.
+
+    Результат хранит только решение, флаги условий и ссылку на конфиг; словарь details
+    собирается при обращении. Тяжелые диагностические секции (свечи, структура, OBV, риск-модель)
+    лежат в extra и заполняются только при detailed=True — для калибровки и ручных проверок.
+    Наследник — dataclass(slots=True) с полями soft_score, config, hard, soft и extra.
+    """
+
+    __slots__ = ()
+
+    @property
+    def hard_conditions(self) -> dict[str, bool]:
+        return self.hard.to_dict()
+
+    @property
+    def soft_conditions(self) -> dict[str, bool]:
+        return self.soft.to_dict()
+
+    @property
+    def soft_score_required(self) -> int:
+        return self.config.min_soft_conditions_passed
+
+    @property
+    def short_circuit(self) -> bool:
+        """Фильтр отказал по hard-условиям, не проверив часть soft-условий (см. short_circuit у фильтров)."""
+        return self.hard.any_evaluated and self.soft.any_skipped
+
+    @property
+    def details(self) -> dict[str, Any]:
+        """Словарь в прежнем формате details; собирается заново при каждом обращении."""
+        details: dict[str, Any] = {"config": asdict(self.config)}
+        if self.hard.any_evaluated:
+            details.update({
+                "hard_conditions": self.hard_conditions,
+                "soft_conditions": self.soft_conditions,
+                "soft_condition_keys": self.soft.keys,
+                "soft_score_required": self.soft_score_required,
+                # Счет по части soft-условий не сравним с полным режимом: при short-circuit — None.
+                "soft_score_actual": None if self.short_circuit else self.soft_score,
+            })
+            if self.short_circuit:
+                details["short_circuit"] = True
+                details["soft_conditions_skipped"] = self.soft.skipped_keys()
+        if self.extra:
+            details.update(self.extra)
+        return details
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+from typing import Any, Callable, Iterable
+
+import pandas as pd
+
+from analyzes.indicator_engine import INDICATOR_KERNELS, compute_full_indicator, indicator_engine
+from config import INDICATOR_CACHE_ENABLED, INDICATOR_CACHE_MAX_ENTRIES, INDICATOR_ENGINE_ENABLED
+
+
+def _window_fingerprint(df: pd.DataFrame) -> tuple[int, int, int, float]:
+    """(first ts, last ts, rows, last close) окна: незакрытая свеча с новым close дает новый ключ."""
+    if "timestamp" in df.columns:
+        timestamps = pd.to_numeric(df["timestamp"], errors="coerce")
+        first_ts, last_ts = timestamps.iloc[0], timestamps.iloc[-1]
+    else:
+        first_ts, last_ts = df.index[0], df.index[-1]
+    if isinstance(first_ts, pd.Timestamp):
+        first_ts, last_ts = first_ts.value // 1_000_000, last_ts.value // 1_000_000
+    return int(first_ts), int(last_ts), len(df), float(df["close"].iloc[-1])
+
+
+class IndicatorCache:
+    """Общий LRU-кэш рассчитанных индикаторов для всех анализаторов.
+
+    Ключ — (symbol, timeframe, last candle ts, indicator, params) плюс отпечаток окна
+    (первая свеча, длина, последний close), так что серия считается один раз на закрытие свечи,
+    а разные окна и обновления live-свечи не путаются. Значения общие: вызывающий код не должен их изменять.
+    """
+
+    def __init__(self, max_entries: int = INDICATOR_CACHE_MAX_ENTRIES, enabled: bool = INDICATOR_CACHE_ENABLED):
+        self.max_entries = max(1, int(max_entries))
+        self.enabled = enabled
+        self._entries: OrderedDict[tuple, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        symbol: str | None,
+        timeframe: str,
+        df: pd.DataFrame,
+        indicator: str,
+        compute: Callable[[], Any] | None = None,
+        **params,
+    ) -> Any:
+        """Возвращает индикатор из кэша или считает его.
+
+        compute — функция без аргументов для собственных расчетов анализатора. Без нее indicator
+        должен быть одним из индикаторов IndicatorEngine (ema/atr/adx/rsi/obv): они берутся из движка
+        или, если движок выключен, полным pandas-пересчетом по окну. Без symbol (или с "UNKNOWN") кэш не используется.
+        """
+        if compute is None:
+            compute = self._engine_compute(symbol, timeframe, df, indicator, params)
+        if symbol in (None, "UNKNOWN") or not self.enabled or df is None or df.empty:
+            return compute()
+
+        key = self._key(symbol, timeframe, df, indicator, params)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        self._store(key, value)
+        return value
+
+    def put(self, symbol: str | None, timeframe: str, df: pd.DataFrame, indicator: str, value: Any, **params) -> None:
+        """Кладет заранее посчитанное значение (например, из пакетного расчета) под ключом, который прочитает get()."""
+        self.put_many(symbol, timeframe, df, [(indicator, params, value)])
+
+    def put_many(
+        self,
+        symbol: str | None,
+        timeframe: str,
+        df: pd.DataFrame,
+        items: Iterable[tuple[str, dict[str, Any], Any]],
+    ) -> None:
+        """put() для нескольких индикаторов одного окна: items — (indicator, params, value), отпечаток окна считается один раз."""
+        if symbol in (None, "UNKNOWN") or not self.enabled or df is None or df.empty:
+            return
+        fingerprint = _window_fingerprint(df)
+        for indicator, params, value in items:
+            self._store(self._key(symbol, timeframe, df, indicator, params, fingerprint), value)
+
+    @staticmethod
+    def _key(
+        symbol: str,
+        timeframe: str,
+        df: pd.DataFrame,
+        indicator: str,
+        params: dict[str, Any],
+        fingerprint: tuple[int, int, int, float] | None = None,
+    ) -> tuple:
+        first_ts, last_ts, rows, last_close = fingerprint or _window_fingerprint(df)
+        return (
+            str(symbol).upper(),
+            str(timeframe),
+            last_ts,
+            indicator,
+            tuple(sorted(params.items())),
+            (first_ts, rows, last_close),
+        )
+
+    def _store(self, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    @staticmethod
+    def _engine_compute(
+        symbol: str | None,
+        timeframe: str,
+        df: pd.DataFrame,
+        indicator: str,
+        params: dict[str, Any],
+    ) -> Callable[[], pd.DataFrame]:
+        if indicator not in INDICATOR_KERNELS:
+            raise ValueError(f"Indicator {indicator!r} requires compute. Engine indicators: {sorted(INDICATOR_KERNELS)}")
+        if symbol not in (None, "UNKNOWN") and INDICATOR_ENGINE_ENABLED:
+            return lambda: indicator_engine.get(symbol, timeframe, df, indicator, **params)
+        return lambda: compute_full_indicator(indicator, df, params)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def get_stats(self) -> dict[str, int | float]:
+        """Возвращает размер кэша, попадания, промахи и вытеснения."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+            }
+
+
+indicator_cache = IndicatorCache()
+
+
+def get_indicator_cache() -> IndicatorCache:
+    """Возвращает общий кэш индикаторов."""
+    return indicator_cache
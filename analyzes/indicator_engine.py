@@ -0,0 +1,521 @@
+from __future__ import annotations
+
+from collections import deque
+import math
+import threading
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from config import INDICATOR_ENGINE_MAX_HISTORY
+
+
+# Порядок входных колонок ряда.
+INPUT_COLUMNS: tuple[str, ...] = ("open", "high", "low", "close", "volume")
+
+
+def _span_to_alpha(span: float) -> float:
+    """alpha для ewm(span=...) ровно так, как его получает pandas (через center of mass)."""
+    return 1.0 / (1.0 + (span - 1) / 2)
+
+
+def _period_to_alpha(period: float) -> float:
+    """alpha для ewm(alpha=1 / period) ровно так, как его получает pandas (через center of mass)."""
+    alpha = 1 / period
+    return 1.0 / (1.0 + (1 - alpha) / alpha)
+
+
+class _EwmState:
+    """Рекурсивное состояние ewm(adjust=False).mean() с той же обработкой NaN и округлением, что в pandas."""
+
+    __slots__ = ("new_wt", "old_wt_factor", "weighted", "old_wt")
+
+    def __init__(self, alpha: float):
+        self.new_wt = alpha
+        self.old_wt_factor = 1.0 - alpha
+        self.weighted = math.nan
+        self.old_wt = 1.0
+
+    def update(self, value: float) -> float:
+        weighted = self.weighted
+        is_observation = value == value
+        if weighted == weighted:
+            self.old_wt *= self.old_wt_factor
+            if is_observation:
+                if weighted != value:
+                    weighted = (self.old_wt * weighted + self.new_wt * value) / (self.old_wt + self.new_wt)
+                self.old_wt = 1.0
+        elif is_observation:
+            weighted = value
+        self.weighted = weighted
+        return weighted
+
+
+def _true_range(high: float, low: float, prev_close: float) -> float:
+    if prev_close != prev_close:
+        return high - low
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+def _restart_ewm(raw: np.ndarray, first: float, decay: float, offset: int = 0) -> np.ndarray:
+    """ewm(adjust=False) того же входа, но начатый заново в позиции offset окна со значением first.
+
+    Рекурсия линейна, поэтому ряд, начатый с окна, отличается от продолжающегося ряда raw
+    на (first - raw[offset]) * decay ** k, где k — число свечей после начала окна.
+    """
+    restarted = np.full(len(raw), np.nan)
+    if offset < len(raw):
+        steps = np.arange(len(raw) - offset, dtype=np.float64)
+        restarted[offset:] = raw[offset:] + (first - raw[offset]) * decay ** steps
+        restarted[offset] = first
+    return restarted
+
+
+def _rma_window(values: np.ndarray, period: int) -> np.ndarray:
+    return pd.Series(values).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+
+
+class _EmaKernel:
+    columns = ("ema",)
+    raw_columns = ("ema",)
+    __slots__ = ("ewm",)
+
+    def __init__(self, period: int):
+        self.ewm = _EwmState(_span_to_alpha(period))
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float) -> tuple[float, ...]:
+        return (self.ewm.update(close),)
+
+    def window(self, raw: np.ndarray, inputs: np.ndarray) -> np.ndarray:
+        return _restart_ewm(raw[:, 0], inputs[0, 3], self.ewm.old_wt_factor)[:, None]
+
+
+class _AtrKernel:
+    columns = ("atr",)
+    raw_columns = ("tr_rma",)
+    __slots__ = ("ewm", "prev_close")
+
+    def __init__(self, period: int = 14):
+        self.ewm = _EwmState(_period_to_alpha(period))
+        self.prev_close = math.nan
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float) -> tuple[float, ...]:
+        tr = _true_range(high, low, self.prev_close)
+        self.prev_close = close
+        return (self.ewm.update(tr),)
+
+    def window(self, raw: np.ndarray, inputs: np.ndarray) -> np.ndarray:
+        # В окне у первой свечи нет предыдущего close: TR = high - low.
+        return _restart_ewm(raw[:, 0], inputs[0, 1] - inputs[0, 2], self.ewm.old_wt_factor)[:, None]
+
+
+class _AdxKernel:
+    columns = ("plus_di", "minus_di", "adx")
+    raw_columns = ("tr_rma", "plus_dm_rma", "minus_dm_rma")
+    __slots__ = ("period", "tr_ewm", "plus_ewm", "minus_ewm", "prev_high", "prev_low", "prev_close")
+
+    def __init__(self, period: int = 14):
+        self.period = int(period)
+        alpha = _period_to_alpha(period)
+        self.tr_ewm = _EwmState(alpha)
+        self.plus_ewm = _EwmState(alpha)
+        self.minus_ewm = _EwmState(alpha)
+        self.prev_high = math.nan
+        self.prev_low = math.nan
+        self.prev_close = math.nan
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float) -> tuple[float, ...]:
+        up_move = high - self.prev_high
+        down_move = -(low - self.prev_low)
+        plus_dm = up_move if (up_move > down_move and up_move > 0) else 0.0
+        minus_dm = down_move if (down_move > up_move and down_move > 0) else 0.0
+        tr = _true_range(high, low, self.prev_close)
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+        return self.tr_ewm.update(tr), self.plus_ewm.update(plus_dm), self.minus_ewm.update(minus_dm)
+
+    def window(self, raw: np.ndarray, inputs: np.ndarray) -> np.ndarray:
+        decay = self.tr_ewm.old_wt_factor
+        # Первая свеча окна: TR = high - low, направленных движений нет.
+        atr_rma = _restart_ewm(raw[:, 0], inputs[0, 1] - inputs[0, 2], decay)
+        plus_rma = _restart_ewm(raw[:, 1], 0.0, decay)
+        minus_rma = _restart_ewm(raw[:, 2], 0.0, decay)
+        # До первого направленного движения в окне средние ровно нули (иначе остаток округления
+        # дает DI ~1e-15 там, где полный пересчет получает 0 и NaN в DX).
+        up_move = np.diff(inputs[:, 1])
+        down_move = -np.diff(inputs[:, 2])
+        for rma, moved in (
+            (plus_rma, (up_move > down_move) & (up_move > 0)),
+            (minus_rma, (down_move > up_move) & (down_move > 0)),
+        ):
+            rma[: int(np.argmax(moved)) + 1 if moved.any() else len(rma)] = 0.0
+
+        atr_rma[atr_rma == 0] = np.nan
+        plus_di = 100 * plus_rma / atr_rma
+        minus_di = 100 * minus_rma / atr_rma
+        di_sum = plus_di + minus_di
+        di_sum[di_sum == 0] = np.nan
+        dx = 100 * np.abs(plus_di - minus_di) / di_sum
+        # DX зависит от начала окна в каждой точке, поэтому его сглаживание считается по окну заново.
+        return np.column_stack([plus_di, minus_di, _rma_window(dx, self.period)])
+
+
+class _RsiKernel:
+    columns = ("rsi",)
+    raw_columns = ("gain_rma", "loss_rma")
+    __slots__ = ("gain_ewm", "loss_ewm", "prev_close")
+
+    def __init__(self, period: int = 14):
+        alpha = _period_to_alpha(period)
+        self.gain_ewm = _EwmState(alpha)
+        self.loss_ewm = _EwmState(alpha)
+        self.prev_close = math.nan
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float) -> tuple[float, ...]:
+        delta = close - self.prev_close
+        self.prev_close = close
+        gain = max(delta, 0.0) if delta == delta else math.nan
+        loss = -min(delta, 0.0) if delta == delta else math.nan
+        return self.gain_ewm.update(gain), self.loss_ewm.update(loss)
+
+    def window(self, raw: np.ndarray, inputs: np.ndarray) -> np.ndarray:
+        decay = self.gain_ewm.old_wt_factor
+        avg_gain = np.full(len(raw), np.nan)
+        avg_loss = np.full(len(raw), np.nan)
+        if len(raw) > 1:
+            # В окне у первой свечи нет изменения цены: средние начинаются со второй.
+            delta = inputs[1, 3] - inputs[0, 3]
+            avg_gain = _restart_ewm(raw[:, 0], max(delta, 0.0), decay, offset=1)
+            avg_loss = _restart_ewm(raw[:, 1], -min(delta, 0.0), decay, offset=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100 - (100 / (1 + avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)))
+        rsi[(avg_loss == 0) & (avg_gain > 0)] = 100.0
+        rsi[(avg_loss == 0) & (avg_gain == 0)] = 50.0
+        return rsi[:, None]
+
+
+class _ObvKernel:
+    columns = ("obv", "obv_ma", "obv_ema_fast", "obv_ema_slow")
+    raw_columns = ("obv", "obv_ema_fast", "obv_ema_slow")
+    __slots__ = ("ma_period", "fast_ewm", "slow_ewm", "prev_close", "obv")
+
+    def __init__(self, ma_period: int = 20, fast_ema_period: int = 10, slow_ema_period: int = 30):
+        self.ma_period = int(ma_period)
+        self.fast_ewm = _EwmState(_span_to_alpha(fast_ema_period))
+        self.slow_ewm = _EwmState(_span_to_alpha(slow_ema_period))
+        self.prev_close = math.nan
+        self.obv = 0.0
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float) -> tuple[float, ...]:
+        price_diff = close - self.prev_close if self.prev_close == self.prev_close else 0.0
+        self.prev_close = close
+        if price_diff > 0:
+            self.obv += volume
+        elif price_diff < 0:
+            self.obv -= volume
+        return self.obv, self.fast_ewm.update(self.obv), self.slow_ewm.update(self.obv)
+
+    def window(self, raw: np.ndarray, inputs: np.ndarray) -> np.ndarray:
+        # OBV окна начинается с нуля: это накопленный ряд за вычетом значения на первой свече окна.
+        base = raw[0, 0]
+        price_diff = np.diff(inputs[:, 3], prepend=inputs[0, 3])
+        obv = np.cumsum(np.where(price_diff > 0, inputs[:, 4], np.where(price_diff < 0, -inputs[:, 4], 0.0)))
+        obv_ma = pd.Series(obv).rolling(self.ma_period).mean().to_numpy()
+        fast = _restart_ewm(raw[:, 1] - base, 0.0, self.fast_ewm.old_wt_factor)
+        slow = _restart_ewm(raw[:, 2] - base, 0.0, self.slow_ewm.old_wt_factor)
+        return np.column_stack([obv, obv_ma, fast, slow])
+
+
+INDICATOR_KERNELS = {
+    "ema": _EmaKernel,
+    "atr": _AtrKernel,
+    "adx": _AdxKernel,
+    "rsi": _RsiKernel,
+    "obv": _ObvKernel,
+}
+# Готовые индексы колонок результата: строить pd.Index заново на каждый вызов заметно дороже самого расчета.
+_COLUMN_INDEXES = {name: pd.Index(kernel.columns) for name, kernel in INDICATOR_KERNELS.items()}
+
+
+def _column_index(name: str) -> pd.Index:
+    return _COLUMN_INDEXES[name]
+
+
+def compute_full_indicator(name: str, inputs: pd.DataFrame, params: dict[str, Any]) -> pd.DataFrame:
+    """Полный пересчет индикатора по окну исходными pandas-функциями фильтров (без состояния)."""
+    from analyzes.obv_analyzer_v3 import OBVAnalyzerV3, OBVPolicy
+    from analyzes.setup_filter_4h import rsi
+    from analyzes.trend_filter_12h_v2 import adx_components, atr, ema
+
+    if name == "ema":
+        return pd.DataFrame({"ema": ema(inputs["close"], params["period"])})
+    if name == "atr":
+        return pd.DataFrame({"atr": atr(inputs, **params)})
+    if name == "adx":
+        return adx_components(inputs, **params)
+    if name == "rsi":
+        return pd.DataFrame({"rsi": rsi(inputs["close"], **params)})
+    if name == "obv":
+        policy = OBVPolicy(
+            ma_period=params.get("ma_period", 20),
+            fast_ema_period=params.get("fast_ema_period", 10),
+            slow_ema_period=params.get("slow_ema_period", 30),
+        )
+        obv = OBVAnalyzerV3.compute_obv_series(inputs["close"], inputs["volume"])
+        return pd.DataFrame(
+            {
+                "obv": obv,
+                "obv_ma": obv.rolling(policy.ma_period).mean(),
+                "obv_ema_fast": obv.ewm(span=policy.fast_ema_period, adjust=False).mean(),
+                "obv_ema_slow": obv.ewm(span=policy.slow_ema_period, adjust=False).mean(),
+            }
+        )
+    raise ValueError(f"Unknown indicator: {name!r}. Expected one of {sorted(INDICATOR_KERNELS)}")
+
+
+class _IndicatorState:
+    __slots__ = ("kernel", "values")
+
+    def __init__(self, kernel, capacity: int):
+        self.kernel = kernel
+        # Сырые рекурсии по всей накопленной истории; в значения окна их переводит kernel.window.
+        self.values = np.full((capacity, len(kernel.raw_columns)), np.nan, dtype=np.float64)
+
+
+class _SeriesState:
+    """Входные закрытые свечи одного (symbol, timeframe) и рекурсивные состояния индикаторов по ним."""
+
+    __slots__ = ("capacity", "timestamps", "inputs", "size", "indicators", "lock")
+
+    def __init__(self):
+        self.capacity = 0
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.inputs = np.empty((0, len(INPUT_COLUMNS)), dtype=np.float64)
+        self.size = 0
+        self.indicators: dict[tuple[str, tuple], _IndicatorState] = {}
+        self.lock = threading.Lock()
+
+    def reserve(self, needed: int, max_capacity: int) -> None:
+        """Растит массивы ряда удвоением, но не больше max_capacity."""
+        if needed <= self.capacity:
+            return
+        capacity = min(max_capacity, max(needed, 2 * self.capacity))
+        timestamps = np.empty(capacity, dtype=np.int64)
+        inputs = np.empty((capacity, len(INPUT_COLUMNS)), dtype=np.float64)
+        timestamps[:self.size] = self.timestamps[:self.size]
+        inputs[:self.size] = self.inputs[:self.size]
+        self.timestamps, self.inputs = timestamps, inputs
+        for state in self.indicators.values():
+            values = np.full((capacity, state.values.shape[1]), np.nan, dtype=np.float64)
+            values[:self.size] = state.values[:self.size]
+            state.values = values
+        self.capacity = capacity
+
+
+class IndicatorEngine:
+    """Инкрементальные индикаторы (EMA/RMA/ATR/ADX/RSI/OBV) с состоянием на (symbol, timeframe, params).
+
+    За O(1) на новую закрытую свечу обновляются только сырые рекурсии состояния. Чтение get остается
+    O(window): значения окна собираются из накопленных рекурсий векторной поправкой numpy, без
+    python-цикла по свечам, но не за константу.
+    Результат get совпадает с полным пересчетом pandas-функциями фильтров по переданному окну
+    (compute_full_indicator): рекурсии ewm линейны, поэтому ряд, начатый с первой свечи окна, получается
+    из накопленного поправкой, затухающей как (1 - alpha) ** k. Значит, результат не зависит от того,
+    сколько истории видел движок, порядка вызовов и перезапусков; validate проверяет это на окне вызывающего.
+    При переполнении max_history старая половина истории отбрасывается и рекурсии один раз пересчитываются.
+    """
+
+    def __init__(self, max_history: int = INDICATOR_ENGINE_MAX_HISTORY):
+        self.max_history = max(2, int(max_history))
+        self._series: dict[tuple[str, str], _SeriesState] = {}
+        self._series_guard = threading.Lock()
+
+    def _get_series(self, key: tuple[str, str]) -> _SeriesState:
+        with self._series_guard:
+            series = self._series.get(key)
+            if series is None:
+                series = _SeriesState()
+                self._series[key] = series
+            return series
+
+    @staticmethod
+    def _frame_inputs(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        index = df.index
+        if isinstance(index, pd.DatetimeIndex):
+            timestamps = index.as_unit("ms").asi8
+        else:
+            timestamps = np.asarray(index, dtype=np.int64)
+        # По колонке, без промежуточного DataFrame из пяти колонок.
+        return timestamps, np.column_stack([df[column].to_numpy(dtype=np.float64) for column in INPUT_COLUMNS])
+
+    def _run(self, series: _SeriesState, state: _IndicatorState, start: int) -> None:
+        update = state.kernel.update
+        values = state.values
+        for position in range(start, series.size):
+            values[position] = update(*series.inputs[position])
+
+    def _reseed(self, series: _SeriesState, timestamps: np.ndarray, inputs: np.ndarray) -> None:
+        """Заменяет историю ряда и пересчитывает все индикаторы заново."""
+        size = min(len(timestamps), self.max_history)
+        series.reserve(size, self.max_history)
+        series.timestamps[:size] = timestamps[-size:]
+        series.inputs[:size] = inputs[-size:]
+        series.size = size
+        for (name, params), state in list(series.indicators.items()):
+            fresh = _IndicatorState(INDICATOR_KERNELS[name](**dict(params)), series.capacity)
+            series.indicators[(name, params)] = fresh
+            self._run(series, fresh, 0)
+
+    def _sync(self, series: _SeriesState, timestamps: np.ndarray, inputs: np.ndarray) -> int:
+        """Подтягивает в ряд новые свечи из окна и возвращает позицию первой свечи окна в истории."""
+        size = series.size
+        if size:
+            first_pos = int(np.searchsorted(series.timestamps[:size], timestamps[0]))
+            overlap = min(size - first_pos, len(timestamps))
+            consistent = (
+                first_pos < size
+                and series.timestamps[first_pos] == timestamps[0]
+                and np.array_equal(series.timestamps[first_pos:first_pos + overlap], timestamps[:overlap])
+                and np.array_equal(series.inputs[first_pos:first_pos + overlap, 3], inputs[:overlap, 3])
+            )
+            if consistent:
+                new_count = len(timestamps) - overlap
+                if new_count == 0:
+                    return first_pos
+                if size + new_count > self.max_history:
+                    # Компакция: оставляем свежую половину истории, дальше снова растем инкрементально.
+                    keep = max(self.max_history // 2, len(timestamps))
+                    merged_ts = np.concatenate([series.timestamps[:size], timestamps[overlap:]])[-keep:]
+                    merged_inputs = np.concatenate([series.inputs[:size], inputs[overlap:]])[-keep:]
+                    self._reseed(series, merged_ts, merged_inputs)
+                    return series.size - len(timestamps)
+
+                series.reserve(size + new_count, self.max_history)
+                series.timestamps[size:size + new_count] = timestamps[overlap:]
+                series.inputs[size:size + new_count] = inputs[overlap:]
+                series.size = size + new_count
+                for state in series.indicators.values():
+                    self._run(series, state, size)
+                return first_pos
+
+        # Первое обращение, разрыв, пересекающаяся правка свечей или окно старше истории: начинаем ряд с окна.
+        self._reseed(series, timestamps, inputs)
+        return series.size - len(timestamps)
+
+    def get(self, symbol: str, timeframe: str, df: pd.DataFrame, name: str, **params) -> pd.DataFrame:
+        """Значения индикатора по окну df (закрытые свечи по возрастанию времени), выровненные по df.index.
+
+        Совпадают с compute_full_indicator(name, df, params) с точностью до округления.
+        """
+        if name not in INDICATOR_KERNELS:
+            raise ValueError(f"Unknown indicator: {name!r}. Expected one of {sorted(INDICATOR_KERNELS)}")
+        columns = INDICATOR_KERNELS[name].columns
+        if df.empty:
+            return pd.DataFrame(columns=list(columns), index=df.index, dtype=float)
+
+        timestamps, inputs = self._frame_inputs(df)
+        if np.isnan(inputs).any():
+            # Пропуски меняют веса ewm нелинейно: такое окно считаем полным пересчетом.
+            return compute_full_indicator(name, df, params).set_axis(df.index)
+
+        if len(df) > self.max_history:
+            # Окно длиннее допустимой истории: считаем разово, без сохранения состояния.
+            kernel = INDICATOR_KERNELS[name](**params)
+            raw = np.array([kernel.update(*row) for row in inputs], dtype=np.float64)
+        else:
+            key = (name, tuple(sorted(params.items())))
+            series = self._get_series((str(symbol).upper(), str(timeframe)))
+            with series.lock:
+                start = self._sync(series, timestamps, inputs)
+                state = series.indicators.get(key)
+                if state is None:
+                    state = _IndicatorState(INDICATOR_KERNELS[name](**params), series.capacity)
+                    series.indicators[key] = state
+                    self._run(series, state, 0)
+                kernel = state.kernel
+                raw = state.values[start:start + len(df)].copy()
+        return pd.DataFrame(kernel.window(raw, inputs), columns=_column_index(name), index=df.index)
+
+    def ema(self, symbol: str, timeframe: str, df: pd.DataFrame, period: int) -> pd.Series:
+        return self.get(symbol, timeframe, df, "ema", period=period)["ema"]
+
+    def atr(self, symbol: str, timeframe: str, df: pd.DataFrame, period: int = 14) -> pd.Series:
+        return self.get(symbol, timeframe, df, "atr", period=period)["atr"]
+
+    def adx_components(self, symbol: str, timeframe: str, df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
+        return self.get(symbol, timeframe, df, "adx", period=period)
+
+    def rsi(self, symbol: str, timeframe: str, df: pd.DataFrame, period: int = 14) -> pd.Series:
+        return self.get(symbol, timeframe, df, "rsi", period=period)["rsi"]
+
+    def obv(
+        self,
+        symbol: str,
+        timeframe: str,
+        df: pd.DataFrame,
+        ma_period: int = 20,
+        fast_ema_period: int = 10,
+        slow_ema_period: int = 30,
+    ) -> pd.DataFrame:
+        return self.get(
+            symbol,
+            timeframe,
+            df,
+            "obv",
+            ma_period=ma_period,
+            fast_ema_period=fast_ema_period,
+            slow_ema_period=slow_ema_period,
+        )
+
+    def validate(
+        self,
+        symbol: str,
+        timeframe: str,
+        df: pd.DataFrame,
+        indicators: list[tuple[str, dict[str, Any]]] | None = None,
+        rtol: float = 1e-9,
+    ) -> dict[str, float]:
+        """Сверяет get по окну df с полным pandas-пересчетом по тому же окну.
+
+        indicators — (name, params); по умолчанию все индикаторы, заведенные для ряда. Расхождение
+        считается относительно максимума модуля колонки. Возвращает максимальное расхождение
+        по индикатору; ValueError, если оно больше rtol.
+        """
+        if indicators is None:
+            series = self._get_series((str(symbol).upper(), str(timeframe)))
+            with series.lock:
+                indicators = [(name, dict(params)) for name, params in series.indicators]
+
+        report: dict[str, float] = {}
+        for name, params in indicators:
+            streamed = self.get(symbol, timeframe, df, name, **params).to_numpy(dtype=np.float64)
+            reference = compute_full_indicator(name, df, params).to_numpy(dtype=np.float64)
+            label = f"{name}{params}"
+            if streamed.size == 0:
+                report[label] = 0.0
+                continue
+            both_nan = np.isnan(streamed) & np.isnan(reference)
+            scale = np.maximum(np.nan_to_num(np.nanmax(np.abs(reference), axis=0, initial=0.0)), 1.0)
+            diff = np.where(both_nan, 0.0, np.abs(streamed - reference) / scale)
+            max_diff = float(np.nan_to_num(diff, nan=np.inf).max())
+            report[label] = max_diff
+            if max_diff > rtol:
+                raise ValueError(f"Indicator {label} diverged from full recompute: {max_diff:.3e} > {rtol:.0e}")
+        return report
+
+    def reset(self, symbol: str | None = None, timeframe: str | None = None) -> None:
+        """Сбрасывает состояние одного ряда или всех рядов."""
+        with self._series_guard:
+            if symbol is None:
+                self._series.clear()
+            else:
+                self._series.pop((str(symbol).upper(), str(timeframe)), None)
+
+
+indicator_engine = IndicatorEngine()
+
+
+def get_indicator_engine() -> IndicatorEngine:
+    """Возвращает общий движок индикаторов для фильтров и калибровки."""
+    return indicator_engine
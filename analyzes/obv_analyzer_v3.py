@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-import json
-import os
 import time
 from dataclasses import dataclass, asdict
 from typing import Any, Dict, List, Optional
@@ -9,6 +7,12 @@ from typing import Any, Dict, List, Optional
 import numpy as np
 import pandas as pd
 
+from analyzes.pivots import pivot_high_indices, pivot_low_indices
+from state_store import StateStore, open_state_store
+
+
+OBV_STATE_FILE = "data/obv_state_v3.json"
+
 
 @dataclass
 class OBVPolicy:
@@ -23,37 +27,10 @@ class OBVPolicy:
     alert_on_change_only: bool = True
 
 
-class JSONStateStore:
-    def __init__(self, file_path: str = "data/obv_state_v3.json"):
-        self.file_path = file_path
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-    def _load(self) -> Dict[str, Any]:
-        if not os.path.exists(self.file_path):
-            return {}
-        try:
-            with open(self.file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-
-    def _save(self, payload: Dict[str, Any]) -> None:
-        with open(self.file_path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
-
-    def get(self, key: str) -> Optional[Dict[str, Any]]:
-        return self._load().get(key)
-
-    def set(self, key: str, value: Dict[str, Any]) -> None:
-        payload = self._load()
-        payload[key] = value
-        self._save(payload)
-
-
 class OBVAnalyzerV3:
-    def __init__(self, policy: Optional[OBVPolicy] = None, store: Optional[JSONStateStore] = None):
+    def __init__(self, policy: Optional[OBVPolicy] = None, store: Optional[StateStore] = None):
         self.policy = policy or OBVPolicy()
-        self.store = store or JSONStateStore()
+        self.store = store or open_state_store("obv_state_v3", OBV_STATE_FILE)
 
     @staticmethod
     def _key(symbol: str, timeframe: str) -> str:
@@ -77,16 +54,8 @@ class OBVAnalyzerV3:
         closes = work["close"].values
         obv_values = work["obv"].values
 
-        pivot_lows: List[int] = []
-        pivot_highs: List[int] = []
-
-        for idx in range(pivot_window, len(work) - pivot_window):
-            window_prices = closes[idx - pivot_window : idx + pivot_window + 1]
-            center_price = closes[idx]
-            if center_price == np.min(window_prices):
-                pivot_lows.append(idx)
-            if center_price == np.max(window_prices):
-                pivot_highs.append(idx)
+        pivot_lows: List[int] = pivot_low_indices(closes, pivot_window, pivot_window).tolist()
+        pivot_highs: List[int] = pivot_high_indices(closes, pivot_window, pivot_window).tolist()
 
         if len(pivot_lows) >= 2:
             prev_idx, last_idx = pivot_lows[-2], pivot_lows[-1]
@@ -120,27 +89,37 @@ class OBVAnalyzerV3:
 
         return {"type": "NONE", "details": "OBV дивергенция не обнаружена"}
 
-    def compute_obv_features(self, df: pd.DataFrame) -> Dict[str, Any]:
+    @staticmethod
+    def compute_obv_series(close: pd.Series, volume: pd.Series) -> pd.Series:
+        price_diff = close.diff().fillna(0)
+        signed_volume = np.where(
+            price_diff > 0,
+            volume,
+            np.where(price_diff < 0, -volume, 0),
+        )
+        return pd.Series(signed_volume, index=close.index).cumsum()
+
+    def compute_obv_features(self, df: pd.DataFrame, obv_frame: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """obv_frame — уже посчитанные obv/obv_ma/obv_ema_fast/obv_ema_slow (например, из IndicatorEngine)."""
         error = self._validate_df(df)
         if error:
             return {"ok": False, "error": error}
 
         work = df[["close", "volume"]].copy()
-        work["price_diff"] = work["close"].diff().fillna(0)
-        signed_volume = np.where(
-            work["price_diff"] > 0,
-            work["volume"],
-            np.where(work["price_diff"] < 0, -work["volume"], 0),
-        )
-        obv = pd.Series(signed_volume, index=work.index).cumsum()
+        if obv_frame is not None:
+            obv = obv_frame["obv"]
+            obv_ma = obv_frame["obv_ma"]
+            obv_ema_fast = obv_frame["obv_ema_fast"]
+            obv_ema_slow = obv_frame["obv_ema_slow"]
+        else:
+            obv = self.compute_obv_series(work["close"], work["volume"])
+            obv_ma = obv.rolling(self.policy.ma_period).mean()
+            obv_ema_fast = obv.ewm(span=self.policy.fast_ema_period, adjust=False).mean()
+            obv_ema_slow = obv.ewm(span=self.policy.slow_ema_period, adjust=False).mean()
 
         if obv.dropna().empty:
             return {"ok": False, "error": "Недостаточно данных для OBV"}
 
-        obv_ma = obv.rolling(self.policy.ma_period).mean()
-        obv_ema_fast = obv.ewm(span=self.policy.fast_ema_period, adjust=False).mean()
-        obv_ema_slow = obv.ewm(span=self.policy.slow_ema_period, adjust=False).mean()
-
         last_obv = float(obv.iloc[-1])
         prev_obv = float(obv.iloc[-2]) if len(obv) > 1 else last_obv
         trend_idx = self.policy.trend_lookback + 1
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _pivot_mask(values: np.ndarray, left_bars: int, right_bars: int, unique: bool, use_max: bool) -> np.ndarray:
+    """Маска pivot-свечей для позиций left_bars..n-right_bars-1 (окно [i - left, i + right])."""
+    window = left_bars + right_bars + 1
+    windows = sliding_window_view(values, window)
+    centers = values[left_bars:len(values) - right_bars]
+    extremes = windows.max(axis=1) if use_max else windows.min(axis=1)
+    mask = centers == extremes
+    if unique:
+        # Экстремум должен встречаться в окне ровно один раз, иначе это плато, а не pivot.
+        mask &= (windows == centers[:, None]).sum(axis=1) == 1
+    return mask
+
+
+def _pivot_indices(values, left_bars: int, right_bars: int, unique: bool, use_max: bool) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    left_bars = max(0, int(left_bars))
+    right_bars = max(0, int(right_bars))
+    if len(values) < left_bars + right_bars + 1:
+        return np.empty(0, dtype=np.int64)
+    mask = _pivot_mask(values, left_bars, right_bars, unique, use_max)
+    return np.flatnonzero(mask) + left_bars
+
+
+def pivot_high_indices(values, left_bars: int = 2, right_bars: int = 2, unique: bool = False) -> np.ndarray:
+    """Позиции pivot high: значение равно максимуму окна из left_bars слева и right_bars справа.
+
+    Справа требуются уже закрытые right_bars свечей, поэтому последние right_bars позиций
+    pivot не бывают. unique=True отбрасывает pivot, если максимум в окне повторяется.
+    """
+    return _pivot_indices(values, left_bars, right_bars, unique, use_max=True)
+
+
+def pivot_low_indices(values, left_bars: int = 2, right_bars: int = 2, unique: bool = False) -> np.ndarray:
+    """Позиции pivot low: значение равно минимуму окна; правила те же, что у pivot_high_indices."""
+    return _pivot_indices(values, left_bars, right_bars, unique, use_max=False)
+
+
+def find_pivots(
+    high,
+    low,
+    left_bars: int = 2,
+    right_bars: int = 2,
+    unique: bool = False,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Возвращает (pivot high позиции по high, pivot low позиции по low) одним вызовом."""
+    return (
+        pivot_high_indices(high, left_bars, right_bars, unique),
+        pivot_low_indices(low, left_bars, right_bars, unique),
+    )
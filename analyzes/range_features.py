@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+RANGE_REGRESSION_PERIOD = 50
+RANGE_MAX_SLOPE_PCT = 2.0
+RANGE_MAX_PRICE_RANGE_PCT = 8.0
+RANGE_BB_WIDTH_TOLERANCE = 1.1
+RANGE_BB_WIDTH_AVG_WINDOW = 20
+
+
+def _rolling(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    """Скользящая агрегация с NaN на первых window-1 позициях (как pandas rolling с min_periods=window)."""
+    out = np.full(len(values), np.nan)
+    if window <= 0 or len(values) < window:
+        return out
+    with np.errstate(invalid="ignore"):
+        out[window - 1:] = reducer(sliding_window_view(values, window), axis=1)
+    return out
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, np.mean)
+
+
+def _ewm(values: np.ndarray, span: int) -> np.ndarray:
+    return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def rolling_linregress(values, period: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Наклон, r-value и среднее линейной регрессии по последним period значениям для каждого бара.
+
+    Считается по накопленным суммам Σy, Σk·y, Σy² (k — номер бара), поэтому каждый бар стоит O(1),
+    а не отдельный linregress. Значения сдвигаются на общее среднее, чтобы разности сумм не теряли точность.
+    Первые period-1 позиций — NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    slope = np.full(n, np.nan)
+    r_value = np.full(n, np.nan)
+    mean = np.full(n, np.nan)
+    if period < 2 or n < period:
+        return slope, r_value, mean
+
+    offset = values.mean()
+    y = values - offset
+    k = np.arange(n, dtype=float)
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sum_ky = np.concatenate(([0.0], np.cumsum(k * y)))
+    sum_yy = np.concatenate(([0.0], np.cumsum(y * y)))
+
+    starts = np.arange(n - period + 1)
+    ends = starts + period
+    window_y = sum_y[ends] - sum_y[starts]
+    # Σ(x - x̄)·y при x = 0..period-1 внутри окна: сдвигаем k к началу окна и центрируем.
+    sxy = (sum_ky[ends] - sum_ky[starts]) - (starts + (period - 1) / 2) * window_y
+    sxx = period * (period * period - 1) / 12
+    syy = (sum_yy[ends] - sum_yy[starts]) - window_y * window_y / period
+
+    slope[period - 1:] = sxy / sxx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.where(syy > 0, sxy / np.sqrt(sxx * np.maximum(syy, 0.0)), 0.0)
+    r_value[period - 1:] = np.clip(r, -1.0, 1.0)
+    mean[period - 1:] = window_y / period + offset
+    return slope, r_value, mean
+
+
+def range_flat_mask(close, bb_width, period: int = RANGE_REGRESSION_PERIOD) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Флэт по каждому бару с условиями is_market_in_range: (маска, наклон в % за period, диапазон цены в %).
+
+    Бар t считается так же, как is_market_in_range по окну df[:t + 1]; до period + 10 баров флэта нет.
+    """
+    close = np.asarray(close, dtype=float)
+    bb_width = np.asarray(bb_width, dtype=float)
+    slope, _, mean = rolling_linregress(close, period)
+    window_max = _rolling(close, period, np.max)
+    window_min = _rolling(close, period, np.min)
+    avg_bb_width = _rolling(bb_width, RANGE_BB_WIDTH_AVG_WINDOW, np.nanmean)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope_pct = slope * period / mean * 100
+        price_range_pct = (window_max - window_min) / mean * 100
+        flat = (
+            (np.abs(slope_pct) < RANGE_MAX_SLOPE_PCT)
+            & (bb_width <= avg_bb_width * RANGE_BB_WIDTH_TOLERANCE)
+            & (price_range_pct < RANGE_MAX_PRICE_RANGE_PCT)
+            & (window_max != window_min)
+        )
+    flat[: period + 9] = False
+    return flat, slope_pct, price_range_pct
+
+
+@dataclass(slots=True)
+class RangeFeatures:
+    """Матрица признаков Range Trading: по одному numpy-массиву на признак, значение на каждый бар."""
+
+    index: pd.Index
+    close: np.ndarray
+    middle_bb: np.ndarray
+    upper_bb: np.ndarray
+    lower_bb: np.ndarray
+    bb_width: np.ndarray
+    rsi: np.ndarray
+    stoch_k: np.ndarray
+    stoch_d: np.ndarray
+    macd_hist: np.ndarray
+    atr: np.ndarray
+    slope_pct: np.ndarray
+    price_range_pct: np.ndarray
+    is_flat: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def series(self, name: str) -> pd.Series:
+        """Признак как pd.Series с индексом исходного DataFrame."""
+        return pd.Series(getattr(self, name), index=self.index, name=name)
+
+
+def build_range_feature_matrix(
+    df: pd.DataFrame,
+    bb_period: int = 20,
+    bb_std: float = 2,
+    rsi_period: int = 14,
+    stoch_period: int = 14,
+    stoch_smooth_k: int = 3,
+    stoch_smooth_d: int = 3,
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_signal: int = 9,
+    atr_period: int = 14,
+    regression_period: int = RANGE_REGRESSION_PERIOD,
+) -> RangeFeatures:
+    """Все признаки Range Trading за один проход по непрерывным массивам OHLC.
+
+    Формулы те же, что у calculate_bollinger_bands / calculate_rsi / calculate_stochastic /
+    calculate_macd / calculate_atr и is_market_in_range в range_trading, но по всем барам сразу:
+    значение на баре t совпадает с анализом окна df[:t + 1], поэтому матрица годится и для
+    побарового прогона истории.
+    """
+    close = np.ascontiguousarray(df['close'].to_numpy(dtype=float))
+    high = np.ascontiguousarray(df['high'].to_numpy(dtype=float))
+    low = np.ascontiguousarray(df['low'].to_numpy(dtype=float))
+
+    # Bollinger Bands
+    middle_bb = _rolling_mean(close, bb_period)
+    std = _rolling(close, bb_period, lambda windows, axis: windows.std(axis=axis, ddof=1))
+    upper_bb = middle_bb + std * bb_std
+    lower_bb = middle_bb - std * bb_std
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bb_width = (upper_bb - lower_bb) / middle_bb
+
+    # RSI на простых средних (первая разность считается нулевой, как delta.where(..., 0))
+    delta = np.diff(close, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = _rolling_mean(gain, rsi_period) / _rolling_mean(loss, rsi_period)
+        rsi = 100 - (100 / (1 + rs))
+
+    # Stochastic
+    low_min = _rolling(low, stoch_period, np.min)
+    high_max = _rolling(high, stoch_period, np.max)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stoch_raw = 100 * (close - low_min) / (high_max - low_min)
+    stoch_k = _rolling_mean(stoch_raw, stoch_smooth_k)
+    stoch_d = _rolling_mean(stoch_k, stoch_smooth_d)
+
+    # MACD
+    macd_line = _ewm(close, macd_fast) - _ewm(close, macd_slow)
+    macd_hist = macd_line - _ewm(macd_line, macd_signal)
+
+    # ATR на простой средней True Range (первый бар — только high - low)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    atr = _rolling_mean(true_range, atr_period)
+
+    is_flat, slope_pct, price_range_pct = range_flat_mask(close, bb_width, regression_period)
+
+    return RangeFeatures(
+        index=df.index,
+        close=close,
+        middle_bb=middle_bb,
+        upper_bb=upper_bb,
+        lower_bb=lower_bb,
+        bb_width=bb_width,
+        rsi=rsi,
+        stoch_k=stoch_k,
+        stoch_d=stoch_d,
+        macd_hist=macd_hist,
+        atr=atr,
+        slope_pct=slope_pct,
+        price_range_pct=price_range_pct,
+        is_flat=is_flat,
+    )
@@ -2,6 +2,8 @@ import time
 import numpy as np
 import pandas as pd
 
+from analyzes.pivots import pivot_high_indices, pivot_low_indices
+
 
 class RSIAnalyzer:
     def __init__(self, default_period=14, default_lookback=30, default_pivot_window=2):
@@ -174,17 +176,8 @@ class RSIAnalyzer:
         closes = work['close'].values
         rsis = work['rsi'].values
 
-        pivot_lows = []
-        pivot_highs = []
-
-        for i in range(pivot_window, len(work) - pivot_window):
-            window_prices = closes[i - pivot_window:i + pivot_window + 1]
-            center_price = closes[i]
-
-            if center_price == np.min(window_prices):
-                pivot_lows.append(i)
-            if center_price == np.max(window_prices):
-                pivot_highs.append(i)
+        pivot_lows = pivot_low_indices(closes, pivot_window, pivot_window).tolist()
+        pivot_highs = pivot_high_indices(closes, pivot_window, pivot_window).tolist()
 
         if len(pivot_lows) >= 2:
             prev_idx, last_idx = pivot_lows[-2], pivot_lows[-1]
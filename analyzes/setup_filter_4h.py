@@ -1,23 +1,33 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Any
 
 import numpy as np
 import pandas as pd
 
+from analyzes.filter_result import CompactFilterResult, ConditionFlags
+from analyzes.indicator_cache import indicator_cache
 from analyzes.obv_analyzer_v3 import OBVAnalyzerV3, OBVPolicy
 from analyzes.trend_filter_12h_v2 import (
-    adx_components,
-    atr,
-    ema,
     evaluate_market_structure,
     find_confirmed_swings,
     rma,
     validate_ohlcv_dataframe,
 )
+from ohlcv_bundle import OHLCVBundle, as_filter_frame
 
 
+HARD_CONDITION_KEYS: tuple[str, ...] = (
+    "trend_bias_passed",
+    "close_above_ema200",
+    "ema50_above_ema200",
+    "pullback_happened",
+    "pullback_not_too_deep",
+    "structure_not_broken",
+    "not_reoverextended",
+)
+
 SOFT_CONDITION_KEYS: tuple[str, ...] = (
     "touched_working_zone",
     "reclaimed_ema20",
@@ -79,14 +89,18 @@ class SetupFilter4hConfig:
 
 
 @dataclass(slots=True)
-class SetupFilter4hResult:
+class SetupFilter4hResult(CompactFilterResult):
     passed: bool
     hard_passed: bool
     soft_score: int
     soft_score_max: int
     reason: str
     setup_state: str
-    details: dict[str, Any]
+    config: SetupFilter4hConfig
+    hard: ConditionFlags
+    soft: ConditionFlags
+    # Диагностика для details (свеча, откат, OBV, структура); при detailed=False — None
+    extra: dict[str, Any] | None = None
 
 
 def rsi(series: pd.Series, period: int = 14) -> pd.Series:
@@ -199,7 +213,7 @@ def resolve_setup_state(
     return "invalid"
 
 
-def build_obv_confirmation(df: pd.DataFrame, config: SetupFilter4hConfig) -> dict[str, Any]:
+def build_obv_confirmation(df: pd.DataFrame, config: SetupFilter4hConfig, symbol: str | None = None) -> dict[str, Any]:
     """Считает OBV-признаки как дополнительное подтверждение 4H continuation setup."""
     analyzer = OBVAnalyzerV3(
         policy=OBVPolicy(
@@ -215,7 +229,19 @@ def build_obv_confirmation(df: pd.DataFrame, config: SetupFilter4hConfig) -> dic
         )
     )
 
-    features = analyzer.compute_obv_features(df[["close", "volume"]])
+    obv_frame = None
+    if symbol is not None:
+        obv_frame = indicator_cache.get(
+            symbol,
+            "240",
+            df,
+            "obv",
+            ma_period=config.obv_ma_period,
+            fast_ema_period=config.obv_fast_ema_period,
+            slow_ema_period=config.obv_slow_ema_period,
+        )
+
+    features = analyzer.compute_obv_features(df[["close", "volume"]], obv_frame=obv_frame)
     decision = analyzer.classify_obv_state(features, previous_state=None)
 
     if not features.get("ok"):
@@ -245,16 +271,111 @@ def build_obv_confirmation(df: pd.DataFrame, config: SetupFilter4hConfig) -> dic
     }
 
 
-def setup_filter_4h(
+def _short_circuit_rejection(
     df: pd.DataFrame,
+    config: SetupFilter4hConfig,
+    trend_bias_reason: str | None,
+    symbol: str | None,
+    detailed: bool,
+) -> SetupFilter4hResult | None:
+    """
+    Все hard-условия (EMA/ATR, откат, свинги) — те же, что в полном режиме, поэтому reason
+    отказа совпадает с ним. RSI, ADX, объем и OBV не считаются.
+    None — hard-условия пройдены, нужен полный расчет.
+    """
+    last = pd.Series({
+        "close": float(df["close"].iloc[-1]),
+        "ema_fast": float(indicator_cache.get(symbol, "240", df, "ema", period=config.ema_fast_period)["ema"].iloc[-1]),
+        "ema_mid": float(indicator_cache.get(symbol, "240", df, "ema", period=config.ema_mid_period)["ema"].iloc[-1]),
+        "ema_slow": float(indicator_cache.get(symbol, "240", df, "ema", period=config.ema_slow_period)["ema"].iloc[-1]),
+        "atr": float(indicator_cache.get(symbol, "240", df, "atr", period=config.atr_period)["atr"].iloc[-1]),
+    })
+    pullback = evaluate_pullback(df, config, last)
+
+    not_reoverextended = False
+    if pullback["current_extension_atr"] is not None:
+        not_reoverextended = bool(pullback["current_extension_atr"] <= config.max_reextension_atr)
+
+    _, swing_lows = find_confirmed_swings(
+        df,
+        left_bars=config.swing_left_bars,
+        right_bars=config.swing_right_bars,
+    )
+
+    hard_conditions = {
+        "trend_bias_passed": True,
+        "close_above_ema200": bool(last["close"] > last["ema_slow"]),
+        "ema50_above_ema200": bool(last["ema_mid"] > last["ema_slow"]),
+        "pullback_happened": bool(pullback["pullback_happened"]),
+        "pullback_not_too_deep": bool(pullback["pullback_not_too_deep"]),
+        "structure_not_broken": bool(not swing_lows or pullback["recent_low"] >= swing_lows[-1].price),
+        "not_reoverextended": not_reoverextended,
+    }
+
+    if all(hard_conditions.values()):
+        return None
+
+    soft_conditions = {
+        "touched_working_zone": bool(pullback["touched_ema20_zone"] or pullback["touched_ema50_zone"]),
+        "reclaimed_ema20": bool(last["close"] > last["ema_fast"]),
+        "near_ema20_after_reclaim": bool(pullback["near_ema20_after_reclaim"]),
+    }
+    soft_score = sum(int(value) for value in soft_conditions.values())
+    setup_state = resolve_setup_state(
+        trend_bias_passed=True,
+        hard_conditions=hard_conditions,
+        soft_conditions=soft_conditions,
+    )
+    hard = ConditionFlags.from_mapping(HARD_CONDITION_KEYS, hard_conditions)
+
+    extra = None
+    if detailed:
+        extra = {
+            "trend_context": {
+                "trend_bias_passed": True,
+                "trend_bias_reason": trend_bias_reason,
+            },
+            "last_candle": {key: float(value) for key, value in last.items()},
+            "pullback": pullback,
+            "setup_state": setup_state,
+        }
+
+    return SetupFilter4hResult(
+        passed=False,
+        hard_passed=False,
+        soft_score=soft_score,
+        soft_score_max=len(SOFT_CONDITION_KEYS),
+        reason=f"4h setup rejected: hard conditions failed: {hard.failed()}",
+        setup_state=setup_state,
+        config=config,
+        hard=hard,
+        soft=ConditionFlags.from_mapping(SOFT_CONDITION_KEYS, soft_conditions),
+        extra=extra,
+    )
+
+
+def setup_filter_4h(
+    df: pd.DataFrame | OHLCVBundle,
     trend_bias_passed: bool,
     config: SetupFilter4hConfig | None = None,
     trend_bias_reason: str | None = None,
+    symbol: str | None = None,
+    short_circuit: bool = False,
+    detailed: bool = True,
 ) -> SetupFilter4hResult:
-    """Оценивает, есть ли на 4H качественный long setup внутри разрешенного 12H тренда."""
+    """Оценивает, есть ли на 4H качественный long setup внутри разрешенного 12H тренда.
+
+    df — закрытые 4H свечи: DataFrame или OHLCVBundle (frame() поверх его массивов, без копий).
+    Если передан symbol, EMA/ATR/RSI/ADX/OBV берутся через IndicatorCache из IndicatorEngine
+    (рекурсии дописываются по новым свечам, чтение окна — векторное O(window)).
+    short_circuit=True: при невыполненном hard-условии отказ возвращается без RSI/ADX/объема/OBV;
+    passed, hard_passed, setup_state и reason совпадают с полным режимом, непосчитанные soft-условия помечены пропущенными.
+    detailed=False: без диагностических секций (свеча, откат, OBV, структура) — только решение и флаги.
+    """
     if config is None:
         config = SetupFilter4hConfig()
 
+    df = as_filter_frame(df)
     validate_ohlcv_dataframe(df)
 
     required_rows = max(
@@ -269,10 +390,12 @@ def setup_filter_4h(
             soft_score_max=len(SOFT_CONDITION_KEYS),
             reason="Недостаточно данных для 4h setup filter",
             setup_state="invalid",
-            details={
+            config=config,
+            hard=ConditionFlags.skipped(HARD_CONDITION_KEYS),
+            soft=ConditionFlags.skipped(SOFT_CONDITION_KEYS),
+            extra={
                 "required_rows": required_rows,
                 "actual_rows": len(df),
-                "config": asdict(config),
             },
         )
 
@@ -284,22 +407,37 @@ def setup_filter_4h(
             soft_score_max=len(SOFT_CONDITION_KEYS),
             reason=trend_bias_reason or "12h trend bias does not allow long setup search",
             setup_state="higher_timeframe_blocked",
-            details={
-                "config": asdict(config),
+            config=config,
+            hard=ConditionFlags.skipped(HARD_CONDITION_KEYS),
+            soft=ConditionFlags.skipped(SOFT_CONDITION_KEYS),
+            extra={
                 "trend_bias_passed": trend_bias_passed,
                 "trend_bias_reason": trend_bias_reason,
             },
         )
 
-    data = df.copy()
-    data["ema_fast"] = ema(data["close"], config.ema_fast_period)
-    data["ema_mid"] = ema(data["close"], config.ema_mid_period)
-    data["ema_slow"] = ema(data["close"], config.ema_slow_period)
-    data["atr"] = atr(data, config.atr_period)
-    data["rsi"] = rsi(data["close"], config.rsi_period)
-    data["volume_ma"] = data["volume"].rolling(config.volume_ma_period).mean()
+    if short_circuit:
+        rejection = _short_circuit_rejection(df, config, trend_bias_reason, symbol, detailed)
+        if rejection is not None:
+            return rejection
+
+    # Поверхностная копия: новые колонки не трогают df, сами OHLCV-массивы не копируются (copy-on-write).
+    data = df.copy(deep=False)
+    data["ema_fast"] = indicator_cache.get(symbol, "240", data, "ema", period=config.ema_fast_period)["ema"]
+    data["ema_mid"] = indicator_cache.get(symbol, "240", data, "ema", period=config.ema_mid_period)["ema"]
+    data["ema_slow"] = indicator_cache.get(symbol, "240", data, "ema", period=config.ema_slow_period)["ema"]
+    data["atr"] = indicator_cache.get(symbol, "240", data, "atr", period=config.atr_period)["atr"]
+    data["rsi"] = indicator_cache.get(symbol, "240", data, "rsi", period=config.rsi_period)["rsi"]
+    adx_df = indicator_cache.get(symbol, "240", data, "adx", period=config.adx_period)
+    data["volume_ma"] = indicator_cache.get(
+        symbol,
+        "240",
+        data,
+        "volume_ma",
+        lambda: data["volume"].rolling(config.volume_ma_period).mean(),
+        period=config.volume_ma_period,
+    )
 
-    adx_df = adx_components(data, config.adx_period)
     data = pd.concat([data, adx_df], axis=1)
 
     last = data.iloc[-1]
@@ -374,7 +512,7 @@ def setup_filter_4h(
         current_volume_ratio >= config.min_reclaim_volume_ratio and
         last["close"] >= prev["close"]
     )
-    obv_confirmation = build_obv_confirmation(data, config)
+    obv_confirmation = build_obv_confirmation(data, config, symbol=symbol)
 
     soft_conditions = {
         "touched_working_zone": touched_working_zone,
@@ -411,51 +549,47 @@ def setup_filter_4h(
                 f"{soft_score}/{soft_score_max}; failed: {failed_soft}"
             )
 
-    details: dict[str, Any] = {
-        "config": asdict(config),
-        "trend_context": {
-            "trend_bias_passed": trend_bias_passed,
-            "trend_bias_reason": trend_bias_reason,
-        },
-        "last_candle": {
-            "close": float(last["close"]),
-            "open": float(last["open"]),
-            "ema_fast": float(last["ema_fast"]),
-            "ema_mid": float(last["ema_mid"]),
-            "ema_slow": float(last["ema_slow"]),
-            "atr": float(last["atr"]) if pd.notna(last["atr"]) else None,
-            "rsi": float(last["rsi"]) if pd.notna(last["rsi"]) else None,
-            "plus_di": float(last["plus_di"]) if pd.notna(last["plus_di"]) else None,
-            "minus_di": float(last["minus_di"]) if pd.notna(last["minus_di"]) else None,
-            "adx": float(last["adx"]) if pd.notna(last["adx"]) else None,
-            "volume": float(last["volume"]),
-            "volume_ma": float(last["volume_ma"]) if pd.notna(last["volume_ma"]) else None,
-            "volume_ratio": current_volume_ratio,
-            "volume_supportive": volume_supportive,
-        },
-        "hard_conditions": hard_conditions,
-        "soft_conditions": soft_conditions,
-        "soft_condition_keys": SOFT_CONDITION_KEYS,
-        "soft_score_required": config.min_soft_conditions_passed,
-        "soft_score_actual": soft_score,
-        "pullback": pullback,
-        "recent_rsi_min": recent_rsi_min,
-        "obv": obv_confirmation,
-        "structure": {
-            **structure,
-            "structure_not_broken": structure_not_broken,
-            "last_confirmed_low": (
-                {
-                    "pos": last_confirmed_low.pos,
-                    "index": last_confirmed_low.index,
-                    "price": last_confirmed_low.price,
-                }
-                if last_confirmed_low is not None
-                else None
-            ),
-        },
-        "setup_state": setup_state,
-    }
+    extra = None
+    if detailed:
+        extra = {
+            "trend_context": {
+                "trend_bias_passed": trend_bias_passed,
+                "trend_bias_reason": trend_bias_reason,
+            },
+            "last_candle": {
+                "close": float(last["close"]),
+                "open": float(last["open"]),
+                "ema_fast": float(last["ema_fast"]),
+                "ema_mid": float(last["ema_mid"]),
+                "ema_slow": float(last["ema_slow"]),
+                "atr": float(last["atr"]) if pd.notna(last["atr"]) else None,
+                "rsi": float(last["rsi"]) if pd.notna(last["rsi"]) else None,
+                "plus_di": float(last["plus_di"]) if pd.notna(last["plus_di"]) else None,
+                "minus_di": float(last["minus_di"]) if pd.notna(last["minus_di"]) else None,
+                "adx": float(last["adx"]) if pd.notna(last["adx"]) else None,
+                "volume": float(last["volume"]),
+                "volume_ma": float(last["volume_ma"]) if pd.notna(last["volume_ma"]) else None,
+                "volume_ratio": current_volume_ratio,
+                "volume_supportive": volume_supportive,
+            },
+            "pullback": pullback,
+            "recent_rsi_min": recent_rsi_min,
+            "obv": obv_confirmation,
+            "structure": {
+                **structure,
+                "structure_not_broken": structure_not_broken,
+                "last_confirmed_low": (
+                    {
+                        "pos": last_confirmed_low.pos,
+                        "index": last_confirmed_low.index,
+                        "price": last_confirmed_low.price,
+                    }
+                    if last_confirmed_low is not None
+                    else None
+                ),
+            },
+            "setup_state": setup_state,
+        }
 
     return SetupFilter4hResult(
         passed=passed,
@@ -464,5 +598,8 @@ def setup_filter_4h(
         soft_score_max=soft_score_max,
         reason=reason,
         setup_state=setup_state,
-        details=details,
+        config=config,
+        hard=ConditionFlags.from_mapping(HARD_CONDITION_KEYS, hard_conditions),
+        soft=ConditionFlags.from_mapping(SOFT_CONDITION_KEYS, soft_conditions),
+        extra=extra,
     )
\ No newline at end of file
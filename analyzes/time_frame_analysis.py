@@ -7,6 +7,7 @@ from analyzes.multi_timeframe_ma_analysis import (
     calculate_bollinger_bands_1D
 )
 from analyzes.atr_rsi_stochastic import calculate_rsi, calculate_atr, calculate_stochastic
+from analyzes.indicator_cache import indicator_cache
 
 
 def calculate_fibonacci_retracement(df, lookback_period=50, trend_1d=None):
@@ -395,7 +396,9 @@ def analyze_12h_correction_strategy(df, trend_1d, symbol="UNKNOWN"):
     macd_action = macd_df.attrs.get('action') if hasattr(macd_df, 'attrs') else None
     
     # 3. RSI (14) - зоны перепроданности/перекупленности
-    rsi_log, rsi_series = calculate_rsi(df, period=14)
+    rsi_log, rsi_series = indicator_cache.get(
+        symbol, "720", df, "rsi_analyzer", lambda: calculate_rsi(df, period=14), period=14
+    )
     current_rsi = rsi_series.iloc[-1] if not rsi_series.empty else None
     prev_rsi = rsi_series.iloc[-2] if len(rsi_series) > 1 else None
     prev_rsi_2 = rsi_series.iloc[-3] if len(rsi_series) > 2 else None
@@ -476,7 +479,9 @@ def analyze_12h_correction_strategy(df, trend_1d, symbol="UNKNOWN"):
         fib_details.append(f"ℹ️ Коррекция {fib_retracement_depth:.1f}%")
     
     # 6.5. ATR - фильтр волатильности (проверка адекватности условий для торговли)
-    atr_log, atr_res = calculate_atr(df, period=14)
+    atr_log, atr_res = indicator_cache.get(
+        symbol, "720", df, "atr_sma_report", lambda: calculate_atr(df, period=14), period=14
+    )
     
     if atr_res is not None and not atr_res.empty:
         current_atr = atr_res['ATR'].iloc[-1]
@@ -983,7 +988,9 @@ def analyze_4h_entry_strategy(df_4h, trend_1d, twelve_h_signal, symbol="UNKNOWN"
     hist_diff = current_hist - prev_hist
     
     # 3. RSI для перекупленности/перепроданности на 4H
-    rsi_log, rsi_series = calculate_rsi(df_4h, period=14)
+    rsi_log, rsi_series = indicator_cache.get(
+        symbol, "240", df_4h, "rsi_analyzer", lambda: calculate_rsi(df_4h, period=14), period=14
+    )
     current_rsi = rsi_series.iloc[-1] if not rsi_series.empty else None
     
     # 4. Stochastic для точных пересечений
@@ -998,7 +1005,9 @@ def analyze_4h_entry_strategy(df_4h, trend_1d, twelve_h_signal, symbol="UNKNOWN"
     volume_ratio = volume_res.get('volume_ratio', 1.0)
     
     # 6. ATR для рисков и фильтра волатильности
-    atr_log, atr_res = calculate_atr(df_4h, period=14)
+    atr_log, atr_res = indicator_cache.get(
+        symbol, "240", df_4h, "atr_sma_report", lambda: calculate_atr(df_4h, period=14), period=14
+    )
     
     if atr_res is not None and not atr_res.empty:
         current_atr = atr_res['ATR'].iloc[-1]
@@ -1412,7 +1421,9 @@ def analyze_1h_execution(df_1h, four_h_signal, trend_1d, symbol="UNKNOWN"):
     hist_diff = current_hist - prev_hist
     
     # 3. RSI для перекупленности/перепроданности на 1H
-    rsi_log, rsi_series = calculate_rsi(df_1h, period=14)
+    rsi_log, rsi_series = indicator_cache.get(
+        symbol, "60", df_1h, "rsi_analyzer", lambda: calculate_rsi(df_1h, period=14), period=14
+    )
     current_rsi = rsi_series.iloc[-1] if not rsi_series.empty else None
     
     # 4. Stochastic для точных пересечений на 1H
@@ -1428,7 +1439,9 @@ def analyze_1h_execution(df_1h, four_h_signal, trend_1d, symbol="UNKNOWN"):
     volume_trend = volume_res.get('volume_trend', 'NEUTRAL')
     
     # 6. ATR для расчета стоп-лосса
-    atr_log, atr_res = calculate_atr(df_1h, period=14)
+    atr_log, atr_res = indicator_cache.get(
+        symbol, "60", df_1h, "atr_sma_report", lambda: calculate_atr(df_1h, period=14), period=14
+    )
     
     if atr_res is not None and not atr_res.empty:
         current_atr = atr_res['ATR'].iloc[-1]
@@ -1,11 +1,23 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Any
 
 import numpy as np
 import pandas as pd
 
+from analyzes.filter_result import CompactFilterResult, ConditionFlags
+from analyzes.indicator_cache import indicator_cache
+from analyzes.pivots import find_pivots
+from ohlcv_bundle import OHLCVBundle, as_filter_frame
+
+
+HARD_CONDITION_KEYS: tuple[str, ...] = (
+    "close_above_ema200",
+    "ema50_above_ema200",
+    "ema200_slope_up",
+    "not_overextended",
+)
 
 # Единый источник soft-условий
 SOFT_CONDITION_KEYS: tuple[str, ...] = (
@@ -60,13 +72,17 @@ class TrendFilter12hConfig:
 # =========================
 
 @dataclass(slots=True)
-class TrendFilter12hResult:
+class TrendFilter12hResult(CompactFilterResult):
     passed: bool
     hard_passed: bool
     soft_score: int
     soft_score_max: int
     reason: str
-    details: dict[str, Any]
+    config: TrendFilter12hConfig
+    hard: ConditionFlags
+    soft: ConditionFlags
+    # Диагностика для details (свеча, наклон EMA200, структура); при detailed=False — None
+    extra: dict[str, Any] | None = None
 
 
 # =========================
@@ -188,25 +204,15 @@ def find_confirmed_swings(
     - highs: список SwingPoint
     - lows: список SwingPoint
     """
-    highs: list[SwingPoint] = []
-    lows: list[SwingPoint] = []
-
     h = df["high"].to_numpy(dtype=float)
     l = df["low"].to_numpy(dtype=float)
     idx = df.index
-    n = len(df)
-
-    for i in range(left_bars, n - right_bars):
-        high_window = h[i - left_bars : i + right_bars + 1]
-        low_window = l[i - left_bars : i + right_bars + 1]
 
-        # Берем только уникальный максимум/минимум, чтобы снизить шум
-        if h[i] == np.max(high_window) and np.sum(high_window == h[i]) == 1:
-            highs.append(SwingPoint(pos=i, index=idx[i], price=float(h[i])))
-
-        if l[i] == np.min(low_window) and np.sum(low_window == l[i]) == 1:
-            lows.append(SwingPoint(pos=i, index=idx[i], price=float(l[i])))
+    # Берем только уникальный максимум/минимум, чтобы снизить шум
+    high_positions, low_positions = find_pivots(h, l, left_bars, right_bars, unique=True)
 
+    highs = [SwingPoint(pos=int(i), index=idx[i], price=float(h[i])) for i in high_positions]
+    lows = [SwingPoint(pos=int(i), index=idx[i], price=float(l[i])) for i in low_positions]
     return highs, lows
 
 
@@ -323,13 +329,79 @@ def validate_ohlcv_dataframe(df: pd.DataFrame) -> None:
         raise ValueError("Обнаружены некорректные OHLC строки")
 
 
+# =========================
+# Быстрый отказ (short-circuit)
+# =========================
+
+def _short_circuit_rejection(
+    df: pd.DataFrame,
+    config: TrendFilter12hConfig,
+    symbol: str | None,
+    detailed: bool,
+) -> TrendFilter12hResult | None:
+    """
+    Все hard-условия (EMA20/50/200, наклон EMA200, ATR) — те же, что в полном режиме, поэтому
+    reason отказа совпадает с ним. ADX, свинги, soft-условия и копия df не считаются.
+    None — hard-условия пройдены, нужен полный расчет.
+    """
+    close = float(df["close"].iloc[-1])
+
+    ema_slow = indicator_cache.get(symbol, "720", df, "ema", period=config.ema_slow_period)["ema"]
+    ema_slow_now = float(ema_slow.iloc[-1])
+    ema_slow_past = ema_slow.iloc[-1 - config.ema_slope_lookback]
+    ema_mid = float(indicator_cache.get(symbol, "720", df, "ema", period=config.ema_mid_period)["ema"].iloc[-1])
+    ema_fast = float(indicator_cache.get(symbol, "720", df, "ema", period=config.ema_fast_period)["ema"].iloc[-1])
+    atr_now = indicator_cache.get(symbol, "720", df, "atr", period=config.atr_period)["atr"].iloc[-1]
+    last_candle: dict[str, Any] = {
+        "close": close,
+        "ema_fast": ema_fast,
+        "ema_mid": ema_mid,
+        "ema_slow": ema_slow_now,
+        "atr": float(atr_now) if pd.notna(atr_now) else None,
+    }
+
+    hard_conditions = {
+        "close_above_ema200": bool(close > ema_slow_now),
+        "ema50_above_ema200": bool(ema_mid > ema_slow_now),
+        "ema200_slope_up": bool(
+            pd.notna(ema_slow_past)
+            and ema_slow_past > 0
+            and (ema_slow_now / ema_slow_past) - 1.0 >= config.min_ema200_slope_pct
+        ),
+        "not_overextended": bool(
+            pd.notna(atr_now)
+            and atr_now > 0
+            and (close - ema_fast) / atr_now <= config.max_overextension_atr
+        ),
+    }
+
+    if all(hard_conditions.values()):
+        return None
+
+    hard = ConditionFlags.from_mapping(HARD_CONDITION_KEYS, hard_conditions)
+    return TrendFilter12hResult(
+        passed=False,
+        hard_passed=False,
+        soft_score=0,
+        soft_score_max=len(SOFT_CONDITION_KEYS),
+        reason=f"Trend 12h rejected: hard conditions failed: {hard.failed()}",
+        config=config,
+        hard=hard,
+        soft=ConditionFlags.skipped(SOFT_CONDITION_KEYS),
+        extra={"last_candle": last_candle} if detailed else None,
+    )
+
+
 # =========================
 # Основной фильтр
 # =========================
 
 def trend_filter_12h(
-    df: pd.DataFrame,
+    df: pd.DataFrame | OHLCVBundle,
     config: TrendFilter12hConfig | None = None,
+    symbol: str | None = None,
+    short_circuit: bool = False,
+    detailed: bool = True,
 ) -> TrendFilter12hResult:
     """
     Фильтр старшего 12h-контекста для LONG на spot.
@@ -341,13 +413,25 @@ def trend_filter_12h(
        разрешаем искать сетап на 4h / триггер на 1h
 
     Ожидается:
-    - df содержит только закрытые 12h свечи
+    - df содержит только закрытые 12h свечи (DataFrame или OHLCVBundle — тогда берется его frame() без копий)
     - колонки: open, high, low, close, volume
     - строки идут от старых к новым
+
+    Если передан symbol, индикаторы берутся через общий IndicatorCache из IndicatorEngine: рекурсии
+    дописываются только по новым свечам, а окно собирается векторно за O(window) без цикла pandas.
+
+    short_circuit=True: при невыполненном hard-условии фильтр возвращает отказ сразу,
+    не считая ADX, свинги и soft-условия (в details soft-условия помечены пропущенными
+    и "short_circuit": True). Решение passed/hard_passed и reason те же, что в полном режиме;
+    калибровка использует полный режим ради полной диагностики.
+
+    detailed=False: результат без диагностических секций (свеча, наклон, структура) —
+    только решение и флаги условий; details по-прежнему собирается при обращении.
     """
     if config is None:
         config = TrendFilter12hConfig()
 
+    df = as_filter_frame(df)
     validate_ohlcv_dataframe(df)
 
     # Минимум истории нужен, чтобы EMA200, ATR, ADX и slope были адекватными
@@ -362,24 +446,32 @@ def trend_filter_12h(
             soft_score=0,
             soft_score_max=len(SOFT_CONDITION_KEYS),
             reason="Недостаточно данных для 12h trend filter",
-            details={
+            config=config,
+            hard=ConditionFlags.skipped(HARD_CONDITION_KEYS),
+            soft=ConditionFlags.skipped(SOFT_CONDITION_KEYS),
+            extra={
                 "required_rows": required_rows,
                 "actual_rows": len(df),
-                "config": asdict(config),
             },
         )
 
-    data = df.copy()
+    if short_circuit:
+        rejection = _short_circuit_rejection(df, config, symbol, detailed)
+        if rejection is not None:
+            return rejection
+
+    # Поверхностная копия: новые колонки не трогают df, сами OHLCV-массивы не копируются (copy-on-write).
+    data = df.copy(deep=False)
 
     # -------------------------
     # Считаем индикаторы
     # -------------------------
-    data["ema_fast"] = ema(data["close"], config.ema_fast_period)
-    data["ema_mid"] = ema(data["close"], config.ema_mid_period)
-    data["ema_slow"] = ema(data["close"], config.ema_slow_period)
-    data["atr"] = atr(data, config.atr_period)
+    data["ema_fast"] = indicator_cache.get(symbol, "720", data, "ema", period=config.ema_fast_period)["ema"]
+    data["ema_mid"] = indicator_cache.get(symbol, "720", data, "ema", period=config.ema_mid_period)["ema"]
+    data["ema_slow"] = indicator_cache.get(symbol, "720", data, "ema", period=config.ema_slow_period)["ema"]
+    data["atr"] = indicator_cache.get(symbol, "720", data, "atr", period=config.atr_period)["atr"]
+    adx_df = indicator_cache.get(symbol, "720", data, "adx", period=config.adx_period)
 
-    adx_df = adx_components(data, config.adx_period)
     data = pd.concat([data, adx_df], axis=1)
 
     last = data.iloc[-1]
@@ -501,42 +593,38 @@ def trend_filter_12h(
             )
 
     # -------------------------
-    # Детали для логов / дебага
+    # Детали для логов / дебага (hard/soft-условия и конфиг details собирает из флагов)
     # -------------------------
-    details: dict[str, Any] = {
-        "config": asdict(config),
-        "last_candle": {
-            "close": float(last["close"]),
-            "ema_fast": float(last["ema_fast"]),
-            "ema_mid": float(last["ema_mid"]),
-            "ema_slow": float(last["ema_slow"]),
-            "atr": float(last["atr"]) if pd.notna(last["atr"]) else None,
-            "plus_di": float(last["plus_di"]) if pd.notna(last["plus_di"]) else None,
-            "minus_di": float(last["minus_di"]) if pd.notna(last["minus_di"]) else None,
-            "adx": float(last["adx"]) if pd.notna(last["adx"]) else None,
-            "plus_di_bullish": plus_di_bullish,
-        },
-        "hard_conditions": hard_conditions,
-        "soft_conditions": soft_conditions,
-        "soft_condition_keys": SOFT_CONDITION_KEYS,
-        "soft_score_required": config.min_soft_conditions_passed,
-        "soft_score_actual": soft_score,
-        "ema200_slope": {
-            "lookback_bars": config.ema_slope_lookback,
-            "ema200_now": float(last["ema_slow"]),
-            "ema200_past": float(ema_slow_past) if pd.notna(ema_slow_past) else None,
-            "slope_pct": ema200_slope_pct,
-            "min_required_slope_pct": config.min_ema200_slope_pct,
-            "slope_up": ema200_slope_up,
-        },
-        "overextension": {
-            "overextension_atr": overextension_atr,
-            "max_allowed_atr": config.max_overextension_atr,
-            "limit_price": overextension_limit,
-            "not_overextended": not_overextended,
-        },
-        "structure": structure,
-    }
+    extra: dict[str, Any] | None = None
+    if detailed:
+        extra = {
+            "last_candle": {
+                "close": float(last["close"]),
+                "ema_fast": float(last["ema_fast"]),
+                "ema_mid": float(last["ema_mid"]),
+                "ema_slow": float(last["ema_slow"]),
+                "atr": float(last["atr"]) if pd.notna(last["atr"]) else None,
+                "plus_di": float(last["plus_di"]) if pd.notna(last["plus_di"]) else None,
+                "minus_di": float(last["minus_di"]) if pd.notna(last["minus_di"]) else None,
+                "adx": float(last["adx"]) if pd.notna(last["adx"]) else None,
+                "plus_di_bullish": plus_di_bullish,
+            },
+            "ema200_slope": {
+                "lookback_bars": config.ema_slope_lookback,
+                "ema200_now": float(last["ema_slow"]),
+                "ema200_past": float(ema_slow_past) if pd.notna(ema_slow_past) else None,
+                "slope_pct": ema200_slope_pct,
+                "min_required_slope_pct": config.min_ema200_slope_pct,
+                "slope_up": ema200_slope_up,
+            },
+            "overextension": {
+                "overextension_atr": overextension_atr,
+                "max_allowed_atr": config.max_overextension_atr,
+                "limit_price": overextension_limit,
+                "not_overextended": not_overextended,
+            },
+            "structure": structure,
+        }
 
     return TrendFilter12hResult(
         passed=passed,
@@ -544,5 +632,8 @@ def trend_filter_12h(
         soft_score=soft_score,
         soft_score_max=soft_score_max,
         reason=reason,
-        details=details,
+        config=config,
+        hard=ConditionFlags.from_mapping(HARD_CONDITION_KEYS, hard_conditions),
+        soft=ConditionFlags.from_mapping(SOFT_CONDITION_KEYS, soft_conditions),
+        extra=extra,
     )
\ No newline at end of file
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from collections import deque
+
+import numpy as np
+
+VOLUME_PROFILE_MIN_BARS = 20
+VALUE_AREA_SHARE = 0.7
+
+
+def _level_bounds(low: np.ndarray, high: np.ndarray, price_min: float, level_width: float, num_levels: int):
+    """Первый и последний уровень, которые пересекает каждая свеча (как int() в прежнем цикле)."""
+    min_level = np.maximum(0, np.floor((low - price_min) / level_width).astype(np.int64))
+    max_level = np.minimum(num_levels - 1, np.floor((high - price_min) / level_width).astype(np.int64))
+    return min_level, max_level
+
+
+def _apply_bars(
+    diff: np.ndarray,
+    low: np.ndarray,
+    high: np.ndarray,
+    volume: np.ndarray,
+    price_min: float,
+    level_width: float,
+    num_levels: int,
+    sign: float = 1.0,
+) -> None:
+    """Добавляет (sign=1) или вычитает (sign=-1) объем свечей в разностный массив уровней."""
+    min_level, max_level = _level_bounds(low, high, price_min, level_width, num_levels)
+    valid = max_level >= min_level
+    if not valid.all():
+        min_level, max_level, volume = min_level[valid], max_level[valid], volume[valid]
+    volume_per_level = sign * volume / (max_level - min_level + 1)
+    np.add.at(diff, min_level, volume_per_level)
+    np.add.at(diff, max_level + 1, -volume_per_level)
+
+
+def volume_at_levels(low, high, volume, price_min: float, price_max: float, num_levels: int = 20) -> np.ndarray:
+    """Объем по num_levels уровням: объем свечи делится поровну между всеми пересекаемыми уровнями.
+
+    Вместо цикла по свечам и уровням каждая свеча дает две записи в разностный массив,
+    а итоговый профиль получается одним cumsum: O(bars + levels).
+    """
+    low = np.asarray(low, dtype=float)
+    high = np.asarray(high, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    level_width = (price_max - price_min) / num_levels
+    diff = np.zeros(num_levels + 1)
+    _apply_bars(diff, low, high, volume, price_min, level_width, num_levels)
+    return np.cumsum(diff[:-1])
+
+
+def summarize_volume_profile(levels_volume: np.ndarray, price_min: float, price_max: float) -> dict:
+    """POC, Value Area (70% объема от самых крупных уровней) и HVN/LVN по готовому профилю."""
+    num_levels = len(levels_volume)
+    price_levels = np.linspace(price_min, price_max, num_levels)
+
+    poc_idx = int(np.argmax(levels_volume))
+
+    total_volume = levels_volume.sum()
+    sorted_indices = np.argsort(levels_volume)[::-1]
+    cumulative_volume = np.cumsum(levels_volume[sorted_indices])
+    reached = cumulative_volume >= total_volume * VALUE_AREA_SHARE
+    value_area_size = int(np.argmax(reached)) + 1 if reached.any() else num_levels
+    value_area_indices = sorted_indices[:value_area_size]
+
+    avg_volume = levels_volume.mean()
+    std_volume = levels_volume.std()
+    high_volume_threshold = avg_volume + std_volume * 0.5
+    low_volume_threshold = avg_volume - std_volume * 0.5
+
+    return {
+        'poc': price_levels[poc_idx],
+        'high_volume_nodes': price_levels[levels_volume > high_volume_threshold].tolist(),
+        'low_volume_nodes': price_levels[levels_volume < low_volume_threshold].tolist(),
+        'value_area_high': price_levels[value_area_indices.max()],
+        'value_area_low': price_levels[value_area_indices.min()],
+    }
+
+
+def build_volume_profile(low, high, volume, num_levels: int = 20) -> dict | None:
+    """Volume Profile по массивам свечи; None, если свечей меньше 20, диапазон нулевой или есть NaN."""
+    low = np.asarray(low, dtype=float)
+    high = np.asarray(high, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    if len(low) < VOLUME_PROFILE_MIN_BARS:
+        return None
+    if not (np.isfinite(low).all() and np.isfinite(high).all()):
+        return None
+
+    price_min = low.min()
+    price_max = high.max()
+    if price_max - price_min == 0:
+        return None
+
+    levels_volume = volume_at_levels(low, high, volume, price_min, price_max, num_levels)
+    return summarize_volume_profile(levels_volume, price_min, price_max)
+
+
+class VolumeProfileWindow:
+    """Скользящий Volume Profile по последним window свечам.
+
+    push() добавляет новую свечу и вытесняет самую старую. Пока границы окна (min low / max high)
+    не меняются, сетка уровней та же, и обновление — две пары записей в разностный массив;
+    при смене границ профиль пересобирается векторно. Результат profile() совпадает
+    с build_volume_profile по тем же свечам.
+    """
+
+    def __init__(self, window: int = 100, num_levels: int = 20):
+        self.window = max(VOLUME_PROFILE_MIN_BARS, int(window))
+        self.num_levels = max(1, int(num_levels))
+        self._low: deque[float] = deque()
+        self._high: deque[float] = deque()
+        self._volume: deque[float] = deque()
+        # Монотонные очереди (номер свечи, значение) для скользящих min low и max high.
+        self._min_low: deque[tuple[int, float]] = deque()
+        self._max_high: deque[tuple[int, float]] = deque()
+        self._pushed = 0
+        self._price_min = 0.0
+        self._price_max = 0.0
+        self._diff = np.zeros(self.num_levels + 1)
+        self._updates_since_rebuild = 0
+
+    def __len__(self) -> int:
+        return len(self._low)
+
+    def _grid_width(self) -> float:
+        return (self._price_max - self._price_min) / self.num_levels
+
+    def _rebuild(self) -> None:
+        self._price_min = self._min_low[0][1]
+        self._price_max = self._max_high[0][1]
+        self._diff = np.zeros(self.num_levels + 1)
+        self._updates_since_rebuild = 0
+        if self._price_max - self._price_min == 0:
+            return
+        _apply_bars(
+            self._diff,
+            np.fromiter(self._low, dtype=float, count=len(self._low)),
+            np.fromiter(self._high, dtype=float, count=len(self._high)),
+            np.fromiter(self._volume, dtype=float, count=len(self._volume)),
+            self._price_min,
+            self._grid_width(),
+            self.num_levels,
+        )
+
+    def _apply_one(self, low: float, high: float, volume: float, sign: float) -> None:
+        if self._price_max - self._price_min == 0:
+            return
+        _apply_bars(
+            self._diff,
+            np.array([low]),
+            np.array([high]),
+            np.array([volume]),
+            self._price_min,
+            self._grid_width(),
+            self.num_levels,
+            sign,
+        )
+
+    def push(self, high: float, low: float, volume: float) -> None:
+        """Добавляет закрытую свечу; при переполнении окна вытесняет самую старую."""
+        high, low, volume = float(high), float(low), float(volume)
+        seq = self._pushed
+        self._pushed += 1
+        self._low.append(low)
+        self._high.append(high)
+        self._volume.append(volume)
+        while self._min_low and self._min_low[-1][1] >= low:
+            self._min_low.pop()
+        self._min_low.append((seq, low))
+        while self._max_high and self._max_high[-1][1] <= high:
+            self._max_high.pop()
+        self._max_high.append((seq, high))
+
+        evicted = None
+        if len(self._low) > self.window:
+            evicted = (self._low.popleft(), self._high.popleft(), self._volume.popleft())
+            oldest_seq = seq - self.window
+            if self._min_low[0][0] == oldest_seq:
+                self._min_low.popleft()
+            if self._max_high[0][0] == oldest_seq:
+                self._max_high.popleft()
+
+        bounds_changed = self._min_low[0][1] != self._price_min or self._max_high[0][1] != self._price_max
+        # Периодическая пересборка не дает накопиться ошибке округления от сложений/вычитаний.
+        if bounds_changed or self._updates_since_rebuild >= self.window:
+            self._rebuild()
+            return
+
+        self._apply_one(low, high, volume, 1.0)
+        if evicted is not None:
+            self._apply_one(*evicted, -1.0)
+        self._updates_since_rebuild += 1
+
+    def extend(self, highs, lows, volumes) -> None:
+        """Добавляет свечи по порядку (старые → новые)."""
+        for high, low, volume in zip(highs, lows, volumes):
+            self.push(high, low, volume)
+
+    def profile(self) -> dict | None:
+        """Текущий Volume Profile окна в формате build_volume_profile."""
+        if len(self._low) < VOLUME_PROFILE_MIN_BARS or self._price_max - self._price_min == 0:
+            return None
+        levels_volume = np.cumsum(self._diff[:-1])
+        return summarize_volume_profile(levels_volume, self._price_min, self._price_max)
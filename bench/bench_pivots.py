@@ -0,0 +1,40 @@
+"""
+Замер векторизованного поиска pivot против прежних поштучных циклов (эквивалентность проверяет test_pivots.py).
+Запуск из корня репозитория: python -m bench.bench_pivots
+"""
+
+import time
+
+from analyzes.pivots import find_pivots, pivot_high_indices, pivot_low_indices
+from test_pivots import loop_close_pivots, loop_swings, make_ohlc
+
+
+def measure(func, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - started) / repeats
+
+
+def run(sizes: tuple[int, ...] = (500, 10_000), left_bars: int = 2, right_bars: int = 2) -> None:
+    for bars in sizes:
+        high, low, close = make_ohlc(bars, seed=7)
+        repeats = max(3, 20_000 // bars)
+
+        loop_time = measure(lambda: loop_swings(high, low, left_bars, right_bars), repeats)
+        vector_time = measure(lambda: find_pivots(high, low, left_bars, right_bars, unique=True), repeats)
+        loop_close_time = measure(lambda: loop_close_pivots(close, left_bars), repeats)
+        vector_close_time = measure(
+            lambda: (pivot_high_indices(close, left_bars, left_bars), pivot_low_indices(close, left_bars, left_bars)),
+            repeats,
+        )
+
+        print(f"\n=== PIVOTS: {bars} bars ===")
+        print(f"swings (unique):  loop={loop_time * 1000:.3f}ms  vectorized={vector_time * 1000:.3f}ms  "
+              f"x{loop_time / vector_time:.1f}")
+        print(f"close pivots:     loop={loop_close_time * 1000:.3f}ms  vectorized={vector_close_time * 1000:.3f}ms  "
+              f"x{loop_close_time / vector_close_time:.1f}")
+
+
+if __name__ == "__main__":
+    run()
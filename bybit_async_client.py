@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    BYBIT_API_URL,
+    BYBIT_ASYNC_MAX_CONNECTIONS,
+    BYBIT_RATE_LIMIT_MAX_RETRIES,
+    BYBIT_TESTNET_URL,
+    INTERVAL,
+    LIMIT,
+)
+from ohlcv_bundle import OHLCVBundle
+from rate_limiter import resolve_endpoint_group
+
+
+MARKET_PATHS = {
+    "get_kline": "/v5/market/kline",
+    "get_tickers": "/v5/market/tickers",
+    "get_orderbook": "/v5/market/orderbook",
+    "get_instruments_info": "/v5/market/instruments-info",
+}
+RATE_LIMIT_RET_CODE = 10006
+# Как часто проверять lock ряда хранилища свечей, занятый другим потоком.
+LOCK_POLL_SECONDS = 0.005
+
+
+class AsyncBybitClient:
+    """Asyncio-клиент публичных market-endpoint'ов Bybit V5 для пакетной загрузки данных.
+
+    Запросы идут через общий keep-alive пул requests.Session в отдельном пуле потоков,
+    поэтому при закрытии свечи по сотням символов одновременно в полете несколько запросов.
+    Нормализация параметров, разбор ответов, план загрузки свечей с локальным хранилищем и rate limiter
+    берутся у синхронного BybitClient, так что контракты методов совпадают с ним.
+    """
+
+    def __init__(self, sync_client, max_connections: int = BYBIT_ASYNC_MAX_CONNECTIONS, timeout: float = 10.0):
+        self.sync_client = sync_client
+        self.rate_limiter = sync_client.rate_limiter
+        self.base_url = sync_client.base_url or (BYBIT_TESTNET_URL if sync_client.testnet else BYBIT_API_URL)
+        self.max_connections = max(1, int(max_connections))
+        self.timeout = float(timeout)
+
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+        self._http.mount("https://", adapter)
+        self._http.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="bybit-async")
+
+    def close(self) -> None:
+        """Закрывает пул соединений и рабочие потоки."""
+        self._executor.shutdown(wait=False)
+        self._http.close()
+
+    async def _get(self, method_name: str, **params) -> dict | None:
+        """Выполняет GET к market-endpoint'у с учетом общего limiter и back-off по retCode 10006."""
+        url = f"{self.base_url}{MARKET_PATHS[method_name]}"
+        query = {key: value for key, value in params.items() if value is not None}
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(BYBIT_RATE_LIMIT_MAX_RETRIES + 1):
+            delay = self.rate_limiter.reserve(resolve_endpoint_group(method_name), endpoint=method_name)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                response = await loop.run_in_executor(
+                    self._executor,
+                    partial(self._http.get, url, params=query, timeout=self.timeout),
+                )
+                payload = response.json()
+            except (requests.RequestException, ValueError) as error:
+                print(f"❌ Ошибка async-запроса Bybit {method_name}: {error}")
+                return None
+
+            self.rate_limiter.observe_headers(method_name, response.headers)
+            if payload.get("retCode") == RATE_LIMIT_RET_CODE and attempt < BYBIT_RATE_LIMIT_MAX_RETRIES:
+                pause = self.rate_limiter.back_off(method_name, response.headers)
+                print(f"⏳ Bybit rate limit на {method_name}: пауза {pause:.2f}s перед повтором")
+                continue
+            if response.status_code != 200:
+                print(f"❌ HTTP {response.status_code} от Bybit для {method_name}")
+                return None
+            return payload
+
+        return None
+
+    async def _acquire(self, lock) -> None:
+        """Берет threading.Lock ряда хранилища, не блокируя event loop (lock может держать синхронный клиент)."""
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+
+    async def get_kline_bundle(
+        self,
+        symbol: str,
+        interval: str = INTERVAL,
+        limit: int = LIMIT,
+        category: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> OHLCVBundle | None:
+        """Асинхронный аналог BybitClient.get_kline_bundle: тот же план загрузки с локальным хранилищем свечей."""
+        client = self.sync_client
+        try:
+            normalized_symbol = client._normalize_symbol(symbol)
+            normalized_category = client._normalize_category(category)
+            normalized_limit = min(max(1, int(limit)), 1000)
+            interval = str(interval)
+
+            plan = client._kline_bundle_plan(normalized_symbol, interval, normalized_limit, normalized_category, start, end)
+            lock = client._kline_store_lock(normalized_symbol, interval, normalized_category, start, end)
+            if lock is not None:
+                await self._acquire(lock)
+            try:
+                params = next(plan)
+                while True:
+                    params = plan.send(await self._get("get_kline", **params))
+            except StopIteration as finished:
+                return finished.value
+            finally:
+                if lock is not None:
+                    lock.release()
+        except Exception as error:
+            print(f"❌ Ошибка при получении данных {symbol}: {error}")
+            return None
+
+    async def get_kline_bundles(
+        self,
+        limits: dict[str, int],
+        interval: str = INTERVAL,
+        category: str | None = None,
+    ) -> dict[str, OHLCVBundle | None]:
+        """Параллельно загружает свечи по словарю symbol -> limit и возвращает symbol -> OHLCVBundle."""
+        bundles = await asyncio.gather(
+            *(
+                self.get_kline_bundle(symbol, interval=interval, limit=limit, category=category)
+                for symbol, limit in limits.items()
+            )
+        )
+        return dict(zip(limits, bundles))
+
+    async def get_klines(
+        self,
+        symbol: str,
+        interval: str = INTERVAL,
+        limit: int = LIMIT,
+        category: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> pd.DataFrame | None:
+        """Асинхронный аналог BybitClient.get_klines."""
+        bundle = await self.get_kline_bundle(symbol, interval=interval, limit=limit, category=category, start=start, end=end)
+        return None if bundle is None else bundle.to_kline_dataframe()
+
+    async def get_klines_many(
+        self,
+        symbols: list[str],
+        interval: str = INTERVAL,
+        limit: int = LIMIT,
+        category: str | None = None,
+    ) -> dict[str, pd.DataFrame | None]:
+        """Параллельно загружает свечи по списку символов и возвращает словарь symbol -> DataFrame."""
+        frames = await asyncio.gather(
+            *(self.get_klines(symbol, interval=interval, limit=limit, category=category) for symbol in symbols)
+        )
+        return dict(zip(symbols, frames))
+
+    async def get_multiple_prices(self, symbols: list[str], category: str | None = None) -> dict[str, float]:
+        """Асинхронный аналог BybitClient.get_multiple_prices: один запрос всех тикеров категории."""
+        client = self.sync_client
+        try:
+            normalized_category = client._normalize_category(category)
+            normalized_symbols = [client._normalize_symbol(symbol) for symbol in symbols]
+            if not normalized_symbols:
+                return {}
+
+            if len(normalized_symbols) == 1 or normalized_category == "option":
+                responses = await asyncio.gather(
+                    *(
+                        self._get("get_tickers", category=normalized_category, symbol=normalized_symbol)
+                        for normalized_symbol in normalized_symbols
+                    )
+                )
+                items = [
+                    item
+                    for response in responses
+                    if client._response_ok(response, "получении цены")
+                    for item in response.get("result", {}).get("list", [])
+                ]
+            else:
+                response = await self._get("get_tickers", category=normalized_category)
+                if not client._response_ok(response, "получении списка тикеров"):
+                    return {}
+                items = response.get("result", {}).get("list", [])
+
+            return client._parse_ticker_prices(items, normalized_symbols)
+        except Exception as error:
+            print(f"❌ Ошибка при получении цен: {error}")
+            return {}
+
+    async def get_orderbook(self, symbol: str, levels: int, whale_size=None, category: str | None = None):
+        """Асинхронный аналог BybitClient.get_orderbook с тем же кортежем из шести значений."""
+        client = self.sync_client
+        try:
+            normalized_symbol = client._normalize_symbol(symbol)
+            normalized_category = client._normalize_category(category)
+            requested_levels = max(1, int(levels))
+            response = await self._get(
+                "get_orderbook",
+                category=normalized_category,
+                symbol=normalized_symbol,
+                limit=client._orderbook_api_limit(requested_levels, normalized_category),
+            )
+            if not client._response_ok(response, f"получении стакана {normalized_symbol}"):
+                return None, None, None, None, None, None
+
+            return client._parse_orderbook_result(response.get("result", {}), requested_levels, whale_size)
+        except Exception as error:
+            print(f"❌ Ошибка при получении стакана {symbol}: {error}")
+            return None, None, None, None, None, None
+
+    async def get_instrument_info(self, symbol: str, category: str | None = None):
+        """Асинхронный аналог BybitClient.get_instrument_info."""
+        client = self.sync_client
+        try:
+            normalized_symbol = client._normalize_symbol(symbol)
+            normalized_category = client._normalize_category(category)
+            response = await self._get(
+                "get_instruments_info",
+                category=normalized_category,
+                symbol=normalized_symbol,
+            )
+            if not client._response_ok(response, f"получении параметров инструмента {normalized_symbol}"):
+                return None
+
+            items = response.get("result", {}).get("list", [])
+            if not items:
+                return None
+
+            return client._parse_instrument_items(items, normalized_symbol, normalized_category)
+        except Exception as error:
+            print(f"❌ Ошибка при получении параметров инструмента {symbol}: {error}")
+            return None
@@ -1,15 +1,26 @@
 from __future__ import annotations
 
-from collections import deque
+import asyncio
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime, timezone
+import threading
 import time
 
+import numpy as np
 import pandas as pd
+from pybit.exceptions import FailedRequestError, InvalidRequestError
 from pybit.unified_trading import HTTP
 
+from candle_store import CandleStore, interval_to_milliseconds
+from ohlcv_bundle import OHLCVBundle, parse_kline_rows
+from rate_limiter import TokenBucketRateLimiter, bybit_rate_limiter, resolve_endpoint_group
 from config import (
     BYBIT_API_KEY,
     BYBIT_API_SECRET,
+    BYBIT_RATE_LIMIT_MAX_RETRIES,
+    CANDLE_STORE_ENABLED,
     CATEGORY,
     INTERVAL,
     LIMIT,
@@ -41,6 +52,9 @@ KLINE_COLUMNS = [
     "volume",
     "turnover",
 ]
+RATE_LIMIT_RET_CODE = 10006
+# Коды, которые pybit повторяет сам; 10006 исключен, чтобы back-off шел через общий limiter.
+PYBIT_RETRY_CODES = {10002, 30034, 30035, 130035, 130150}
 
 
 class BybitClient:
@@ -51,8 +65,9 @@ class BybitClient:
         testnet: bool = TESTNET,
         default_category: str = CATEGORY,
         recv_window: int = 5000,
-        rate_limit_per_minute: int = 100,
-        min_request_interval: float = 0.6,
+        rate_limiter: TokenBucketRateLimiter | None = None,
+        candle_store: CandleStore | None = None,
+        base_url: str | None = None,
     ):
         """Создает V5-клиент Bybit с настройками авторизации и локального rate limit."""
         self.api_key = api_key or BYBIT_API_KEY
@@ -60,12 +75,16 @@ class BybitClient:
         self.testnet = testnet
         self.default_category = self._normalize_category(default_category)
         self.recv_window = int(recv_window)
+        self.base_url = base_url.rstrip("/") if base_url else None
 
-        self.rate_limit = max(1, int(rate_limit_per_minute))
-        self.rate_window = 60.0
-        self.min_request_interval = max(0.0, float(min_request_interval))
-        self.request_times = deque(maxlen=self.rate_limit)
-        self.last_request_time = 0.0
+        self.rate_limiter = rate_limiter or bybit_rate_limiter
+
+        if candle_store is None and CANDLE_STORE_ENABLED:
+            candle_store = CandleStore()
+        self.candle_store = candle_store
+
+        self._async_client = None
+        self._async_client_lock = threading.Lock()
 
         self.session: HTTP | None = None
         self._initialize_session()
@@ -78,7 +97,12 @@ class BybitClient:
                 api_secret=self.api_secret,
                 testnet=self.testnet,
                 recv_window=self.recv_window,
+                return_response_headers=True,
+                retry_codes=set(PYBIT_RETRY_CODES),
             )
+            if self.base_url:
+                # Позволяет направить клиента на локальный stub-сервер вместо api.bybit.com.
+                self.session.endpoint = self.base_url
         except Exception as error:
             print(f"❌ Ошибка инициализации сессии Bybit: {error}")
             self.session = None
@@ -116,55 +140,50 @@ class BybitClient:
                 return candidate[: -len(suffix)]
         return candidate
 
-    def _wait_for_rate_limit(self) -> None:
-        """Применяет локальное ограничение частоты запросов до отправки вызова в API."""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last)
-            current_time = time.time()
-
-        cutoff = current_time - self.rate_window
-        while self.request_times and self.request_times[0] <= cutoff:
-            self.request_times.popleft()
-
-        if len(self.request_times) >= self.rate_limit:
-            sleep_time = self.rate_window - (current_time - self.request_times[0]) + 0.05
-            if sleep_time > 0:
-                print(f"⏳ Rate limit: ожидание {sleep_time:.2f}s...")
-                time.sleep(sleep_time)
-                current_time = time.time()
-                cutoff = current_time - self.rate_window
-                while self.request_times and self.request_times[0] <= cutoff:
-                    self.request_times.popleft()
-
-        self.request_times.append(time.time())
-        self.last_request_time = time.time()
+    def _wait_for_rate_limit(self, method_name: str) -> None:
+        """Ждет свободный слот в token bucket группы и в квоте endpoint'а, известной из заголовков Bybit."""
+        group = resolve_endpoint_group(method_name)
+        delay = self.rate_limiter.acquire(group, endpoint=method_name)
+        if delay >= 1.0:
+            print(f"⏳ Rate limit {group}/{method_name}: ожидание {delay:.2f}s...")
 
     def _request(self, method_name: str, **params) -> dict | None:
         """Вызывает метод pybit по имени, применяя rate limit и базовую обработку ошибок."""
         if not self._ensure_session():
             return None
 
-        self._wait_for_rate_limit()
-
         try:
             method = getattr(self.session, method_name)
         except AttributeError:
             print(f"❌ Метод pybit не найден: {method_name}")
             return None
 
-        try:
-            response = method(**params)
-        except Exception as error:
-            print(f"❌ Ошибка запроса Bybit {method_name}: {error}")
-            return None
+        for attempt in range(BYBIT_RATE_LIMIT_MAX_RETRIES + 1):
+            self._wait_for_rate_limit(method_name)
+            try:
+                response = method(**params)
+            except (InvalidRequestError, FailedRequestError) as error:
+                if error.status_code != RATE_LIMIT_RET_CODE or attempt >= BYBIT_RATE_LIMIT_MAX_RETRIES:
+                    print(f"❌ Ошибка запроса Bybit {method_name}: {error}")
+                    return None
+                pause = self.rate_limiter.back_off(method_name, error.resp_headers)
+                print(f"⏳ Bybit rate limit на {method_name}: пауза {pause:.2f}s перед повтором")
+                continue
+            except Exception as error:
+                print(f"❌ Ошибка запроса Bybit {method_name}: {error}")
+                return None
 
-        if not isinstance(response, dict):
-            print(f"❌ Некорректный ответ Bybit для {method_name}: {type(response)!r}")
-            return None
+            if isinstance(response, tuple):
+                response, _, headers = response
+                self.rate_limiter.observe_headers(method_name, headers)
+
+            if not isinstance(response, dict):
+                print(f"❌ Некорректный ответ Bybit для {method_name}: {type(response)!r}")
+                return None
+
+            return response
 
-        return response
+        return None
 
     def _response_ok(self, response: dict | None, action: str) -> bool:
         """Проверяет стандартный ответ Bybit и печатает причину ошибки при retCode != 0."""
@@ -180,15 +199,87 @@ class BybitClient:
         """Преобразует сырые свечи Bybit в очищенный DataFrame с числовыми колонками."""
         if not klines:
             return pd.DataFrame(columns=KLINE_COLUMNS)
+        return OHLCVBundle.from_klines(klines).to_kline_dataframe()
+
+    def _kline_response_rows(self, response: dict) -> tuple[np.ndarray, int]:
+        """Возвращает свечи ответа в виде отсортированного массива (n, 7) и серверное время ответа в мс."""
+        rows = parse_kline_rows(response.get("result", {}).get("list", []))
+        server_time_ms = response.get("time")
+        if not isinstance(server_time_ms, (int, float)):
+            server_time_ms = time.time() * 1000
+        return rows, int(server_time_ms)
+
+    def _kline_store_lock(self, symbol: str, interval: str, category: str, start: int | None = None, end: int | None = None):
+        """Lock ряда в локальном хранилище свечей или None, если запрос идет мимо хранилища."""
+        if self.candle_store is None or start is not None or end is not None or interval_to_milliseconds(interval) is None:
+            return None
+        return self.candle_store.lock_for(category, symbol, interval)
+
+    def _kline_bundle_plan(
+        self,
+        symbol: str,
+        interval: str,
+        limit: int,
+        category: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> Generator[dict, dict | None, OHLCVBundle | None]:
+        """План загрузки свечей: отдает параметры get_kline, получает ответ, возвращает OHLCVBundle.
+
+        Один план исполняют get_kline_bundle и AsyncBybitClient.get_kline_bundle, поэтому локальное
+        хранилище стоит перед биржей в обоих: с биржи докачиваются только бары новее последнего
+        сохраненного. Исполнитель держит _kline_store_lock ряда, пока план не завершится.
+        """
+        interval_ms = interval_to_milliseconds(interval)
+        store = self.candle_store
+        if store is None or start is not None or end is not None or interval_ms is None:
+            params = {"category": category, "symbol": symbol, "interval": interval, "limit": limit}
+            if start is not None:
+                params["start"] = int(start)
+            if end is not None:
+                params["end"] = int(end)
+            response = yield params
+            if not self._response_ok(response, f"получении свечей {symbol}"):
+                return None
+            return OHLCVBundle.from_klines(response.get("result", {}).get("list", []))
+
+        stored = store.load(category, symbol, interval, tail=limit)
+        if len(stored) > 0:
+            last_ts = int(stored[-1, 0])
+            missing_bars = max(1, (int(time.time() * 1000) - last_ts) // interval_ms)
+            if missing_bars < 1000 and len(stored) + missing_bars >= limit:
+                response = yield {
+                    "category": category,
+                    "symbol": symbol,
+                    "interval": interval,
+                    "limit": 1000,
+                    "start": last_ts + interval_ms,
+                }
+                if not self._response_ok(response, f"получении новых свечей {symbol}"):
+                    return None
 
-        df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
-        for column in KLINE_COLUMNS:
-            df[column] = pd.to_numeric(df[column], errors="coerce")
+                fresh, server_time_ms = self._kline_response_rows(response)
+                # Полный ответ означает, что разрыв больше одной страницы: перезагружаем окно целиком.
+                if len(fresh) < 1000:
+                    fresh = fresh[fresh[:, 0] > last_ts]
+                    closed = fresh[fresh[:, 0] + interval_ms <= server_time_ms]
+                    store.append(category, symbol, interval, closed)
+                    combined = np.concatenate([stored, fresh])[-limit:]
+                    return OHLCVBundle.from_rows(combined)
+
+        response = yield {"category": category, "symbol": symbol, "interval": interval, "limit": limit}
+        if not self._response_ok(response, f"получении свечей {symbol}"):
+            return None
 
-        df = df.dropna(subset=["timestamp", "open", "high", "low", "close", "volume"])
-        df = df.sort_values("timestamp")
-        df = df.drop_duplicates(subset=["timestamp"], keep="last").reset_index(drop=True)
-        return df
+        fetched, server_time_ms = self._kline_response_rows(response)
+        closed = fetched[fetched[:, 0] + interval_ms <= server_time_ms]
+        if len(closed) > 0:
+            history = store.load(category, symbol, interval)
+            first_fetched_ts = closed[0, 0]
+            if len(history) > 0 and first_fetched_ts <= history[-1, 0] + interval_ms:
+                closed = np.concatenate([history[history[:, 0] < first_fetched_ts], closed])
+            store.replace(category, symbol, interval, closed)
+        return OHLCVBundle.from_rows(fetched)
 
     def _try_number(self, value):
         """Пытается преобразовать строковое значение API в число, сохраняя исходное значение при неудаче."""
@@ -216,6 +307,69 @@ class BybitClient:
             return [self._coerce_numbers(item) for item in value]
         return self._try_number(value)
 
+    def _orderbook_api_limit(self, requested_levels: int, category: str) -> int:
+        """Считает глубину стакана для запроса с запасом под поиск крупных заявок."""
+        return min(max(requested_levels * 3, requested_levels), ORDERBOOK_LIMITS[category])
+
+    def _parse_orderbook_result(self, result: dict, requested_levels: int, whale_size=None):
+        """Считает агрегированные объемы и крупные заявки по сырому ответу стакана."""
+        bids = result.get("b", [])
+        asks = result.get("a", [])
+
+        bid_volume = sum(float(bid[1]) for bid in bids[:requested_levels]) if bids else 0.0
+        ask_volume = sum(float(ask[1]) for ask in asks[:requested_levels]) if asks else 0.0
+
+        whale_bids = []
+        whale_asks = []
+        if whale_size is not None:
+            whale_threshold = float(whale_size)
+            whale_bids = [order for order in bids if float(order[1]) >= whale_threshold]
+            whale_asks = [order for order in asks if float(order[1]) >= whale_threshold]
+
+        return bids, asks, bid_volume, ask_volume, whale_bids, whale_asks
+
+    def _parse_ticker_prices(self, items: list[dict], symbols: list[str]) -> dict[str, float]:
+        """Выбирает последние цены нужных символов из списка тикеров."""
+        target_symbols = set(symbols)
+        prices: dict[str, float] = {}
+        for item in items:
+            symbol = str(item.get("symbol", "")).upper()
+            if symbol in target_symbols and item.get("lastPrice") not in (None, ""):
+                prices[symbol] = float(item["lastPrice"])
+        return prices
+
+    def _parse_instrument_items(self, items: list[dict], symbol: str, category: str) -> dict:
+        """Приводит описание инструмента из instruments-info к плоскому словарю параметров."""
+        raw_item = next(
+            (item for item in items if str(item.get("symbol", "")).upper() == symbol),
+            items[0],
+        )
+        item = self._coerce_numbers(raw_item)
+
+        lot = item.get("lotSizeFilter", {}) or {}
+        price_filter = item.get("priceFilter", {}) or {}
+        leverage_filter = item.get("leverageFilter", {}) or {}
+
+        return {
+            "symbol": item.get("symbol"),
+            "category": category,
+            "status": item.get("status"),
+            "baseCoin": item.get("baseCoin"),
+            "quoteCoin": item.get("quoteCoin"),
+            "priceScale": item.get("priceScale"),
+            "tickSize": price_filter.get("tickSize"),
+            "minPrice": price_filter.get("minPrice"),
+            "maxPrice": price_filter.get("maxPrice"),
+            "qtyStep": lot.get("qtyStep"),
+            "minOrderQty": lot.get("minOrderQty"),
+            "maxOrderQty": lot.get("maxOrderQty"),
+            "maxMktOrderQty": lot.get("maxMktOrderQty"),
+            "minNotionalValue": lot.get("minNotionalValue") or lot.get("minOrderAmt"),
+            "minLeverage": leverage_filter.get("minLeverage"),
+            "maxLeverage": leverage_filter.get("maxLeverage"),
+            "raw": item,
+        }
+
     def get_klines(
         self,
         symbol: str,
@@ -226,32 +380,70 @@ class BybitClient:
         end: int | None = None,
     ) -> pd.DataFrame | None:
         """Получает исторические свечи по инструменту и возвращает их в виде DataFrame."""
+        bundle = self.get_kline_bundle(symbol, interval=interval, limit=limit, category=category, start=start, end=end)
+        return None if bundle is None else bundle.to_kline_dataframe()
+
+    def get_kline_bundle(
+        self,
+        symbol: str,
+        interval: str = INTERVAL,
+        limit: int = LIMIT,
+        category: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> OHLCVBundle | None:
+        """Получает исторические свечи в виде OHLCVBundle: ответ Bybit разбирается сразу в numpy без DataFrame."""
         try:
             normalized_symbol = self._normalize_symbol(symbol)
             normalized_category = self._normalize_category(category)
             normalized_limit = min(max(1, int(limit)), 1000)
-
-            params = {
-                "category": normalized_category,
-                "symbol": normalized_symbol,
-                "interval": str(interval),
-                "limit": normalized_limit,
-            }
-            if start is not None:
-                params["start"] = int(start)
-            if end is not None:
-                params["end"] = int(end)
-
-            response = self._request("get_kline", **params)
-            if not self._response_ok(response, f"получении свечей {normalized_symbol}"):
-                return None
-
-            klines = response.get("result", {}).get("list", [])
-            return self._build_kline_dataframe(klines)
+            interval = str(interval)
+
+            plan = self._kline_bundle_plan(normalized_symbol, interval, normalized_limit, normalized_category, start, end)
+            lock = self._kline_store_lock(normalized_symbol, interval, normalized_category, start, end)
+            with lock or nullcontext():
+                try:
+                    params = next(plan)
+                    while True:
+                        params = plan.send(self._request("get_kline", **params))
+                except StopIteration as finished:
+                    return finished.value
         except Exception as error:
             print(f"❌ Ошибка при получении данных {symbol}: {error}")
             return None
 
+    @property
+    def async_client(self):
+        """Лениво создает AsyncBybitClient с теми же base URL, limiter и разбором ответов."""
+        with self._async_client_lock:
+            if self._async_client is None:
+                from bybit_async_client import AsyncBybitClient
+
+                self._async_client = AsyncBybitClient(self)
+            return self._async_client
+
+    def get_kline_bundles_batch(
+        self,
+        limits: dict[str, int],
+        interval: str = INTERVAL,
+        category: str | None = None,
+    ) -> dict[str, OHLCVBundle | None]:
+        """Свечи по многим символам (symbol -> limit) с несколькими запросами в полете через AsyncBybitClient.
+
+        Локальное хранилище свечей работает так же, как в get_kline_bundle. Рассчитан на синхронный код;
+        из корутины лучше await async_client.get_kline_bundles(...), иначе вызов блокирует свой event loop.
+        """
+        def run_batch() -> dict[str, OHLCVBundle | None]:
+            return asyncio.run(self.async_client.get_kline_bundles(limits, interval=interval, category=category))
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return run_batch()
+        # asyncio.run нельзя вызвать внутри работающего loop: пакет исполняется в отдельном потоке со своим loop.
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="kline-batch") as executor:
+            return executor.submit(run_batch).result()
+
     def get_klines_until_date(
         self,
         symbol: str,
@@ -338,7 +530,7 @@ class BybitClient:
             normalized_symbol = self._normalize_symbol(symbol)
             normalized_category = self._normalize_category(category)
             requested_levels = max(1, int(levels))
-            api_limit = min(max(requested_levels * 3, requested_levels), ORDERBOOK_LIMITS[normalized_category])
+            api_limit = self._orderbook_api_limit(requested_levels, normalized_category)
 
             response = self._request(
                 "get_orderbook",
@@ -349,21 +541,7 @@ class BybitClient:
             if not self._response_ok(response, f"получении стакана {normalized_symbol}"):
                 return None, None, None, None, None, None
 
-            result = response.get("result", {})
-            bids = result.get("b", [])
-            asks = result.get("a", [])
-
-            bid_volume = sum(float(bid[1]) for bid in bids[:requested_levels]) if bids else 0.0
-            ask_volume = sum(float(ask[1]) for ask in asks[:requested_levels]) if asks else 0.0
-
-            whale_bids = []
-            whale_asks = []
-            if whale_size is not None:
-                whale_threshold = float(whale_size)
-                whale_bids = [order for order in bids if float(order[1]) >= whale_threshold]
-                whale_asks = [order for order in asks if float(order[1]) >= whale_threshold]
-
-            return bids, asks, bid_volume, ask_volume, whale_bids, whale_asks
+            return self._parse_orderbook_result(response.get("result", {}), requested_levels, whale_size)
         except Exception as error:
             print(f"❌ Ошибка при получении стакана {symbol}: {error}")
             return None, None, None, None, None, None
@@ -410,14 +588,7 @@ class BybitClient:
             if not self._response_ok(response, "получении списка тикеров"):
                 return {}
 
-            target_symbols = set(normalized_symbols)
-            prices: dict[str, float] = {}
-            for item in response.get("result", {}).get("list", []):
-                symbol = str(item.get("symbol", "")).upper()
-                if symbol in target_symbols and item.get("lastPrice") not in (None, ""):
-                    prices[symbol] = float(item["lastPrice"])
-
-            return prices
+            return self._parse_ticker_prices(response.get("result", {}).get("list", []), normalized_symbols)
         except Exception as error:
             print(f"❌ Ошибка при получении цен: {error}")
             return {}
@@ -610,35 +781,7 @@ class BybitClient:
             if not items:
                 return None
 
-            raw_item = next(
-                (item for item in items if str(item.get("symbol", "")).upper() == normalized_symbol),
-                items[0],
-            )
-            item = self._coerce_numbers(raw_item)
-
-            lot = item.get("lotSizeFilter", {}) or {}
-            price_filter = item.get("priceFilter", {}) or {}
-            leverage_filter = item.get("leverageFilter", {}) or {}
-
-            return {
-                "symbol": item.get("symbol"),
-                "category": normalized_category,
-                "status": item.get("status"),
-                "baseCoin": item.get("baseCoin"),
-                "quoteCoin": item.get("quoteCoin"),
-                "priceScale": item.get("priceScale"),
-                "tickSize": price_filter.get("tickSize"),
-                "minPrice": price_filter.get("minPrice"),
-                "maxPrice": price_filter.get("maxPrice"),
-                "qtyStep": lot.get("qtyStep"),
-                "minOrderQty": lot.get("minOrderQty"),
-                "maxOrderQty": lot.get("maxOrderQty"),
-                "maxMktOrderQty": lot.get("maxMktOrderQty"),
-                "minNotionalValue": lot.get("minNotionalValue") or lot.get("minOrderAmt"),
-                "minLeverage": leverage_filter.get("minLeverage"),
-                "maxLeverage": leverage_filter.get("maxLeverage"),
-                "raw": item,
-            }
+            return self._parse_instrument_items(items, normalized_symbol, normalized_category)
         except Exception as error:
             print(f"❌ Ошибка при получении параметров инструмента {symbol}: {error}")
             return None
@@ -1,9 +1,12 @@
 import contextlib
 import csv
+from dataclasses import asdict, dataclass
+import hashlib
 import json
 import math
 from numbers import Real
 from pathlib import Path
+import threading
 from typing import Any
 
 import pandas as pd
@@ -11,13 +14,15 @@ import pandas as pd
 from analyzes.entry_trigger_1h import EntryTrigger1hConfig, entry_trigger_1h
 from analyzes.setup_filter_4h import SetupFilter4hConfig, setup_filter_4h
 from analyzes.trend_filter_12h_v2 import TrendFilter12hConfig, trend_filter_12h
-from bybit_client_v2 import bybit_client
+from market_data import market_data_provider
+from state_store import StateStore, open_state_store
 from config import UNIVERSE_FILTER_MIN_MARKET_CAP, UNIVERSE_FILTER_MIN_VOLUME_24H
 from symbol_universe import (
     COMMON_SYMBOLS_FILE,
+    get_symbol_universe,
     load_symbols_from_file,
+    publish_symbol_universe,
     refresh_common_symbols,
-    write_symbols_file,
 )
 
 
@@ -111,28 +116,35 @@ def collect_passed_conditions(conditions: dict[str, bool] | None) -> list[str]:
     return [key for key, value in conditions.items() if value]
 
 
-def load_calibration_schedule_state(
-    file_path: str = CALIBRATION_SCHEDULE_STATE_FILE,
-) -> dict[str, Any]:
-    """Загружает состояние автоматического scheduler для calibration-report."""
-    path = Path(file_path)
-    if not path.exists():
-        return {}
+_calibration_schedule_store: StateStore | None = None
+_calibration_schedule_store_lock = threading.Lock()
 
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except (json.JSONDecodeError, OSError):
-        return {}
 
+def get_calibration_schedule_store() -> StateStore:
+    """Хранилище состояния scheduler calibration-report (создается при первом обращении)."""
+    global _calibration_schedule_store
+    with _calibration_schedule_store_lock:
+        if _calibration_schedule_store is None:
+            _calibration_schedule_store = open_state_store("calibration_schedule", CALIBRATION_SCHEDULE_STATE_FILE)
+        return _calibration_schedule_store
+
+
+def load_calibration_schedule_state(store: StateStore | None = None) -> dict[str, Any]:
+    """Загружает состояние автоматического scheduler для calibration-report."""
+    store = store or get_calibration_schedule_store()
+    return store.items()
 
-def save_calibration_schedule_state(
-    state: dict[str, Any],
-    file_path: str = CALIBRATION_SCHEDULE_STATE_FILE,
-) -> None:
-    """Сохраняет состояние автоматического scheduler для calibration-report."""
-    path = Path(file_path)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(state, ensure_ascii=True, indent=2), encoding="utf-8")
+
+def save_calibration_schedule_state(state: dict[str, Any], store: StateStore | None = None) -> None:
+    """Сохраняет состояние автоматического scheduler для calibration-report (только изменившиеся поля)."""
+    store = store or get_calibration_schedule_store()
+    current = store.items()
+    for key, value in state.items():
+        if current.get(key) != value:
+            store.set(key, value)
+    for key in current.keys() - state.keys():
+        store.delete(key)
+    store.flush()
 
 
 def is_auto_update_window(now_utc: pd.Timestamp) -> bool:
@@ -344,6 +356,188 @@ def build_dynamic_symbols_from_report_file(report_file: str, min_stage: str = "s
     return [symbol for _, symbol in ranked_symbols]
 
 
+def expected_last_closed_timestamp(interval_minutes: int, now_ms: int | None = None) -> int:
+    """Возвращает timestamp открытия последней закрытой свечи интервала (UTC-бакеты Bybit)."""
+    if now_ms is None:
+        now_ms = int(pd.Timestamp.now(tz="UTC").value // 1_000_000)
+    interval_ms = interval_minutes * 60_000
+    return (now_ms // interval_ms) * interval_ms - interval_ms
+
+
+def calibration_config_hash(config: Any, limit: int) -> str:
+    """Короткий стабильный hash параметров стадии: при смене порогов или глубины истории кэш не переиспользуется."""
+    payload = json.dumps({"config": asdict(config), "limit": limit}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(slots=True)
+class CalibrationStageEntry:
+    key: tuple[str, str, int, str]
+    upstream_key: tuple[str, str, int, str] | None
+    result: Any
+    rows: int
+    last_closed: str
+
+
+class CalibrationStageCache:
+    """Кэш результатов стадий калибровки с ключом (symbol, stage, last closed candle ts, config hash).
+
+    На (symbol, stage) хранится только последний результат: старые свечи повторно не анализируются.
+    Запись валидна, только если совпадает и ключ вышестоящей стадии, от результата которой она зависит.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple[str, str], CalibrationStageEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        key: tuple[str, str, int, str],
+        upstream_key: tuple[str, str, int, str] | None,
+    ) -> CalibrationStageEntry | None:
+        """Возвращает запись стадии, если ее вход (свеча, config и вышестоящая стадия) не изменился."""
+        symbol, stage, _, _ = key
+        with self._lock:
+            entry = self._entries.get((symbol, stage))
+            if entry is not None and entry.key == key and entry.upstream_key == upstream_key:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, entry: CalibrationStageEntry) -> None:
+        symbol, stage, _, _ = entry.key
+        with self._lock:
+            self._entries[(symbol, stage)] = entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> dict[str, int]:
+        """Возвращает счетчики попаданий и промахов."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Общий кэш стадий для scheduler и manual-запусков в пределах процесса.
+calibration_stage_cache = CalibrationStageCache()
+
+
+def resolve_calibration_stage(
+    stage_cache: CalibrationStageCache | None,
+    symbol: str,
+    stage: str,
+    interval_minutes: int,
+    limit: int,
+    config_hash: str,
+    upstream_key: tuple[str, str, int, str] | None,
+    compute,
+) -> tuple[CalibrationStageEntry | None, int]:
+    """Берет стадию из кэша или загружает свечи и пересчитывает ее.
+
+    compute(df) возвращает результат фильтра. Возвращает запись стадии (None, если данных нет)
+    и число строк после очистки для missing_data-отчета.
+    """
+    if stage_cache is not None:
+        # Ожидаемая закрытая свеча уже посчитана: ни запроса свечей, ни пересчета.
+        expected_key = (symbol, stage, expected_last_closed_timestamp(interval_minutes), config_hash)
+        entry = stage_cache.get(expected_key, upstream_key)
+        if entry is not None:
+            return entry, entry.rows
+
+    raw = market_data_provider.get_klines(symbol=symbol, interval=str(interval_minutes), limit=limit)
+    df = prepare_ohlcv_for_filter(raw, interval_minutes=interval_minutes)
+    if df.empty:
+        return None, 0
+
+    key = (symbol, stage, int(df.index[-1].value // 1_000_000), config_hash)
+    if stage_cache is not None:
+        # Биржа могла еще не отдать новую свечу: тогда результат по фактической последней свече тоже переиспользуем.
+        entry = stage_cache.get(key, upstream_key)
+        if entry is not None:
+            return entry, entry.rows
+
+    entry = CalibrationStageEntry(
+        key=key,
+        upstream_key=upstream_key,
+        result=compute(df),
+        rows=len(df),
+        last_closed=str(df.index[-1]),
+    )
+    if stage_cache is not None:
+        stage_cache.put(entry)
+    return entry, entry.rows
+
+
+def summarize_trend_stage(trend_result) -> dict[str, Any]:
+    """Компактная секция 12H для report row."""
+    trend_hard = trend_result.hard_conditions
+    trend_soft = trend_result.soft_conditions
+    return {
+        "passed": trend_result.passed,
+        "hard_passed": trend_result.hard_passed,
+        "soft_score": trend_result.soft_score,
+        "soft_score_max": trend_result.soft_score_max,
+        "reason": trend_result.reason,
+        "passed_soft": collect_passed_conditions(trend_soft),
+        "failed_hard": collect_failed_conditions(trend_hard),
+        "failed_soft": collect_failed_conditions(trend_soft),
+    }
+
+
+def summarize_setup_stage(setup_result) -> dict[str, Any]:
+    """Компактная секция 4H для report row."""
+    setup_hard = setup_result.hard_conditions
+    setup_soft = setup_result.soft_conditions
+    return {
+        "passed": setup_result.passed,
+        "hard_passed": setup_result.hard_passed,
+        "setup_state": setup_result.setup_state,
+        "soft_score": setup_result.soft_score,
+        "soft_score_max": setup_result.soft_score_max,
+        "reason": setup_result.reason,
+        "passed_soft": collect_passed_conditions(setup_soft),
+        "failed_hard": collect_failed_conditions(setup_hard),
+        "failed_soft": collect_failed_conditions(setup_soft),
+        "volume_ratio": safe_round(setup_result.details.get("last_candle", {}).get("volume_ratio"), 3),
+        "current_extension_atr": safe_round(
+            setup_result.details.get("pullback", {}).get("current_extension_atr"),
+            3,
+        ),
+    }
+
+
+def summarize_entry_stage(entry_result) -> dict[str, Any]:
+    """Компактная секция 1H для report row."""
+    entry_hard = entry_result.hard_conditions
+    entry_soft = entry_result.soft_conditions
+    entry_last = entry_result.details.get("last_candle", {})
+    return {
+        "passed": entry_result.passed,
+        "action": entry_result.action,
+        "trigger_state": entry_result.trigger_state,
+        "hard_passed": entry_result.hard_passed,
+        "soft_score": entry_result.soft_score,
+        "soft_score_max": entry_result.soft_score_max,
+        "reason": entry_result.reason,
+        "passed_soft": collect_passed_conditions(entry_soft),
+        "failed_hard": collect_failed_conditions(entry_hard),
+        "failed_soft": collect_failed_conditions(entry_soft),
+        "volume_ratio": safe_round(entry_last.get("volume_ratio"), 3),
+        "current_extension_atr": safe_round(entry_last.get("current_extension_atr"), 3),
+        "entry": safe_round(entry_result.entry_price, 6),
+        "stop": safe_round(entry_result.stop_loss, 6),
+        "take": safe_round(entry_result.take_profit, 6),
+        "rr": safe_round(entry_result.reward_risk, 3),
+        "risk_pct": safe_round(entry_result.risk_percent, 3),
+    }
+
+
 def analyze_symbol(
     symbol: str,
     trend_config: TrendFilter12hConfig,
@@ -352,95 +546,74 @@ def analyze_symbol(
     limit_12h: int,
     limit_4h: int,
     limit_1h: int,
+    stage_cache: CalibrationStageCache | None = None,
 ) -> dict[str, Any]:
-    """Прогоняет один символ через 12H -> 4H -> 1H и возвращает compact report row."""
-    raw_12h = bybit_client.get_klines(symbol=symbol, interval="720", limit=limit_12h)
-    raw_4h = bybit_client.get_klines(symbol=symbol, interval="240", limit=limit_4h)
-    raw_1h = bybit_client.get_klines(symbol=symbol, interval="60", limit=limit_1h)
-
-    df_12h = prepare_ohlcv_for_filter(raw_12h, interval_minutes=720)
-    df_4h = prepare_ohlcv_for_filter(raw_4h, interval_minutes=240)
-    df_1h = prepare_ohlcv_for_filter(raw_1h, interval_minutes=60)
+    """Прогоняет один символ через 12H -> 4H -> 1H и возвращает compact report row.
+
+    С stage_cache пересчитываются только стадии, у которых закрылась новая свеча
+    или изменился результат вышестоящей стадии; остальные секции собираются из кэша.
+    """
+    trend_entry, rows_12h = resolve_calibration_stage(
+        stage_cache,
+        symbol,
+        "12H",
+        720,
+        limit_12h,
+        calibration_config_hash(trend_config, limit_12h),
+        None,
+        lambda df: trend_filter_12h(df, config=trend_config, symbol=symbol),
+    )
+    setup_entry, rows_4h = None, 0
+    if trend_entry is not None:
+        setup_entry, rows_4h = resolve_calibration_stage(
+            stage_cache,
+            symbol,
+            "4H",
+            240,
+            limit_4h,
+            calibration_config_hash(setup_config, limit_4h),
+            trend_entry.key,
+            lambda df: setup_filter_4h(
+                df,
+                trend_bias_passed=trend_entry.result.passed,
+                trend_bias_reason=trend_entry.result.reason,
+                config=setup_config,
+                symbol=symbol,
+            ),
+        )
+    entry_entry, rows_1h = None, 0
+    if setup_entry is not None:
+        entry_entry, rows_1h = resolve_calibration_stage(
+            stage_cache,
+            symbol,
+            "1H",
+            60,
+            limit_1h,
+            calibration_config_hash(entry_config, limit_1h),
+            setup_entry.key,
+            lambda df: entry_trigger_1h(df, setup_result=setup_entry.result, config=entry_config, symbol=symbol),
+        )
 
-    if df_12h.empty or df_4h.empty or df_1h.empty:
+    if trend_entry is None or setup_entry is None or entry_entry is None:
         return {
             "symbol": symbol,
             "status": "missing_data",
-            "rows": {"12H": len(df_12h), "4H": len(df_4h), "1H": len(df_1h)},
+            "rows": {"12H": rows_12h, "4H": rows_4h, "1H": rows_1h},
             "reason": "Missing data on at least one timeframe after cleaning",
         }
 
-    trend_result = trend_filter_12h(df_12h, config=trend_config)
-    setup_result = setup_filter_4h(
-        df_4h,
-        trend_bias_passed=trend_result.passed,
-        trend_bias_reason=trend_result.reason,
-        config=setup_config,
-    )
-    entry_result = entry_trigger_1h(df_1h, setup_result=setup_result, config=entry_config)
-
-    trend_hard = trend_result.details.get("hard_conditions", {})
-    trend_soft = trend_result.details.get("soft_conditions", {})
-    setup_hard = setup_result.details.get("hard_conditions", {})
-    setup_soft = setup_result.details.get("soft_conditions", {})
-    entry_hard = entry_result.details.get("hard_conditions", {})
-    entry_soft = entry_result.details.get("soft_conditions", {})
-    entry_last = entry_result.details.get("last_candle", {})
-
     return {
         "symbol": symbol,
         "status": "ok",
-        "rows": {"12H": len(df_12h), "4H": len(df_4h), "1H": len(df_1h)},
+        "rows": {"12H": trend_entry.rows, "4H": setup_entry.rows, "1H": entry_entry.rows},
         "last_closed": {
-            "12H": str(df_12h.index[-1]),
-            "4H": str(df_4h.index[-1]),
-            "1H": str(df_1h.index[-1]),
-        },
-        "12H": {
-            "passed": trend_result.passed,
-            "hard_passed": trend_result.hard_passed,
-            "soft_score": trend_result.soft_score,
-            "soft_score_max": trend_result.soft_score_max,
-            "reason": trend_result.reason,
-            "passed_soft": collect_passed_conditions(trend_soft),
-            "failed_hard": collect_failed_conditions(trend_hard),
-            "failed_soft": collect_failed_conditions(trend_soft),
-        },
-        "4H": {
-            "passed": setup_result.passed,
-            "hard_passed": setup_result.hard_passed,
-            "setup_state": setup_result.setup_state,
-            "soft_score": setup_result.soft_score,
-            "soft_score_max": setup_result.soft_score_max,
-            "reason": setup_result.reason,
-            "passed_soft": collect_passed_conditions(setup_soft),
-            "failed_hard": collect_failed_conditions(setup_hard),
-            "failed_soft": collect_failed_conditions(setup_soft),
-            "volume_ratio": safe_round(setup_result.details.get("last_candle", {}).get("volume_ratio"), 3),
-            "current_extension_atr": safe_round(
-                setup_result.details.get("pullback", {}).get("current_extension_atr"),
-                3,
-            ),
-        },
-        "1H": {
-            "passed": entry_result.passed,
-            "action": entry_result.action,
-            "trigger_state": entry_result.trigger_state,
-            "hard_passed": entry_result.hard_passed,
-            "soft_score": entry_result.soft_score,
-            "soft_score_max": entry_result.soft_score_max,
-            "reason": entry_result.reason,
-            "passed_soft": collect_passed_conditions(entry_soft),
-            "failed_hard": collect_failed_conditions(entry_hard),
-            "failed_soft": collect_failed_conditions(entry_soft),
-            "volume_ratio": safe_round(entry_last.get("volume_ratio"), 3),
-            "current_extension_atr": safe_round(entry_last.get("current_extension_atr"), 3),
-            "entry": safe_round(entry_result.entry_price, 6),
-            "stop": safe_round(entry_result.stop_loss, 6),
-            "take": safe_round(entry_result.take_profit, 6),
-            "rr": safe_round(entry_result.reward_risk, 3),
-            "risk_pct": safe_round(entry_result.risk_percent, 3),
+            "12H": trend_entry.last_closed,
+            "4H": setup_entry.last_closed,
+            "1H": entry_entry.last_closed,
         },
+        "12H": summarize_trend_stage(trend_entry.result),
+        "4H": summarize_setup_stage(setup_entry.result),
+        "1H": summarize_entry_stage(entry_entry.result),
     }
 
 
@@ -453,6 +626,7 @@ def build_report_rows(
     limit_4h: int = DEFAULT_LIMIT_4H,
     limit_1h: int = DEFAULT_LIMIT_1H,
     stream_tsv_output_file: str | None = None,
+    stage_cache: CalibrationStageCache | None = calibration_stage_cache,
 ) -> list[dict[str, Any]]:
     """Строит calibration-report rows для списка символов."""
     report_rows: list[dict[str, Any]] = []
@@ -476,6 +650,7 @@ def build_report_rows(
                     limit_12h=limit_12h,
                     limit_4h=limit_4h,
                     limit_1h=limit_1h,
+                    stage_cache=stage_cache,
                 )
             except Exception as exc:
                 row = {"symbol": symbol, "status": "error", "reason": repr(exc)}
@@ -755,10 +930,7 @@ def run_scheduled_calibration(now_utc: pd.Timestamp | None = None) -> dict[str,
         refresh_common_symbols(output_file=COMMON_SYMBOLS_FILE)
         state["last_filtered_refresh_date"] = current_date
 
-    try:
-        symbols = load_symbols_from_file(COMMON_SYMBOLS_FILE)
-    except FileNotFoundError:
-        symbols = []
+    symbols = list(get_symbol_universe(COMMON_SYMBOLS_FILE).symbols)
 
     if not symbols:
         state["last_attempt_at"] = now_ts.isoformat()
@@ -781,7 +953,7 @@ def run_scheduled_calibration(now_utc: pd.Timestamp | None = None) -> dict[str,
         limit_1h=DEFAULT_LIMIT_1H,
     )
     dynamic_symbols = build_dynamic_symbols(report_rows, min_stage="setup")
-    write_symbols_file(DYNAMIC_SYMBOLS_FILE, dynamic_symbols)
+    publish_symbol_universe(dynamic_symbols, DYNAMIC_SYMBOLS_FILE)
     write_report_tsv(report_rows, DEFAULT_REPORT_TSV_FILE)
     write_human_report(
         report_rows,
@@ -812,6 +984,7 @@ def run_scheduled_calibration(now_utc: pd.Timestamp | None = None) -> dict[str,
         "dynamic_symbols_count": len(dynamic_symbols),
         "report_file": DEFAULT_REPORT_TEXT_FILE,
         "tsv_file": DEFAULT_REPORT_TSV_FILE,
+        "stage_cache": calibration_stage_cache.get_stats(),
     }
 
 
@@ -882,7 +1055,7 @@ def run_manual_calibration(
             )
         else:
             dynamic_symbols = build_dynamic_symbols(report_rows, min_stage=dynamic_min_stage)
-        write_symbols_file(dynamic_output_file, dynamic_symbols)
+        publish_symbol_universe(dynamic_symbols, dynamic_output_file)
 
     if tsv_output_file:
         write_report_tsv(report_rows, tsv_output_file)
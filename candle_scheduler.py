@@ -0,0 +1,93 @@
+"""
+Планировщик основного цикла по закрытию свечей.
+
+Держит min-heap моментов следующего закрытия для каждого таймфрейма и периодических задач,
+спит ровно до ближайшего события и отдает набор событий, которые наступили.
+"""
+
+from __future__ import annotations
+
+import heapq
+import time
+
+from config import SCHEDULER_SETTLE_DELAY_SECONDS
+
+
+class CandleCloseScheduler:
+    """Будит основной цикл на границах свечей (по серверному времени Bybit) и для периодических задач."""
+
+    def __init__(
+        self,
+        timeframe_seconds: dict[str, int],
+        periodic_tasks: dict[str, float] | None = None,
+        settle_delay_seconds: float = SCHEDULER_SETTLE_DELAY_SECONDS,
+    ):
+        self.timeframe_seconds = dict(timeframe_seconds)
+        self.periodic_tasks = dict(periodic_tasks or {})
+        self.settle_delay_seconds = max(0.0, float(settle_delay_seconds))
+        self.clock_offset_seconds = 0.0
+        self._heap: list[tuple[float, str]] = []
+
+    def now(self) -> float:
+        """Текущее время по часам биржи (локальное время плюс измеренное смещение)."""
+        return time.time() + self.clock_offset_seconds
+
+    def sync_server_time(self, client) -> float | None:
+        """Измеряет смещение локальных часов относительно get_server_time и возвращает его."""
+        local_before = time.time()
+        server_time = client.get_server_time()
+        local_after = time.time()
+        if not server_time:
+            return None
+
+        try:
+            if server_time.get("timeNano"):
+                server_seconds = int(server_time["timeNano"]) / 1_000_000_000
+            else:
+                server_seconds = float(server_time["timeSecond"])
+        except (TypeError, ValueError, KeyError):
+            return None
+
+        self.clock_offset_seconds = server_seconds - (local_before + local_after) / 2
+        return self.clock_offset_seconds
+
+    def _next_boundary(self, name: str, after: float) -> float:
+        if name in self.timeframe_seconds:
+            candle_seconds = self.timeframe_seconds[name]
+            return (int(after) // candle_seconds + 1) * candle_seconds + self.settle_delay_seconds
+        return after + self.periodic_tasks[name]
+
+    def start(self) -> set[str]:
+        """Инициализирует heap и возвращает все события: первый проход анализирует последние закрытые свечи."""
+        now = self.now()
+        self._heap = []
+        for name in [*self.timeframe_seconds, *self.periodic_tasks]:
+            # Для таймфреймов считаем от момента без settle delay, чтобы не пропустить только что начавшуюся свечу.
+            anchor = now - self.settle_delay_seconds if name in self.timeframe_seconds else now
+            heapq.heappush(self._heap, (self._next_boundary(name, anchor), name))
+        return set(self.timeframe_seconds) | set(self.periodic_tasks)
+
+    def seconds_until_next(self) -> float:
+        """Сколько секунд осталось до ближайшего события."""
+        if not self._heap:
+            return 0.0
+        return max(0.0, self._heap[0][0] - self.now())
+
+    def wait_next(self) -> set[str]:
+        """Спит до ближайшего события и возвращает все события, срок которых наступил."""
+        if not self._heap:
+            return self.start()
+
+        delay = self.seconds_until_next()
+        if delay > 0:
+            time.sleep(delay)
+
+        now = self.now()
+        due: set[str] = set()
+        while self._heap and self._heap[0][0] <= now:
+            due_at, name = heapq.heappop(self._heap)
+            due.add(name)
+            # Если цикл затянулся дольше периода, пропущенные срабатывания схлопываются в одно.
+            anchor = max(due_at, now) - (self.settle_delay_seconds if name in self.timeframe_seconds else 0.0)
+            heapq.heappush(self._heap, (self._next_boundary(name, anchor), name))
+        return due
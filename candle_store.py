@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import threading
+
+import numpy as np
+
+from config import CANDLE_STORE_DIR, CANDLE_STORE_MAX_ROWS
+
+
+# Порядок колонок совпадает с KLINE_COLUMNS клиента Bybit:
+# timestamp, open, high, low, close, volume, turnover.
+CANDLE_RECORD_FIELDS = 7
+CANDLE_RECORD_DTYPE = np.dtype("<f8")
+CANDLE_RECORD_SIZE = CANDLE_RECORD_FIELDS * CANDLE_RECORD_DTYPE.itemsize
+CANDLE_FILE_SUFFIX = ".f64"
+
+_FIXED_INTERVAL_MILLISECONDS = {
+    "D": 86_400_000,
+    "W": 604_800_000,
+}
+
+
+def interval_to_milliseconds(interval: str | int) -> int | None:
+    """Возвращает длительность интервала Bybit в миллисекундах или None для нефиксированных интервалов."""
+    normalized = str(interval).strip().upper()
+    if normalized.isdigit():
+        return int(normalized) * 60_000
+    return _FIXED_INTERVAL_MILLISECONDS.get(normalized)
+
+
+def empty_candle_rows() -> np.ndarray:
+    """Возвращает пустой массив свечей нужной формы."""
+    return np.empty((0, CANDLE_RECORD_FIELDS), dtype=CANDLE_RECORD_DTYPE)
+
+
+class CandleStore:
+    """Append-only хранилище закрытых свечей: один бинарный float64-файл на (category, symbol, interval).
+
+    Файл состоит из записей по 7 float64 без заголовка, поэтому его можно открыть
+    через np.memmap или np.fromfile и прочитать только хвост без загрузки всей истории.
+    """
+
+    def __init__(self, root_dir: str | os.PathLike = CANDLE_STORE_DIR, max_rows: int = CANDLE_STORE_MAX_ROWS):
+        self.root_dir = Path(root_dir)
+        self.max_rows = max(1, int(max_rows))
+        self._locks: dict[tuple[str, str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _key(self, category: str, symbol: str, interval: str | int) -> tuple[str, str, str]:
+        return str(category).lower(), str(symbol).upper(), str(interval).upper()
+
+    def _path(self, key: tuple[str, str, str]) -> Path:
+        category, symbol, interval = key
+        return self.root_dir / category / interval / f"{symbol}{CANDLE_FILE_SUFFIX}"
+
+    def lock_for(self, category: str, symbol: str, interval: str | int) -> threading.Lock:
+        """Возвращает lock конкретного ряда, чтобы чтение и дозапись шли атомарно относительно других потоков."""
+        key = self._key(category, symbol, interval)
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+    def _row_count(self, path: Path) -> int:
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return 0
+        return size // CANDLE_RECORD_SIZE
+
+    def row_count(self, category: str, symbol: str, interval: str | int) -> int:
+        """Возвращает количество сохраненных закрытых свечей."""
+        return self._row_count(self._path(self._key(category, symbol, interval)))
+
+    def load(self, category: str, symbol: str, interval: str | int, tail: int | None = None) -> np.ndarray:
+        """Читает сохраненные свечи (целиком или только последние tail записей) в виде массива (n, 7)."""
+        path = self._path(self._key(category, symbol, interval))
+        total_rows = self._row_count(path)
+        if total_rows == 0:
+            return empty_candle_rows()
+
+        rows_to_read = total_rows if tail is None else min(total_rows, max(0, int(tail)))
+        if rows_to_read == 0:
+            return empty_candle_rows()
+
+        offset = (total_rows - rows_to_read) * CANDLE_RECORD_SIZE
+        mapped = np.memmap(
+            path,
+            dtype=CANDLE_RECORD_DTYPE,
+            mode="r",
+            offset=offset,
+            shape=(rows_to_read, CANDLE_RECORD_FIELDS),
+        )
+        try:
+            # Копируем, чтобы не держать файл открытым: иначе os.replace при компакции падает на Windows.
+            return np.array(mapped)
+        finally:
+            del mapped
+
+    def last_timestamp(self, category: str, symbol: str, interval: str | int) -> int | None:
+        """Возвращает timestamp последней сохраненной свечи или None, если ряд пуст."""
+        rows = self.load(category, symbol, interval, tail=1)
+        if len(rows) == 0:
+            return None
+        return int(rows[-1, 0])
+
+    def append(self, category: str, symbol: str, interval: str | int, rows: np.ndarray) -> int:
+        """Дописывает только свечи новее последней сохраненной и возвращает число добавленных записей."""
+        rows = np.asarray(rows, dtype=CANDLE_RECORD_DTYPE).reshape(-1, CANDLE_RECORD_FIELDS)
+        if len(rows) == 0:
+            return 0
+
+        key = self._key(category, symbol, interval)
+        path = self._path(key)
+        last_ts = self.last_timestamp(category, symbol, interval)
+        if last_ts is not None:
+            rows = rows[rows[:, 0] > last_ts]
+        if len(rows) == 0:
+            return 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as handle:
+            handle.write(np.ascontiguousarray(rows).tobytes())
+
+        if self._row_count(path) > self.max_rows:
+            self.replace(category, symbol, interval, self.load(category, symbol, interval, tail=self.max_rows))
+        return len(rows)
+
+    def replace(self, category: str, symbol: str, interval: str | int, rows: np.ndarray) -> None:
+        """Атомарно перезаписывает ряд (используется при разрыве истории и компакции)."""
+        rows = np.asarray(rows, dtype=CANDLE_RECORD_DTYPE).reshape(-1, CANDLE_RECORD_FIELDS)
+        if len(rows) > self.max_rows:
+            rows = rows[-self.max_rows:]
+
+        path = self._path(self._key(category, symbol, interval))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, "wb") as handle:
+            handle.write(np.ascontiguousarray(rows).tobytes())
+        os.replace(tmp_path, path)
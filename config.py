@@ -61,13 +61,117 @@ UNIVERSE_FILTER_EXCLUDE_STABLECOINS = os.getenv('UNIVERSE_FILTER_EXCLUDE_STABLEC
 SPOT_POSITION_MIN_USD_VALUE = float(os.getenv('SPOT_POSITION_MIN_USD_VALUE', '1.0'))
 
 # ==== Параметры основного цикла и фоновых потоков ====
-# Пауза между основными циклами анализа символов в main.py.
+# Период мониторинга активных сделок в main.py; анализ символов запускается по закрытию свечей.
 MAIN_LOOP_PAUSE_SECONDS = int(os.getenv('MAIN_LOOP_PAUSE_SECONDS', '60'))
+# Задержка после закрытия свечи перед анализом, чтобы биржа успела финализировать бар.
+SCHEDULER_SETTLE_DELAY_SECONDS = float(os.getenv('SCHEDULER_SETTLE_DELAY_SECONDS', '3'))
+# Сколько символов анализируется параллельно в одном цикле (1 = последовательный режим).
+MAIN_ANALYSIS_WORKERS = int(os.getenv('MAIN_ANALYSIS_WORKERS', '4'))
+# Прогонять MULTI_TF воронкой: 12H для всех символов пакетом, 4H и 1H только для прошедших предыдущий этап.
+MULTI_TF_FUNNEL_ENABLED = os.getenv('MULTI_TF_FUNNEL_ENABLED', 'True').lower() == 'true'
 # Как часто background calibration worker проверяет, не наступило ли окно автокалибровки.
 CALIBRATION_CHECK_PAUSE_SECONDS = int(os.getenv('CALIBRATION_CHECK_PAUSE_SECONDS', '60'))
 # Как часто background calibration worker пишет heartbeat в отдельный лог, даже если окно еще не наступило.
 CALIBRATION_HEARTBEAT_INTERVAL_SECONDS = int(os.getenv('CALIBRATION_HEARTBEAT_INTERVAL_SECONDS', '300'))
 
+# ==== Локальное хранилище свечей ====
+# Если включено, get_klines держит закрытые свечи на диске и докачивает с биржи только новые бары.
+CANDLE_STORE_ENABLED = os.getenv('CANDLE_STORE_ENABLED', 'True').lower() == 'true'
+# Каталог с бинарными файлами свечей (по одному файлу на category/interval/symbol).
+CANDLE_STORE_DIR = os.getenv('CANDLE_STORE_DIR', 'data/candles')
+# Сколько последних закрытых свечей хранить на один ряд; более старые срезаются при компакции.
+CANDLE_STORE_MAX_ROWS = int(os.getenv('CANDLE_STORE_MAX_ROWS', '5000'))
+# Размер кольцевого буфера закрытых свечей на один (symbol, interval) в общем провайдере данных.
+MARKET_DATA_BUFFER_CAPACITY = int(os.getenv('MARKET_DATA_BUFFER_CAPACITY', '1000'))
+# Сколько секунд незакрытая свеча считается свежей и повторные запросы ряда обслуживаются из памяти.
+MARKET_DATA_LIVE_TTL_SECONDS = float(os.getenv('MARKET_DATA_LIVE_TTL_SECONDS', '60'))
+# Собирать 4H и 12H свечи из часовых локально вместо отдельных запросов к бирже.
+MARKET_DATA_RESAMPLE_ENABLED = os.getenv('MARKET_DATA_RESAMPLE_ENABLED', 'True').lower() == 'true'
+
+# ==== Инкрементальные индикаторы ====
+# Считать EMA/ATR/ADX/RSI/OBV фильтров через состояние на символ и таймфрейм: рекурсии обновляются
+# за O(1) на новую свечу, чтение окна остается векторным O(window).
+INDICATOR_ENGINE_ENABLED = os.getenv('INDICATOR_ENGINE_ENABLED', 'True').lower() == 'true'
+# Сколько закрытых свечей держит движок на (symbol, timeframe); при переполнении старая половина отбрасывается.
+INDICATOR_ENGINE_MAX_HISTORY = int(os.getenv('INDICATOR_ENGINE_MAX_HISTORY', '2000'))
+
+# Общий LRU-кэш рассчитанных индикаторов (ключ: symbol, timeframe, последняя свеча, индикатор, параметры).
+INDICATOR_CACHE_ENABLED = os.getenv('INDICATOR_CACHE_ENABLED', 'True').lower() == 'true'
+INDICATOR_CACHE_MAX_ENTRIES = int(os.getenv('INDICATOR_CACHE_MAX_ENTRIES', '4096'))
+
+# ==== Хранилище состояния (OBV, расписание калибровки, подписчики Telegram) ====
+# sqlite — одна БД в режиме WAL, строка на ключ; json — прежние JSON-файлы, переписываемые целиком.
+STATE_STORE_BACKEND = os.getenv('STATE_STORE_BACKEND', 'sqlite').lower()
+# Файл SQLite-БД; старые JSON-файлы переносятся в нее при первом запуске.
+STATE_STORE_PATH = os.getenv('STATE_STORE_PATH', 'data/state.sqlite3')
+# Изменения копятся и коммитятся одной транзакцией: по размеру пачки или через интервал после первой записи.
+STATE_STORE_BATCH_SIZE = int(os.getenv('STATE_STORE_BATCH_SIZE', '64'))
+STATE_STORE_COMMIT_INTERVAL_SECONDS = float(os.getenv('STATE_STORE_COMMIT_INTERVAL_SECONDS', '1.0'))
+
+# ==== Отправка в Telegram (очередь с фоновыми sender'ами) ====
+# Сколько потоков отправляют сообщения; все делят один keep-alive Session.
+TELEGRAM_SENDER_WORKERS = int(os.getenv('TELEGRAM_SENDER_WORKERS', '4'))
+# Общий лимит бота: Telegram допускает около 30 сообщений в секунду, держим запас.
+TELEGRAM_GLOBAL_MESSAGES_PER_SECOND = float(os.getenv('TELEGRAM_GLOBAL_MESSAGES_PER_SECOND', '25'))
+TELEGRAM_GLOBAL_BURST = int(os.getenv('TELEGRAM_GLOBAL_BURST', '25'))
+# Минимальный интервал между сообщениями в один чат: личный — около 1 в секунду, группа — около 20 в минуту.
+TELEGRAM_CHAT_MIN_INTERVAL_SECONDS = float(os.getenv('TELEGRAM_CHAT_MIN_INTERVAL_SECONDS', '1.0'))
+TELEGRAM_GROUP_CHAT_MIN_INTERVAL_SECONDS = float(os.getenv('TELEGRAM_GROUP_CHAT_MIN_INTERVAL_SECONDS', '3.0'))
+# Попыток на сообщение: повтор после 429 (через retry_after из ответа), 5xx и сетевых ошибок.
+TELEGRAM_MAX_ATTEMPTS = int(os.getenv('TELEGRAM_MAX_ATTEMPTS', '5'))
+# Потолок экспоненциальной паузы между попытками, секунды (retry_after из 429 им не ограничивается).
+TELEGRAM_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv('TELEGRAM_RETRY_BACKOFF_MAX_SECONDS', '60'))
+TELEGRAM_REQUEST_TIMEOUT_SECONDS = float(os.getenv('TELEGRAM_REQUEST_TIMEOUT_SECONDS', '10'))
+# Сколько секунд при остановке процесса досылать оставшуюся очередь.
+TELEGRAM_SHUTDOWN_FLUSH_SECONDS = float(os.getenv('TELEGRAM_SHUTDOWN_FLUSH_SECONDS', '10'))
+
+# ==== Дедупликация Telegram-сигналов ====
+# Сколько секунд не повторять одинаковый сигнал (symbol, timeframe, action), если для него нет своего TTL.
+SIGNAL_DEDUP_DEFAULT_TTL_SECONDS = float(os.getenv('SIGNAL_DEDUP_DEFAULT_TTL_SECONDS', '3600'))
+# TTL по стратегии и таймфрейму; ключи ищутся в порядке 'STRATEGY:TF', 'STRATEGY', 'TF'.
+SIGNAL_DEDUP_TTL_SECONDS = {
+    'RANGE': 60 * 60,
+    '1H': 60 * 60,
+    '4H': 4 * 60 * 60,
+    '12H': 12 * 60 * 60,
+}
+
+# ==== Снимок состояния tracker (теплый старт) ====
+# Сохранять обработанные свечи, результаты 12H/4H и отправленные сигналы после каждого цикла и при остановке,
+# чтобы после перезапуска не переанализировать весь universe и не дублировать сигналы.
+TRACKER_SNAPSHOT_ENABLED = os.getenv('TRACKER_SNAPSHOT_ENABLED', 'True').lower() == 'true'
+TRACKER_SNAPSHOT_FILE = os.getenv('TRACKER_SNAPSHOT_FILE', 'data/tracker_snapshot.pkl')
+
+# ==== Журнал активных сделок ====
+# Изменения сделок дописываются в JSONL-журнал; снимок data/active_trades.json переписывается только при компакции.
+# Сколько событий журнала (обновления цены и биржевого статуса) копить до fsync; открытие и закрытие — fsync сразу.
+TRADE_JOURNAL_FSYNC_BATCH_SIZE = int(os.getenv('TRADE_JOURNAL_FSYNC_BATCH_SIZE', '32'))
+# Максимальная задержка fsync после первой несинхронизированной записи, секунды.
+TRADE_JOURNAL_FSYNC_INTERVAL_SECONDS = float(os.getenv('TRADE_JOURNAL_FSYNC_INTERVAL_SECONDS', '1.0'))
+# Компакция: новый снимок открытых сделок, закрытые — в архив, журнал обнуляется.
+# Запускается после стольких событий или по истечении интервала (что наступит раньше).
+TRADE_JOURNAL_COMPACT_EVENTS = int(os.getenv('TRADE_JOURNAL_COMPACT_EVENTS', '1000'))
+TRADE_JOURNAL_COMPACT_INTERVAL_SECONDS = float(os.getenv('TRADE_JOURNAL_COMPACT_INTERVAL_SECONDS', '3600'))
+
+# ==== Лимиты запросов к Bybit (token bucket на группу endpoint'ов) ====
+# Публичные market-запросы: свечи, тикеры, стакан, инструменты.
+BYBIT_RATE_LIMIT_MARKET_PER_SECOND = float(os.getenv('BYBIT_RATE_LIMIT_MARKET_PER_SECOND', '10'))
+BYBIT_RATE_LIMIT_MARKET_BURST = int(os.getenv('BYBIT_RATE_LIMIT_MARKET_BURST', '20'))
+# Торговые операции: выставление, изменение и отмена ордеров, TP/SL, плечо.
+BYBIT_RATE_LIMIT_TRADE_PER_SECOND = float(os.getenv('BYBIT_RATE_LIMIT_TRADE_PER_SECOND', '5'))
+BYBIT_RATE_LIMIT_TRADE_BURST = int(os.getenv('BYBIT_RATE_LIMIT_TRADE_BURST', '5'))
+# Приватные account-запросы: баланс, позиции, ордера, исполнения.
+BYBIT_RATE_LIMIT_ACCOUNT_PER_SECOND = float(os.getenv('BYBIT_RATE_LIMIT_ACCOUNT_PER_SECOND', '5'))
+BYBIT_RATE_LIMIT_ACCOUNT_BURST = int(os.getenv('BYBIT_RATE_LIMIT_ACCOUNT_BURST', '10'))
+# Доля квоты из X-Bapi-Limit, ниже которой оставшиеся запросы растягиваются до сброса окна.
+BYBIT_RATE_LIMIT_ADAPTIVE_THRESHOLD = float(os.getenv('BYBIT_RATE_LIMIT_ADAPTIVE_THRESHOLD', '0.2'))
+# Максимальная пауза экспоненциального back-off после retCode 10006, если биржа не прислала время сброса.
+BYBIT_RATE_LIMIT_BACKOFF_MAX_SECONDS = float(os.getenv('BYBIT_RATE_LIMIT_BACKOFF_MAX_SECONDS', '30'))
+# Сколько раз повторять запрос после ответа retCode 10006.
+BYBIT_RATE_LIMIT_MAX_RETRIES = int(os.getenv('BYBIT_RATE_LIMIT_MAX_RETRIES', '3'))
+# Сколько keep-alive соединений (и одновременных запросов) держит AsyncBybitClient.
+BYBIT_ASYNC_MAX_CONNECTIONS = int(os.getenv('BYBIT_ASYNC_MAX_CONNECTIONS', '8'))
+
 
 # ==== Конфигурация стратегий ==== 
 # enabled: участвует ли стратегия в цикле анализа
@@ -83,6 +187,8 @@ STRATEGY_RUNTIME_CONFIGS = {
             'setup_min_soft_conditions_passed': 6,
             'entry_min_required_rows': 180,
             'entry_min_soft_conditions_passed': 5,
+            # Отказ по первому невыполненному hard-условию без расчета soft-индикаторов
+            'short_circuit': True,
         },
     },
     'RANGE': {
@@ -2,21 +2,30 @@ import threading
 import time
 import os
 import logging
+import signal
 
+from bybit_client_v2 import bybit_client
 from calibration_report_v3 import run_scheduled_calibration
+from candle_scheduler import CandleCloseScheduler
 from config import (
     CALIBRATION_CHECK_PAUSE_SECONDS,
     CALIBRATION_HEARTBEAT_INTERVAL_SECONDS,
+    MAIN_ANALYSIS_WORKERS,
     MAIN_LOOP_PAUSE_SECONDS,
+    MULTI_TF_FUNNEL_ENABLED,
+    TRACKER_SNAPSHOT_ENABLED,
 )
 from telegram_utils import send_telegram_message, process_telegram_updates, send_emergency_alert
 from strategies.base import StrategyContext
+from strategies.funnel import MultiTimeframeFunnelExecutor
+from strategies.multi_tf_trend_strategy import MultiTimeframeTrendStrategy
 from strategies.registry import build_default_strategies
 from strategies.runner import StrategyRunner
-from symbol_universe import load_common_symbols
+from symbol_universe import get_symbol_universe
 from time_frame_tracker import TimeframeAnalysisTracker
 from trade_monitor import load_active_trades, monitor_active_trades
-from bybit_client_v2 import bybit_client
+from market_data import market_data_provider
+from analyzes.indicator_cache import indicator_cache
 
 # Настройка логирования
 logging.basicConfig(
@@ -27,8 +36,6 @@ logging.basicConfig(
     encoding='utf-8'
 )
 
-CALIBRATION_LOCK = threading.Lock()
-
 # Создаем отдельные логгеры для каждого таймфрейма
 def setup_timeframe_loggers():
     """Настройка отдельных логгеров для каждого таймфрейма"""
@@ -80,9 +87,8 @@ def setup_calibration_logger():
 
 
 def load_strategy_symbols():
-    """Загружает общий список символов для всех стратегий."""
-    with CALIBRATION_LOCK:
-        return load_common_symbols()
+    """Возвращает текущую версию общего списка символов; калибровка публикует новые версии без блокировки цикла."""
+    return list(get_symbol_universe().symbols)
 
 
 def telegram_command_listener():
@@ -102,8 +108,7 @@ def telegram_command_listener():
 
 def run_scheduled_calibration_sync():
     """Запускает встроенный scheduler calibration_report_v3 и пишет результат в логи."""
-    with CALIBRATION_LOCK:
-        result = run_scheduled_calibration()
+    result = run_scheduled_calibration()
     if not result.get('ran'):
         return result
 
@@ -171,10 +176,25 @@ def calibration_scheduler_worker(calibration_logger, pause_seconds=60, heartbeat
         time.sleep(pause_seconds)
 
 
+def handle_shutdown_signal(signum, frame):
+    """Переводит SIGTERM в SystemExit, чтобы main() сохранил состояние в finally."""
+    raise SystemExit(0)
+
+
 def main():
     tracker = TimeframeAnalysisTracker()
+    if TRACKER_SNAPSHOT_ENABLED and tracker.load_snapshot():
+        # Теплый старт: уже обработанные свечи не анализируются повторно, результаты 12H/4H восстановлены.
+        logging.info(f"♻️ Состояние tracker восстановлено из снимка: {tracker.get_stats()['tracked_symbols']} символов")
     tracker.active_trades = load_active_trades()
-    strategy_runner = StrategyRunner(build_default_strategies())
+    strategies = build_default_strategies()
+    funnel_executor = None
+    multi_tf_strategy = next((item for item in strategies if isinstance(item, MultiTimeframeTrendStrategy)), None)
+    if MULTI_TF_FUNNEL_ENABLED and multi_tf_strategy is not None:
+        # MULTI_TF идет воронкой по всему набору символов, остальные стратегии — поштучно.
+        funnel_executor = MultiTimeframeFunnelExecutor(multi_tf_strategy, max_workers=MAIN_ANALYSIS_WORKERS)
+        strategies = [item for item in strategies if item is not multi_tf_strategy]
+    strategy_runner = StrategyRunner(strategies)
     tf_loggers = setup_timeframe_loggers()
     calibration_logger = setup_calibration_logger()
     
@@ -199,33 +219,79 @@ def main():
     )
     calibration_thread.start()
 
-    while True:
-        cycle_start = time.time()
-        monitor_active_trades(tracker.active_trades, tf_loggers)
-        symbols = load_strategy_symbols()
-        
-        for symbol in symbols:
-            try:
-                strategy_runner.analyze_symbol(
+    scheduler = CandleCloseScheduler(
+        tracker.timeframe_seconds,
+        periodic_tasks={'MONITOR': CYCLE_PAUSE},
+    )
+    if scheduler.sync_server_time(bybit_client) is not None:
+        tracker.clock_offset_seconds = scheduler.clock_offset_seconds
+    due_events = scheduler.start()
+
+    # SIGTERM завершает цикл через SystemExit, чтобы успеть сохранить снимок tracker.
+    signal.signal(signal.SIGTERM, handle_shutdown_signal)
+    try:
+        while True:
+            cycle_start = time.time()
+            if 'MONITOR' in due_events:
+                monitor_active_trades(tracker.active_trades, tf_loggers)
+
+            closed_timeframes = frozenset(due_events & set(tracker.timeframe_seconds))
+            if closed_timeframes:
+                symbols = load_strategy_symbols()
+
+                contexts = [
                     StrategyContext(
                         symbol=symbol,
                         tracker=tracker,
                         tf_loggers=tf_loggers,
-                        market_data_provider=bybit_client,
+                        market_data_provider=market_data_provider,
+                        closed_timeframes=closed_timeframes,
                     )
+                    for symbol in symbols
+                ]
+                funnel_result = funnel_executor.run(contexts) if funnel_executor is not None else None
+                batch_result = strategy_runner.analyze_symbols(contexts, max_workers=MAIN_ANALYSIS_WORKERS)
+                if funnel_result is not None:
+                    batch_result.merge(funnel_result)
+                    logging.info(f"🔻 Воронка MULTI_TF: {funnel_result.summary()}")
+                for symbol, error in batch_result.errors.items():
+                    error_msg = f"❌ Ошибка анализа {symbol}: {error}"
+                    print(error_msg)
+                    logging.error(error_msg)
+
+                    # Отправляем аварийное уведомление о критической ошибке
+                    send_emergency_alert('ANALYSIS', symbol=symbol, details=str(error))
+
+                if batch_result.signal_count:
+                    logging.info(
+                        f"📊 Сигналов за цикл: {batch_result.signal_count} | "
+                        f"символов с сигналами: {sum(1 for items in batch_result.signals.values() if items)}"
+                    )
+
+                cache_stats = indicator_cache.get_stats()
+                logging.info(
+                    f"🧮 Кэш индикаторов: {cache_stats['entries']} записей | "
+                    f"hit rate {cache_stats['hit_rate']:.0%} | вытеснено {cache_stats['evictions']}"
                 )
-            except Exception as e:
-                error_msg = f"❌ Ошибка анализа {symbol}: {e}"
-                print(error_msg)
-                logging.error(error_msg)
-                
-                # Отправляем аварийное уведомление о критической ошибке
-                send_emergency_alert('ANALYSIS', symbol=symbol, details=str(e))
-                continue
-        
-        cycle_duration = time.time() - cycle_start
-        print(f"\n⏱️  Цикл завершен за {cycle_duration:.1f}s. Пауза {CYCLE_PAUSE}s...\n")
-        time.sleep(CYCLE_PAUSE)
+
+                cycle_duration = time.time() - cycle_start
+                print(
+                    f"\n⏱️  Цикл {', '.join(sorted(closed_timeframes))} завершен за {cycle_duration:.1f}s. "
+                    f"Следующее событие через {scheduler.seconds_until_next():.0f}s...\n"
+                )
+
+                # Раз в закрытие свечи уточняем смещение часов, чтобы границы не уплывали.
+                if scheduler.sync_server_time(bybit_client) is not None:
+                    tracker.clock_offset_seconds = scheduler.clock_offset_seconds
+
+                if TRACKER_SNAPSHOT_ENABLED:
+                    tracker.save_snapshot()
+
+            due_events = scheduler.wait_next()
+    finally:
+        if TRACKER_SNAPSHOT_ENABLED:
+            tracker.save_snapshot()
+            logging.info("💾 Снимок tracker сохранен перед остановкой")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
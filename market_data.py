@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from bybit_client_v2 import bybit_client
+from candle_store import CANDLE_RECORD_FIELDS, empty_candle_rows, interval_to_milliseconds
+from ohlcv_bundle import OHLCVBundle
+from config import (
+    CATEGORY,
+    INTERVAL,
+    LIMIT,
+    MARKET_DATA_BUFFER_CAPACITY,
+    MARKET_DATA_LIVE_TTL_SECONDS,
+    MARKET_DATA_RESAMPLE_ENABLED,
+)
+
+
+# Старшие интервалы, которые собираются локально из часовых свечей.
+# Бакеты Bybit для 4H и 12H выровнены по UTC, поэтому агрегация по ts // interval_ms точная.
+RESAMPLED_INTERVAL_SOURCES = {
+    "240": "60",
+    "720": "60",
+}
+
+
+def resample_candles(rows: np.ndarray, interval_ms: int) -> np.ndarray:
+    """Агрегирует отсортированные свечи (n, 7) в UTC-бакеты interval_ms: first open, max high, min low, last close, sum volume."""
+    if len(rows) == 0:
+        return empty_candle_rows()
+
+    buckets = (rows[:, 0] // interval_ms) * interval_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(rows)] - 1
+
+    aggregated = np.empty((len(starts), CANDLE_RECORD_FIELDS), dtype=np.float64)
+    aggregated[:, 0] = buckets[starts]
+    aggregated[:, 1] = rows[starts, 1]
+    aggregated[:, 2] = np.maximum.reduceat(rows[:, 2], starts)
+    aggregated[:, 3] = np.minimum.reduceat(rows[:, 3], starts)
+    aggregated[:, 4] = rows[ends, 4]
+    aggregated[:, 5] = np.add.reduceat(rows[:, 5], starts)
+    aggregated[:, 6] = np.add.reduceat(rows[:, 6], starts)
+    return aggregated
+
+
+class CandleRingBuffer:
+    """Кольцевой буфер закрытых свечей фиксированного размера с O(1)-дозаписью.
+
+    Каждая запись пишется дважды (в позицию i и i + capacity), поэтому текущее окно
+    всегда лежит в памяти непрерывно и отдается как view без копирования.
+    """
+
+    __slots__ = ("capacity", "_data", "_start", "_size")
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._data = np.full((2 * self.capacity, CANDLE_RECORD_FIELDS), np.nan, dtype=np.float64)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_timestamp(self) -> int | None:
+        if self._size == 0:
+            return None
+        return int(self._data[self._start + self._size - 1, 0])
+
+    def append(self, row: np.ndarray) -> None:
+        """Добавляет одну закрытую свечу, вытесняя самую старую при заполненном буфере."""
+        if self._size < self.capacity:
+            position = self._size
+            self._size += 1
+        else:
+            position = self._start
+            self._start = (self._start + 1) % self.capacity
+
+        self._data[position] = row
+        self._data[position + self.capacity] = row
+
+    def extend(self, rows: np.ndarray) -> int:
+        """Добавляет свечи новее последней сохраненной и возвращает число добавленных записей."""
+        last_ts = self.last_timestamp
+        if last_ts is not None:
+            rows = rows[rows[:, 0] > last_ts]
+        for row in rows[-self.capacity:]:
+            self.append(row)
+        return len(rows)
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+
+    def view(self, tail: int | None = None) -> np.ndarray:
+        """Возвращает read-only view последних tail свечей в хронологическом порядке."""
+        size = self._size if tail is None else min(self._size, max(0, int(tail)))
+        end = self._start + self._size
+        window = self._data[end - size:end]
+        window.flags.writeable = False
+        return window
+
+
+class _CandleSeries:
+    __slots__ = ("buffer", "live_row", "refreshed_at", "complete", "lock")
+
+    def __init__(self, capacity: int):
+        self.buffer = CandleRingBuffer(capacity)
+        self.live_row: np.ndarray | None = None
+        self.refreshed_at = 0.0
+        # Биржа вернула меньше свечей, чем запрошено: в буфере вся история инструмента (молодой листинг).
+        self.complete = False
+        self.lock = threading.Lock()
+
+
+class MarketDataProvider:
+    """Общий источник свечей для стратегий и калибровки поверх BybitClient.
+
+    Держит по кольцевому буферу на (category, symbol, interval), поэтому повторные запросы
+    одного ряда в пределах live TTL не уходят в сеть, а обновление докачивает только хвост.
+    4H и 12H достраиваются из часового ряда, так что на символ обычно уходит один запрос свечей.
+    """
+
+    def __init__(
+        self,
+        client=bybit_client,
+        capacity: int = MARKET_DATA_BUFFER_CAPACITY,
+        live_ttl_seconds: float = MARKET_DATA_LIVE_TTL_SECONDS,
+        default_category: str = CATEGORY,
+        resample_enabled: bool = MARKET_DATA_RESAMPLE_ENABLED,
+    ):
+        self.client = client
+        self.resample_sources = dict(RESAMPLED_INTERVAL_SOURCES) if resample_enabled else {}
+        self.capacity = max(1, int(capacity))
+        self.live_ttl_seconds = max(0.0, float(live_ttl_seconds))
+        self.default_category = default_category
+        self._series: dict[tuple[str, str, str], _CandleSeries] = {}
+        self._series_guard = threading.Lock()
+
+    def _get_series(self, key: tuple[str, str, str]) -> _CandleSeries:
+        with self._series_guard:
+            series = self._series.get(key)
+            if series is None:
+                series = _CandleSeries(self.capacity)
+                self._series[key] = series
+            return series
+
+    @staticmethod
+    def _has_history(series: _CandleSeries, limit: int) -> bool:
+        """Буфер покрывает limit свечей или уже содержит всю историю инструмента."""
+        return series.complete or len(series.buffer) + 1 >= limit
+
+    def _is_fresh(self, series: _CandleSeries, interval_ms: int, limit: int) -> bool:
+        """Проверяет, что в буфере есть последняя закрытая свеча и live-свеча еще не устарела."""
+        if series.live_row is None:
+            return False
+        if time.monotonic() - series.refreshed_at > self.live_ttl_seconds:
+            return False
+        if not self._has_history(series, limit):
+            return False
+
+        now_ms = int(time.time() * 1000)
+        last_closed_open = (now_ms // interval_ms) * interval_ms - interval_ms
+        last_ts = series.buffer.last_timestamp
+        return last_ts is not None and last_ts >= last_closed_open
+
+    def _fetch_limit(self, series: _CandleSeries, limit: int, interval_ms: int) -> int:
+        """Сколько свечей запросить: при достаточной истории — только недостающий хвост и live-свеча."""
+        fetch_limit = max(limit, 2)
+        last_ts = series.buffer.last_timestamp
+        if last_ts is not None and self._has_history(series, limit):
+            now_ms = int(time.time() * 1000)
+            missing_bars = max(0, (now_ms - last_ts) // interval_ms)
+            fetch_limit = min(fetch_limit, missing_bars + 2)
+        return fetch_limit
+
+    def _apply_bundle(
+        self,
+        series: _CandleSeries,
+        bundle: OHLCVBundle | None,
+        limit: int,
+        interval_ms: int,
+        fetch_limit: int,
+    ) -> bool:
+        """Дописывает ответ на запрос fetch_limit свечей в буфер; последняя свеча ответа всегда считается live."""
+        if bundle is None or bundle.empty:
+            return False
+
+        rows = bundle.columns.T
+        last_ts = series.buffer.last_timestamp
+        if last_ts is None or not self._has_history(series, limit) or rows[0, 0] > last_ts + interval_ms:
+            # Истории не хватает или между буфером и ответом разрыв: заполняем буфер заново.
+            series.buffer.clear()
+            series.complete = fetch_limit >= limit and len(rows) < fetch_limit
+
+        series.buffer.extend(rows[:-1])
+        self._set_live_row(series, rows[-1])
+        return True
+
+    def _refresh(self, series: _CandleSeries, symbol: str, interval: str, limit: int, category: str, interval_ms: int) -> bool:
+        """Докачивает недостающие свечи в буфер."""
+        fetch_limit = self._fetch_limit(series, limit, interval_ms)
+        bundle = self.client.get_kline_bundle(symbol, interval=interval, limit=fetch_limit, category=category)
+        return self._apply_bundle(series, bundle, limit, interval_ms, fetch_limit)
+
+    def _set_live_row(self, series: _CandleSeries, row: np.ndarray) -> None:
+        series.live_row = np.array(row, dtype=np.float64)
+        series.live_row.flags.writeable = False
+        series.refreshed_at = time.monotonic()
+
+    def _refresh_resampled(
+        self,
+        series: _CandleSeries,
+        symbol: str,
+        interval: str,
+        limit: int,
+        category: str,
+        interval_ms: int,
+    ) -> bool:
+        """Достраивает старший интервал из часового буфера; прямой запрос идет только если часовой истории не хватает.
+
+        Если в часовом буфере вся история инструмента, старший интервал целиком собирается из него.
+        """
+        source_interval = self.resample_sources[interval]
+        source_ms = interval_to_milliseconds(source_interval)
+        source_limit = min(self.capacity, 1000)
+        source = self._get_series((category, str(symbol).upper(), source_interval))
+
+        with source.lock:
+            if not self._is_fresh(source, source_ms, source_limit):
+                if not self._refresh(source, symbol, source_interval, source_limit, category, source_ms):
+                    return False
+            source_closed = np.array(source.buffer.view())
+            source_live = source.live_row
+
+        current_bucket = (int(source_live[0]) // interval_ms) * interval_ms
+        first_source_ts = int(source_closed[0, 0]) if len(source_closed) else current_bucket
+        last_ts = series.buffer.last_timestamp
+        next_bucket = None if last_ts is None else last_ts + interval_ms
+
+        if source.complete:
+            if not series.complete or next_bucket is None or next_bucket < first_source_ts:
+                series.buffer.clear()
+                series.complete = True
+                next_bucket = (first_source_ts // interval_ms) * interval_ms
+        elif not self._has_history(series, limit) or next_bucket is None or next_bucket < first_source_ts:
+            # Часовая история не покрывает нужный участок: один раз берем интервал с биржи напрямую.
+            fetch_limit = max(limit, 2)
+            bundle = self.client.get_kline_bundle(symbol, interval=interval, limit=fetch_limit, category=category)
+            if not self._reset_from_bundle(series, bundle, current_bucket, fetch_limit):
+                return False
+            next_bucket = series.buffer.last_timestamp + interval_ms
+
+        source_ts = source_closed[:, 0]
+        completed = source_closed[(source_ts >= next_bucket) & (source_ts < current_bucket)]
+        series.buffer.extend(resample_candles(completed, interval_ms))
+
+        live_parts = np.vstack([source_closed[source_ts >= current_bucket], source_live])
+        self._set_live_row(series, resample_candles(live_parts, interval_ms)[-1])
+        return True
+
+    def _reset_from_bundle(
+        self,
+        series: _CandleSeries,
+        bundle: OHLCVBundle | None,
+        current_bucket: int,
+        fetch_limit: int,
+    ) -> bool:
+        """Заполняет буфер старшего интервала свечами с биржи, закрытыми до current_bucket."""
+        if bundle is None or bundle.empty:
+            return False
+        rows = bundle.columns.T
+        series.buffer.clear()
+        series.complete = len(rows) < fetch_limit
+        series.buffer.extend(rows[rows[:, 0] < current_bucket])
+        return series.buffer.last_timestamp is not None
+
+    def _fetch_batch(self, limits: dict[str, int], interval: str, category: str) -> dict[str, OHLCVBundle | None]:
+        if not limits:
+            return {}
+        return self.client.get_kline_bundles_batch(limits, interval=interval, category=category)
+
+    def prefetch(
+        self,
+        symbols: list[str],
+        interval: str = INTERVAL,
+        limit: int = LIMIT,
+        category: str | None = None,
+    ) -> int:
+        """Обновляет устаревшие ряды набора символов одним пакетом запросов и возвращает число обновленных.
+
+        Свечи загружаются через BybitClient.get_kline_bundles_batch (несколько запросов в полете,
+        перед биржей — локальное хранилище свечей), после чего get_ohlcv/get_candles для этих символов
+        отдают буфер без сети. Для 4H/12H пакетом обновляется часовой ряд, а прямой запрос старшего
+        интервала делается только там, где его буфер еще не набрал истории.
+        """
+        interval = str(interval)
+        normalized_category = (category or self.default_category).lower()
+        interval_ms = interval_to_milliseconds(interval)
+        limit = max(1, int(limit))
+        if interval_ms is None or limit > self.capacity + 1:
+            return 0
+
+        source_interval = self.resample_sources.get(interval, interval)
+        source_ms = interval_to_milliseconds(source_interval)
+        source_limit = min(self.capacity, 1000) if source_interval != interval else limit
+
+        symbols = list(dict.fromkeys(str(item).upper() for item in symbols))
+        stale: dict[str, tuple[_CandleSeries, int]] = {}
+        for symbol in symbols:
+            series = self._get_series((normalized_category, symbol, source_interval))
+            with series.lock:
+                if not self._is_fresh(series, source_ms, source_limit):
+                    stale[symbol] = (series, self._fetch_limit(series, source_limit, source_ms))
+
+        bundles = self._fetch_batch(
+            {symbol: fetch_limit for symbol, (_, fetch_limit) in stale.items()},
+            source_interval,
+            normalized_category,
+        )
+        refreshed = 0
+        for symbol, (series, fetch_limit) in stale.items():
+            with series.lock:
+                refreshed += self._apply_bundle(series, bundles.get(symbol), source_limit, source_ms, fetch_limit)
+
+        if source_interval != interval:
+            current_bucket = (int(time.time() * 1000) // interval_ms) * interval_ms
+            short: dict[str, _CandleSeries] = {}
+            for symbol in symbols:
+                if self._get_series((normalized_category, symbol, source_interval)).complete:
+                    # Вся история уже в часовом ряду: get_ohlcv соберет интервал из него без запроса.
+                    continue
+                series = self._get_series((normalized_category, symbol, interval))
+                with series.lock:
+                    if not self._has_history(series, limit):
+                        short[symbol] = series
+            fetch_limit = max(limit, 2)
+            bundles = self._fetch_batch({symbol: fetch_limit for symbol in short}, interval, normalized_category)
+            for symbol, series in short.items():
+                with series.lock:
+                    # Короткий ответ помечает ряд полным, и get_ohlcv этого этапа не запрашивает его повторно.
+                    self._reset_from_bundle(series, bundles.get(symbol), current_bucket, fetch_limit)
+        return refreshed
+
+    def _read_series(self, symbol: str, interval: str, limit: int, category: str | None, snapshot=None):
+        interval = str(interval)
+        normalized_category = (category or self.default_category).lower()
+        interval_ms = interval_to_milliseconds(interval)
+        limit = max(1, int(limit))
+        if interval_ms is None or limit > self.capacity + 1:
+            return None
+
+        series = self._get_series((normalized_category, str(symbol).upper(), interval))
+        with series.lock:
+            if not self._is_fresh(series, interval_ms, limit):
+                refresh = self._refresh_resampled if interval in self.resample_sources else self._refresh
+                if not refresh(series, symbol, interval, limit, normalized_category, interval_ms):
+                    return None
+            closed = series.buffer.view(tail=limit - 1) if limit > 1 else empty_candle_rows()
+            if snapshot is not None:
+                # Копия снимается под lock, пока соседний поток не перезаписал хвост буфера.
+                return snapshot(closed, series.live_row)
+            return closed, series.live_row
+
+    def get_candles(
+        self,
+        symbol: str,
+        interval: str = INTERVAL,
+        limit: int = LIMIT,
+        category: str | None = None,
+    ) -> tuple[np.ndarray, np.ndarray | None] | None:
+        """Возвращает read-only view закрытых свечей (n, 7) и текущую live-свечу или None при ошибке.
+
+        View действителен до следующего обновления ряда: при долгом хранении данных сделайте копию.
+        """
+        return self._read_series(symbol, interval, limit, category)
+
+    def get_ohlcv(
+        self,
+        symbol: str,
+        interval: str = INTERVAL,
+        limit: int = LIMIT,
+        category: str | None = None,
+    ) -> OHLCVBundle | None:
+        """Последние limit свечей (включая текущую незакрытую) как OHLCVBundle без промежуточного DataFrame.
+
+        Снимок буфера копируется под lock сразу в колоночный вид, так что это единственная копия до фильтров.
+        """
+        if interval_to_milliseconds(interval) is None or max(1, int(limit)) > self.capacity + 1:
+            return self.client.get_kline_bundle(symbol, interval=interval, limit=limit, category=category)
+        return self._read_series(symbol, interval, limit, category, snapshot=OHLCVBundle.from_rows)
+
+    def get_klines(
+        self,
+        symbol: str,
+        interval: str = INTERVAL,
+        limit: int = LIMIT,
+        category: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> pd.DataFrame | None:
+        """Совместимая с BybitClient.get_klines выдача: последние limit свечей, включая текущую незакрытую."""
+        if start is not None or end is not None or interval_to_milliseconds(interval) is None:
+            return self.client.get_klines(symbol, interval=interval, limit=limit, category=category, start=start, end=end)
+        if max(1, int(limit)) > self.capacity + 1:
+            return self.client.get_klines(symbol, interval=interval, limit=limit, category=category)
+
+        bundle = self._read_series(symbol, interval, limit, category, snapshot=OHLCVBundle.from_rows)
+        return None if bundle is None else bundle.to_kline_dataframe()
+
+
+market_data_provider = MarketDataProvider()
+
+
+def get_market_data_provider() -> MarketDataProvider:
+    """Возвращает общий провайдер свечей для стратегий и калибровки."""
+    return market_data_provider
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import time
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CANDLE_RECORD_FIELDS, empty_candle_rows
+
+
+# Порядок полей совпадает с KLINE_COLUMNS клиента Bybit и записями CandleStore.
+OHLCV_FIELDS = ("timestamp", "open", "high", "low", "close", "volume", "turnover")
+FILTER_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def parse_kline_rows(klines: list[list[str]] | list[tuple[str, ...]] | np.ndarray) -> np.ndarray:
+    """Разбирает list-of-strings ответа Bybit в отсортированный массив свечей (n, 7) за один проход numpy.
+
+    Строки с пропусками отбрасываются, дубли по timestamp схлопываются с сохранением последней записи.
+    Bybit отдает свечи от новых к старым, поэтому обычный случай — просто разворот без сортировки.
+    """
+    if len(klines) == 0:
+        return empty_candle_rows()
+
+    try:
+        rows = np.array(klines, dtype=np.float64)
+    except ValueError:
+        # Редкий ответ с нечисловыми полями: разбираем построчно, некорректные значения -> NaN.
+        rows = pd.DataFrame(klines).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    if rows.ndim != 2 or rows.shape[1] < CANDLE_RECORD_FIELDS:
+        return empty_candle_rows()
+    rows = rows[:, :CANDLE_RECORD_FIELDS]
+
+    rows = rows[~np.isnan(rows[:, :6]).any(axis=1)]
+    if len(rows) < 2:
+        return rows
+
+    timestamps = rows[:, 0]
+    if np.all(timestamps[1:] < timestamps[:-1]):
+        return rows[::-1].copy()
+    if not np.all(timestamps[1:] > timestamps[:-1]):
+        rows = rows[np.argsort(timestamps, kind="stable")]
+        timestamps = rows[:, 0]
+        rows = rows[np.r_[timestamps[1:] != timestamps[:-1], True]]
+    return rows
+
+
+@dataclass(slots=True, eq=False)
+class OHLCVBundle:
+    """Свечи одного ряда как непрерывные float64-массивы без DataFrame.
+
+    columns — матрица (7, n) в порядке OHLCV_FIELDS: каждое поле — непрерывная строка,
+    а open/high/... — ее view без копирования. Бандл передается по ссылке от провайдера
+    до фильтров; DataFrame для кода на pandas собирается только в frame() поверх тех же массивов.
+    """
+
+    columns: np.ndarray
+    _frame: pd.DataFrame | None = field(default=None, repr=False)
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, live_row: np.ndarray | None = None) -> OHLCVBundle:
+        """Собирает бандл из свечей (n, 7) и, если есть, live-свечи — одна копия в колоночный вид."""
+        size = len(rows) + (live_row is not None)
+        columns = np.empty((CANDLE_RECORD_FIELDS, size), dtype=np.float64)
+        columns[:, : len(rows)] = np.asarray(rows, dtype=np.float64).T
+        if live_row is not None:
+            columns[:, -1] = live_row
+        return cls(columns)
+
+    @classmethod
+    def from_klines(cls, klines: list[list[str]] | list[tuple[str, ...]]) -> OHLCVBundle:
+        return cls.from_rows(parse_kline_rows(klines))
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame | None) -> OHLCVBundle:
+        """Бандл из DataFrame формата BybitClient.get_klines (колонка timestamp в мс)."""
+        if df is None or df.empty:
+            return cls.from_rows(empty_candle_rows())
+        columns = np.vstack([
+            pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+            if name in df.columns else np.zeros(len(df))
+            for name in OHLCV_FIELDS
+        ])
+        return cls.from_rows(parse_kline_rows(columns.T))
+
+    def __len__(self) -> int:
+        return self.columns.shape[1]
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self.columns[0]
+
+    @property
+    def open(self) -> np.ndarray:
+        return self.columns[1]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.columns[2]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.columns[3]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.columns[4]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.columns[5]
+
+    @property
+    def turnover(self) -> np.ndarray:
+        return self.columns[6]
+
+    def rows(self) -> np.ndarray:
+        """Свечи в построчном виде (n, 7) для CandleStore и ресемплинга (копия)."""
+        return np.ascontiguousarray(self.columns.T)
+
+    def tail(self, count: int) -> OHLCVBundle:
+        """View последних count свечей."""
+        count = max(0, int(count))
+        return OHLCVBundle(self.columns[:, len(self) - min(count, len(self)):])
+
+    def drop_incomplete(self, interval_minutes: int, now_ms: int | None = None) -> OHLCVBundle:
+        """View без последней свечи, если она принадлежит текущему незакрытому бакету интервала."""
+        if self.empty:
+            return self
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        interval_ms = int(interval_minutes) * 60_000
+        current_bucket_start = (now_ms // interval_ms) * interval_ms
+        if self.timestamp[-1] >= current_bucket_start:
+            return OHLCVBundle(self.columns[:, :-1])
+        return self
+
+    def frame(self) -> pd.DataFrame:
+        """DataFrame формата фильтров (индекс — UTC timestamp, колонки open..volume) поверх массивов бандла.
+
+        Собирается один раз и кэшируется; колонки не копируются, поэтому изменять его нельзя.
+        """
+        if self._frame is None:
+            index = pd.DatetimeIndex(
+                pd.to_datetime(self.timestamp.astype(np.int64), unit="ms", utc=True),
+                name="timestamp",
+            )
+            self._frame = pd.DataFrame(
+                {name: getattr(self, name) for name in FILTER_COLUMNS},
+                index=index,
+                copy=False,
+            )
+        return self._frame
+
+    def to_kline_dataframe(self) -> pd.DataFrame:
+        """DataFrame формата BybitClient.get_klines: колонки OHLCV_FIELDS, timestamp — int64 мс."""
+        data = {name: self.columns[position] for position, name in enumerate(OHLCV_FIELDS)}
+        data["timestamp"] = self.timestamp.astype(np.int64)
+        return pd.DataFrame(data, copy=False)
+
+
+def as_filter_frame(data: pd.DataFrame | OHLCVBundle) -> pd.DataFrame:
+    """DataFrame формата фильтров из бандла (view) или уже готового DataFrame (как есть)."""
+    if isinstance(data, OHLCVBundle):
+        return data.frame()
+    return data
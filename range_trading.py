@@ -23,7 +23,10 @@ Range Trading Strategy - Торговля в ценовом канале (УЛУ
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from scipy import stats
+
+from analyzes.indicator_cache import indicator_cache
+from analyzes.range_features import build_range_feature_matrix, range_flat_mask
+from analyzes.volume_profile import build_volume_profile
 
 
 def calculate_bollinger_bands(df, period=20, std_dev=2):
@@ -258,7 +261,7 @@ def is_market_in_range(df, bb_width, period=50, volatility_threshold=0.15):
     3. Ценовой диапазон: узкий (< 8%)
     
     Улучшения:
-    - Математически точное определение тренда через scipy.stats.linregress
+    - Наклон и r-value линейной регрессии по скользящим суммам (analyzes.range_features)
     - Учет волатильности BB
     - Анализ ценового диапазона
     
@@ -271,42 +274,17 @@ def is_market_in_range(df, bb_width, period=50, volatility_threshold=0.15):
         return False
     
     try:
-        # 1. Анализ тренда через линейную регрессию
-        prices = df['close'].iloc[-period:].values
-        
-        # Проверка на достаточность данных и вариативность
-        if len(prices) < 2 or np.all(prices == prices[0]):
-            return False
-        
-        x = np.arange(len(prices))
-        
-        slope, _, r_value, _, _ = stats.linregress(x, prices)
-        # Наклон в процентах за весь период (используем np.mean для безопасности)
-        slope_percent = (slope * len(prices)) / np.mean(prices) * 100
-        
-        # 2. Анализ волатильности через Bollinger Bands
-        current_volatility = bb_width.iloc[-1]
-        avg_volatility = bb_width.iloc[-20:].mean()
-        
-        # 3. Анализ ценового диапазона (используем np функции)
-        price_range = (np.max(prices) - np.min(prices)) / np.mean(prices) * 100
-        
-        # Критерии флэта:
-        # - Слабый наклон (< 2%) - почти горизонтальный тренд
-        # - Низкая или снижающаяся волатильность (не расширяется)
-        # - Узкий ценовой диапазон (< 8%) - цена в коридоре
-        is_flat = (abs(slope_percent) < 2.0 and 
-                   current_volatility <= avg_volatility * 1.1 and
-                   price_range < 8.0)
-        
-        return is_flat
+        # Условия те же, что у матрицы признаков: наклон регрессии по накопленным суммам,
+        # волатильность BB и ценовой диапазон за period баров
+        is_flat, _, _ = range_flat_mask(df['close'].to_numpy(dtype=float), bb_width.to_numpy(dtype=float), period)
+        return bool(is_flat[-1])
         
     except (ValueError, TypeError, IndexError, AttributeError) as e:
         # В случае любых ошибок в расчетах считаем что тренд есть (безопасный выход)
         return False
 
 
-def calculate_dynamic_stop_loss(df, current_price, support_level, resistance_level, action):
+def calculate_dynamic_stop_loss(df, current_price, support_level, resistance_level, action, symbol=None, current_atr=None):
     """
     УЛУЧШЕННЫЙ расчет стоп-лосса с учетом ATR (волатильности)
     
@@ -323,9 +301,10 @@ def calculate_dynamic_stop_loss(df, current_price, support_level, resistance_lev
     else:  # SELL
         base_sl = resistance_level * 1.005  # +0.5% от сопротивления
     
-    # Рассчитываем ATR для оценки волатильности
-    atr = calculate_atr(df, period=14)
-    current_atr = atr.iloc[-1]
+    # Рассчитываем ATR для оценки волатильности (если не передан из матрицы признаков)
+    if current_atr is None:
+        atr = indicator_cache.get(symbol, "60", df, "atr_sma", lambda: calculate_atr(df, period=14), period=14)
+        current_atr = atr.iloc[-1]
     
     # Динамический стоп-лосс на основе ATR (1.5x ATR от входа)
     if action == "BUY":
@@ -340,7 +319,7 @@ def calculate_dynamic_stop_loss(df, current_price, support_level, resistance_lev
     return dynamic_sl
 
 
-def calculate_volume_nodes(df, num_levels=20):
+def calculate_volume_nodes(df, num_levels=20, symbol=None):
     """
     УЛУЧШЕННЫЙ расчет Volume Profile с корректным распределением объема
     
@@ -352,10 +331,12 @@ def calculate_volume_nodes(df, num_levels=20):
     УЛУЧШЕНИЯ:
     - Распределение объема свечи по всем пересекаемым уровням (не только по среднему)
     - Более точный Volume Profile, учитывающий полный диапазон каждой свечи
+    - Расчет векторный (analyzes.volume_profile): разностный массив + cumsum вместо цикла по свечам и уровням
     
     Args:
         df: DataFrame с OHLCV данными
         num_levels: Количество ценовых уровней для анализа
+        symbol: Символ для общего кэша индикаторов (без него профиль считается каждый раз)
     
     Returns:
         dict: {
@@ -366,91 +347,16 @@ def calculate_volume_nodes(df, num_levels=20):
             'value_area_low': float     # Нижняя граница Value Area
         }
     """
+    def compute():
+        return build_volume_profile(df['low'].to_numpy(), df['high'].to_numpy(), df['volume'].to_numpy(), num_levels)
+
     try:
-        if len(df) < 20:
-            return None
-        
-        # Определяем ценовой диапазон
-        price_min = df['low'].min()
-        price_max = df['high'].max()
-        price_range = price_max - price_min
-        
-        if price_range == 0:
-            return None
-        
-        # Создаем уровни цен
-        price_levels = np.linspace(price_min, price_max, num_levels)
-        level_width = price_range / num_levels
-        
-        # Распределяем объем по уровням (УЛУЧШЕННАЯ ЛОГИКА)
-        volume_at_levels = np.zeros(num_levels)
-        
-        for i in range(len(df)):
-            high = df['high'].iloc[i]
-            low = df['low'].iloc[i]
-            volume = df['volume'].iloc[i]
-            
-            # Распределяем объем свечи по всем уровням, которые она пересекает
-            min_level = max(0, int((low - price_min) / level_width))
-            max_level = min(num_levels - 1, int((high - price_min) / level_width))
-            
-            if max_level >= min_level:
-                # Равномерно распределяем объем по пересекаемым уровням
-                levels_count = max_level - min_level + 1
-                volume_per_level = volume / levels_count
-                
-                for level_idx in range(min_level, max_level + 1):
-                    volume_at_levels[level_idx] += volume_per_level
-        
-        # POC - уровень с максимальным объемом
-        poc_idx = np.argmax(volume_at_levels)
-        poc_price = price_levels[poc_idx]
-        
-        # Value Area - зона с 70% от общего объема
-        total_volume = volume_at_levels.sum()
-        sorted_indices = np.argsort(volume_at_levels)[::-1]  # От большего к меньшему
-        
-        cumulative_volume = 0
-        value_area_indices = []
-        for idx in sorted_indices:
-            cumulative_volume += volume_at_levels[idx]
-            value_area_indices.append(idx)
-            if cumulative_volume >= total_volume * 0.7:
-                break
-        
-        value_area_high = price_levels[max(value_area_indices)]
-        value_area_low = price_levels[min(value_area_indices)]
-        
-        # High Volume Nodes - уровни выше среднего объема
-        avg_volume = volume_at_levels.mean()
-        std_volume = volume_at_levels.std()
-        high_volume_threshold = avg_volume + std_volume * 0.5
-        
-        high_volume_nodes = [
-            price_levels[i] for i in range(num_levels) 
-            if volume_at_levels[i] > high_volume_threshold
-        ]
-        
-        # Low Volume Nodes - уровни ниже среднего объема
-        low_volume_threshold = avg_volume - std_volume * 0.5
-        low_volume_nodes = [
-            price_levels[i] for i in range(num_levels)
-            if volume_at_levels[i] < low_volume_threshold
-        ]
-        
-        return {
-            'poc': poc_price,
-            'high_volume_nodes': high_volume_nodes,
-            'low_volume_nodes': low_volume_nodes,
-            'value_area_high': value_area_high,
-            'value_area_low': value_area_low
-        }
-        
+        return indicator_cache.get(symbol, "60", df, "volume_profile", compute=compute, num_levels=num_levels)
     except Exception as e:
         return None
 
 
-def analyze_volume_profile(df):
+def analyze_volume_profile(df, symbol=None):
     """
     Анализ Volume Profile для определения значимых уровней и объемной активности
     
@@ -474,7 +380,7 @@ def analyze_volume_profile(df):
             return None
         
         # Рассчитываем Volume Profile
-        volume_levels = calculate_volume_nodes(df)
+        volume_levels = calculate_volume_nodes(df, symbol=symbol)
         
         if volume_levels is None:
             return None
@@ -674,26 +580,27 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
             'summary': f"{symbol} | Недостаточно данных"
         }
     
-    # Рассчитываем индикаторы
-    middle_bb, upper_bb, lower_bb, bb_width = calculate_bollinger_bands(df)
-    rsi = calculate_rsi(df)
-    stoch_k, stoch_d = calculate_stochastic(df)
-    macd_line, signal_line, macd_hist = calculate_macd(df)
+    # Все индикаторы одним проходом (через общий кэш: повторный анализ той же свечи не пересчитывает матрицу)
+    features = indicator_cache.get(symbol, "60", df, "range_features", lambda: build_range_feature_matrix(df))
+    rsi = features.rsi
+    stoch_k = features.stoch_k
+    stoch_d = features.stoch_d
+    macd_hist = features.macd_hist
     
     # Текущие значения
     current_price = df['close'].iloc[-1]
-    current_rsi = rsi.iloc[-1]
-    current_stoch_k = stoch_k.iloc[-1]
-    current_stoch_d = stoch_d.iloc[-1]
-    current_macd_hist = macd_hist.iloc[-1]
-    prev_macd_hist = macd_hist.iloc[-2]
+    current_rsi = rsi[-1]
+    current_stoch_k = stoch_k[-1]
+    current_stoch_d = stoch_d[-1]
+    current_macd_hist = macd_hist[-1]
+    current_atr = features.atr[-1]
     
-    current_upper_bb = upper_bb.iloc[-1]
-    current_lower_bb = lower_bb.iloc[-1]
-    current_middle_bb = middle_bb.iloc[-1]
+    current_upper_bb = features.upper_bb[-1]
+    current_lower_bb = features.lower_bb[-1]
+    current_middle_bb = features.middle_bb[-1]
     
     # Проверка: рынок во флэте?
-    is_ranging = is_market_in_range(df, bb_width)
+    is_ranging = bool(features.is_flat[-1])
     
     signals = []
     confidence_score = 0
@@ -737,7 +644,7 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
         confidence_score += 2
         
         # ШАГ 3A: АНАЛИЗ ОБЪЕМА (Volume Analysis)
-        volume_analysis = analyze_volume_profile(df)
+        volume_analysis = analyze_volume_profile(df, symbol=symbol)
         
         if volume_analysis:
             # Проверка близости к POC (Point of Control)
@@ -776,7 +683,7 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
         
         # RSI: Перепроданность + ПРОВЕРКА РАЗВОРОТА
         if current_rsi < 35:  # Расширили зону до 35
-            rsi_slope = rsi.iloc[-1] - rsi.iloc[-3]  # Изменение за 3 бара
+            rsi_slope = rsi[-1] - rsi[-3]  # Изменение за 3 бара
             if rsi_slope > 0:  # RSI начал расти - РАЗВОРОТ ВВЕРХ
                 signals.append(f"✅ RSI перепродан И разворачивается вверх: {current_rsi:.1f} (↑{rsi_slope:.1f})")
                 oscillator_confirmations += 1
@@ -785,7 +692,7 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
                 signals.append(f"⚠️ RSI перепродан но еще падает: {current_rsi:.1f} (↓{abs(rsi_slope):.1f})")
         
         # УЛУЧШЕННАЯ проверка бычьей дивергенции RSI
-        rsi_divergence = detect_rsi_divergence(df, rsi, lookback=20)
+        rsi_divergence = detect_rsi_divergence(df, features.series('rsi'), lookback=20)
         if rsi_divergence == 'BULLISH':
             signals.append("✅✅ СИЛЬНАЯ БЫЧЬЯ ДИВЕРГЕНЦИЯ RSI (топ-сигнал!)")
             oscillator_confirmations += 2  # Дивергенция дает 2 подтверждения!
@@ -793,8 +700,8 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
         
         # Stochastic: Золотой крест в зоне перепроданности (улучшенная проверка)
         if current_stoch_k < 25 and current_stoch_d < 25:  # Расширили зону до 25
-            prev_stoch_k = stoch_k.iloc[-2]
-            prev_stoch_d = stoch_d.iloc[-2]
+            prev_stoch_k = stoch_k[-2]
+            prev_stoch_d = stoch_d[-2]
             
             # Проверка качественного пересечения
             stoch_cross_up = (prev_stoch_k < prev_stoch_d and current_stoch_k > current_stoch_d)
@@ -804,8 +711,8 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
                 confidence_score += 2
         
         # MACD: Улучшенная логика - гистограмма разворачивается вверх
-        macd_turning = (macd_hist.iloc[-1] > macd_hist.iloc[-2] and 
-                       macd_hist.iloc[-2] < macd_hist.iloc[-3])  # Точка разворота
+        macd_turning = (macd_hist[-1] > macd_hist[-2] and 
+                       macd_hist[-2] < macd_hist[-3])  # Точка разворота
         if macd_turning and current_macd_hist < 0:
             signals.append("✅ MACD: гистограмма разворачивается вверх от медвежьей зоны")
             oscillator_confirmations += 1
@@ -841,7 +748,7 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
             entry_price = current_price
             
             # ДИНАМИЧЕСКИЙ стоп-лосс на основе ATR
-            stop_loss = calculate_dynamic_stop_loss(df, current_price, current_lower_bb, current_upper_bb, "BUY")
+            stop_loss = calculate_dynamic_stop_loss(df, current_price, current_lower_bb, current_upper_bb, "BUY", symbol=symbol, current_atr=current_atr)
             take_profit = current_upper_bb * 0.995  # У сопротивления
             
             risk = entry_price - stop_loss
@@ -876,7 +783,7 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
         confidence_score += 2
         
         # ШАГ 3A: АНАЛИЗ ОБЪЕМА (Volume Analysis)
-        volume_analysis = analyze_volume_profile(df)
+        volume_analysis = analyze_volume_profile(df, symbol=symbol)
         
         if volume_analysis:
             # Проверка близости к POC (Point of Control)
@@ -915,7 +822,7 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
         
         # RSI: Перекупленность + ПРОВЕРКА РАЗВОРОТА
         if current_rsi > 65:  # Расширили зону до 65
-            rsi_slope = rsi.iloc[-1] - rsi.iloc[-3]  # Изменение за 3 бара
+            rsi_slope = rsi[-1] - rsi[-3]  # Изменение за 3 бара
             if rsi_slope < 0:  # RSI начал падать - РАЗВОРОТ ВНИЗ
                 signals.append(f"✅ RSI перекуплен И разворачивается вниз: {current_rsi:.1f} (↓{abs(rsi_slope):.1f})")
                 oscillator_confirmations += 1
@@ -924,7 +831,7 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
                 signals.append(f"⚠️ RSI перекуплен но еще растет: {current_rsi:.1f} (↑{rsi_slope:.1f})")
         
         # УЛУЧШЕННАЯ проверка медвежьей дивергенции RSI
-        rsi_divergence = detect_rsi_divergence(df, rsi, lookback=20)
+        rsi_divergence = detect_rsi_divergence(df, features.series('rsi'), lookback=20)
         if rsi_divergence == 'BEARISH':
             signals.append("✅✅ СИЛЬНАЯ МЕДВЕЖЬЯ ДИВЕРГЕНЦИЯ RSI (топ-сигнал!)")
             oscillator_confirmations += 2  # Дивергенция дает 2 подтверждения!
@@ -932,8 +839,8 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
         
         # Stochastic: Мертвый крест в зоне перекупленности (улучшенная проверка)
         if current_stoch_k > 75 and current_stoch_d > 75:  # Расширили зону до 75
-            prev_stoch_k = stoch_k.iloc[-2]
-            prev_stoch_d = stoch_d.iloc[-2]
+            prev_stoch_k = stoch_k[-2]
+            prev_stoch_d = stoch_d[-2]
             
             # Проверка качественного пересечения
             stoch_cross_down = (prev_stoch_k > prev_stoch_d and current_stoch_k < current_stoch_d)
@@ -943,8 +850,8 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
                 confidence_score += 2
         
         # MACD: Улучшенная логика - гистограмма разворачивается вниз
-        macd_turning = (macd_hist.iloc[-1] < macd_hist.iloc[-2] and 
-                       macd_hist.iloc[-2] > macd_hist.iloc[-3])  # Точка разворота
+        macd_turning = (macd_hist[-1] < macd_hist[-2] and 
+                       macd_hist[-2] > macd_hist[-3])  # Точка разворота
         if macd_turning and current_macd_hist > 0:
             signals.append("✅ MACD: гистограмма разворачивается вниз от бычьей зоны")
             oscillator_confirmations += 1
@@ -980,7 +887,7 @@ def analyze_range_trading_signal(df, symbol="UNKNOWN"):
             entry_price = current_price
             
             # ДИНАМИЧЕСКИЙ стоп-лосс на основе ATR
-            stop_loss = calculate_dynamic_stop_loss(df, current_price, current_lower_bb, current_upper_bb, "SELL")
+            stop_loss = calculate_dynamic_stop_loss(df, current_price, current_lower_bb, current_upper_bb, "SELL", symbol=symbol, current_atr=current_atr)
             take_profit = current_lower_bb * 1.005  # У поддержки
             
             risk = stop_loss - entry_price
@@ -1039,15 +946,15 @@ def monitor_range_conditions(df, symbol="UNKNOWN"):
     if df is None or len(df) < 100:
         return None
     
-    _, upper_bb, lower_bb, bb_width = calculate_bollinger_bands(df)
+    features = indicator_cache.get(symbol, "60", df, "range_features", lambda: build_range_feature_matrix(df))
     
     current_price = df['close'].iloc[-1]
-    current_upper = upper_bb.iloc[-1]
-    current_lower = lower_bb.iloc[-1]
+    current_upper = features.upper_bb[-1]
+    current_lower = features.lower_bb[-1]
     bb_range = current_upper - current_lower
     
     # Определяем состояние
-    is_ranging = is_market_in_range(df, bb_width)
+    is_ranging = bool(features.is_flat[-1])
     
     distance_to_upper_pct = ((current_upper - current_price) / bb_range) * 100
     distance_to_lower_pct = ((current_price - current_lower) / bb_range) * 100
@@ -1058,7 +965,7 @@ def monitor_range_conditions(df, symbol="UNKNOWN"):
         'price': current_price,
         'bb_upper': current_upper,
         'bb_lower': current_lower,
-        'bb_width_pct': bb_width.iloc[-1] * 100,
+        'bb_width_pct': features.bb_width[-1] * 100,
         'in_range': is_ranging,
         'distance_to_upper_pct': distance_to_upper_pct,
         'distance_to_lower_pct': distance_to_lower_pct,
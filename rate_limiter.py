@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import threading
+import time
+
+from config import (
+    BYBIT_RATE_LIMIT_ADAPTIVE_THRESHOLD,
+    BYBIT_RATE_LIMIT_BACKOFF_MAX_SECONDS,
+    BYBIT_RATE_LIMIT_ACCOUNT_BURST,
+    BYBIT_RATE_LIMIT_ACCOUNT_PER_SECOND,
+    BYBIT_RATE_LIMIT_MARKET_BURST,
+    BYBIT_RATE_LIMIT_MARKET_PER_SECOND,
+    BYBIT_RATE_LIMIT_TRADE_BURST,
+    BYBIT_RATE_LIMIT_TRADE_PER_SECOND,
+)
+
+
+MARKET_ENDPOINT_GROUP = "market"
+TRADE_ENDPOINT_GROUP = "trade"
+ACCOUNT_ENDPOINT_GROUP = "account"
+
+# Заголовки Bybit V5 с фактической квотой конкретного endpoint'а.
+LIMIT_STATUS_HEADER = "X-Bapi-Limit-Status"
+LIMIT_HEADER = "X-Bapi-Limit"
+LIMIT_RESET_HEADER = "X-Bapi-Limit-Reset-Timestamp"
+
+# Группы лимитов Bybit V5: публичные market-запросы, торговые операции и приватные account/position-запросы.
+METHOD_ENDPOINT_GROUPS = {
+    "get_kline": MARKET_ENDPOINT_GROUP,
+    "get_tickers": MARKET_ENDPOINT_GROUP,
+    "get_orderbook": MARKET_ENDPOINT_GROUP,
+    "get_instruments_info": MARKET_ENDPOINT_GROUP,
+    "get_server_time": MARKET_ENDPOINT_GROUP,
+    "place_order": TRADE_ENDPOINT_GROUP,
+    "amend_order": TRADE_ENDPOINT_GROUP,
+    "cancel_order": TRADE_ENDPOINT_GROUP,
+    "cancel_all_orders": TRADE_ENDPOINT_GROUP,
+    "set_trading_stop": TRADE_ENDPOINT_GROUP,
+    "set_leverage": TRADE_ENDPOINT_GROUP,
+}
+
+
+def resolve_endpoint_group(method_name: str) -> str:
+    """Возвращает группу лимитов для метода pybit; все неизвестные приватные вызовы считаются account."""
+    return METHOD_ENDPOINT_GROUPS.get(method_name, ACCOUNT_ENDPOINT_GROUP)
+
+
+@dataclass(slots=True)
+class RateLimitBudget:
+    requests_per_second: float
+    burst: int
+
+
+@dataclass(slots=True)
+class RateLimiterStats:
+    acquired: int = 0
+    waited: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class _EndpointQuota:
+    __slots__ = ("remaining", "limit", "reset_ms", "reset_at", "next_allowed_at", "backoff_seconds")
+
+    def __init__(self):
+        self.remaining: int | None = None
+        self.limit: int | None = None
+        # Биржевая метка сброса окна: по ней сравниваются ответы, пришедшие не в порядке отправки.
+        self.reset_ms = 0
+        self.reset_at = 0.0
+        self.next_allowed_at = 0.0
+        self.backoff_seconds = 0.0
+
+    def reserve(self, now: float, adaptive_threshold: float) -> float:
+        """Резервирует запрос по квоте из заголовков и возвращает задержку до него."""
+        slot = max(now, self.next_allowed_at)
+        if self.remaining is None or slot >= self.reset_at:
+            self.next_allowed_at = slot
+            return slot - now
+
+        if self.remaining <= 0:
+            # Квота окна исчерпана: ждем сброса, дальше снова идем без ограничения до свежих заголовков.
+            slot = max(slot, self.reset_at)
+            self.next_allowed_at = slot
+            return slot - now
+
+        spacing = 0.0
+        if self.limit and self.remaining < self.limit * adaptive_threshold:
+            # Остаток квоты мал: растягиваем его равномерно до момента сброса окна.
+            spacing = (self.reset_at - slot) / self.remaining
+        self.remaining -= 1
+        self.next_allowed_at = slot + spacing
+        return slot - now
+
+
+def _parse_int_header(headers, name: str) -> int | None:
+    if not headers:
+        return None
+    value = headers.get(name)
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _epoch_ms_to_monotonic(epoch_ms: int) -> float:
+    return time.monotonic() + (epoch_ms - time.time() * 1000) / 1000
+
+
+class _TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at", "stats")
+
+    def __init__(self, budget: RateLimitBudget):
+        self.rate = max(1e-6, float(budget.requests_per_second))
+        self.capacity = max(1.0, float(budget.burst))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.stats = RateLimiterStats()
+
+    def reserve(self, now: float) -> float:
+        """Забирает токен и возвращает задержку до момента, когда он реально станет доступен."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        # Баланс может уходить в минус: каждый следующий ожидающий получает слот строго после предыдущего (FIFO).
+        self.tokens -= 1.0
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def pause_until(self, until: float) -> None:
+        """Сдвигает ближайший свободный токен на until; уже выданные слоты не отзываются."""
+        next_token_at = self.updated_at + max(0.0, 1.0 - self.tokens) / self.rate
+        if until > next_token_at:
+            self.tokens = 1.0
+            self.updated_at = until
+
+
+class TokenBucketRateLimiter:
+    """Потокобезопасный token bucket с отдельным бюджетом на каждую группу endpoint'ов.
+
+    Ожидающие получают слоты в порядке вызова acquire, а время сна копится в статистике группы.
+    """
+
+    def __init__(
+        self,
+        budgets: dict[str, RateLimitBudget],
+        adaptive_threshold: float = BYBIT_RATE_LIMIT_ADAPTIVE_THRESHOLD,
+        backoff_max_seconds: float = BYBIT_RATE_LIMIT_BACKOFF_MAX_SECONDS,
+    ):
+        self._lock = threading.Lock()
+        self._buckets = {group: _TokenBucket(budget) for group, budget in budgets.items()}
+        self._quotas: dict[str, _EndpointQuota] = {}
+        self.adaptive_threshold = max(0.0, float(adaptive_threshold))
+        self.backoff_max_seconds = max(1.0, float(backoff_max_seconds))
+
+    def _quota(self, endpoint: str) -> _EndpointQuota:
+        quota = self._quotas.get(endpoint)
+        if quota is None:
+            quota = _EndpointQuota()
+            self._quotas[endpoint] = quota
+        return quota
+
+    def _bucket(self, group: str) -> _TokenBucket:
+        bucket = self._buckets.get(group)
+        if bucket is None:
+            raise ValueError(f"Unknown rate limit group: {group!r}. Expected one of {sorted(self._buckets)}")
+        return bucket
+
+    def reserve(self, group: str, endpoint: str | None = None) -> float:
+        """Резервирует слот без блокировки и возвращает, сколько секунд нужно подождать перед запросом."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(group)
+            delay = bucket.reserve(now)
+            if endpoint is not None:
+                delay = max(delay, self._quota(endpoint).reserve(now, self.adaptive_threshold))
+            stats = bucket.stats
+            stats.acquired += 1
+            if delay > 0:
+                stats.waited += 1
+                stats.total_wait_seconds += delay
+                stats.max_wait_seconds = max(stats.max_wait_seconds, delay)
+            return delay
+
+    def acquire(self, group: str, endpoint: str | None = None) -> float:
+        """Блокирует поток до получения слота в группе (и квоте endpoint'а) и возвращает фактическую задержку."""
+        delay = self.reserve(group, endpoint)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def pause(self, group: str, seconds: float) -> None:
+        """Не выдает слоты группы ближайшие seconds секунд, например по retry_after из ответа 429."""
+        with self._lock:
+            self._bucket(group).pause_until(time.monotonic() + max(0.0, float(seconds)))
+
+    def observe_headers(self, endpoint: str, headers) -> None:
+        """Обновляет квоту endpoint'а по заголовкам X-Bapi-Limit-* из ответа Bybit.
+
+        Ответ из более старого окна игнорируется, в пределах одного окна остаток только уменьшается.
+        """
+        remaining = _parse_int_header(headers, LIMIT_STATUS_HEADER)
+        reset_ms = _parse_int_header(headers, LIMIT_RESET_HEADER)
+        if remaining is None or reset_ms is None:
+            return
+
+        with self._lock:
+            quota = self._quota(endpoint)
+            if reset_ms < quota.reset_ms:
+                # Запоздавший ответ из прошлого окна: его остаток уже неактуален.
+                return
+            if reset_ms == quota.reset_ms and quota.remaining is not None:
+                # Параллельные ответы одного окна приходят в произвольном порядке: верим наименьшему остатку.
+                remaining = min(remaining, quota.remaining)
+            quota.remaining = remaining
+            quota.limit = _parse_int_header(headers, LIMIT_HEADER) or quota.limit
+            quota.reset_ms = reset_ms
+            quota.reset_at = _epoch_ms_to_monotonic(reset_ms)
+            quota.backoff_seconds = 0.0
+
+    def back_off(self, endpoint: str, headers=None) -> float:
+        """Блокирует endpoint после retCode 10006 до сброса окна или на экспоненциально растущую паузу."""
+        reset_ms = _parse_int_header(headers, LIMIT_RESET_HEADER)
+        with self._lock:
+            now = time.monotonic()
+            quota = self._quota(endpoint)
+            quota.backoff_seconds = min(self.backoff_max_seconds, max(1.0, quota.backoff_seconds * 2))
+            reset_at = _epoch_ms_to_monotonic(reset_ms) if reset_ms is not None else now + quota.backoff_seconds
+            if reset_ms is not None:
+                quota.reset_ms = max(quota.reset_ms, reset_ms)
+            quota.remaining = 0
+            quota.reset_at = max(reset_at, now)
+            return quota.reset_at - now
+
+    def get_endpoint_quotas(self) -> dict[str, dict[str, float | int | None]]:
+        """Возвращает последнюю известную квоту по каждому endpoint'у."""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                endpoint: {
+                    "remaining": quota.remaining,
+                    "limit": quota.limit,
+                    "reset_in_seconds": round(max(0.0, quota.reset_at - now), 3),
+                }
+                for endpoint, quota in self._quotas.items()
+            }
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        """Возвращает статистику ожиданий по группам."""
+        with self._lock:
+            return {
+                group: {
+                    "acquired": bucket.stats.acquired,
+                    "waited": bucket.stats.waited,
+                    "total_wait_seconds": round(bucket.stats.total_wait_seconds, 3),
+                    "max_wait_seconds": round(bucket.stats.max_wait_seconds, 3),
+                }
+                for group, bucket in self._buckets.items()
+            }
+
+
+def build_default_rate_limiter() -> TokenBucketRateLimiter:
+    """Создает limiter с бюджетами групп из config.py."""
+    return TokenBucketRateLimiter(
+        {
+            MARKET_ENDPOINT_GROUP: RateLimitBudget(BYBIT_RATE_LIMIT_MARKET_PER_SECOND, BYBIT_RATE_LIMIT_MARKET_BURST),
+            TRADE_ENDPOINT_GROUP: RateLimitBudget(BYBIT_RATE_LIMIT_TRADE_PER_SECOND, BYBIT_RATE_LIMIT_TRADE_BURST),
+            ACCOUNT_ENDPOINT_GROUP: RateLimitBudget(BYBIT_RATE_LIMIT_ACCOUNT_PER_SECOND, BYBIT_RATE_LIMIT_ACCOUNT_BURST),
+        }
+    )
+
+
+# Общий на процесс limiter: основной цикл, калибровка и мониторинг делят одни и те же бюджеты.
+bybit_rate_limiter = build_default_rate_limiter()
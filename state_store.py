@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import atexit
+from collections.abc import Callable, Mapping
+import json
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from config import (
+    STATE_STORE_BACKEND,
+    STATE_STORE_BATCH_SIZE,
+    STATE_STORE_COMMIT_INTERVAL_SECONDS,
+    STATE_STORE_PATH,
+)
+
+
+# Возвращает начальные записи namespace при первом открытии (миграция старого JSON или значения по умолчанию).
+StateSeed = Callable[[], Mapping[str, Any]]
+
+
+class StateStore(ABC):
+    """Хранилище JSON-совместимого состояния по ключам внутри одного namespace.
+
+    get возвращает независимую копию значения: изменять ее можно без записи обратно.
+    """
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def items(self) -> dict[str, Any]:
+        """Все записи namespace в порядке первой записи ключа."""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Дописывает на диск отложенные изменения (если backend их копит)."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+def load_legacy_json(file_path: str | os.PathLike, default: Any = None) -> Any:
+    """Читает старый JSON-файл состояния для миграции; нет файла или он битый — default."""
+    path = Path(file_path)
+    if not path.exists():
+        return default
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError) as error:
+        print(f"❌ Не удалось прочитать {path}: {error}")
+        return default
+
+
+class JSONStateStore(StateStore):
+    """Прежний формат: весь namespace — один JSON-объект в файле.
+
+    Файл читается один раз, дальше get обслуживается из памяти; set переписывает файл
+    целиком через временный файл и os.replace, поэтому подходит только для маленьких состояний.
+    """
+
+    def __init__(self, file_path: str = "data/obv_state_v3.json", seed: StateSeed | None = None):
+        self.file_path = file_path
+        self._seed = seed
+        self._lock = threading.Lock()
+        self._payload: dict[str, str] | None = None
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _load(self) -> dict[str, str]:
+        if self._payload is None:
+            payload = load_legacy_json(self.file_path)
+            seeded = not isinstance(payload, dict) and self._seed is not None
+            if seeded:
+                payload = self._seed()
+            elif not isinstance(payload, dict):
+                payload = {}
+            self._payload = {str(key): json.dumps(value, ensure_ascii=False) for key, value in payload.items()}
+            if seeded:
+                self._save()
+        return self._payload
+
+    def _save(self) -> None:
+        payload = {key: json.loads(value) for key, value in self._payload.items()}
+        temp_path = f"{self.file_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.file_path)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            encoded = self._load().get(key)
+        return default if encoded is None else json.loads(encoded)
+
+    def set(self, key: str, value: Any) -> None:
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._load()[key] = encoded
+            self._save()
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            payload = self._load()
+            if key not in payload:
+                return False
+            del payload[key]
+            self._save()
+            return True
+
+    def items(self) -> dict[str, Any]:
+        with self._lock:
+            payload = dict(self._load())
+        return {key: json.loads(value) for key, value in payload.items()}
+
+
+class _SQLiteDatabase:
+    """Общее соединение с файлом БД: WAL, кэш чтения по namespace и пачка отложенных записей."""
+
+    def __init__(self, db_path: str, batch_size: int, commit_interval_seconds: float):
+        self.db_path = db_path
+        self.batch_size = max(1, int(batch_size))
+        self.commit_interval_seconds = max(0.0, float(commit_interval_seconds))
+        self._lock = threading.RLock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state_namespaces (namespace TEXT PRIMARY KEY, created_at REAL NOT NULL)"
+        )
+        # namespace -> {key: JSON-текст}; None в pending — удаление.
+        self._cache: dict[str, dict[str, str]] = {}
+        self._pending: dict[tuple[str, str], str | None] = {}
+        self._timer: threading.Timer | None = None
+        self._closed = False
+
+    def open_namespace(self, namespace: str, seed: StateSeed | None) -> None:
+        """Загружает namespace в кэш; при самом первом открытии записывает seed."""
+        with self._lock:
+            if namespace in self._cache:
+                return
+            known = self._conn.execute(
+                "SELECT 1 FROM state_namespaces WHERE namespace = ?", (namespace,)
+            ).fetchone()
+            if known is None:
+                initial = dict(seed()) if seed is not None else {}
+                now = time.time()
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                        [(namespace, str(key), json.dumps(value, ensure_ascii=False), now) for key, value in initial.items()],
+                    )
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO state_namespaces (namespace, created_at) VALUES (?, ?)",
+                        (namespace, now),
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            rows = self._conn.execute(
+                "SELECT key, value FROM state WHERE namespace = ? ORDER BY rowid", (namespace,)
+            ).fetchall()
+            self._cache[namespace] = dict(rows)
+
+    def get(self, namespace: str, key: str) -> str | None:
+        with self._lock:
+            return self._cache[namespace].get(key)
+
+    def items(self, namespace: str) -> dict[str, str]:
+        with self._lock:
+            return dict(self._cache[namespace])
+
+    def write(self, namespace: str, key: str, encoded: str | None) -> bool:
+        with self._lock:
+            entries = self._cache[namespace]
+            if encoded is None:
+                if key not in entries:
+                    return False
+                del entries[key]
+            else:
+                entries[key] = encoded
+            self._pending[(namespace, key)] = encoded
+            if len(self._pending) >= self.batch_size or self.commit_interval_seconds == 0:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.commit_interval_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            return True
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending or self._closed:
+            return
+        pending, self._pending = self._pending, {}
+        now = time.time()
+        upserts = [(namespace, key, value, now) for (namespace, key), value in pending.items() if value is not None]
+        deletes = [(namespace, key) for (namespace, key), value in pending.items() if value is None]
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            if upserts:
+                self._conn.executemany(
+                    "INSERT INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    upserts,
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM state WHERE namespace = ? AND key = ?", deletes)
+            self._conn.execute("COMMIT")
+        except sqlite3.Error as error:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            # Возвращаем несохраненное в очередь, не затирая более свежие записи.
+            for item_key, value in pending.items():
+                self._pending.setdefault(item_key, value)
+            print(f"❌ Ошибка записи состояния в {self.db_path}: {error}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self._closed = True
+            self._conn.close()
+
+
+_databases: dict[str, _SQLiteDatabase] = {}
+_databases_guard = threading.Lock()
+
+
+def _get_database(db_path: str) -> _SQLiteDatabase:
+    resolved = os.path.abspath(db_path)
+    with _databases_guard:
+        database = _databases.get(resolved)
+        if database is None or database._closed:
+            database = _SQLiteDatabase(resolved, STATE_STORE_BATCH_SIZE, STATE_STORE_COMMIT_INTERVAL_SECONDS)
+            _databases[resolved] = database
+        return database
+
+
+@atexit.register
+def _close_databases() -> None:
+    with _databases_guard:
+        databases = list(_databases.values())
+    for database in databases:
+        database.close()
+
+
+class SQLiteStateStore(StateStore):
+    """Namespace в общей SQLite-БД (WAL): одна строка на ключ, чтение из кэша в памяти.
+
+    set и delete меняют кэш сразу, а на диск уходят пачкой в одной транзакции — когда набралось
+    STATE_STORE_BATCH_SIZE изменений или прошло STATE_STORE_COMMIT_INTERVAL_SECONDS. Кэш считается
+    авторитетным, поэтому в одну БД должен писать один процесс.
+    """
+
+    def __init__(self, namespace: str, db_path: str = STATE_STORE_PATH, seed: StateSeed | None = None):
+        self.namespace = namespace
+        self.db_path = db_path
+        self._db = _get_database(db_path)
+        self._db.open_namespace(namespace, seed)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        encoded = self._db.get(self.namespace, key)
+        return default if encoded is None else json.loads(encoded)
+
+    def set(self, key: str, value: Any) -> None:
+        self._db.write(self.namespace, key, json.dumps(value, ensure_ascii=False))
+
+    def delete(self, key: str) -> bool:
+        return self._db.write(self.namespace, key, None)
+
+    def items(self) -> dict[str, Any]:
+        return {key: json.loads(value) for key, value in self._db.items(self.namespace).items()}
+
+    def flush(self) -> None:
+        self._db.flush()
+
+
+def open_state_store(namespace: str, legacy_json_path: str, seed: StateSeed | None = None) -> StateStore:
+    """Хранилище namespace по STATE_STORE_BACKEND.
+
+    sqlite: при первом открытии namespace в него переносится legacy_json_path (если это JSON-объект),
+    иначе записывается seed. json: прежний файл legacy_json_path, seed — если файла еще нет.
+    """
+    if STATE_STORE_BACKEND == "json":
+        return JSONStateStore(legacy_json_path, seed=seed)
+
+    def migrate() -> Mapping[str, Any]:
+        payload = load_legacy_json(legacy_json_path)
+        if isinstance(payload, dict):
+            return payload
+        return seed() if seed is not None else {}
+
+    return SQLiteStateStore(namespace, seed=migrate)
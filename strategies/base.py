@@ -14,6 +14,8 @@ class StrategySignal:
     action: str
     summary: str
     details: dict[str, Any] = field(default_factory=dict)
+    # Результат фильтра стадии (details собирается из него по запросу)
+    result: Any = None
 
 
 @dataclass(slots=True)
@@ -29,6 +31,13 @@ class StrategyContext:
     tracker: Any
     tf_loggers: dict[str, Any]
     market_data_provider: Any
+    # Таймфреймы, свеча которых закрылась в текущем событии планировщика; None - проверять все.
+    closed_timeframes: frozenset[str] | None = None
+
+    def should_analyze(self, timeframe: str) -> bool:
+        if self.closed_timeframes is not None and timeframe not in self.closed_timeframes:
+            return False
+        return self.tracker.should_analyze(self.symbol, timeframe)
 
 
 class BaseStrategy(ABC):
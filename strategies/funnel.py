@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import time
+
+from analyzes.batch_indicators import prime_filter_indicators
+from ohlcv_bundle import OHLCVBundle
+from strategies.base import StrategyContext
+from strategies.multi_tf_trend_strategy import STAGE_INTERVAL_MINUTES, MultiTimeframeTrendStrategy
+from strategies.runner import StrategyBatchResult
+
+
+@dataclass(slots=True)
+class FunnelStageStats:
+    timeframe: str
+    # Символов, допущенных к этапу (предыдущие этапы пройдены и закрылась новая свеча).
+    candidates: int = 0
+    # Символов, прошедших этап и допущенных к следующему.
+    survivors: int = 0
+    fetch_seconds: float = 0.0
+    batch_seconds: float = 0.0
+    evaluate_seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.timeframe} {self.candidates}→{self.survivors} "
+            f"(fetch {self.fetch_seconds:.1f}s, batch {self.batch_seconds:.2f}s, eval {self.evaluate_seconds:.1f}s)"
+        )
+
+
+@dataclass(slots=True)
+class FunnelBatchResult(StrategyBatchResult):
+    stages: list[FunnelStageStats] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return " | ".join(stage.summary() for stage in self.stages)
+
+
+class MultiTimeframeFunnelExecutor:
+    """Пакетный прогон MULTI_TF по воронке: 12H для всего набора, затем 4H для выживших, затем 1H.
+
+    На каждом этапе свечи допущенных символов загружаются одним пакетом (prefetch_stage_frames),
+    индикаторы фильтра считаются одной матрицей на весь набор (prime_filter_indicators), после чего символы
+    оцениваются теми же методами стратегии, что и в поштучном analyze_symbol. Большинство
+    символов отсеивается на 12H, так что загрузки и расчеты 4H/1H идут только по выжившим.
+    """
+
+    def __init__(self, strategy: MultiTimeframeTrendStrategy, max_workers: int = 1):
+        self.strategy = strategy
+        self.max_workers = max(1, int(max_workers))
+
+    def _map(self, func, contexts: list[StrategyContext]) -> list[tuple[StrategyContext, object, Exception | None]]:
+        def call(context: StrategyContext):
+            try:
+                return context, func(context), None
+            except Exception as error:
+                return context, None, error
+
+        if self.max_workers <= 1 or len(contexts) <= 1:
+            return [call(context) for context in contexts]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='funnel') as executor:
+            return list(executor.map(call, contexts))
+
+    def run(self, contexts: list[StrategyContext]) -> FunnelBatchResult:
+        result = FunnelBatchResult()
+        for context in contexts:
+            result.signals[context.symbol] = []
+        if not self.strategy.enabled:
+            return result
+
+        for timeframe in self.strategy.stage_timeframes:
+            stats = FunnelStageStats(timeframe=timeframe)
+            result.stages.append(stats)
+            ready = [
+                context for context in contexts
+                if context.symbol not in result.errors and self.strategy.stage_ready(context, timeframe)
+            ]
+            stats.candidates = len(ready)
+            if not ready:
+                continue
+
+            started = time.perf_counter()
+            try:
+                # Стейл-ряды этапа докачиваются одним пакетом с несколькими запросами в полете.
+                self.strategy.prefetch_stage_frames(ready, timeframe)
+            except Exception as error:
+                # Не критично: load_stage_frame догрузит недостающее поштучно.
+                logging.warning(f"Пакетная загрузка свечей {timeframe} не удалась: {error}")
+            frames: dict[str, OHLCVBundle] = {}
+            loaded: list[StrategyContext] = []
+            for context, bundle, error in self._map(lambda item: self.strategy.load_stage_frame(item, timeframe), ready):
+                if error is not None:
+                    result.errors[context.symbol] = error
+                    continue
+                frames[context.symbol] = bundle
+                loaded.append(context)
+            stats.fetch_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            prime_filter_indicators(
+                {symbol: bundle.frame() for symbol, bundle in frames.items() if not bundle.empty},
+                str(STAGE_INTERVAL_MINUTES[timeframe]),
+                self.strategy.stage_config(timeframe),
+            )
+            stats.batch_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            evaluated = self._map(
+                lambda item: self.strategy.evaluate_stage(item, timeframe, frames[item.symbol]),
+                loaded,
+            )
+            for context, stage_signals, error in evaluated:
+                if error is not None:
+                    result.errors[context.symbol] = error
+                    continue
+                result.signals[context.symbol].extend(stage_signals)
+                if self.strategy.stage_passed(context, timeframe, stage_signals):
+                    stats.survivors += 1
+            stats.evaluate_seconds = time.perf_counter() - started
+
+        for symbol in result.errors:
+            result.signals.pop(symbol, None)
+        return result
@@ -17,7 +17,7 @@ class RangeTradingStrategy(BaseStrategy):
         min_confidence = int(self.get_parameter('min_confidence', 9))
         min_risk_reward_ratio = float(self.get_parameter('min_risk_reward_ratio', 7))
 
-        if not tracker.should_analyze(symbol, 'RANGE'):
+        if not context.should_analyze('RANGE'):
             return []
 
         df_1h_range = context.market_data_provider.get_klines(symbol, interval='60')
@@ -49,7 +49,7 @@ class RangeTradingStrategy(BaseStrategy):
             not self.watch_only and
             confidence >= min_confidence and
             risk_reward_ratio >= min_risk_reward_ratio and
-            tracker.should_send_signal(symbol, range_result['action'], 'RANGE')
+            tracker.should_send_signal(symbol, range_result['action'], 'RANGE', strategy=self.name)
         )
         if should_route_signal:
             handle_range_signal(
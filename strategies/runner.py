@@ -1,8 +1,27 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
 from strategies.base import BaseStrategy, StrategyContext, StrategySignal
 
 
+@dataclass(slots=True)
+class StrategyBatchResult:
+    signals: dict[str, list[StrategySignal]] = field(default_factory=dict)
+    errors: dict[str, Exception] = field(default_factory=dict)
+
+    @property
+    def signal_count(self) -> int:
+        return sum(len(symbol_signals) for symbol_signals in self.signals.values())
+
+    def merge(self, other: StrategyBatchResult) -> None:
+        """Добавляет сигналы и ошибки другого прогона (например, воронки MULTI_TF) к этому результату."""
+        for symbol, symbol_signals in other.signals.items():
+            self.signals.setdefault(symbol, []).extend(symbol_signals)
+        self.errors.update(other.errors)
+
+
 class StrategyRunner:
     def __init__(self, strategies: list[BaseStrategy]):
         self.strategies = strategies
@@ -13,4 +32,28 @@ class StrategyRunner:
             if not strategy.enabled:
                 continue
             signals.extend(strategy.analyze_symbol(context))
-        return signals
\ No newline at end of file
+        return signals
+
+    def analyze_symbols(self, contexts: list[StrategyContext], max_workers: int = 1) -> StrategyBatchResult:
+        """Прогоняет символы через стратегии, при max_workers > 1 параллельно.
+
+        Все стратегии одного символа выполняются последовательно в одном воркере,
+        поэтому порядок 12H -> 4H -> 1H и RANGE внутри символа сохраняется.
+        """
+        result = StrategyBatchResult()
+        if max_workers <= 1 or len(contexts) <= 1:
+            for context in contexts:
+                try:
+                    result.signals[context.symbol] = self.analyze_symbol(context)
+                except Exception as error:
+                    result.errors[context.symbol] = error
+            return result
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='strategy') as executor:
+            futures = [(context.symbol, executor.submit(self.analyze_symbol, context)) for context in contexts]
+            for symbol, future in futures:
+                try:
+                    result.signals[symbol] = future.result()
+                except Exception as error:
+                    result.errors[symbol] = error
+        return result
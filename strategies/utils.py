@@ -59,38 +59,50 @@ def derive_filter_action(passed, hard_passed, soft_score, required_score):
     return "STOP"
 
 
+def format_soft_score(result):
+    # В short-circuit soft-условия не проверялись: частичный счет выглядел бы как проваленные условия.
+    if result.short_circuit:
+        return f"skipped (need {result.soft_score_required})"
+    return f"{result.soft_score}/{result.soft_score_max} (need {result.soft_score_required})"
+
+
+def format_soft_flag(result, key):
+    soft = result.soft_conditions
+    if key not in soft:
+        return "SKIPPED"
+    return "YES" if soft[key] else "NO"
+
+
 def format_bias_summary(label, result):
-    required_score = result.details.get("soft_score_required", result.soft_score_max)
     status = "GO" if result.passed else ("ATTENTION" if result.hard_passed else "STOP")
     return (
         f"{label} BIAS: {status}\n"
-        f"Hard: {'OK' if result.hard_passed else 'FAIL'} | Soft: {result.soft_score}/{result.soft_score_max} (need {required_score})\n"
+        f"Hard: {'OK' if result.hard_passed else 'FAIL'} | Soft: {format_soft_score(result)}\n"
         f"Reason: {result.reason}"
     )
 
 
 def format_setup_summary(label, result):
-    required_score = result.details.get("soft_score_required", result.soft_score_max)
-    obv = result.details.get("obv", {})
-    obv_score = sum(
-        int(obv.get(key, False))
-        for key in ["obv_bullish_state", "obv_strength_supportive", "obv_bullish_divergence"]
-    )
-    soft = result.details.get("soft_conditions", {})
+    soft = result.soft_conditions
+    obv_keys = ["obv_bullish_state", "obv_strength_supportive", "obv_bullish_divergence"]
+    if all(key in soft for key in obv_keys):
+        obv_summary = f"{sum(int(soft[key]) for key in obv_keys)}/3"
+    else:
+        obv_summary = "SKIPPED"
     return (
         f"{label} SETUP: {result.setup_state}\n"
-        f"Hard: {'OK' if result.hard_passed else 'FAIL'} | Soft: {result.soft_score}/{result.soft_score_max} (need {required_score})\n"
-        f"Pullback: {'YES' if soft.get('touched_working_zone') else 'NO'} | Reclaim EMA20: {'YES' if soft.get('reclaimed_ema20') else 'NO'} | OBV: {obv_score}/3\n"
+        f"Hard: {'OK' if result.hard_passed else 'FAIL'} | Soft: {format_soft_score(result)}\n"
+        f"Pullback: {format_soft_flag(result, 'touched_working_zone')} | "
+        f"Reclaim EMA20: {format_soft_flag(result, 'reclaimed_ema20')} | OBV: {obv_summary}\n"
         f"Reason: {result.reason}"
     )
 
 
 def format_trigger_summary(label, result):
-    required_score = result.details.get("soft_score_required", result.soft_score_max)
     lines = [
         f"{label} TRIGGER: {result.action}",
         f"State: {result.trigger_state}",
-        f"Hard: {'OK' if result.hard_passed else 'FAIL'} | Soft: {result.soft_score}/{result.soft_score_max} (need {required_score})",
+        f"Hard: {'OK' if result.hard_passed else 'FAIL'} | Soft: {format_soft_score(result)}",
     ]
     if result.entry_price is not None:
         lines.append(
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 from collections.abc import Iterator
+from dataclasses import dataclass
 from datetime import datetime, timezone
+import itertools
+import os
 from pathlib import Path
+import threading
+import time
 from typing import Any
 
 from bybit_client_v2 import bybit_client
@@ -20,6 +25,24 @@ LEGACY_FILTERED_SYMBOLS_FILE = "data/filtered_symbols.txt"
 UNIVERSE_SYNC_LOG_FILE = "logs/universe_sync_report.txt"
 
 
+@dataclass(frozen=True, slots=True)
+class SymbolUniverseSnapshot:
+    """Неизменяемая версия списка символов: читатели держат ссылку и не видят частичных обновлений."""
+
+    version: int
+    symbols: tuple[str, ...]
+    file_path: str
+    file_mtime_ns: int | None
+    published_at: float
+
+
+# Последний опубликованный snapshot по каждому файлу. Замена значения в dict - атомарная операция,
+# поэтому читатели берут ссылку без блокировки, а lock нужен только писателям между собой.
+_UNIVERSE_SNAPSHOTS: dict[str, SymbolUniverseSnapshot] = {}
+_UNIVERSE_GENERATION = itertools.count(1)
+_UNIVERSE_PUBLISH_LOCK = threading.Lock()
+
+
 def load_symbols_from_file(file_path: str) -> list[str]:
     """Загружает символы из текстового файла, по одному символу на строку."""
     path = Path(file_path)
@@ -35,12 +58,55 @@ def load_symbols_from_file(file_path: str) -> list[str]:
 
 
 def write_symbols_file(file_path: str, symbols: list[str]) -> None:
-    """Сохраняет список символов по одному на строку."""
+    """Атомарно сохраняет список символов по одному на строку (через временный файл и os.replace)."""
     path = Path(file_path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as file_handle:
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as file_handle:
         for symbol in symbols:
             file_handle.write(f"{symbol}\n")
+    os.replace(tmp_path, path)
+
+
+def _get_file_mtime_ns(file_path: str) -> int | None:
+    try:
+        return os.stat(file_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def publish_symbol_universe(symbols: list[str], file_path: str = COMMON_SYMBOLS_FILE) -> SymbolUniverseSnapshot:
+    """Записывает список символов и публикует его новой версией snapshot одним переключением ссылки."""
+    normalized = tuple(dict.fromkeys(symbols))
+    with _UNIVERSE_PUBLISH_LOCK:
+        write_symbols_file(file_path, list(normalized))
+        snapshot = SymbolUniverseSnapshot(
+            version=next(_UNIVERSE_GENERATION),
+            symbols=normalized,
+            file_path=file_path,
+            file_mtime_ns=_get_file_mtime_ns(file_path),
+            published_at=time.time(),
+        )
+        _UNIVERSE_SNAPSHOTS[file_path] = snapshot
+    return snapshot
+
+
+def get_symbol_universe(file_path: str = COMMON_SYMBOLS_FILE) -> SymbolUniverseSnapshot:
+    """Возвращает актуальный snapshot без блокировок; если файл изменили извне, перечитывает его."""
+    snapshot = _UNIVERSE_SNAPSHOTS.get(file_path)
+    file_mtime_ns = _get_file_mtime_ns(file_path)
+    if snapshot is not None and snapshot.file_mtime_ns == file_mtime_ns:
+        return snapshot
+
+    snapshot = SymbolUniverseSnapshot(
+        version=next(_UNIVERSE_GENERATION),
+        symbols=tuple(load_common_symbols(file_path)),
+        file_path=file_path,
+        file_mtime_ns=file_mtime_ns,
+        published_at=time.time(),
+    )
+    _UNIVERSE_SNAPSHOTS[file_path] = snapshot
+    return snapshot
 
 
 def load_common_symbols(file_path: str = COMMON_SYMBOLS_FILE) -> list[str]:
@@ -94,10 +160,6 @@ def chunked(items: list[str], chunk_size: int) -> Iterator[list[str]]:
 
 def fetch_spot_usdt_symbols() -> list[str]:
     """Получает актуальный список торгуемых спотовых USDT-пар с Bybit."""
-    session = getattr(bybit_client, "session", None)
-    if session is None:
-        return []
-
     symbols: list[str] = []
     cursor: str | None = None
 
@@ -106,12 +168,9 @@ def fetch_spot_usdt_symbols() -> list[str]:
         if cursor:
             params["cursor"] = cursor
 
-        try:
-            response = session.get_instruments_info(**params)
-        except Exception:
-            return []
-
-        if not isinstance(response, dict) or response.get("retCode") != 0:
+        # Через _request: запрос проходит общий limiter и обновляет квоту endpoint'а по заголовкам ответа.
+        response = bybit_client._request("get_instruments_info", **params)
+        if response is None or response.get("retCode") != 0:
             return []
 
         result = response.get("result", {}) or {}
@@ -211,7 +270,7 @@ def refresh_common_symbols(
 
     eligible_coins.sort(key=lambda item: (item["market_cap"], item["volume_24h"]), reverse=True)
     common_symbols = [coin["symbol"] for coin in eligible_coins]
-    write_symbols_file(output_file, common_symbols)
+    publish_symbol_universe(common_symbols, output_file)
     append_universe_sync_log(
         output_file=output_file,
         total_spot_symbols=len(spot_symbols),
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import atexit
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import heapq
+import threading
+import time
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_CHAT_MIN_INTERVAL_SECONDS,
+    TELEGRAM_GLOBAL_BURST,
+    TELEGRAM_GLOBAL_MESSAGES_PER_SECOND,
+    TELEGRAM_GROUP_CHAT_MIN_INTERVAL_SECONDS,
+    TELEGRAM_MAX_ATTEMPTS,
+    TELEGRAM_REQUEST_TIMEOUT_SECONDS,
+    TELEGRAM_RETRY_BACKOFF_MAX_SECONDS,
+    TELEGRAM_SENDER_WORKERS,
+    TELEGRAM_SHUTDOWN_FLUSH_SECONDS,
+)
+from rate_limiter import RateLimitBudget, TokenBucketRateLimiter
+
+
+TELEGRAM_GLOBAL_GROUP = "telegram"
+TELEGRAM_API_URL = "https://api.telegram.org/bot{token}/{method}"
+
+# Handle доставки: Future[bool] — True, если сообщение принято Telegram.
+# Можно не ждать (fire-and-forget), ждать через .result(timeout) или await asyncio.wrap_future(handle).
+DeliveryHandle = Future
+
+
+@dataclass(slots=True)
+class _Delivery:
+    chat_id: int | str
+    payload: dict[str, Any]
+    handle: DeliveryHandle
+    attempts: int = 0
+
+
+@dataclass(slots=True)
+class _ChatLane:
+    """Очередь одного чата: сообщения уходят по порядку и не чаще минимального интервала чата."""
+
+    pending: deque[_Delivery] = field(default_factory=deque)
+    next_allowed_at: float = 0.0
+    # Сообщение чата сейчас у sender'а: второй поток чат не берет, порядок сохраняется.
+    busy: bool = False
+
+
+def _is_group_chat(chat_id: int | str) -> bool:
+    # У групп и каналов chat_id отрицательный; лимит Telegram для них — около 20 сообщений в минуту.
+    return str(chat_id).startswith("-")
+
+
+def _resolve_when_all_done(handles: list[DeliveryHandle]) -> DeliveryHandle:
+    """Handle рассылки: завершается, когда завершены все сообщения; True — доставлено хотя бы одно."""
+    combined: DeliveryHandle = Future()
+    if not handles:
+        combined.set_result(False)
+        return combined
+
+    remaining = len(handles)
+    lock = threading.Lock()
+
+    def on_done(_handle: DeliveryHandle) -> None:
+        nonlocal remaining
+        with lock:
+            remaining -= 1
+            if remaining:
+                return
+        combined.set_result(any(handle.result() for handle in handles))
+
+    for handle in handles:
+        handle.add_done_callback(on_done)
+    return combined
+
+
+class TelegramDeliveryQueue:
+    """Исходящая очередь Telegram с пулом фоновых sender'ов.
+
+    submit только кладет сообщение в очередь чата и сразу возвращает handle — вызывающий поток
+    (стратегия, монитор сделок) не ждет сети. Sender'ы берут чат, у которого истек минимальный
+    интервал, занимают слот глобального token bucket и отправляют через общий keep-alive Session.
+    429 останавливает глобальный bucket и чат на полный retry_after из ответа, 5xx и сетевые ошибки
+    откладывают чат на экспоненциальную паузу; после max_attempts попыток или при прочих 4xx handle
+    завершается с False.
+    """
+
+    def __init__(
+        self,
+        token: str | None = TELEGRAM_BOT_TOKEN,
+        workers: int = TELEGRAM_SENDER_WORKERS,
+        global_per_second: float = TELEGRAM_GLOBAL_MESSAGES_PER_SECOND,
+        global_burst: int = TELEGRAM_GLOBAL_BURST,
+        chat_interval_seconds: float = TELEGRAM_CHAT_MIN_INTERVAL_SECONDS,
+        group_chat_interval_seconds: float = TELEGRAM_GROUP_CHAT_MIN_INTERVAL_SECONDS,
+        max_attempts: int = TELEGRAM_MAX_ATTEMPTS,
+        backoff_max_seconds: float = TELEGRAM_RETRY_BACKOFF_MAX_SECONDS,
+        request_timeout: float = TELEGRAM_REQUEST_TIMEOUT_SECONDS,
+    ):
+        self.token = token
+        self.workers = max(1, int(workers))
+        self.chat_interval_seconds = max(0.0, float(chat_interval_seconds))
+        self.group_chat_interval_seconds = max(0.0, float(group_chat_interval_seconds))
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_max_seconds = max(1.0, float(backoff_max_seconds))
+        self.request_timeout = float(request_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.session.mount("https://", adapter)
+        self.limiter = TokenBucketRateLimiter({TELEGRAM_GLOBAL_GROUP: RateLimitBudget(global_per_second, global_burst)})
+
+        self._cond = threading.Condition()
+        self._lanes: dict[int | str, _ChatLane] = {}
+        # (готов к отправке, seq, chat_id): один элемент на чат, у которого есть сообщения и он не busy.
+        self._ready: list[tuple[float, int, int | str]] = []
+        self._seq = 0
+        self._unfinished = 0
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+
+    def api_url(self, method: str) -> str:
+        return TELEGRAM_API_URL.format(token=self.token, method=method)
+
+    def chat_interval(self, chat_id: int | str) -> float:
+        return self.group_chat_interval_seconds if _is_group_chat(chat_id) else self.chat_interval_seconds
+
+    def submit(self, chat_id: int | str, text: str, parse_mode: str | None = None, urgent: bool = False) -> DeliveryHandle:
+        """Ставит сообщение в очередь чата; urgent — в начало очереди (аварийные уведомления)."""
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        delivery = _Delivery(chat_id, payload, Future())
+
+        with self._cond:
+            if self._stopping:
+                delivery.handle.set_result(False)
+                return delivery.handle
+            self._start_workers_locked()
+            lane = self._lanes.get(chat_id)
+            if lane is None:
+                lane = _ChatLane()
+                self._lanes[chat_id] = lane
+            was_idle = not lane.pending and not lane.busy
+            if urgent:
+                lane.pending.appendleft(delivery)
+            else:
+                lane.pending.append(delivery)
+            self._unfinished += 1
+            if was_idle:
+                self._schedule_locked(chat_id, lane.next_allowed_at)
+        return delivery.handle
+
+    def broadcast(
+        self,
+        chat_ids: Iterable[int | str],
+        text: str,
+        parse_mode: str | None = None,
+        urgent: bool = False,
+    ) -> tuple[DeliveryHandle, list[DeliveryHandle]]:
+        """Ставит сообщение в очередь каждого чата; возвращает общий handle и handle'ы по чатам."""
+        handles = [self.submit(chat_id, text, parse_mode=parse_mode, urgent=urgent) for chat_id in chat_ids]
+        return _resolve_when_all_done(handles), handles
+
+    def _start_workers_locked(self) -> None:
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run_worker, name=f"telegram-sender-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _schedule_locked(self, chat_id: int | str, ready_at: float) -> None:
+        self._seq += 1
+        heapq.heappush(self._ready, (ready_at, self._seq, chat_id))
+        self._cond.notify()
+
+    def _take_locked(self) -> _Delivery | None:
+        """Ждет чат, готовый к отправке; None — очередь остановлена."""
+        while not self._stopping:
+            if not self._ready:
+                self._cond.wait()
+                continue
+            ready_at, _, chat_id = self._ready[0]
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                self._cond.wait(delay)
+                continue
+            heapq.heappop(self._ready)
+            lane = self._lanes[chat_id]
+            lane.busy = True
+            return lane.pending.popleft()
+        return None
+
+    def _run_worker(self) -> None:
+        while True:
+            with self._cond:
+                delivery = self._take_locked()
+            if delivery is None:
+                return
+            self.limiter.acquire(TELEGRAM_GLOBAL_GROUP)
+            delivery.attempts += 1
+            delivered, retry_in = self._post(delivery)
+            now = time.monotonic()
+
+            with self._cond:
+                # После close() повтор уже никто не возьмет из очереди: сообщение завершается как недоставленное.
+                finished = retry_in is None or delivery.attempts >= self.max_attempts or self._stopping
+                lane = self._lanes[delivery.chat_id]
+                lane.busy = False
+                if finished:
+                    lane.next_allowed_at = now + self.chat_interval(delivery.chat_id)
+                    if delivered:
+                        self.sent += 1
+                    else:
+                        self.failed += 1
+                else:
+                    # Повтор идет первым в очереди чата, чтобы не нарушить порядок сообщений.
+                    self.retried += 1
+                    lane.pending.appendleft(delivery)
+                    lane.next_allowed_at = now + retry_in
+                if lane.pending:
+                    self._schedule_locked(delivery.chat_id, lane.next_allowed_at)
+                self._cond.notify_all()
+
+            if finished:
+                # Колбэки handle'а (например, аварийное уведомление) ставятся в очередь до того,
+                # как сообщение перестанет считаться незавершенным, — flush дождется и их.
+                delivery.handle.set_result(delivered)
+                with self._cond:
+                    self._unfinished -= 1
+                    self._cond.notify_all()
+
+    def _post(self, delivery: _Delivery) -> tuple[bool, float | None]:
+        """Одна попытка sendMessage: (доставлено, через сколько секунд повторить или None)."""
+        chat_id = delivery.chat_id
+        backoff = min(self.backoff_max_seconds, 2.0 ** (delivery.attempts - 1))
+        try:
+            response = self.session.post(self.api_url("sendMessage"), data=delivery.payload, timeout=self.request_timeout)
+        except requests.RequestException as error:
+            print(f"❌ Ошибка отправки в Telegram [{chat_id}] (попытка {delivery.attempts}): {error}")
+            return False, backoff
+
+        try:
+            response_data = response.json()
+        except ValueError:
+            response_data = {}
+        if response.ok and response_data.get("ok"):
+            return True, None
+
+        error_desc = response_data.get("description") or f"HTTP {response.status_code}"
+        if response.status_code == 429:
+            with self._cond:
+                self.rate_limited += 1
+            retry_after = (response_data.get("parameters") or {}).get("retry_after")
+            retry_in = float(retry_after) if retry_after is not None else backoff
+            # Лимит 429 общий для бота: retry_after выдерживается целиком и останавливает все чаты,
+            # иначе остальные sender'ы продолжают слать и продлевают бан.
+            self.limiter.pause(TELEGRAM_GLOBAL_GROUP, retry_in)
+            print(f"⚠️ Telegram rate limit [{chat_id}]: повтор через {retry_in:.0f}с")
+            return False, retry_in
+        if response.status_code >= 500:
+            print(f"❌ Telegram API error [{chat_id}] (попытка {delivery.attempts}): {error_desc}")
+            return False, backoff
+
+        # Прочие 4xx (бот заблокирован, неверная разметка) повтором не исправить.
+        print(f"❌ Telegram API error [{chat_id}]: {error_desc}")
+        return False, None
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Ждет, пока очередь опустеет; False — за timeout не успели."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._unfinished:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: float | None = TELEGRAM_SHUTDOWN_FLUSH_SECONDS) -> None:
+        """Досылает очередь (не дольше timeout), останавливает sender'ы; недоставленное — False."""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            abandoned = [delivery for lane in self._lanes.values() for delivery in lane.pending]
+            for lane in self._lanes.values():
+                lane.pending.clear()
+            self._ready.clear()
+            self._unfinished -= len(abandoned)
+            self.failed += len(abandoned)
+            self._cond.notify_all()
+        for delivery in abandoned:
+            delivery.handle.set_result(False)
+        if abandoned:
+            print(f"⚠️ Telegram: {len(abandoned)} сообщений не отправлено до остановки")
+        self.session.close()
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "queued": self._unfinished,
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "rate_limited": self.rate_limited,
+                "chats": len(self._lanes),
+                "global_limiter": self.limiter.get_stats()[TELEGRAM_GLOBAL_GROUP],
+            }
+
+
+_delivery_queue: TelegramDeliveryQueue | None = None
+_delivery_queue_lock = threading.Lock()
+
+
+def get_telegram_delivery() -> TelegramDeliveryQueue:
+    """Общая на процесс очередь отправки (создается при первом обращении)."""
+    global _delivery_queue
+    with _delivery_queue_lock:
+        if _delivery_queue is None:
+            _delivery_queue = TelegramDeliveryQueue()
+        return _delivery_queue
+
+
+@atexit.register
+def _close_delivery_queue() -> None:
+    with _delivery_queue_lock:
+        delivery_queue = _delivery_queue
+    if delivery_queue is not None:
+        delivery_queue.close()
@@ -1,45 +1,64 @@
-import requests
-import json
-import os
+from concurrent.futures import Future
+import threading
 from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from state_store import load_legacy_json, open_state_store
+from telegram_delivery import get_telegram_delivery
 
-# Файл для хранения подписчиков
+# Старый файл подписчиков: переносится в хранилище состояния при первом запуске
 SUBSCRIBERS_FILE = "data/telegram_subscribers.json"
 
+_subscribers_store = None
+_subscribers_store_lock = threading.Lock()
+
+
+def _initial_subscribers():
+    """Начальные подписчики: список из старого файла или chat_id из конфига (для обратной совместимости)"""
+    subscribers = load_legacy_json(SUBSCRIBERS_FILE)
+    if not isinstance(subscribers, list):
+        subscribers = [TELEGRAM_CHAT_ID] if TELEGRAM_CHAT_ID else []
+    return {str(chat_id): chat_id for chat_id in subscribers}
+
+
+def get_subscribers_store():
+    """Хранилище подписчиков: одна запись на chat_id (создается при первом обращении)"""
+    global _subscribers_store
+    with _subscribers_store_lock:
+        if _subscribers_store is None:
+            _subscribers_store = open_state_store(
+                "telegram_subscribers", SUBSCRIBERS_FILE, seed=_initial_subscribers
+            )
+        return _subscribers_store
+
 
 def load_subscribers():
-    """Загружает список подписчиков из файла"""
-    if not os.path.exists(SUBSCRIBERS_FILE):
-        # Создаем файл с текущим chat_id из конфига (для обратной совместимости)
-        initial_subscribers = [TELEGRAM_CHAT_ID] if TELEGRAM_CHAT_ID else []
-        save_subscribers(initial_subscribers)
-        return initial_subscribers
-    
+    """Загружает список подписчиков"""
     try:
-        with open(SUBSCRIBERS_FILE, 'r', encoding='utf-8') as f:
-            subscribers = json.load(f)
-            return subscribers if isinstance(subscribers, list) else []
+        return list(get_subscribers_store().items().values())
     except Exception as e:
         print(f"❌ Ошибка загрузки подписчиков: {e}")
         return [TELEGRAM_CHAT_ID] if TELEGRAM_CHAT_ID else []
 
 
 def save_subscribers(subscribers):
-    """Сохраняет список подписчиков в файл"""
+    """Сохраняет список подписчиков целиком"""
     try:
-        os.makedirs(os.path.dirname(SUBSCRIBERS_FILE), exist_ok=True)
-        with open(SUBSCRIBERS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(subscribers, f, ensure_ascii=False, indent=2)
+        store = get_subscribers_store()
+        wanted = {str(chat_id): chat_id for chat_id in subscribers}
+        for key in store.items().keys() - wanted.keys():
+            store.delete(key)
+        for key, chat_id in wanted.items():
+            store.set(key, chat_id)
+        store.flush()
     except Exception as e:
         print(f"❌ Ошибка сохранения подписчиков: {e}")
 
 
 def add_subscriber(chat_id):
     """Добавляет нового подписчика"""
-    subscribers = load_subscribers()
-    if chat_id not in subscribers:
-        subscribers.append(chat_id)
-        save_subscribers(subscribers)
+    store = get_subscribers_store()
+    if store.get(str(chat_id)) is None:
+        store.set(str(chat_id), chat_id)
+        store.flush()
         print(f"✅ Новый подписчик добавлен: {chat_id}")
         return True
     return False
@@ -47,10 +66,9 @@ def add_subscriber(chat_id):
 
 def remove_subscriber(chat_id):
     """Удаляет подписчика"""
-    subscribers = load_subscribers()
-    if chat_id in subscribers:
-        subscribers.remove(chat_id)
-        save_subscribers(subscribers)
+    store = get_subscribers_store()
+    if store.delete(str(chat_id)):
+        store.flush()
         print(f"✅ Подписчик удален: {chat_id}")
         return True
     return False
@@ -67,9 +85,10 @@ def process_telegram_updates():
     if not TELEGRAM_BOT_TOKEN:
         return
     
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
+    delivery = get_telegram_delivery()
+    url = delivery.api_url("getUpdates")
     try:
-        response = requests.get(url, timeout=5)
+        response = delivery.session.get(url, timeout=5)
         data = response.json()
         
         if not data.get('ok'):
@@ -105,7 +124,7 @@ def process_telegram_updates():
                 
                 # Подтверждаем обработку update
                 offset = update['update_id'] + 1
-                requests.get(f"{url}?offset={offset}", timeout=5)
+                delivery.session.get(f"{url}?offset={offset}", timeout=5)
             
             elif text == '/stop':
                 is_removed = remove_subscriber(chat_id)
@@ -120,7 +139,7 @@ def process_telegram_updates():
                     send_direct_message(chat_id, "ℹ️ Вы не были подписаны.", parse_mode="HTML")
                 
                 offset = update['update_id'] + 1
-                requests.get(f"{url}?offset={offset}", timeout=5)
+                delivery.session.get(f"{url}?offset={offset}", timeout=5)
             
             elif text == '/status':
                 subscribers = load_subscribers()
@@ -141,97 +160,89 @@ def process_telegram_updates():
                     )
                 
                 offset = update['update_id'] + 1
-                requests.get(f"{url}?offset={offset}", timeout=5)
+                delivery.session.get(f"{url}?offset={offset}", timeout=5)
     
     except Exception as e:
         # Тихо игнорируем ошибки polling (не критично)
         pass
 
 
-def send_direct_message(chat_id, text, parse_mode=None):
-    """Отправляет сообщение конкретному пользователю"""
+def _resolved(result):
+    """Уже завершенный handle (когда отправлять нечего)"""
+    handle = Future()
+    handle.set_result(result)
+    return handle
+
+
+def send_direct_message(chat_id, text, parse_mode=None, urgent=False):
+    """
+    Ставит сообщение конкретному пользователю в очередь отправки и сразу возвращает handle
+    (Future[bool]: True — доставлено). Ждать не обязательно: .result(timeout) или asyncio.wrap_future
+    """
     if not TELEGRAM_BOT_TOKEN:
         print(f"❌ TELEGRAM_BOT_TOKEN не задан!")
-        return False
+        return _resolved(False)
     
     # Защита от слишком длинных сообщений (Telegram лимит 4096 символов)
     MAX_LENGTH = 4000
     if len(text) > MAX_LENGTH:
         text = text[:MAX_LENGTH] + "\n\n... (обрезано)"
     
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": chat_id, "text": text}
-    
-    # Добавляем parse_mode только если указан (для команд /start, /status)
-    if parse_mode:
-        payload["parse_mode"] = parse_mode
-    
-    try:
-        response = requests.post(url, data=payload, timeout=10)
-        response_data = response.json()
-        
-        if not response_data.get('ok'):
-            error_desc = response_data.get('description', 'Unknown error')
-            print(f"❌ Telegram API error [{chat_id}]: {error_desc}")
-            return False
-        
-        return True
-    except Exception as e:
-        print(f"❌ Ошибка отправки в Telegram [{chat_id}]: {e}")
-        return False
+    # parse_mode добавляется только если указан (для команд /start, /status)
+    return get_telegram_delivery().submit(chat_id, text, parse_mode=parse_mode, urgent=urgent)
 
 
-def send_telegram_message(text):
+def send_telegram_message(text, failure_alert=None):
     """
-    Отправляет сообщение ВСЕМ подписчикам
+    Ставит сообщение в очередь ВСЕМ подписчикам
     (для торговых сигналов и массовых уведомлений)
-    Возвращает True если хотя бы одному подписчику доставлено
+    Возвращает handle: Future[bool], True если хотя бы одному подписчику доставлено.
+    failure_alert — аргументы send_emergency_alert, которое уйдет, если не доставлено никому
+    (вызывающему не нужно ждать результата)
     """
     if not TELEGRAM_BOT_TOKEN:
         print("❌ Не задан TELEGRAM_BOT_TOKEN")
-        return False
+        return _resolved(False)
     
     subscribers = load_subscribers()
     
     if not subscribers:
         print("⚠️ Нет подписчиков для рассылки")
-        return False
-    
-    print(f"📨 Отправка сообщения {len(subscribers)} подписчикам...")
+        return _resolved(False)
     
-    success_count = 0
-    failed_chats = []
+    print(f"📨 Сообщение в очереди для {len(subscribers)} подписчиков...")
     
-    for chat_id in subscribers:
-        if send_direct_message(chat_id, text):
-            success_count += 1
-        else:
-            failed_chats.append(chat_id)
+    handle, chat_handles = get_telegram_delivery().broadcast(subscribers, text)
     
-    if success_count > 0:
-        print(f"✅ Сообщение отправлено {success_count}/{len(subscribers)} подписчикам")
-        return True
-    else:
+    def report(_handle):
+        success_count = sum(1 for chat_handle in chat_handles if chat_handle.result())
+        if success_count > 0:
+            print(f"✅ Сообщение отправлено {success_count}/{len(subscribers)} подписчикам")
+            return
         print(f"❌ Сообщение НЕ отправлено ни одному подписчику!")
-        if failed_chats:
-            print(f"❌ Проблемные подписчики: {failed_chats}")
-        return False
+        print(f"❌ Проблемные подписчики: {subscribers}")
+        if failure_alert:
+            send_emergency_alert(**failure_alert)
+    
+    handle.add_done_callback(report)
+    return handle
 
 
 def send_emergency_alert(error_type, symbol=None, details=None):
     """
     АВАРИЙНАЯ СИСТЕМА УВЕДОМЛЕНИЙ
     Отправляет короткое простое сообщение об ошибке
-    Гарантированно доставляется (без HTML, короткое)
+    Без HTML и короткое; в очереди каждого чата идет первым
+    Возвращает handle: Future[bool], True если хотя бы одному подписчику доставлено
     
     error_type: 'ANALYSIS', 'TELEGRAM', 'API', 'CRITICAL'
     """
     if not TELEGRAM_BOT_TOKEN:
-        return False
+        return _resolved(False)
     
     subscribers = load_subscribers()
     if not subscribers:
-        return False
+        return _resolved(False)
     
     # Короткие простые сообщения (без спецсимволов)
     messages = {
@@ -250,15 +261,5 @@ def send_emergency_alert(error_type, symbol=None, details=None):
     
     print(f"🚨 EMERGENCY ALERT: {message}")
     
-    success = False
-    for chat_id in subscribers:
-        try:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            payload = {"chat_id": chat_id, "text": message}
-            response = requests.post(url, data=payload, timeout=5)
-            if response.json().get('ok'):
-                success = True
-        except:
-            pass
-    
-    return success
\ No newline at end of file
+    handle, _ = get_telegram_delivery().broadcast(subscribers, message, urgent=True)
+    return handle
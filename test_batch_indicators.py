@@ -0,0 +1,110 @@
+"""
+Проверка пакетного прогрева индикаторов: фильтр по прогретому кэшу дает тот же результат, что и без прогрева.
+Запуск: python -m pytest -q test_batch_indicators.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analyzes.indicator_cache as indicator_cache_module
+from analyzes.batch_indicators import prime_filter_indicators
+from analyzes.indicator_cache import indicator_cache
+from analyzes.setup_filter_4h import SetupFilter4hConfig, setup_filter_4h
+from analyzes.trend_filter_12h_v2 import TrendFilter12hConfig, trend_filter_12h
+
+
+def make_candles(rows: int, freq: str, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = np.abs(50 + np.cumsum(rng.normal(0.02, 0.5, rows))) + 5
+    open_ = close + rng.normal(0, 0.2, rows)
+    return pd.DataFrame(
+        {
+            "open": open_,
+            "high": np.maximum(open_, close) + rng.random(rows),
+            "low": np.minimum(open_, close) - rng.random(rows),
+            "close": close,
+            "volume": rng.random(rows) * 1e6,
+        },
+        index=pd.date_range("2024-01-01", periods=rows, freq=freq, tz="UTC"),
+    )
+
+
+def run_filter(timeframe: str, window: pd.DataFrame, symbol: str):
+    if timeframe == "720":
+        return trend_filter_12h(window, symbol=symbol)
+    return setup_filter_4h(window, trend_bias_passed=True, symbol=symbol)
+
+
+def assert_same_details(actual, expected, rtol: float = 0.0) -> None:
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            assert_same_details(actual[key], expected[key], rtol)
+    elif isinstance(expected, float) and not isinstance(actual, bool):
+        assert actual == pytest.approx(expected, rel=rtol, abs=rtol, nan_ok=True)
+    else:
+        assert actual == expected
+
+
+FILTERS = [
+    ("720", "12h", TrendFilter12hConfig()),
+    ("240", "4h", SetupFilter4hConfig()),
+]
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    indicator_cache.clear()
+    yield
+    indicator_cache.clear()
+
+
+@pytest.mark.parametrize("timeframe,freq,config", FILTERS)
+def test_priming_fills_filter_keys(timeframe, freq, config):
+    symbol = f"KEYS{timeframe}USDT"
+    window = make_candles(500, freq, seed=1)
+
+    assert prime_filter_indicators({symbol: window}, timeframe, config) == 1
+    run_filter(timeframe, window, symbol)
+
+    # Все engine-индикаторы фильтра (EMA/ATR/ADX/RSI/OBV) и MA объема взяты из прогрева.
+    assert indicator_cache.get_stats()["misses"] == 0
+
+
+@pytest.mark.parametrize("timeframe,freq,config", FILTERS)
+def test_primed_filter_matches_unprimed_with_engine(timeframe, freq, config):
+    symbol = f"PRIME{timeframe}USDT"
+    candles = make_candles(900, freq, seed=3)
+    # Движок уже видел более ранние окна этого символа, как в работающем сканере.
+    for step in range(0, 300, 30):
+        run_filter(timeframe, candles.iloc[step:step + 500], symbol)
+    window = candles.iloc[-500:]
+
+    indicator_cache.clear()
+    unprimed = run_filter(timeframe, window, symbol)
+    indicator_cache.clear()
+    prime_filter_indicators({symbol: window}, timeframe, config)
+    primed = run_filter(timeframe, window, symbol)
+
+    # Движок и пакет равны пересчету по окну: решения совпадают, значения — до округления.
+    assert primed.passed == unprimed.passed
+    assert primed.reason == unprimed.reason
+    assert_same_details(primed.details, unprimed.details, rtol=1e-9)
+
+
+@pytest.mark.parametrize("timeframe,freq,config", FILTERS)
+def test_primed_filter_matches_unprimed_without_engine(timeframe, freq, config, monkeypatch):
+    monkeypatch.setattr(indicator_cache_module, "INDICATOR_ENGINE_ENABLED", False)
+    symbol = f"BATCH{timeframe}USDT"
+    window = make_candles(500, freq, seed=5)
+
+    unprimed = run_filter(timeframe, window, symbol)
+    indicator_cache.clear()
+    prime_filter_indicators({symbol: window}, timeframe, config)
+    primed = run_filter(timeframe, window, symbol)
+
+    # Без движка фильтр считает pandas по окну, прогрев — матрицей: совпадение до округления.
+    assert primed.passed == unprimed.passed
+    assert primed.reason == unprimed.reason
+    assert_same_details(primed.details, unprimed.details, rtol=1e-9)
@@ -0,0 +1,46 @@
+"""
+Проверка синхронной обертки пакетной загрузки свечей BybitClient.get_kline_bundles_batch.
+Запуск: python -m pytest -q test_bybit_async_client.py
+"""
+
+import asyncio
+import threading
+
+from bybit_client_v2 import BybitClient
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.threads = []
+
+    async def get_kline_bundles(self, limits, interval="60", category=None):
+        await asyncio.sleep(0)
+        self.threads.append(threading.current_thread().name)
+        return {symbol: (interval, limit) for symbol, limit in limits.items()}
+
+
+def make_client() -> tuple[BybitClient, FakeAsyncClient]:
+    client = BybitClient(candle_store=None, base_url="http://127.0.0.1:9")
+    fake = FakeAsyncClient()
+    client._async_client = fake
+    return client, fake
+
+
+def test_batch_from_sync_code_runs_its_own_loop():
+    client, fake = make_client()
+
+    result = client.get_kline_bundles_batch({"BTCUSDT": 10, "ETHUSDT": 20}, interval="240")
+
+    assert result == {"BTCUSDT": ("240", 10), "ETHUSDT": ("240", 20)}
+    assert fake.threads == [threading.current_thread().name]
+
+
+def test_batch_inside_running_loop_does_not_raise():
+    client, fake = make_client()
+
+    async def caller():
+        return client.get_kline_bundles_batch({"BTCUSDT": 5}, interval="60")
+
+    assert asyncio.run(caller()) == {"BTCUSDT": ("60", 5)}
+    # asyncio.run внутри работающего loop недоступен: пакет ушел в отдельный поток.
+    assert fake.threads[0].startswith("kline-batch")
@@ -0,0 +1,182 @@
+"""
+Проверка адаптивного rate limit по заголовкам X-Bapi-Limit-* на локальном stub-сервере Bybit.
+Запуск: python -m pytest -q test_bybit_rate_limit_headers.py
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import symbol_universe
+from bybit_client_v2 import RATE_LIMIT_RET_CODE, BybitClient
+from rate_limiter import (
+    ACCOUNT_ENDPOINT_GROUP,
+    MARKET_ENDPOINT_GROUP,
+    TRADE_ENDPOINT_GROUP,
+    RateLimitBudget,
+    TokenBucketRateLimiter,
+)
+
+
+class StubBybitHandler(BaseHTTPRequestHandler):
+    """Отдает ответы из server.responses по очереди (дальше — успешный ответ без заголовков лимита)."""
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        server = self.server
+        with server.lock:
+            server.requests.append((time.monotonic(), parsed.path, parse_qs(parsed.query)))
+            scripted = server.responses.pop(0) if server.responses else {}
+
+        body = {
+            "retCode": scripted.get("retCode", 0),
+            "retMsg": "Too many visits!" if scripted.get("retCode") else "OK",
+            "result": scripted.get("result", {"list": []}),
+            "time": int(time.time() * 1000),
+        }
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in scripted.get("headers", {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def limit_headers(remaining: int, limit: int, reset_in_seconds: float) -> dict[str, int]:
+    return {
+        "X-Bapi-Limit-Status": remaining,
+        "X-Bapi-Limit": limit,
+        "X-Bapi-Limit-Reset-Timestamp": int((time.time() + reset_in_seconds) * 1000),
+    }
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBybitHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.responses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub_server):
+    # Бюджеты token bucket заведомо не ограничивают: темп задают только заголовки stub-сервера.
+    budget = RateLimitBudget(requests_per_second=1000, burst=1000)
+    limiter = TokenBucketRateLimiter(
+        {MARKET_ENDPOINT_GROUP: budget, TRADE_ENDPOINT_GROUP: budget, ACCOUNT_ENDPOINT_GROUP: budget},
+        adaptive_threshold=0.2,
+        backoff_max_seconds=5,
+    )
+    host, port = stub_server.server_address
+    return BybitClient(rate_limiter=limiter, base_url=f"http://{host}:{port}")
+
+
+def request_gaps(server) -> list[float]:
+    times = [item[0] for item in server.requests]
+    return [later - earlier for earlier, later in zip(times, times[1:])]
+
+
+def test_spare_quota_does_not_delay_requests(stub_server, client):
+    stub_server.responses = [{"headers": limit_headers(remaining=90, limit=100, reset_in_seconds=1.0)}] * 3
+
+    for _ in range(3):
+        assert client._request("get_instruments_info", category="spot")["retCode"] == 0
+
+    assert max(request_gaps(stub_server)) < 0.15
+    quota = client.rate_limiter.get_endpoint_quotas()["get_instruments_info"]
+    assert quota["limit"] == 100
+
+
+def test_exhausted_quota_waits_for_window_reset(stub_server, client):
+    stub_server.responses = [{"headers": limit_headers(remaining=0, limit=100, reset_in_seconds=0.6)}]
+
+    client._request("get_instruments_info", category="spot")
+    client._request("get_instruments_info", category="spot")
+
+    assert request_gaps(stub_server)[0] >= 0.45
+
+
+def test_low_quota_spreads_remaining_requests_until_reset(stub_server, client):
+    # Остаток 2 из 100 ниже порога 0.2: два оставшихся запроса растягиваются на ~0.8s до сброса окна.
+    stub_server.responses = [{"headers": limit_headers(remaining=2, limit=100, reset_in_seconds=0.8)}]
+
+    for _ in range(3):
+        client._request("get_instruments_info", category="spot")
+
+    gaps = request_gaps(stub_server)
+    assert gaps[0] < 0.15
+    assert gaps[1] >= 0.3
+
+
+def test_rate_limit_ret_code_backs_off_until_reset_and_retries(stub_server, client):
+    stub_server.responses = [
+        {"retCode": RATE_LIMIT_RET_CODE, "headers": limit_headers(remaining=0, limit=100, reset_in_seconds=0.5)},
+        {"headers": limit_headers(remaining=99, limit=100, reset_in_seconds=1.0)},
+    ]
+
+    response = client._request("get_instruments_info", category="spot")
+
+    assert response is not None and response["retCode"] == 0
+    assert len(stub_server.requests) == 2
+    assert request_gaps(stub_server)[0] >= 0.4
+    assert client.rate_limiter.get_endpoint_quotas()["get_instruments_info"]["remaining"] == 99
+
+
+def test_rate_limit_ret_code_without_reset_uses_exponential_back_off(stub_server, client):
+    stub_server.responses = [{"retCode": RATE_LIMIT_RET_CODE}, {"retCode": RATE_LIMIT_RET_CODE}, {}]
+
+    response = client._request("get_instruments_info", category="spot")
+
+    assert response is not None and response["retCode"] == 0
+    gaps = request_gaps(stub_server)
+    assert gaps[0] >= 0.9
+    assert gaps[1] >= 1.9
+
+
+def test_symbol_universe_fetch_goes_through_client(stub_server, client, monkeypatch):
+    monkeypatch.setattr(symbol_universe, "bybit_client", client)
+    stub_server.responses = [
+        {
+            "result": {
+                "list": [
+                    {"symbol": "BTCUSDT", "quoteCoin": "USDT", "status": "Trading"},
+                    {"symbol": "ETHBTC", "quoteCoin": "BTC", "status": "Trading"},
+                ],
+                "nextPageCursor": "page2",
+            },
+            "headers": limit_headers(remaining=50, limit=100, reset_in_seconds=1.0),
+        },
+        {"result": {"list": [{"symbol": "SOLUSDT", "quoteCoin": "USDT", "status": "Trading"}], "nextPageCursor": ""}},
+    ]
+
+    assert symbol_universe.fetch_spot_usdt_symbols() == ["BTCUSDT", "SOLUSDT"]
+    assert stub_server.requests[1][2]["cursor"] == ["page2"]
+    assert "get_instruments_info" in client.rate_limiter.get_endpoint_quotas()
+
+
+def test_late_response_does_not_raise_quota(client):
+    limiter = client.rate_limiter
+    fresh = limit_headers(remaining=3, limit=100, reset_in_seconds=2.0)
+    limiter.observe_headers("get_tickers", fresh)
+
+    # Ответы, отправленные раньше, приходят позже: тот же сброс окна с большим остатком и прошлое окно.
+    limiter.observe_headers("get_tickers", {**fresh, "X-Bapi-Limit-Status": 40})
+    limiter.observe_headers("get_tickers", limit_headers(remaining=95, limit=100, reset_in_seconds=-1.0))
+    assert limiter.get_endpoint_quotas()["get_tickers"]["remaining"] == 3
+
+    limiter.observe_headers("get_tickers", limit_headers(remaining=99, limit=100, reset_in_seconds=4.0))
+    assert limiter.get_endpoint_quotas()["get_tickers"]["remaining"] == 99
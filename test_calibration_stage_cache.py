@@ -0,0 +1,111 @@
+"""
+Проверка кэша стадий калибровки: повтор по той же закрытой свече не грузит свечи и не пересчитывает
+стадию, а новая свеча, смена config или результата вышестоящей стадии инвалидируют запись.
+Запуск: python -m pytest -q test_calibration_stage_cache.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import calibration_report_v3
+from calibration_report_v3 import (
+    CalibrationStageCache,
+    CalibrationStageEntry,
+    expected_last_closed_timestamp,
+    resolve_calibration_stage,
+)
+
+
+class FakeProvider:
+    """Свечи 4H, заканчивающиеся незакрытой текущей свечой; lag_bars сдвигает ряд в прошлое на столько баров."""
+
+    def __init__(self, lag_bars: int = 0):
+        self.lag_bars = lag_bars
+        self.calls = 0
+
+    def get_klines(self, symbol, interval, limit):
+        self.calls += 1
+        interval_ms = int(interval) * 60_000
+        last_open = expected_last_closed_timestamp(int(interval)) + interval_ms * (1 - self.lag_bars)
+        timestamps = last_open - interval_ms * np.arange(limit)[::-1]
+        close = np.linspace(100, 110, limit)
+        return pd.DataFrame(
+            {"timestamp": timestamps, "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1.0}
+        )
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    fake = FakeProvider()
+    monkeypatch.setattr(calibration_report_v3, "market_data_provider", fake)
+    return fake
+
+
+def resolve(cache, computed, config_hash="cfg", upstream_key=None):
+    def compute(df):
+        computed.append(len(df))
+        return f"result-{len(computed)}"
+
+    return resolve_calibration_stage(cache, "BTCUSDT", "4H", 240, 50, config_hash, upstream_key, compute)
+
+
+def test_same_closed_candle_is_served_from_cache(provider):
+    cache = CalibrationStageCache()
+    computed = []
+
+    first, rows = resolve(cache, computed)
+    second, cached_rows = resolve(cache, computed)
+
+    assert second is first and cached_rows == rows == 49
+    assert computed == [49]
+    assert provider.calls == 1
+    assert first.key == ("BTCUSDT", "4H", expected_last_closed_timestamp(240), "cfg")
+    # Первый прогон промахивается и по ожидаемой, и по фактической свече.
+    assert cache.get_stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_lagging_exchange_reuses_result_of_actual_last_candle(provider):
+    # Биржа еще не отдала последнюю закрытую свечу (и незакрытую текущую).
+    provider.lag_bars = 2
+    cache = CalibrationStageCache()
+    computed = []
+
+    first, _ = resolve(cache, computed)
+    second, _ = resolve(cache, computed)
+
+    # Ожидаемой свечи еще нет: свечи грузятся повторно, но стадия по той же свече не пересчитывается.
+    assert second is first
+    assert computed == [50]
+    assert provider.calls == 2
+
+
+def test_config_and_upstream_changes_invalidate_entry(provider):
+    cache = CalibrationStageCache()
+    computed = []
+    upstream = ("BTCUSDT", "12H", 1, "trend")
+
+    first, _ = resolve(cache, computed, upstream_key=upstream)
+    changed_config, _ = resolve(cache, computed, config_hash="cfg2", upstream_key=upstream)
+    changed_upstream, _ = resolve(cache, computed, config_hash="cfg2", upstream_key=("BTCUSDT", "12H", 2, "trend"))
+
+    assert len({first.result, changed_config.result, changed_upstream.result}) == 3
+    assert len(computed) == 3
+    # На (symbol, stage) хранится только последний результат.
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_newer_candle_replaces_entry():
+    cache = CalibrationStageCache()
+    old = CalibrationStageEntry(("BTCUSDT", "1H", 1_000, "cfg"), None, "old", 10, "t0")
+    cache.put(old)
+
+    assert cache.get(("BTCUSDT", "1H", 1_000, "cfg"), None) is old
+    assert cache.get(("BTCUSDT", "1H", 4_600_000, "cfg"), None) is None
+
+    cache.put(CalibrationStageEntry(("BTCUSDT", "1H", 4_600_000, "cfg"), None, "new", 10, "t1"))
+    assert cache.get(("BTCUSDT", "1H", 1_000, "cfg"), None) is None
+    assert cache.get(("BTCUSDT", "1H", 4_600_000, "cfg"), None).result == "new"
+
+    cache.clear()
+    assert cache.get_stats() == {"entries": 0, "hits": 0, "misses": 0}
@@ -0,0 +1,88 @@
+"""
+Проверка CandleCloseScheduler на подменных часах: границы свечей с settle delay, совпадающие закрытия
+таймфреймов, периодические задачи, схлопывание пропущенных срабатываний и смещение по серверному времени.
+Запуск: python -m pytest -q test_candle_scheduler.py
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import candle_scheduler
+from candle_scheduler import CandleCloseScheduler
+
+
+HOUR = 3600
+DAY_START = 1_700_006_400  # кратно 12 часам
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = {"now": float(DAY_START), "slept": []}
+
+    def sleep(seconds):
+        state["slept"].append(seconds)
+        state["now"] += seconds
+
+    monkeypatch.setattr(candle_scheduler, "time", SimpleNamespace(time=lambda: state["now"], sleep=sleep))
+    return state
+
+
+def make_scheduler(settle: float = 5.0) -> CandleCloseScheduler:
+    return CandleCloseScheduler({"60": HOUR, "240": 4 * HOUR, "720": 12 * HOUR}, {"monitor": 900}, settle_delay_seconds=settle)
+
+
+def test_wakes_on_candle_boundaries_plus_settle_delay(clock):
+    clock["now"] = DAY_START + 30 * 60
+    scheduler = make_scheduler()
+
+    assert scheduler.start() == {"60", "240", "720", "monitor"}
+    assert scheduler.seconds_until_next() == pytest.approx(900)
+
+    assert scheduler.wait_next() == {"monitor"}
+    assert scheduler.wait_next() == {"monitor"}
+    assert scheduler.wait_next() == {"60"}
+    assert clock["now"] == DAY_START + HOUR + 5
+
+    due = set()
+    while "240" not in due:
+        due = scheduler.wait_next()
+    # На границе 4H закрываются сразу 1H и 4H; периодическая задача идет своим шагом.
+    assert clock["now"] == DAY_START + 4 * HOUR + 5
+    assert due == {"60", "240"}
+
+
+def test_start_inside_settle_window_does_not_skip_new_candle(clock):
+    clock["now"] = DAY_START + 12 * HOUR + 2
+    scheduler = make_scheduler()
+    scheduler.start()
+
+    # Свеча закрылась 2 секунды назад: ее закрытие еще впереди через settle delay, а не через час.
+    assert scheduler.seconds_until_next() == pytest.approx(3)
+    assert scheduler.wait_next() == {"60", "240", "720"}
+
+
+def test_overrun_collapses_missed_events_into_one(clock):
+    scheduler = make_scheduler(settle=0)
+    scheduler.start()
+
+    clock["now"] += 4 * HOUR + 10
+    assert scheduler.wait_next() == {"60", "240", "monitor"}
+    assert clock["slept"] == []
+    # Следующие срабатывания — уже после текущего момента, без очереди пропущенных.
+    assert scheduler.seconds_until_next() > 0
+    assert scheduler.wait_next() == {"monitor"}
+
+
+def test_server_time_offset_shifts_boundaries(clock):
+    clock["now"] = DAY_START + 30 * 60
+    scheduler = make_scheduler(settle=0)
+    server = SimpleNamespace(get_server_time=lambda: {"timeSecond": str(int(clock["now"]) + 120)})
+
+    assert scheduler.sync_server_time(server) == pytest.approx(120)
+    scheduler.start()
+
+    assert scheduler.wait_next() == {"monitor"}
+    assert scheduler.wait_next() == {"60"}
+    # Час на бирже закрылся на 2 минуты раньше по локальным часам.
+    assert clock["now"] == DAY_START + HOUR - 120
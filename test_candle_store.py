@@ -0,0 +1,100 @@
+"""
+Проверка локального хранилища свечей: запись и чтение хвоста, компакция по max_rows и дозагрузка
+только новых баров в BybitClient.get_kline_bundle.
+Запуск: python -m pytest -q test_candle_store.py
+"""
+
+import time
+
+import numpy as np
+
+from bybit_client_v2 import BybitClient
+from candle_store import CandleStore
+
+
+HOUR_MS = 3_600_000
+
+
+def make_rows(start_ts: int, count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    return np.column_stack(
+        [
+            start_ts + np.arange(count, dtype=np.float64) * HOUR_MS,
+            close + rng.normal(0, 0.1, count),
+            close + 1,
+            close - 1,
+            close,
+            rng.random(count) * 10,
+            rng.random(count) * 1000,
+        ]
+    )
+
+
+class FakeExchange:
+    """Отдает get_kline как Bybit: от новых к старым, строками; последний бар еще не закрыт."""
+
+    def __init__(self, hours: int):
+        self.params = []
+        self.server_time_ms = int(time.time() * 1000)
+        self.current_hour = (self.server_time_ms // HOUR_MS) * HOUR_MS
+        self.rows = make_rows(self.current_hour - (hours - 1) * HOUR_MS, hours, seed=1)
+
+    def __call__(self, method_name: str, **params) -> dict:
+        assert method_name == "get_kline"
+        self.params.append(params)
+        rows = self.rows
+        if "start" in params:
+            rows = rows[rows[:, 0] >= params["start"]][: params["limit"]]
+        else:
+            rows = rows[-params["limit"]:]
+        klines = [[f"{value:.10g}" for value in row] for row in rows[::-1]]
+        return {"retCode": 0, "result": {"list": klines}, "time": self.server_time_ms}
+
+
+def test_append_and_load_tail_round_trip(tmp_path):
+    store = CandleStore(tmp_path, max_rows=1000)
+    rows = make_rows(0, 50)
+
+    assert store.append("linear", "btcusdt", "60", rows[:30]) == 30
+    # Пересекающийся кусок: дописываются только бары новее последнего сохраненного.
+    assert store.append("linear", "BTCUSDT", "60", rows[20:]) == 20
+
+    np.testing.assert_array_equal(store.load("LINEAR", "BTCUSDT", "60"), rows)
+    np.testing.assert_array_equal(store.load("linear", "BTCUSDT", "60", tail=7), rows[-7:])
+    assert store.row_count("linear", "BTCUSDT", "60") == 50
+    assert store.last_timestamp("linear", "BTCUSDT", "60") == int(rows[-1, 0])
+    assert store.load("linear", "ETHUSDT", "60").shape == (0, 7)
+
+
+def test_append_compacts_to_max_rows(tmp_path):
+    store = CandleStore(tmp_path, max_rows=40)
+    rows = make_rows(0, 100)
+
+    store.append("linear", "BTCUSDT", "60", rows[:30])
+    store.append("linear", "BTCUSDT", "60", rows[30:])
+
+    np.testing.assert_array_equal(store.load("linear", "BTCUSDT", "60"), rows[-40:])
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_get_kline_bundle_fetches_only_new_bars(tmp_path):
+    exchange = FakeExchange(hours=500)
+    client = BybitClient(candle_store=CandleStore(tmp_path), base_url="http://127.0.0.1:9")
+    client._request = exchange
+
+    first = client.get_kline_bundle("BTCUSDT", interval="60", limit=200, category="linear")
+    store_rows = client.candle_store.load("linear", "BTCUSDT", "60")
+    # В хранилище попадают только закрытые бары; открытый текущий час остается в ответе.
+    np.testing.assert_allclose(store_rows, exchange.rows[-200:-1])
+
+    # Биржа закрыла текущий час и открыла следующий.
+    exchange.rows = np.vstack([exchange.rows, make_rows(exchange.current_hour + HOUR_MS, 1, seed=2)])
+    exchange.server_time_ms += HOUR_MS
+    second = client.get_kline_bundle("BTCUSDT", interval="60", limit=200, category="linear")
+
+    assert exchange.params[0] == {"category": "linear", "symbol": "BTCUSDT", "interval": "60", "limit": 200}
+    assert exchange.params[1]["start"] == int(store_rows[-1, 0]) + HOUR_MS
+    np.testing.assert_allclose(first.columns.T, exchange.rows[-201:-1])
+    np.testing.assert_allclose(second.columns.T, exchange.rows[-200:])
+    np.testing.assert_allclose(client.candle_store.load("linear", "BTCUSDT", "60"), exchange.rows[-201:-1])
@@ -1,6 +1,7 @@
 """
 Тестовый скрипт для проверки аварийной системы уведомлений
 Запустите этот файл для проверки работоспособности send_emergency_alert
+Отправка асинхронная: функции возвращают handle, здесь ждем результат через .result()
 """
 
 from telegram_utils import send_emergency_alert, send_telegram_message
@@ -12,22 +13,22 @@ print("="*60)
 # Тест 1: Простое уведомление
 print("\n1️⃣ Тест ANALYSIS error...")
 result1 = send_emergency_alert('ANALYSIS', symbol='BTCUSDT', details='Test error message')
-print(f"Результат: {'✅ Отправлено' if result1 else '❌ Не отправлено'}")
+print(f"Результат: {'✅ Отправлено' if result1.result(timeout=60) else '❌ Не отправлено'}")
 
 # Тест 2: Telegram ошибка
 print("\n2️⃣ Тест TELEGRAM error...")
 result2 = send_emergency_alert('TELEGRAM', symbol='ETHUSDT', details='Failed to send main message')
-print(f"Результат: {'✅ Отправлено' if result2 else '❌ Не отправлено'}")
+print(f"Результат: {'✅ Отправлено' if result2.result(timeout=60) else '❌ Не отправлено'}")
 
 # Тест 3: Критическая ошибка (самая важная!)
 print("\n3️⃣ Тест CRITICAL error...")
 result3 = send_emergency_alert('CRITICAL', details='ENTER signal LONG @ 0.0374')
-print(f"Результат: {'✅ Отправлено' if result3 else '❌ Не отправлено'}")
+print(f"Результат: {'✅ Отправлено' if result3.result(timeout=60) else '❌ Не отправлено'}")
 
 # Тест 4: API ошибка
 print("\n4️⃣ Тест API error...")
 result4 = send_emergency_alert('API', symbol='SOLUSDT', details='Bybit API timeout')
-print(f"Результат: {'✅ Отправлено' if result4 else '❌ Не отправлено'}")
+print(f"Результат: {'✅ Отправлено' if result4.result(timeout=60) else '❌ Не отправлено'}")
 
 # Тест 5: Сравнение с обычным сообщением (может не пройти из-за спецсимволов)
 print("\n5️⃣ Тест обычного сообщения (может упасть)...")
@@ -36,13 +37,13 @@ result5 = send_telegram_message(
     "Цена < EMA9 → тест символов\n"
     "Тренд: BEARISH"
 )
-print(f"Результат: {'✅ Отправлено' if result5 else '❌ Не отправлено'}")
+print(f"Результат: {'✅ Отправлено' if result5.result(timeout=60) else '❌ Не отправлено'}")
 
 print("\n" + "="*60)
 print("🏁 ТЕСТИРОВАНИЕ ЗАВЕРШЕНО")
 print("="*60)
 
-if all([result1, result2, result3, result4]):
+if all(result.result() for result in [result1, result2, result3, result4]):
     print("✅ ВСЕ АВАРИЙНЫЕ УВЕДОМЛЕНИЯ РАБОТАЮТ!")
 else:
     print("⚠️ Некоторые уведомления не доставлены - проверьте конфигурацию")
@@ -0,0 +1,83 @@
+"""
+Проверка компактных результатов фильтров: флаги условий, details собирается по запросу,
+а detailed=False дает то же решение и флаги, что полный результат, без диагностических секций.
+Запуск: python -m pytest -q test_filter_result.py
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyzes.entry_trigger_1h import entry_trigger_1h
+from analyzes.filter_result import CONDITION_SKIPPED, ConditionFlags
+from analyzes.setup_filter_4h import setup_filter_4h
+from analyzes.trend_filter_12h_v2 import trend_filter_12h
+
+
+SETUP_OK = SimpleNamespace(passed=True, setup_state="setup_ok", reason="4h setup OK")
+
+FILTERS = {
+    "12H": lambda df, detailed: trend_filter_12h(df, detailed=detailed),
+    "4H": lambda df, detailed: setup_filter_4h(df, trend_bias_passed=True, detailed=detailed),
+    "1H": lambda df, detailed: entry_trigger_1h(df, setup_result=SETUP_OK, detailed=detailed),
+}
+
+
+def make_candles(rng: np.random.Generator, rows: int = 400) -> pd.DataFrame:
+    close = 100 * np.exp(np.cumsum(rng.normal(rng.uniform(-0.003, 0.005), 0.02, rows)))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame(
+        {
+            "open": open_,
+            "high": np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, rows)),
+            "low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, rows)),
+            "close": close,
+            "volume": rng.uniform(1, 10, rows),
+        },
+        index=pd.date_range("2024-01-01", periods=rows, freq="h", tz="UTC"),
+    )
+
+
+def test_condition_flags_round_trip():
+    keys = ("a", "b", "c", "d")
+    flags = ConditionFlags.from_mapping(keys, {"a": True, "b": False, "d": np.bool_(True)})
+
+    assert flags.values.dtype == np.int8
+    assert flags.values.tolist() == [1, 0, CONDITION_SKIPPED, 1]
+    assert flags.to_dict() == {"a": True, "b": False, "d": True}
+    assert flags.failed() == ["b"] and flags.skipped_keys() == ["c"]
+    assert flags.passed_count() == 2
+    assert flags.any_skipped and flags.any_evaluated
+    assert not ConditionFlags.skipped(keys).any_evaluated
+
+
+@pytest.mark.parametrize("label", list(FILTERS))
+def test_compact_result_matches_detailed_result(label):
+    run = FILTERS[label]
+    rng = np.random.default_rng(29)
+    for _ in range(20):
+        df = make_candles(rng)
+        full = run(df, True)
+        compact = run(df, False)
+
+        assert not hasattr(compact, "__dict__")
+        assert compact.extra is None
+        for name in ("passed", "hard_passed", "soft_score", "reason", "hard_conditions", "soft_conditions"):
+            assert getattr(compact, name) == getattr(full, name)
+        # Без диагностики details — подмножество полного словаря с теми же значениями.
+        compact_details = compact.details
+        assert set(compact_details) <= set(full.details)
+        for key, value in compact_details.items():
+            assert full.details[key] == value
+
+
+def test_details_is_rebuilt_on_every_access():
+    result = trend_filter_12h(make_candles(np.random.default_rng(1)))
+
+    details = result.details
+    details["hard_conditions"]["close_above_ema200"] = "changed"
+
+    assert result.details is not details
+    assert result.details["hard_conditions"] == result.hard_conditions
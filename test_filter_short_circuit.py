@@ -0,0 +1,88 @@
+"""
+Проверка short-circuit режима фильтров 12H/4H/1H: решение, состояние и reason совпадают с полным
+режимом, а непроверенные soft-условия отображаются как пропущенные, а не как проваленные.
+Запуск: python -m pytest -q test_filter_short_circuit.py
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyzes.entry_trigger_1h import entry_trigger_1h
+from analyzes.setup_filter_4h import setup_filter_4h
+from analyzes.trend_filter_12h_v2 import trend_filter_12h
+from strategies.utils import format_bias_summary, format_setup_summary, format_trigger_summary
+
+
+SETUP_OK = SimpleNamespace(passed=True, setup_state="setup_ok", reason="4h setup OK")
+
+FILTERS = {
+    "12H": (lambda df, short_circuit: trend_filter_12h(df, short_circuit=short_circuit), format_bias_summary),
+    "4H": (
+        lambda df, short_circuit: setup_filter_4h(df, trend_bias_passed=True, short_circuit=short_circuit),
+        format_setup_summary,
+    ),
+    "1H": (
+        lambda df, short_circuit: entry_trigger_1h(df, setup_result=SETUP_OK, short_circuit=short_circuit),
+        format_trigger_summary,
+    ),
+}
+
+
+def make_candles(rng: np.random.Generator, rows: int = 400) -> pd.DataFrame:
+    returns = rng.normal(rng.uniform(-0.004, 0.006), 0.02, rows)
+    close = 100 * np.exp(np.cumsum(returns))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame(
+        {
+            "open": open_,
+            "high": np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, rows)),
+            "low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, rows)),
+            "close": close,
+            "volume": rng.uniform(1, 10, rows),
+        },
+        index=pd.date_range("2024-01-01", periods=rows, freq="h", tz="UTC"),
+    )
+
+
+def decision(result) -> tuple:
+    return (
+        result.passed,
+        result.hard_passed,
+        result.reason,
+        result.hard_conditions,
+        getattr(result, "setup_state", None),
+        getattr(result, "trigger_state", None),
+        getattr(result, "action", None),
+    )
+
+
+@pytest.mark.parametrize("label", list(FILTERS))
+def test_short_circuit_matches_full_mode(label):
+    run, summarize = FILTERS[label]
+    rng = np.random.default_rng(11)
+    short_circuited = 0
+    for _ in range(60):
+        df = make_candles(rng)
+        full = run(df, False)
+        fast = run(df, True)
+
+        assert decision(fast) == decision(full)
+        if not fast.short_circuit:
+            assert summarize(label, fast) == summarize(label, full)
+            continue
+
+        short_circuited += 1
+        summary = summarize(label, fast)
+        assert "Soft: skipped" in summary
+        assert f"Reason: {full.reason}" in summary
+        # Пропущенные soft-условия не попадают в словарь и не считаются проваленными.
+        details = fast.details
+        assert details["soft_score_actual"] is None
+        assert set(details["soft_conditions_skipped"]).isdisjoint(fast.soft_conditions)
+        for key, value in fast.soft_conditions.items():
+            assert value == full.soft_conditions[key]
+
+    assert short_circuited > 0
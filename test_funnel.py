@@ -0,0 +1,135 @@
+"""
+Проверка воронки MULTI_TF: пакетный прогон MultiTimeframeFunnelExecutor дает те же сигналы и состояния,
+что поштучный analyze_symbol, и на 4H/1H оценивает только выживших.
+Запуск: python -m pytest -q test_funnel.py
+"""
+
+import logging
+import time
+
+import numpy as np
+import pytest
+
+import strategies.multi_tf_trend_strategy as multi_tf_module
+from analyzes.indicator_cache import indicator_cache
+from ohlcv_bundle import OHLCVBundle
+from strategies.base import StrategyContext, StrategyRuntimeConfig
+from strategies.funnel import MultiTimeframeFunnelExecutor
+from strategies.multi_tf_trend_strategy import MultiTimeframeTrendStrategy
+
+
+class FakeTracker:
+    def __init__(self):
+        self.states = {}
+        self.active_trades = {}
+
+    def should_analyze(self, symbol, timeframe):
+        return True
+
+    def get_state(self, symbol, key, default=None):
+        return self.states.get(symbol, {}).get(key, default)
+
+    def set_state(self, symbol, key, value):
+        self.states.setdefault(symbol, {})[key] = value
+
+    def clear_state(self, symbol, *keys):
+        for key in keys:
+            self.states.get(symbol, {}).pop(key, None)
+
+
+class FakeProvider:
+    """Закрытые свечи 12H/4H/1H по символу; у каждого второго символа — восходящий тренд."""
+
+    def __init__(self, symbols: list[str], seed: int = 0):
+        self.series = {}
+        self.prefetched = {}
+        rng = np.random.default_rng(seed)
+        for index, symbol in enumerate(symbols):
+            trending = index % 2 == 0
+            self.series[symbol] = {
+                interval: self._make_rows(rng, interval, 0.002 * interval / 720 if trending else rng.uniform(-0.002, 0.002))
+                for interval in (720, 240, 60)
+            }
+
+    @staticmethod
+    def _make_rows(rng, interval: int, drift: float, rows: int = 400) -> np.ndarray:
+        interval_ms = interval * 60_000
+        last_closed = (int(time.time() * 1000) // interval_ms - 1) * interval_ms
+        timestamps = last_closed - interval_ms * np.arange(rows, dtype=np.float64)[::-1]
+        close = 100 * np.exp(np.cumsum(rng.normal(drift, 0.01 * np.sqrt(interval / 60), rows)))
+        open_ = np.r_[close[0], close[:-1]]
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, rows))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, rows))
+        volume = rng.uniform(100, 1000, rows)
+        return np.column_stack([timestamps, open_, high, low, close, volume, volume * close])
+
+    def get_ohlcv(self, symbol, interval):
+        return OHLCVBundle.from_rows(self.series[symbol][int(interval)])
+
+    def prefetch(self, symbols, interval):
+        self.prefetched.setdefault(interval, []).extend(symbols)
+
+
+@pytest.fixture(autouse=True)
+def quiet_side_effects(monkeypatch):
+    monkeypatch.setattr(multi_tf_module, "send_telegram_message", lambda *args, **kwargs: None)
+    monkeypatch.setattr(multi_tf_module, "handle_multitimeframe_entry_signal", lambda *args, **kwargs: None)
+    indicator_cache.clear()
+    yield
+    indicator_cache.clear()
+
+
+def make_contexts(provider: FakeProvider, tracker: FakeTracker) -> list[StrategyContext]:
+    loggers = {timeframe: logging.getLogger(f"test_funnel.{timeframe}") for timeframe in ("12H", "4H", "1H", "MONITOR")}
+    return [StrategyContext(symbol, tracker, loggers, provider) for symbol in provider.series]
+
+
+def make_strategy() -> MultiTimeframeTrendStrategy:
+    parameters = {
+        "trend_min_soft_conditions_passed": 1,
+        "setup_min_soft_conditions_passed": 1,
+        "entry_min_soft_conditions_passed": 1,
+    }
+    return MultiTimeframeTrendStrategy(StrategyRuntimeConfig(parameters=parameters))
+
+
+def signal_view(signals) -> list[tuple]:
+    return [(signal.timeframe, signal.stage, signal.action, signal.summary) for signal in signals]
+
+
+def state_view(tracker: FakeTracker) -> dict:
+    return {
+        symbol: {key: (value["action"], value["summary"]) for key, value in states.items()}
+        for symbol, states in tracker.states.items()
+        if states
+    }
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_funnel_matches_per_symbol_analysis(max_workers):
+    symbols = [f"S{index:02d}USDT" for index in range(18)]
+    provider = FakeProvider(symbols, seed=2)
+
+    sequential_tracker = FakeTracker()
+    strategy = make_strategy()
+    expected = {context.symbol: strategy.analyze_symbol(context) for context in make_contexts(provider, sequential_tracker)}
+
+    indicator_cache.clear()
+    funnel_tracker = FakeTracker()
+    result = MultiTimeframeFunnelExecutor(make_strategy(), max_workers=max_workers).run(make_contexts(provider, funnel_tracker))
+
+    assert not result.errors
+    assert {symbol: signal_view(signals) for symbol, signals in result.signals.items()} == {
+        symbol: signal_view(signals) for symbol, signals in expected.items()
+    }
+    assert state_view(funnel_tracker) == state_view(sequential_tracker)
+
+    stages = {stage.timeframe: stage for stage in result.stages}
+    assert stages["12H"].candidates == len(symbols)
+    assert stages["4H"].candidates == stages["12H"].survivors
+    assert stages["1H"].candidates == stages["4H"].survivors
+    # Набор подобран так, что воронка доходит до 1H, но отсеивает часть символов раньше.
+    assert 0 < stages["1H"].candidates < stages["4H"].candidates < len(symbols)
+    assert sorted(provider.prefetched["240"]) == sorted(
+        symbol for symbol, signals in expected.items() if any(signal.timeframe == "4H" for signal in signals)
+    )
@@ -0,0 +1,96 @@
+"""
+Проверка IndicatorCache: ключ различает символ, таймфрейм, параметры и окно (включая close live-свечи),
+не зависит от порядка параметров, а LRU вытесняет давно не читанные записи.
+Запуск: python -m pytest -q test_indicator_cache.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from analyzes.indicator_cache import IndicatorCache
+from analyzes.indicator_engine import compute_full_indicator
+
+
+def make_candles(rows: int = 60, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    return pd.DataFrame(
+        {"open": close, "high": close + 1, "low": close - 1, "close": close, "volume": rng.random(rows) * 10},
+        index=pd.date_range("2024-01-01", periods=rows, freq="h", tz="UTC"),
+    )
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def test_key_separates_symbol_timeframe_params_and_window():
+    cache = IndicatorCache(max_entries=100)
+    df = make_candles()
+    compute = Counter()
+
+    first = cache.get("BTCUSDT", "60", df, "custom", compute, period=14, fast=True)
+    # Порядок params и регистр символа не меняют ключ.
+    assert cache.get("btcusdt", "60", df, "custom", compute, fast=True, period=14) == first
+
+    live = df.copy()
+    live.iloc[-1, live.columns.get_loc("close")] += 0.5
+    variants = [
+        ("ETHUSDT", "60", df, {"period": 14, "fast": True}),
+        ("BTCUSDT", "240", df, {"period": 14, "fast": True}),
+        ("BTCUSDT", "60", df, {"period": 21, "fast": True}),
+        ("BTCUSDT", "60", df.iloc[1:], {"period": 14, "fast": True}),
+        ("BTCUSDT", "60", df.iloc[:-1], {"period": 14, "fast": True}),
+        ("BTCUSDT", "60", live, {"period": 14, "fast": True}),
+    ]
+    for symbol, timeframe, window, params in variants:
+        cache.get(symbol, timeframe, window, "custom", compute, **params)
+
+    assert compute.calls == 1 + len(variants)
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_without_symbol_cache_is_bypassed():
+    cache = IndicatorCache(max_entries=100)
+    df = make_candles()
+    compute = Counter()
+
+    cache.get(None, "60", df, "custom", compute)
+    cache.get("UNKNOWN", "60", df, "custom", compute)
+
+    assert compute.calls == 2
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_lru_evicts_least_recently_read_entry():
+    cache = IndicatorCache(max_entries=2)
+    windows = {symbol: make_candles(seed=index) for index, symbol in enumerate(("A", "B", "C"))}
+    compute = Counter()
+
+    cache.get("A", "60", windows["A"], "custom", compute)
+    cache.get("B", "60", windows["B"], "custom", compute)
+    cache.get("A", "60", windows["A"], "custom", compute)
+    cache.get("C", "60", windows["C"], "custom", compute)
+
+    assert cache.get_stats()["evictions"] == 1
+    calls = compute.calls
+    cache.get("A", "60", windows["A"], "custom", compute)
+    assert compute.calls == calls
+    cache.get("B", "60", windows["B"], "custom", compute)
+    assert compute.calls == calls + 1
+
+
+def test_put_is_read_back_by_get_and_engine_values_match_full_recompute():
+    cache = IndicatorCache(max_entries=100)
+    df = make_candles(200)
+
+    cache.put("BTCUSDT", "60", df, "ema", "primed", period=20)
+    assert cache.get("BTCUSDT", "60", df, "ema", period=20) == "primed"
+
+    engine = cache.get("ETHUSDT", "60", df, "rsi", period=14)
+    np.testing.assert_allclose(engine.to_numpy(), compute_full_indicator("rsi", df, {"period": 14}).to_numpy(), rtol=1e-9)
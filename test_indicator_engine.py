@@ -0,0 +1,101 @@
+"""
+Проверка IndicatorEngine: значения по окну совпадают с полным pandas-пересчетом по тому же окну,
+независимо от того, сколько истории движок видел раньше.
+Запуск: python -m pytest -q test_indicator_engine.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyzes.indicator_engine import IndicatorEngine, compute_full_indicator
+
+
+INDICATORS = [
+    ("ema", {"period": 200}),
+    ("ema", {"period": 50}),
+    ("atr", {"period": 14}),
+    ("adx", {"period": 14}),
+    ("rsi", {"period": 14}),
+    ("obv", {"ma_period": 20, "fast_ema_period": 10, "slow_ema_period": 30}),
+]
+
+
+def make_candles(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = np.abs(50 + np.cumsum(rng.normal(0, 0.5, rows))) + 5
+    return pd.DataFrame(
+        {
+            "open": close + rng.normal(0, 0.2, rows),
+            "high": close + rng.random(rows),
+            "low": close - rng.random(rows),
+            "close": close,
+            "volume": rng.random(rows) * 1e6,
+        },
+        index=pd.date_range("2024-01-01", periods=rows, freq="12h", tz="UTC"),
+    )
+
+
+def assert_frames_close(actual: pd.DataFrame, expected: pd.DataFrame, rtol: float = 1e-9) -> None:
+    """Допуск масштабируется по максимуму колонки, как в IndicatorEngine.validate()."""
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns:
+        reference = expected[column].to_numpy(dtype=float)
+        scale = max(np.nanmax(np.abs(reference), initial=0.0), 1.0)
+        np.testing.assert_allclose(
+            actual[column].to_numpy(dtype=float), reference, rtol=0, atol=rtol * scale, equal_nan=True,
+            err_msg=column,
+        )
+
+
+def assert_window_equivalent(engine: IndicatorEngine, window: pd.DataFrame, name: str, params: dict) -> None:
+    streamed = engine.get("TESTUSDT", "720", window, name, **params)
+    assert streamed.index.equals(window.index)
+    assert_frames_close(streamed, compute_full_indicator(name, window, params))
+
+
+@pytest.mark.parametrize("name,params", INDICATORS)
+def test_sliding_windows_match_full_recompute(name, params):
+    candles = make_candles(1300)
+    engine = IndicatorEngine(max_history=1000)
+    # Окна разной длины (калибровка и стратегия) по одному ряду, с компакцией истории по пути.
+    for step in range(0, 800, 7):
+        for length in (500, 400):
+            assert_window_equivalent(engine, candles.iloc[step:step + length], name, params)
+
+
+@pytest.mark.parametrize("name,params", INDICATORS)
+def test_result_does_not_depend_on_seen_history(name, params):
+    candles = make_candles(1500)
+    window = candles.iloc[-500:]
+
+    warmed = IndicatorEngine()
+    for step in range(0, 1000, 50):
+        warmed.get("TESTUSDT", "720", candles.iloc[step:step + 500], name, **params)
+    fresh = IndicatorEngine()
+
+    assert_frames_close(
+        warmed.get("TESTUSDT", "720", window, name, **params),
+        fresh.get("TESTUSDT", "720", window, name, **params),
+        rtol=1e-12,
+    )
+
+
+def test_validate_checks_callers_window():
+    candles = make_candles(900)
+    engine = IndicatorEngine()
+    for step in range(0, 400, 25):
+        window = candles.iloc[step:step + 500]
+        for name, params in INDICATORS:
+            engine.get("TESTUSDT", "720", window, name, **params)
+
+    report = engine.validate("TESTUSDT", "720", candles.iloc[-500:])
+    assert len(report) == len(INDICATORS)
+    assert max(report.values()) < 1e-9
+
+
+def test_window_with_gaps_falls_back_to_full_recompute():
+    window = make_candles(300)
+    window.iloc[100, window.columns.get_loc("close")] = np.nan
+    for name, params in INDICATORS:
+        assert_window_equivalent(IndicatorEngine(), window, name, params)
@@ -0,0 +1,169 @@
+"""
+Проверка MarketDataProvider на фейковом клиенте Bybit: кольцевой буфер отдает то же, что прямой запрос,
+4H/12H из 1H совпадают с нативными свечами, а повторные чтения ряда в пределах live TTL отдаются
+из буфера, в том числе для молодых листингов с историей короче запрошенного limit.
+Запуск: python -m pytest -q test_market_data.py
+"""
+
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import market_data
+from market_data import CandleRingBuffer, MarketDataProvider, resample_candles
+from ohlcv_bundle import OHLCVBundle
+
+
+HOUR_MS = 3_600_000
+
+
+class FakeKlineClient:
+    """Отдает последние limit свечей из hours часов истории; старшие интервалы — агрегаты тех же часов.
+
+    visible ограничивает уже наступившие часы: тест сдвигает его вместе с часами провайдера.
+    """
+
+    def __init__(self, hours: int, seed: int = 0):
+        self.calls = []
+        self.visible = hours
+        current_hour = (int(time.time() * 1000) // HOUR_MS) * HOUR_MS
+        timestamps = np.arange(current_hour - (hours - 1) * HOUR_MS, current_hour + 1, HOUR_MS, dtype=np.float64)
+        rng = np.random.default_rng(seed)
+        open_ = 100 + rng.random(len(timestamps))
+        close = open_ + rng.random(len(timestamps)) - 0.5
+        self.hours = np.column_stack(
+            [
+                timestamps,
+                open_,
+                np.maximum(open_, close) + rng.random(len(timestamps)),
+                np.minimum(open_, close) - rng.random(len(timestamps)),
+                close,
+                rng.random(len(timestamps)) * 10,
+                rng.random(len(timestamps)) * 1000,
+            ]
+        )
+
+    def native(self, interval: str) -> np.ndarray:
+        return resample_candles(self.hours[:self.visible], int(interval) * 60_000)
+
+    def get_kline_bundle(self, symbol, interval="60", limit=200, category="linear"):
+        self.calls.append((symbol, str(interval), limit))
+        return OHLCVBundle.from_rows(self.native(str(interval))[-limit:])
+
+    def get_kline_bundles_batch(self, limits, interval="60", category="linear"):
+        return {symbol: self.get_kline_bundle(symbol, interval, limit, category) for symbol, limit in limits.items()}
+
+
+def make_provider(client: FakeKlineClient) -> MarketDataProvider:
+    return MarketDataProvider(client, capacity=1000, live_ttl_seconds=60)
+
+
+def test_ring_buffer_view_matches_plain_tail():
+    rng = np.random.default_rng(3)
+    buffer = CandleRingBuffer(capacity=50)
+    rows = np.column_stack([np.arange(400, dtype=np.float64), rng.random((400, 6))])
+
+    position = 0
+    while position < len(rows):
+        step = int(rng.integers(1, 40))
+        # Пересечение с уже записанным куском не дублирует свечи.
+        buffer.extend(rows[max(0, position - 5):position + step])
+        position += step
+        expected = rows[:min(position, len(rows))][-50:]
+        np.testing.assert_array_equal(buffer.view(), expected)
+        np.testing.assert_array_equal(buffer.view(tail=7), expected[-7:])
+        assert buffer.last_timestamp == int(expected[-1, 0])
+    assert not buffer.view().flags.writeable
+
+
+def test_buffered_series_matches_direct_fetch():
+    client = FakeKlineClient(hours=3000, seed=1)
+    provider = make_provider(client)
+
+    for interval, limit in (("60", 200), ("60", 1000), ("240", 200), ("720", 200), ("720", 500)):
+        bundle = provider.get_ohlcv("BTCUSDT", interval, limit)
+        direct = client.get_kline_bundle("BTCUSDT", interval, limit)
+        np.testing.assert_array_equal(bundle.columns.T, direct.columns.T)
+
+
+def test_resampled_candles_match_native_candles(monkeypatch):
+    client = FakeKlineClient(hours=3000, seed=2)
+    client.visible = 3000 - 60
+    clock = {"ms": int(client.hours[client.visible - 1, 0]) + 1_800_000}
+    monkeypatch.setattr(market_data, "time", SimpleNamespace(time=lambda: clock["ms"] / 1000, monotonic=time.monotonic))
+    provider = make_provider(client)
+    limits = {"240": 200, "720": 150}
+    for interval, limit in limits.items():
+        provider.get_ohlcv("BTCUSDT", interval, limit)
+
+    # Прошло 60 часов: новые 4H и 12H свечи достраиваются из часового ряда, с биржи идет только 1H.
+    client.visible = 3000
+    clock["ms"] += 60 * HOUR_MS
+    calls = len(client.calls)
+    for interval, limit in limits.items():
+        bundle = provider.get_ohlcv("BTCUSDT", interval, limit)
+        np.testing.assert_array_equal(bundle.columns.T, client.native(interval)[-limit:])
+
+    assert [call[1] for call in client.calls[calls:]] == ["60"]
+
+
+def test_young_listing_hourly_series_is_served_from_buffer():
+    client = FakeKlineClient(hours=30 * 24)
+    provider = make_provider(client)
+
+    first = provider.get_ohlcv("NEWUSDT", "60", 1000)
+    calls = len(client.calls)
+    repeat = provider.get_ohlcv("NEWUSDT", "60", 1000)
+
+    assert len(client.calls) == calls == 1
+    assert len(first) == len(repeat) == 30 * 24
+    np.testing.assert_array_equal(repeat.columns.T, client.native("60"))
+
+
+def test_young_listing_resampled_series_repeat_makes_no_requests():
+    # 100 дней: часовой ряд (1000 баров) не покрывает 500 свечей 12H, а биржа отдает только 200.
+    client = FakeKlineClient(hours=100 * 24)
+    provider = make_provider(client)
+
+    provider.get_ohlcv("NEWUSDT", "720", 500)
+    calls = len(client.calls)
+    repeat = provider.get_ohlcv("NEWUSDT", "720", 500)
+
+    assert len(client.calls) == calls
+    np.testing.assert_array_equal(repeat.columns.T, client.native("720"))
+
+
+def test_resampled_series_is_built_from_complete_hourly_history():
+    client = FakeKlineClient(hours=20 * 24)
+    provider = make_provider(client)
+
+    for interval in ("720", "240", "60"):
+        bundle = provider.get_ohlcv("NEWUSDT", interval, 500)
+        np.testing.assert_array_equal(bundle.columns.T, client.native(interval))
+
+    # Вся история уже в часовом ряду: 4H и 12H собраны из него без прямых запросов.
+    assert client.calls == [("NEWUSDT", "60", 1000)]
+
+
+def test_prefetch_leaves_nothing_for_get_ohlcv_of_the_stage():
+    client = FakeKlineClient(hours=100 * 24)
+    provider = make_provider(client)
+
+    provider.prefetch(["NEWUSDT"], "720", 500)
+    calls = len(client.calls)
+    bundle = provider.get_ohlcv("NEWUSDT", "720", 500)
+
+    assert calls == 2
+    assert len(client.calls) == calls
+    np.testing.assert_array_equal(bundle.columns.T, client.native("720"))
+
+
+def test_prefetch_skips_direct_request_when_hourly_history_is_complete():
+    client = FakeKlineClient(hours=20 * 24)
+    provider = make_provider(client)
+
+    provider.prefetch(["NEWUSDT"], "720", 500)
+    provider.get_ohlcv("NEWUSDT", "720", 500)
+
+    assert client.calls == [("NEWUSDT", "60", 1000)]
@@ -0,0 +1,98 @@
+"""
+Проверка OHLCVBundle: разбор ответа Bybit, view без копий от бандла до DataFrame фильтра и тот же
+результат фильтров, что по обычному DataFrame.
+Запуск: python -m pytest -q test_ohlcv_bundle.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from analyzes.setup_filter_4h import setup_filter_4h
+from analyzes.trend_filter_12h_v2 import trend_filter_12h
+from ohlcv_bundle import OHLCVBundle, parse_kline_rows
+
+
+HOUR_MS = 3_600_000
+
+
+def make_rows(count: int, seed: int = 0, step_ms: int = HOUR_MS) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.001, 0.02, count)))
+    open_ = np.r_[close[0], close[:-1]]
+    volume = rng.uniform(1, 100, count)
+    return np.column_stack(
+        [
+            1_700_000_000_000 + step_ms * np.arange(count, dtype=np.float64),
+            open_,
+            np.maximum(open_, close) * 1.01,
+            np.minimum(open_, close) * 0.99,
+            close,
+            volume,
+            volume * close,
+        ]
+    )
+
+
+def as_klines(rows: np.ndarray) -> list[list[str]]:
+    return [[repr(float(value)) for value in row] for row in rows]
+
+
+def test_parse_kline_rows_orders_dedupes_and_drops_gaps():
+    rows = make_rows(6)
+    # Bybit отдает от новых к старым.
+    np.testing.assert_array_equal(parse_kline_rows(as_klines(rows[::-1])), rows)
+
+    shuffled = as_klines(rows[[3, 0, 5, 1, 4, 2]])
+    duplicate = rows[2].copy()
+    duplicate[4] = 1.0
+    broken = as_klines(rows[:1])[0]
+    broken[4] = "nan"
+    parsed = parse_kline_rows(shuffled + [as_klines(duplicate[None, :])[0], broken])
+
+    expected = rows.copy()
+    expected[2] = duplicate
+    # Дубль по timestamp заменяет прежнюю запись, строка с пропуском отбрасывается.
+    np.testing.assert_array_equal(parsed, expected)
+    assert parse_kline_rows([]).shape == (0, 7)
+
+
+def test_frame_and_views_share_memory_with_columns():
+    bundle = OHLCVBundle.from_rows(make_rows(50))
+    frame = bundle.frame()
+
+    assert frame is bundle.frame()
+    assert list(frame.columns) == ["open", "high", "low", "close", "volume"]
+    assert np.shares_memory(frame["close"].to_numpy(), bundle.columns)
+    assert np.shares_memory(bundle.tail(10).close, bundle.columns)
+    np.testing.assert_array_equal(bundle.tail(10).close, bundle.close[-10:])
+    assert len(bundle.tail(500)) == 50
+    assert frame.index[-1] == pd.Timestamp(int(bundle.timestamp[-1]), unit="ms", tz="UTC")
+
+
+def test_drop_incomplete_removes_only_open_candle():
+    bundle = OHLCVBundle.from_rows(make_rows(10))
+    last_ts = int(bundle.timestamp[-1])
+
+    assert len(bundle.drop_incomplete(60, now_ms=last_ts + 10)) == 9
+    assert bundle.drop_incomplete(60, now_ms=last_ts + HOUR_MS) is bundle
+
+
+def test_dataframe_round_trip():
+    bundle = OHLCVBundle.from_rows(make_rows(30))
+    kline_df = bundle.to_kline_dataframe()
+
+    assert kline_df["timestamp"].dtype == np.int64
+    np.testing.assert_array_equal(OHLCVBundle.from_dataframe(kline_df).columns, bundle.columns)
+    assert OHLCVBundle.from_dataframe(None).empty
+
+
+def test_filters_give_same_result_for_bundle_and_dataframe():
+    for step_hours, run in ((12, lambda data: trend_filter_12h(data)), (4, lambda data: setup_filter_4h(data, trend_bias_passed=True))):
+        for seed in range(5):
+            bundle = OHLCVBundle.from_rows(make_rows(400, seed, step_ms=step_hours * HOUR_MS))
+            from_bundle = run(bundle)
+            from_frame = run(bundle.frame().copy())
+
+            assert from_bundle.passed == from_frame.passed
+            assert from_bundle.reason == from_frame.reason
+            assert from_bundle.details == from_frame.details
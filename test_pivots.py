@@ -0,0 +1,72 @@
+"""
+Проверка векторизованного поиска pivot: совпадение с прежними поштучными циклами на 200 случайных рядах.
+Запуск: python -m pytest -q test_pivots.py
+"""
+
+import numpy as np
+import pytest
+
+from analyzes.pivots import find_pivots, pivot_high_indices, pivot_low_indices
+
+
+def loop_swings(high: np.ndarray, low: np.ndarray, left_bars: int, right_bars: int) -> tuple[list[int], list[int]]:
+    """Прежний поштучный поиск уникальных swing (как в find_confirmed_swings до векторизации)."""
+    highs, lows = [], []
+    for i in range(left_bars, len(high) - right_bars):
+        high_window = high[i - left_bars : i + right_bars + 1]
+        low_window = low[i - left_bars : i + right_bars + 1]
+        if high[i] == np.max(high_window) and np.sum(high_window == high[i]) == 1:
+            highs.append(i)
+        if low[i] == np.min(low_window) and np.sum(low_window == low[i]) == 1:
+            lows.append(i)
+    return highs, lows
+
+
+def loop_close_pivots(closes: np.ndarray, pivot_window: int) -> tuple[list[int], list[int]]:
+    """Прежний поштучный поиск pivot по close (как в OBV/RSI дивергенциях до векторизации)."""
+    pivot_highs, pivot_lows = [], []
+    for i in range(pivot_window, len(closes) - pivot_window):
+        window_prices = closes[i - pivot_window : i + pivot_window + 1]
+        if closes[i] == np.min(window_prices):
+            pivot_lows.append(i)
+        if closes[i] == np.max(window_prices):
+            pivot_highs.append(i)
+    return pivot_highs, pivot_lows
+
+
+def make_ohlc(bars: int, seed: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    # Округление до тика дает равные соседние значения, чтобы проверить правило уникальности.
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, bars)), 1)
+    high = close + np.round(rng.uniform(0, 1, bars), 1)
+    low = close - np.round(rng.uniform(0, 1, bars), 1)
+    return high, low, close
+
+
+def random_cases(count: int = 200):
+    rng = np.random.default_rng(13)
+    for seed in range(count):
+        yield seed, int(rng.integers(0, 400)), int(rng.integers(1, 6)), int(rng.integers(1, 6))
+
+
+@pytest.mark.parametrize("seed,bars,left_bars,right_bars", list(random_cases()))
+def test_vectorized_pivots_match_loops(seed, bars, left_bars, right_bars):
+    high, low, close = make_ohlc(bars, seed)
+
+    vector_highs, vector_lows = find_pivots(high, low, left_bars, right_bars, unique=True)
+    loop_highs, loop_lows = loop_swings(high, low, left_bars, right_bars)
+    assert vector_highs.tolist() == loop_highs
+    assert vector_lows.tolist() == loop_lows
+
+    loop_close_highs, loop_close_lows = loop_close_pivots(close, left_bars)
+    assert pivot_high_indices(close, left_bars, left_bars).tolist() == loop_close_highs
+    assert pivot_low_indices(close, left_bars, left_bars).tolist() == loop_close_lows
+
+
+def test_short_series_has_no_pivots():
+    high, low, _ = make_ohlc(4, seed=0)
+
+    vector_highs, vector_lows = find_pivots(high, low, 2, 2)
+
+    assert vector_highs.dtype == np.int64 and vector_highs.size == 0
+    assert vector_lows.size == 0
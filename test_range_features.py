@@ -0,0 +1,91 @@
+"""
+Проверка матрицы признаков Range Trading: каждый признак на каждом баре совпадает с pandas-расчетом
+range_trading, а маска флэта — с прежним is_market_in_range на linregress по окну df[:t + 1]
+(200 случайных рядов).
+Запуск: python -m pytest -q test_range_features.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from analyzes.range_features import build_range_feature_matrix, rolling_linregress
+from range_trading import calculate_atr, calculate_bollinger_bands, calculate_macd, calculate_rsi, calculate_stochastic
+
+
+def loop_is_market_in_range(df: pd.DataFrame, bb_width: pd.Series, period: int = 50) -> bool:
+    """Прежний is_market_in_range: отдельный linregress по последним period закрытиям."""
+    if len(df) < period + 10:
+        return False
+    prices = df['close'].iloc[-period:].values
+    if np.all(prices == prices[0]):
+        return False
+    slope, _, _, _, _ = stats.linregress(np.arange(len(prices)), prices)
+    slope_percent = (slope * len(prices)) / np.mean(prices) * 100
+    current_volatility = bb_width.iloc[-1]
+    avg_volatility = bb_width.iloc[-20:].mean()
+    price_range = (np.max(prices) - np.min(prices)) / np.mean(prices) * 100
+    return bool(abs(slope_percent) < 2.0 and current_volatility <= avg_volatility * 1.1 and price_range < 8.0)
+
+
+def make_candles(rng: np.random.Generator, rows: int) -> pd.DataFrame:
+    # Малая волатильность и слабый дрейф, чтобы во многих рядах встречался флэт.
+    close = 100 * np.exp(np.cumsum(rng.normal(rng.uniform(-0.002, 0.002), rng.uniform(0.002, 0.01), rows)))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame(
+        {
+            "open": open_,
+            "high": np.maximum(open_, close) * (1 + rng.uniform(0, 0.004, rows)),
+            "low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.004, rows)),
+            "close": close,
+            "volume": rng.uniform(1, 100, rows),
+        },
+        index=pd.date_range("2024-01-01", periods=rows, freq="h", tz="UTC"),
+    )
+
+
+def assert_series(actual: np.ndarray, expected: pd.Series) -> None:
+    np.testing.assert_allclose(actual, expected.to_numpy(dtype=float), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def random_cases(count: int = 200):
+    rng = np.random.default_rng(23)
+    for seed in range(count):
+        yield seed, int(rng.integers(40, 160))
+
+
+@pytest.mark.parametrize("seed,rows", list(random_cases()))
+def test_feature_matrix_matches_pandas_and_loop(seed, rows):
+    df = make_candles(np.random.default_rng(seed), rows)
+    features = build_range_feature_matrix(df)
+
+    middle, upper, lower, bb_width = calculate_bollinger_bands(df)
+    stoch_k, stoch_d = calculate_stochastic(df)
+    assert_series(features.middle_bb, middle)
+    assert_series(features.upper_bb, upper)
+    assert_series(features.lower_bb, lower)
+    assert_series(features.bb_width, bb_width)
+    assert_series(features.rsi, calculate_rsi(df))
+    assert_series(features.stoch_k, stoch_k)
+    assert_series(features.stoch_d, stoch_d)
+    assert_series(features.macd_hist, calculate_macd(df)[2])
+    assert_series(features.atr, calculate_atr(df))
+
+    expected_flat = [loop_is_market_in_range(df.iloc[:end], bb_width.iloc[:end]) for end in range(1, rows + 1)]
+    assert features.is_flat.tolist() == expected_flat
+
+
+def test_rolling_linregress_matches_scipy():
+    rng = np.random.default_rng(4)
+    values = 1000 + np.cumsum(rng.normal(0, 1, 300))
+
+    slope, r_value, mean = rolling_linregress(values, 50)
+
+    assert np.isnan(slope[:49]).all()
+    for end in range(50, len(values) + 1):
+        window = values[end - 50:end]
+        expected = stats.linregress(np.arange(50), window)
+        assert slope[end - 1] == pytest.approx(expected.slope, rel=1e-8, abs=1e-10)
+        assert r_value[end - 1] == pytest.approx(expected.rvalue, rel=1e-8, abs=1e-10)
+        assert mean[end - 1] == pytest.approx(window.mean(), rel=1e-12)
@@ -0,0 +1,77 @@
+"""
+Проверка token bucket: burst, равномерный темп после него, пополнение со временем, независимость групп
+и порядок выдачи слотов между потоками.
+Запуск: python -m pytest -q test_rate_limiter.py
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimitBudget, TokenBucketRateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = {"now": 1000.0}
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=lambda: state["now"], time=time.time, sleep=time.sleep))
+    return state
+
+
+def test_burst_then_even_spacing(clock):
+    limiter = TokenBucketRateLimiter({"market": RateLimitBudget(requests_per_second=10, burst=5)})
+
+    delays = [limiter.reserve("market") for _ in range(8)]
+
+    assert delays[:5] == [0.0] * 5
+    assert delays[5:] == pytest.approx([0.1, 0.2, 0.3])
+    stats = limiter.get_stats()["market"]
+    assert stats["acquired"] == 8 and stats["waited"] == 3
+    assert stats["max_wait_seconds"] == pytest.approx(0.3)
+
+
+def test_tokens_refill_with_time_up_to_burst(clock):
+    limiter = TokenBucketRateLimiter({"market": RateLimitBudget(requests_per_second=10, burst=3)})
+    for _ in range(3):
+        limiter.reserve("market")
+
+    clock["now"] += 0.2
+    assert [limiter.reserve("market") for _ in range(3)] == pytest.approx([0.0, 0.0, 0.1])
+
+    # Долгий простой не накапливает больше burst.
+    clock["now"] += 60
+    assert [limiter.reserve("market") for _ in range(4)] == pytest.approx([0.0, 0.0, 0.0, 0.1])
+
+
+def test_groups_have_independent_budgets(clock):
+    limiter = TokenBucketRateLimiter(
+        {"market": RateLimitBudget(requests_per_second=1, burst=1), "trade": RateLimitBudget(requests_per_second=1, burst=1)}
+    )
+
+    assert limiter.reserve("market") == 0.0
+    assert limiter.reserve("market") == pytest.approx(1.0)
+    assert limiter.reserve("trade") == 0.0
+    with pytest.raises(ValueError):
+        limiter.reserve("unknown")
+
+
+def test_concurrent_acquire_keeps_the_rate():
+    limiter = TokenBucketRateLimiter({"market": RateLimitBudget(requests_per_second=100, burst=1)})
+    started = time.monotonic()
+
+    def worker():
+        for _ in range(5):
+            limiter.acquire("market")
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    # 30 слотов при burst 1 и 100 в секунду: последний выдан не раньше чем через 0.29 с.
+    assert time.monotonic() - started >= 0.28
+    assert limiter.get_stats()["market"]["acquired"] == 30
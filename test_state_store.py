@@ -0,0 +1,122 @@
+"""
+Проверка SQLite-хранилища состояния: перенос старого JSON при первом открытии namespace, запись пачкой
+в одной транзакции и откат с повтором после ошибки записи.
+Запуск: python -m pytest -q test_state_store.py
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+import state_store
+from state_store import SQLiteStateStore, open_state_store
+
+
+def read_rows(db_path, namespace: str) -> dict:
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT key, value FROM state WHERE namespace = ?", (namespace,)).fetchall()
+    return {key: json.loads(value) for key, value in rows}
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / "state.sqlite3"
+    monkeypatch.setattr(state_store, "STATE_STORE_BACKEND", "sqlite")
+    monkeypatch.setattr(state_store, "STATE_STORE_BATCH_SIZE", 3)
+    monkeypatch.setattr(state_store, "STATE_STORE_COMMIT_INTERVAL_SECONDS", 3600)
+    monkeypatch.setattr(
+        state_store,
+        "SQLiteStateStore",
+        lambda namespace, seed=None: SQLiteStateStore(namespace, db_path=str(path), seed=seed),
+    )
+    yield path
+    state_store._close_databases()
+
+
+def reopen(db_path, namespace: str, legacy_path) -> state_store.StateStore:
+    state_store._close_databases()
+    return open_state_store(namespace, str(legacy_path))
+
+
+def test_legacy_json_is_migrated_once(db_path, tmp_path):
+    legacy = tmp_path / "obv_state.json"
+    legacy.write_text(json.dumps({"BTCUSDT": {"obv": 1.5}, "ETHUSDT": [1, 2]}), encoding="utf-8")
+
+    store = open_state_store("obv", str(legacy))
+    assert store.items() == {"BTCUSDT": {"obv": 1.5}, "ETHUSDT": [1, 2]}
+    assert read_rows(db_path, "obv") == store.items()
+
+    store.set("SOLUSDT", {"obv": 3})
+    store.delete("ETHUSDT")
+    store.flush()
+    # Старый файл после миграции больше не читается: его изменения не затирают БД.
+    legacy.write_text(json.dumps({"XRPUSDT": 1}), encoding="utf-8")
+
+    reopened = reopen(db_path, "obv", legacy)
+    assert reopened.items() == {"BTCUSDT": {"obv": 1.5}, "SOLUSDT": {"obv": 3}}
+
+
+def test_missing_legacy_file_uses_seed(db_path, tmp_path):
+    store = open_state_store("active_trades", str(tmp_path / "missing.json"), seed=lambda: {"version": 1})
+
+    assert store.items() == {"version": 1}
+
+
+def test_get_returns_independent_copy(db_path, tmp_path):
+    store = open_state_store("tracker", str(tmp_path / "missing.json"))
+    store.set("BTCUSDT", {"levels": [1, 2]})
+
+    value = store.get("BTCUSDT")
+    value["levels"].append(3)
+
+    assert store.get("BTCUSDT") == {"levels": [1, 2]}
+
+
+def test_writes_are_flushed_in_batches(db_path, tmp_path):
+    store = open_state_store("tracker", str(tmp_path / "missing.json"))
+
+    store.set("A", 1)
+    store.set("B", 2)
+    assert store.get("A") == 1
+    assert read_rows(db_path, "tracker") == {}
+
+    store.set("C", 3)
+    assert read_rows(db_path, "tracker") == {"A": 1, "B": 2, "C": 3}
+
+
+class FailingConnection:
+    """Обертка соединения: первый executemany падает, как при ошибке диска посреди транзакции."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self.failures = 1
+
+    def executemany(self, sql, rows):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("disk I/O error")
+        return self._conn.executemany(sql, rows)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_failed_flush_rolls_back_and_retries_without_losing_newer_values(db_path, tmp_path):
+    store = open_state_store("tracker", str(tmp_path / "missing.json"))
+    store.set("A", 1)
+    store.flush()
+    database = store._db
+    database._conn = FailingConnection(database._conn)
+
+    store.set("A", 2)
+    store.set("B", 2)
+    store.flush()
+    # Транзакция откатилась целиком, изменения остались в очереди.
+    assert not database._conn.in_transaction
+    assert read_rows(db_path, "tracker") == {"A": 1}
+    assert store.items() == {"A": 2, "B": 2}
+
+    store.set("A", 3)
+    store.flush()
+    assert read_rows(db_path, "tracker") == {"A": 3, "B": 2}
@@ -0,0 +1,68 @@
+"""
+Проверка пула воркеров StrategyRunner: параллельный прогон дает те же сигналы, что последовательный,
+стратегии символа идут по порядку в одном воркере, а ошибка символа не роняет остальные.
+Запуск: python -m pytest -q test_strategy_runner.py
+"""
+
+import threading
+import time
+
+from strategies.base import BaseStrategy, StrategyContext, StrategyRuntimeConfig, StrategySignal
+from strategies.runner import StrategyRunner
+
+
+class RecordingStrategy(BaseStrategy):
+    def __init__(self, name: str, runtime_config: StrategyRuntimeConfig | None = None):
+        super().__init__(runtime_config)
+        self.name = name
+        self.calls = []
+        self._guard = threading.Lock()
+
+    def analyze_symbol(self, context: StrategyContext) -> list[StrategySignal]:
+        if context.symbol == "BADUSDT":
+            raise RuntimeError("broken candles")
+        time.sleep(0.01)
+        with self._guard:
+            self.calls.append((context.symbol, threading.current_thread().name, time.monotonic()))
+        return [StrategySignal(self.name, context.symbol, "60", "trigger", "WATCH", f"{self.name}:{context.symbol}")]
+
+
+def make_contexts(symbols: list[str]) -> list[StrategyContext]:
+    return [StrategyContext(symbol=symbol, tracker=None, tf_loggers={}, market_data_provider=None) for symbol in symbols]
+
+
+def make_runner() -> tuple[StrategyRunner, list[RecordingStrategy]]:
+    strategies = [
+        RecordingStrategy("MULTI_TF"),
+        RecordingStrategy("RANGE"),
+        RecordingStrategy("OFF", StrategyRuntimeConfig(enabled=False)),
+    ]
+    return StrategyRunner(strategies), strategies
+
+
+def summaries(result) -> dict[str, list[str]]:
+    return {symbol: [signal.summary for signal in signals] for symbol, signals in result.signals.items()}
+
+
+def test_parallel_run_matches_sequential_run():
+    symbols = [f"S{index}USDT" for index in range(12)] + ["BADUSDT"]
+    sequential, _ = make_runner()
+    parallel, strategies = make_runner()
+
+    expected = sequential.analyze_symbols(make_contexts(symbols), max_workers=1)
+    actual = parallel.analyze_symbols(make_contexts(symbols), max_workers=4)
+
+    assert summaries(actual) == summaries(expected)
+    assert list(actual.signals) == list(expected.signals)
+    assert set(actual.errors) == set(expected.errors) == {"BADUSDT"}
+    assert isinstance(actual.errors["BADUSDT"], RuntimeError)
+    assert actual.signal_count == 24
+    assert strategies[2].calls == []
+
+    # Символы разошлись по нескольким воркерам, но стратегии символа шли подряд в одном из них.
+    multi_tf, range_strategy = strategies[0], strategies[1]
+    assert len({thread for _, thread, _ in multi_tf.calls}) > 1
+    range_calls = {symbol: (thread, at) for symbol, thread, at in range_strategy.calls}
+    for symbol, thread, at in multi_tf.calls:
+        assert range_calls[symbol][0] == thread
+        assert range_calls[symbol][1] > at
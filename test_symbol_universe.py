@@ -0,0 +1,65 @@
+"""
+Проверка snapshot'ов symbol universe: публикация новой версии, чтение без блокировок во время записи
+и перечитывание файла, измененного извне.
+Запуск: python -m pytest -q test_symbol_universe.py
+"""
+
+import os
+import threading
+
+from symbol_universe import get_symbol_universe, load_symbols_from_file, publish_symbol_universe
+
+
+def test_publish_replaces_snapshot_without_touching_readers(tmp_path):
+    file_path = str(tmp_path / "common_symbols.txt")
+    first = publish_symbol_universe(["BTCUSDT", "ETHUSDT", "BTCUSDT"], file_path)
+
+    assert get_symbol_universe(file_path) is first
+    assert first.symbols == ("BTCUSDT", "ETHUSDT")
+
+    second = publish_symbol_universe(["SOLUSDT"], file_path)
+
+    assert second.version > first.version
+    assert get_symbol_universe(file_path) is second
+    # Читатель, взявший старую версию, продолжает работать с ней целиком.
+    assert first.symbols == ("BTCUSDT", "ETHUSDT")
+    assert load_symbols_from_file(file_path) == ["SOLUSDT"]
+    assert not os.path.exists(file_path + ".tmp")
+
+
+def test_external_file_change_is_reloaded(tmp_path):
+    file_path = tmp_path / "common_symbols.txt"
+    snapshot = publish_symbol_universe(["BTCUSDT"], str(file_path))
+
+    file_path.write_text("XRPUSDT\nADAUSDT\n", encoding="utf-8")
+    os.utime(file_path, ns=(snapshot.file_mtime_ns + 10**9, snapshot.file_mtime_ns + 10**9))
+    reloaded = get_symbol_universe(str(file_path))
+
+    assert reloaded.version > snapshot.version
+    assert reloaded.symbols == ("XRPUSDT", "ADAUSDT")
+    assert get_symbol_universe(str(file_path)) is reloaded
+
+
+def test_readers_never_see_a_partial_universe(tmp_path):
+    file_path = str(tmp_path / "common_symbols.txt")
+    universes = [tuple(f"S{generation}X{index}USDT" for index in range(200)) for generation in range(30)]
+    publish_symbol_universe(list(universes[0]), file_path)
+    stop = threading.Event()
+    seen = []
+
+    def reader():
+        while not stop.is_set():
+            seen.append(get_symbol_universe(file_path).symbols)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for symbols in universes[1:]:
+        publish_symbol_universe(list(symbols), file_path)
+    stop.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert seen
+    assert set(seen) <= set(universes)
+    assert get_symbol_universe(file_path).symbols == universes[-1]
@@ -0,0 +1,91 @@
+"""
+Проверка очереди доставки Telegram: остановка во время повторяемой ошибки не оставляет handle незавершенным,
+а 429 выдерживает полный retry_after и останавливает отправку во все чаты.
+Запуск: python -m pytest -q test_telegram_delivery.py
+"""
+
+import threading
+import time
+
+from telegram_delivery import TELEGRAM_GLOBAL_GROUP, TelegramDeliveryQueue
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, data: dict):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self._data = data
+
+    def json(self) -> dict:
+        return self._data
+
+
+def test_close_during_retryable_error_resolves_handle():
+    queue = TelegramDeliveryQueue(token="TEST", workers=1, chat_interval_seconds=0)
+    posting = threading.Event()
+    release = threading.Event()
+
+    def post(url, data=None, timeout=None):
+        posting.set()
+        release.wait(5)
+        return FakeResponse(502, {"ok": False, "description": "Bad Gateway"})
+
+    queue.session.post = post
+    handle = queue.submit(1, "hello")
+    assert posting.wait(5)
+
+    # close() выставляет _stopping, пока sender еще ждет ответа, который потребует повтора.
+    closer = threading.Thread(target=queue.close, kwargs={"timeout": 0})
+    closer.start()
+    closer.join(5)
+    release.set()
+
+    assert handle.result(timeout=5) is False
+    assert queue.flush(timeout=5)
+    stats = queue.get_stats()
+    assert stats["queued"] == 0
+    assert stats["retried"] == 0
+
+
+def test_rate_limit_honours_full_retry_after_and_pauses_all_chats():
+    queue = TelegramDeliveryQueue(token="TEST", workers=1, backoff_max_seconds=1)
+    posted = threading.Event()
+
+    def post(url, data=None, timeout=None):
+        posted.set()
+        return FakeResponse(429, {"ok": False, "description": "Too Many Requests", "parameters": {"retry_after": 120}})
+
+    queue.session.post = post
+    handle = queue.submit(1, "hello")
+    assert posted.wait(5)
+    queue.close(timeout=0)
+    assert handle.result(timeout=5) is False
+
+    assert queue.get_stats()["rate_limited"] == 1
+    # Следующий слот глобального bucket, а значит и любого другого чата, — не раньше чем через retry_after.
+    assert queue.limiter.reserve(TELEGRAM_GLOBAL_GROUP) > 119
+
+
+def test_rate_limit_in_one_chat_delays_other_chats():
+    queue = TelegramDeliveryQueue(token="TEST", workers=2, chat_interval_seconds=0, global_burst=10)
+    sent_at = {}
+    limited = threading.Event()
+
+    def post(url, data=None, timeout=None):
+        chat_id = data["chat_id"]
+        if chat_id == 1 and not limited.is_set():
+            limited.set()
+            return FakeResponse(429, {"ok": False, "parameters": {"retry_after": 1}})
+        sent_at[chat_id] = time.monotonic()
+        return FakeResponse(200, {"ok": True})
+
+    queue.session.post = post
+    first = queue.submit(1, "hello")
+    assert limited.wait(5)
+    limited_at = time.monotonic()
+    second = queue.submit(2, "world")
+
+    assert first.result(timeout=5) is True
+    assert second.result(timeout=5) is True
+    assert sent_at[2] - limited_at >= 0.9
+    queue.close()
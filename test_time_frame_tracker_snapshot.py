@@ -0,0 +1,81 @@
+"""
+Проверка снимка TimeframeAnalysisTracker: теплый старт восстанавливает обработанные свечи и живые
+сигналы с остатком TTL, а снимок другой версии, другой сетки таймфреймов или битый файл игнорируются.
+Запуск: python -m pytest -q test_time_frame_tracker_snapshot.py
+"""
+
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+import time_frame_tracker
+from time_frame_tracker import TRACKER_SNAPSHOT_VERSION, TimeframeAnalysisTracker
+
+
+HOUR = 3600
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"value": 1_700_000_000.0}
+    monkeypatch.setattr(time_frame_tracker, "time", SimpleNamespace(time=lambda: now["value"]))
+    return now
+
+
+def make_tracker() -> TimeframeAnalysisTracker:
+    tracker = TimeframeAnalysisTracker()
+    tracker.signal_ttls = {"4H": 4 * HOUR, "1H": HOUR}
+    return tracker
+
+
+def test_snapshot_restores_candles_state_and_live_signals(clock, tmp_path):
+    path = tmp_path / "tracker.pkl"
+    tracker = make_tracker()
+    assert tracker.should_analyze("BTCUSDT", "1H")
+    tracker.set_state("BTCUSDT", "trend_12h", {"passed": True})
+    assert tracker.should_send_signal("BTCUSDT", "GO", "4H")
+    assert tracker.should_send_signal("ETHUSDT", "GO", "1H")
+    assert tracker.save_snapshot(str(path))
+
+    # Перезапуск через 2 часа: часовой сигнал истек, 4H живет еще 2 часа.
+    clock["value"] += 2 * HOUR
+    restored = make_tracker()
+    assert restored.load_snapshot(str(path))
+
+    assert restored.get_state("BTCUSDT", "trend_12h") == {"passed": True}
+    assert restored.last_analysis["BTCUSDT"]["1H"] == tracker.last_analysis["BTCUSDT"]["1H"]
+    assert not restored.should_send_signal("BTCUSDT", "GO", "4H")
+    assert restored.sent_signals.expires_in("BTCUSDT_4H_GO") == pytest.approx(2 * HOUR)
+    assert restored.should_send_signal("ETHUSDT", "GO", "1H")
+
+
+def test_snapshot_of_other_version_is_ignored(clock):
+    tracker = make_tracker()
+    tracker.set_state("BTCUSDT", "trend_12h", {"passed": True})
+    snapshot = tracker.snapshot()
+
+    restored = make_tracker()
+    assert not restored.restore({**snapshot, "version": TRACKER_SNAPSHOT_VERSION - 1})
+    assert not restored.restore({key: value for key, value in snapshot.items() if key != "version"})
+    assert restored.last_analysis == {}
+    assert restored.restore(snapshot)
+
+
+def test_snapshot_with_other_timeframes_is_ignored(clock):
+    snapshot = make_tracker().snapshot()
+    snapshot["timeframe_seconds"] = {**snapshot["timeframe_seconds"], "4H": 2 * HOUR}
+
+    assert not make_tracker().restore(snapshot)
+
+
+def test_missing_or_corrupt_file_is_cold_start(clock, tmp_path):
+    path = tmp_path / "tracker.pkl"
+    tracker = make_tracker()
+    assert not tracker.load_snapshot(str(path))
+
+    path.write_bytes(pickle.dumps(make_tracker().snapshot())[:20])
+    assert not tracker.load_snapshot(str(path))
+    path.write_bytes(pickle.dumps(["not", "a", "snapshot"]))
+    assert not tracker.load_snapshot(str(path))
+    assert tracker.last_analysis == {}
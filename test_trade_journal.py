@@ -0,0 +1,90 @@
+"""
+Проверка TradeJournal: восстановление снимка и журнала, недописанная строка после падения,
+повреждение в середине журнала и компакция закрытых сделок в архив.
+Запуск: python -m pytest -q test_trade_journal.py
+"""
+
+import json
+
+from trade_journal import TradeJournal
+
+
+def make_journal(tmp_path, **kwargs) -> TradeJournal:
+    options = {"fsync_batch_size": 1, "compact_events": 1000, "compact_interval_seconds": 3600}
+    options.update(kwargs)
+    return TradeJournal(tmp_path / "active_trades.json", **options)
+
+
+def open_trade(symbol: str, price: float = 100.0) -> dict:
+    return {"symbol": symbol, "status": "OPEN", "opened_at": "2026-01-01T00:00:00+00:00", "entry": price, "last": price}
+
+
+def journal_lines(journal: TradeJournal) -> list[str]:
+    return journal.journal_path.read_text(encoding="utf-8").splitlines()
+
+
+def test_load_replays_journal_after_restart(tmp_path):
+    journal = make_journal(tmp_path)
+    trades = {"BTCUSDT": open_trade("BTCUSDT"), "ETHUSDT": open_trade("ETHUSDT", 10.0)}
+    journal.record(trades)
+    trades["BTCUSDT"] = {**trades["BTCUSDT"], "last": 105.0}
+    assert journal.record(trades) == 1
+    journal.close()
+
+    restored = make_journal(tmp_path).load()
+
+    assert restored == trades
+
+
+def test_torn_tail_line_is_dropped(tmp_path):
+    journal = make_journal(tmp_path)
+    trades = {"BTCUSDT": open_trade("BTCUSDT")}
+    journal.record(trades)
+    journal.close()
+    with open(journal.journal_path, "a", encoding="utf-8") as handle:
+        handle.write('{"seq": 2, "type": "price", "symbol": "BTCUSDT", "chan')
+
+    assert make_journal(tmp_path).load() == trades
+
+
+def test_corrupt_line_in_the_middle_stops_replay(tmp_path, caplog):
+    journal = make_journal(tmp_path)
+    trades = {"BTCUSDT": open_trade("BTCUSDT")}
+    journal.record(trades)
+    for price in (101.0, 102.0, 103.0):
+        trades["BTCUSDT"] = {**trades["BTCUSDT"], "last": price}
+        journal.record(trades)
+    journal.close()
+
+    lines = journal_lines(journal)
+    lines[2] = lines[2][: len(lines[2]) // 2]
+    journal.journal_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    restored = make_journal(tmp_path).load()
+
+    # Применены события до битой строки; события после нее не накладываются на устаревшую сделку.
+    assert restored["BTCUSDT"]["last"] == 101.0
+    assert "1 событий после нее не применены" in caplog.text
+
+
+def test_compaction_archives_closed_trades_and_truncates_journal(tmp_path):
+    journal = make_journal(tmp_path, compact_events=3)
+    trades = {"BTCUSDT": open_trade("BTCUSDT"), "ETHUSDT": open_trade("ETHUSDT", 10.0)}
+    journal.record(trades)
+    trades["ETHUSDT"] = {**trades["ETHUSDT"], "status": "CLOSED", "last": 12.0}
+    journal.record(trades)
+
+    assert "ETHUSDT" not in trades
+    assert journal.journal_path.read_text(encoding="utf-8") == ""
+    snapshot = json.loads(journal.snapshot_path.read_text(encoding="utf-8"))
+    assert set(snapshot["trades"]) == {"BTCUSDT"}
+    assert snapshot["journal_seq"] == 3
+    archived = [json.loads(line) for line in journal.archive_path.read_text(encoding="utf-8").splitlines()]
+    assert [record["archive_id"] for record in archived] == ["ETHUSDT:2026-01-01T00:00:00+00:00"]
+
+    trades["BTCUSDT"] = {**trades["BTCUSDT"], "last": 99.0}
+    journal.record(trades)
+    journal.close()
+
+    restored = make_journal(tmp_path).load()
+    assert restored == {"BTCUSDT": trades["BTCUSDT"]}
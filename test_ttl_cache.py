@@ -0,0 +1,105 @@
+"""
+Проверка TTLCache на фейковых часах: истечение записей с разными TTL, перезапись ключа, add() как
+атомарная проверка-и-вставка и вытеснение при max_entries.
+Запуск: python -m pytest -q test_ttl_cache.py
+"""
+
+import pytest
+
+from ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(**kwargs) -> tuple[TTLCache, FakeClock]:
+    clock = FakeClock()
+    return TTLCache(default_ttl=10, clock=clock, **kwargs), clock
+
+
+def test_entries_expire_by_their_own_ttl():
+    cache, clock = make_cache()
+    cache.set("short", 1)
+    cache.set("long", 2, ttl=60)
+
+    clock.now += 10
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    assert len(cache) == 1
+
+    clock.now += 50
+    assert "long" not in cache
+    assert cache.get_stats()["expirations"] == 2
+
+
+def test_overwritten_key_is_not_expired_by_stale_queue_entry():
+    cache, clock = make_cache()
+    cache.set("key", 1)
+    clock.now += 8
+    cache.set("key", 2)
+
+    # Старая запись ключа уже в голове очереди, но она перезаписана: новое значение живет свои 10 секунд.
+    clock.now += 5
+    assert cache.get("key") == 2
+    assert cache.expires_in("key") == pytest.approx(5)
+    clock.now += 5
+    assert cache.get("key") is None
+
+
+def test_add_does_not_refresh_live_entry():
+    cache, clock = make_cache()
+    assert cache.add("signal", "first")
+
+    clock.now += 6
+    assert not cache.add("signal", "second")
+    assert cache.get("signal") == "first"
+    assert cache.expires_in("signal") == pytest.approx(4)
+
+    clock.now += 4
+    assert cache.add("signal", "third")
+    assert cache.get("signal") == "third"
+
+
+def test_set_with_expires_in_keeps_remaining_ttl():
+    cache, clock = make_cache()
+    cache.set("restored", 1, ttl=60, expires_in=15)
+    cache.set("capped", 2, ttl=5, expires_in=30)
+
+    # Остаток срока не больше ttl записи, а сама ttl сохраняется для следующего снимка.
+    assert cache.expires_in("restored") == pytest.approx(15)
+    assert cache.expires_in("capped") == pytest.approx(5)
+    assert {key: ttl for key, _, _, ttl in cache.items()} == {"restored": 60, "capped": 5}
+
+
+def test_max_entries_evicts_entry_expiring_first():
+    cache, clock = make_cache(max_entries=2)
+    cache.set("long", 1, ttl=60)
+    cache.set("short", 2, ttl=5)
+    cache.set("medium", 3, ttl=30)
+
+    assert "short" not in cache
+    assert cache.get("long") == 1 and cache.get("medium") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_pop_and_stats():
+    cache, clock = make_cache()
+    cache.set("key", 1)
+    assert cache.pop("key") == 1
+    assert cache.pop("key", "missing") == "missing"
+
+    cache.set("key", 2)
+    clock.now += 10
+    assert cache.pop("key", "expired") == "expired"
+
+    cache.add("a", 1)
+    cache.add("a", 1)
+    cache.get("a")
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
@@ -0,0 +1,113 @@
+"""
+Проверка векторного Volume Profile: calculate_volume_nodes и скользящее окно VolumeProfileWindow
+совпадают с прежним циклом по свечам и уровням на 200 случайных рядах.
+Запуск: python -m pytest -q test_volume_profile.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyzes.volume_profile import VolumeProfileWindow, build_volume_profile
+from range_trading import calculate_volume_nodes
+
+
+def loop_volume_nodes(df: pd.DataFrame, num_levels: int = 20) -> dict | None:
+    """Прежний calculate_volume_nodes: объем каждой свечи раскладывается по уровням во вложенном цикле."""
+    if len(df) < 20:
+        return None
+    price_min = df['low'].min()
+    price_max = df['high'].max()
+    price_range = price_max - price_min
+    if price_range == 0:
+        return None
+
+    price_levels = np.linspace(price_min, price_max, num_levels)
+    level_width = price_range / num_levels
+    volume_at_levels = np.zeros(num_levels)
+    for i in range(len(df)):
+        high = df['high'].iloc[i]
+        low = df['low'].iloc[i]
+        volume = df['volume'].iloc[i]
+        min_level = max(0, int((low - price_min) / level_width))
+        max_level = min(num_levels - 1, int((high - price_min) / level_width))
+        if max_level >= min_level:
+            volume_per_level = volume / (max_level - min_level + 1)
+            for level_idx in range(min_level, max_level + 1):
+                volume_at_levels[level_idx] += volume_per_level
+
+    poc_idx = np.argmax(volume_at_levels)
+    total_volume = volume_at_levels.sum()
+    cumulative_volume = 0
+    value_area_indices = []
+    for idx in np.argsort(volume_at_levels)[::-1]:
+        cumulative_volume += volume_at_levels[idx]
+        value_area_indices.append(idx)
+        if cumulative_volume >= total_volume * 0.7:
+            break
+
+    avg_volume = volume_at_levels.mean()
+    std_volume = volume_at_levels.std()
+    return {
+        'poc': price_levels[poc_idx],
+        'high_volume_nodes': [price_levels[i] for i in range(num_levels) if volume_at_levels[i] > avg_volume + std_volume * 0.5],
+        'low_volume_nodes': [price_levels[i] for i in range(num_levels) if volume_at_levels[i] < avg_volume - std_volume * 0.5],
+        'value_area_high': price_levels[max(value_area_indices)],
+        'value_area_low': price_levels[min(value_area_indices)],
+    }
+
+
+def make_candles(rng: np.random.Generator, rows: int) -> pd.DataFrame:
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, rows)), 2)
+    return pd.DataFrame(
+        {
+            "open": close,
+            "high": close + np.round(rng.uniform(0, 2, rows), 2),
+            "low": close - np.round(rng.uniform(0, 2, rows), 2),
+            "close": close,
+            "volume": np.round(rng.uniform(1, 1000, rows), 3),
+        }
+    )
+
+
+def assert_same_profile(actual: dict | None, expected: dict | None) -> None:
+    if expected is None:
+        assert actual is None
+        return
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        assert actual[key] == pytest.approx(value, rel=1e-12)
+
+
+def random_cases(count: int = 200):
+    rng = np.random.default_rng(17)
+    for seed in range(count):
+        yield seed, int(rng.integers(10, 300)), int(rng.integers(5, 40))
+
+
+@pytest.mark.parametrize("seed,rows,num_levels", list(random_cases()))
+def test_vectorized_profile_matches_loop(seed, rows, num_levels):
+    df = make_candles(np.random.default_rng(seed), rows)
+
+    assert_same_profile(calculate_volume_nodes(df, num_levels=num_levels), loop_volume_nodes(df, num_levels))
+
+
+def test_flat_range_has_no_profile():
+    df = pd.DataFrame({"open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 5.0}, index=range(30))
+
+    assert calculate_volume_nodes(df) is None
+    assert loop_volume_nodes(df) is None
+
+
+def test_sliding_window_matches_full_rebuild():
+    rng = np.random.default_rng(5)
+    df = make_candles(rng, 600)
+    window = VolumeProfileWindow(window=100, num_levels=24)
+
+    for end, (high, low, volume) in enumerate(zip(df["high"], df["low"], df["volume"]), start=1):
+        window.push(high, low, volume)
+        tail = df.iloc[max(0, end - 100):end]
+        expected = build_volume_profile(tail["low"], tail["high"], tail["volume"], 24)
+        assert_same_profile(window.profile(), expected)
+        if end >= 100:
+            assert_same_profile(expected, loop_volume_nodes(tail, 24))
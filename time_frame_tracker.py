@@ -5,8 +5,18 @@
 и предотвращает отправку дублирующихся Telegram сигналов.
 """
 
+import os
+import pickle
+import threading
 import time
 
+from config import SIGNAL_DEDUP_DEFAULT_TTL_SECONDS, SIGNAL_DEDUP_TTL_SECONDS, TRACKER_SNAPSHOT_FILE
+from ttl_cache import TTLCache
+
+
+# Версия формата снимка; снимок другой версии игнорируется (холодный старт).
+TRACKER_SNAPSHOT_VERSION = 2
+
 
 class TimeframeAnalysisTracker:
     """Отслеживает время последнего анализа для каждого таймфрейма и символа"""
@@ -24,9 +34,17 @@ class TimeframeAnalysisTracker:
         # Хранилище последней уже обработанной закрытой свечи: {symbol: {timeframe: candle_open_ts}}
         self.last_analysis = {}
         
-        # Кэш для дедупликации Telegram сигналов
-        self.sent_signals = {}
-        self.signal_timeout = 3600  # 1 час - время жизни сигнала в кэше
+        # Кэш для дедупликации Telegram сигналов: ключ -> время отправки, TTL по стратегии/таймфрейму.
+        # Часы — time.time, чтобы оставшийся TTL переживал перезапуск через снимок.
+        self.signal_timeout = SIGNAL_DEDUP_DEFAULT_TTL_SECONDS
+        self.signal_ttls = dict(SIGNAL_DEDUP_TTL_SECONDS)
+        self.sent_signals = TTLCache(self.signal_timeout, clock=time.time)
+
+        # Смещение локальных часов относительно сервера Bybit (выставляет планировщик основного цикла).
+        self.clock_offset_seconds = 0.0
+
+        # Защищает last_analysis и sent_signals при параллельном анализе символов.
+        self._lock = threading.RLock()
     
     def should_analyze(self, symbol, timeframe):
         """
@@ -43,56 +61,98 @@ class TimeframeAnalysisTracker:
         if candle_seconds is None:
             raise ValueError(f"Unsupported timeframe: {timeframe}")
 
-        current_time = int(time.time())
+        current_time = int(time.time() + self.clock_offset_seconds)
         current_bucket_open = (current_time // candle_seconds) * candle_seconds
         last_closed_candle_open = current_bucket_open - candle_seconds
         
-        if symbol not in self.last_analysis:
-            self.last_analysis[symbol] = {}
+        with self._lock:
+            symbol_state = self.last_analysis.setdefault(symbol, {})
+
+            if timeframe not in symbol_state:
+                # Первый запуск: анализируем последнюю уже закрытую свечу.
+                symbol_state[timeframe] = last_closed_candle_open
+                return True
+
+            if symbol_state[timeframe] != last_closed_candle_open:
+                symbol_state[timeframe] = last_closed_candle_open
+                return True
+
+            return False
+
+    def get_state(self, symbol, key, default=None):
+        """
+        Возвращает сохраненное состояние стратегии по символу (например, результат 12H фильтра).
+        
+        Args:
+            symbol (str): Торговый символ
+            key (str): Ключ состояния стратегии
+            default: Значение, если состояние отсутствует
         
-        if timeframe not in self.last_analysis[symbol]:
-            # Первый запуск: анализируем последнюю уже закрытую свечу.
-            self.last_analysis[symbol][timeframe] = last_closed_candle_open
-            return True
+        Returns:
+            Сохраненное значение или default
+        """
+        with self._lock:
+            return self.last_analysis.get(symbol, {}).get(key, default)
 
-        if self.last_analysis[symbol][timeframe] != last_closed_candle_open:
-            self.last_analysis[symbol][timeframe] = last_closed_candle_open
-            return True
+    def set_state(self, symbol, key, value):
+        """
+        Сохраняет состояние стратегии по символу.
+        
+        Args:
+            symbol (str): Торговый символ
+            key (str): Ключ состояния стратегии
+            value: Сохраняемое значение
+        """
+        with self._lock:
+            self.last_analysis.setdefault(symbol, {})[key] = value
+
+    def clear_state(self, symbol, *keys):
+        """
+        Удаляет сохраненные состояния стратегии по символу.
         
-        return False
+        Args:
+            symbol (str): Торговый символ
+            *keys (str): Ключи состояний, которые нужно удалить
+        """
+        with self._lock:
+            symbol_state = self.last_analysis.get(symbol)
+            if not symbol_state:
+                return
+            for key in keys:
+                symbol_state.pop(key, None)
     
-    def should_send_signal(self, symbol, action, timeframe):
+    def signal_ttl(self, timeframe, strategy=None):
+        """
+        Время жизни сигнала в кэше дедупликации.
+
+        Ищется в signal_ttls по ключам 'STRATEGY:TF', 'STRATEGY', 'TF', иначе signal_timeout.
+        """
+        candidates = [timeframe]
+        if strategy:
+            candidates = [f"{strategy}:{timeframe}", strategy, timeframe]
+        for key in candidates:
+            if key in self.signal_ttls:
+                return self.signal_ttls[key]
+        return self.signal_timeout
+
+    def should_send_signal(self, symbol, action, timeframe, strategy=None):
         """
         Проверяет, нужно ли отправлять Telegram сигнал (дедупликация).
         
-        Предотвращает отправку одинаковых сигналов в течение signal_timeout (1 час).
+        Предотвращает отправку одинаковых сигналов в течение signal_ttl(timeframe, strategy).
+        Просроченные записи вытесняются из очереди истечения без перебора всего кэша.
         
         Args:
             symbol (str): Торговый символ (например, 'BTCUSDT')
             action (str): Действие/сигнал ('GO', 'ATTENTION', 'ENTER', 'WAIT_BETTER', 'SKIP')
             timeframe (str): Таймфрейм ('4H', '1H')
+            strategy (str): Имя стратегии для отдельного TTL (необязательно)
         
         Returns:
             bool: True если нужно отправить сигнал, False если уже отправляли недавно
         """
         key = f"{symbol}_{timeframe}_{action}"
-        current_time = time.time()
-        
-        # Очистка старых сигналов из кэша
-        self.sent_signals = {
-            k: v for k, v in self.sent_signals.items() 
-            if current_time - v < self.signal_timeout
-        }
-        
-        # Проверка, был ли отправлен такой сигнал недавно
-        if key in self.sent_signals:
-            time_diff = current_time - self.sent_signals[key]
-            if time_diff < self.signal_timeout:
-                return False  # Уже отправляли недавно, не спамим
-        
-        # Сохраняем новый сигнал в кэш
-        self.sent_signals[key] = current_time
-        return True
+        return self.sent_signals.add(key, time.time(), ttl=self.signal_ttl(timeframe, strategy))
     
     def get_time_until_next_analysis(self, symbol, timeframe):
         """
@@ -109,7 +169,7 @@ class TimeframeAnalysisTracker:
         if candle_seconds is None:
             raise ValueError(f"Unsupported timeframe: {timeframe}")
 
-        current_time = time.time()
+        current_time = time.time() + self.clock_offset_seconds
         next_bucket_open = (int(current_time) // candle_seconds + 1) * candle_seconds
         return max(0.0, next_bucket_open - current_time)
     
@@ -121,9 +181,98 @@ class TimeframeAnalysisTracker:
         Args:
             symbol (str): Торговый символ
         """
-        if symbol in self.last_analysis:
-            del self.last_analysis[symbol]
+        with self._lock:
+            self.last_analysis.pop(symbol, None)
     
+    def snapshot(self):
+        """
+        Возвращает копию состояния для сохранения: обработанные свечи, результаты стадий
+        (например, 12H/4H фильтров MULTI_TF) и кэш отправленных сигналов.
+
+        Значения состояний стратегий не копируются глубоко: set_state всегда заменяет их целиком.
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                'version': TRACKER_SNAPSHOT_VERSION,
+                'saved_at': now,
+                'timeframe_seconds': dict(self.timeframe_seconds),
+                'last_analysis': {symbol: dict(state) for symbol, state in self.last_analysis.items()},
+                # {key: (время отправки, время истечения, ttl)} — TTL сигнала мог зависеть от стратегии.
+                'sent_signals': {
+                    key: (sent_at, now + remaining, ttl) for key, sent_at, remaining, ttl in self.sent_signals.items()
+                },
+                'clock_offset_seconds': self.clock_offset_seconds,
+            }
+
+    def restore(self, snapshot):
+        """
+        Восстанавливает состояние из snapshot(). Просроченные сигналы отбрасываются.
+
+        Returns:
+            bool: True если снимок подходит и применен
+        """
+        if not isinstance(snapshot, dict) or snapshot.get('version') != TRACKER_SNAPSHOT_VERSION:
+            return False
+        if snapshot.get('timeframe_seconds') != self.timeframe_seconds:
+            # Границы свечей другие — сохраненные candle_open_ts не сопоставимы.
+            return False
+
+        current_time = time.time()
+        with self._lock:
+            self.last_analysis = {symbol: dict(state) for symbol, state in snapshot.get('last_analysis', {}).items()}
+            self.sent_signals.clear()
+            restored = sorted(snapshot.get('sent_signals', {}).items(), key=lambda item: item[1][1])
+            for key, (sent_at, expires_at, ttl) in restored:
+                remaining = expires_at - current_time
+                if remaining > 0:
+                    self.sent_signals.set(key, sent_at, ttl=ttl, expires_in=remaining)
+            self.clock_offset_seconds = float(snapshot.get('clock_offset_seconds', 0.0))
+        return True
+
+    def save_snapshot(self, file_path=TRACKER_SNAPSHOT_FILE):
+        """
+        Атомарно сохраняет snapshot() в файл (временный файл + os.replace).
+
+        Returns:
+            bool: True если снимок записан
+        """
+        snapshot = self.snapshot()
+        temp_path = f"{file_path}.tmp"
+        try:
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'wb') as file_handle:
+                pickle.dump(snapshot, file_handle, protocol=pickle.HIGHEST_PROTOCOL)
+                file_handle.flush()
+                os.fsync(file_handle.fileno())
+            os.replace(temp_path, file_path)
+            return True
+        except Exception as e:
+            print(f"❌ Ошибка сохранения снимка tracker: {e}")
+            return False
+
+    def load_snapshot(self, file_path=TRACKER_SNAPSHOT_FILE):
+        """
+        Теплый старт: загружает снимок предыдущего процесса.
+
+        should_analyze вернет True только для свечей, закрывшихся после снимка, а сохраненные
+        результаты 12H/4H снова доступны стадиям ниже. Нет файла или он не подходит — холодный старт.
+
+        Returns:
+            bool: True если состояние восстановлено
+        """
+        if not os.path.exists(file_path):
+            return False
+        try:
+            with open(file_path, 'rb') as file_handle:
+                snapshot = pickle.load(file_handle)
+        except Exception as e:
+            print(f"❌ Ошибка загрузки снимка tracker: {e}")
+            return False
+        return self.restore(snapshot)
+
     def get_stats(self):
         """
         Возвращает статистику по отслеживаемым символам и таймфреймам.
@@ -131,9 +280,11 @@ class TimeframeAnalysisTracker:
         Returns:
             dict: Статистика (количество символов, отправленных сигналов и т.д.)
         """
-        return {
-            'tracked_symbols': len(self.last_analysis),
-            'cached_signals': len(self.sent_signals),
-            'mode': 'closed-candle',
-            'timeframe_seconds': self.timeframe_seconds,
-        }
+        with self._lock:
+            return {
+                'tracked_symbols': len(self.last_analysis),
+                'cached_signals': len(self.sent_signals),
+                'signal_cache': self.sent_signals.get_stats(),
+                'mode': 'closed-candle',
+                'timeframe_seconds': self.timeframe_seconds,
+            }
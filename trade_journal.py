@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any
+
+import pandas as pd
+
+from config import (
+    TRADE_JOURNAL_COMPACT_EVENTS,
+    TRADE_JOURNAL_COMPACT_INTERVAL_SECONDS,
+    TRADE_JOURNAL_FSYNC_BATCH_SIZE,
+    TRADE_JOURNAL_FSYNC_INTERVAL_SECONDS,
+)
+
+
+TRADE_EVENT_OPEN = 'open'
+TRADE_EVENT_SYNC = 'sync'
+TRADE_EVENT_PRICE = 'price'
+TRADE_EVENT_CLOSE = 'close'
+# После этих событий fsync делается сразу, остальные синхронизируются пачкой.
+DURABLE_TRADE_EVENTS = frozenset({TRADE_EVENT_OPEN, TRADE_EVENT_CLOSE})
+
+_MISSING = object()
+
+
+def classify_trade_change(previous: dict[str, Any] | None, trade: dict[str, Any], changes: dict[str, Any]) -> str:
+    """Тип события журнала по изменившимся полям сделки."""
+    if previous is None or previous.keys() - trade.keys() or trade.get('opened_at') != previous.get('opened_at'):
+        # Новая сделка по символу (или удаленные поля) — пишем ее целиком.
+        return TRADE_EVENT_OPEN
+    if changes.get('status') == 'CLOSED':
+        return TRADE_EVENT_CLOSE
+    if any(key.startswith('exchange_') for key in changes):
+        return TRADE_EVENT_SYNC
+    return TRADE_EVENT_PRICE
+
+
+class TradeJournal:
+    """Персистентность реестра сделок: снимок + append-only JSONL-журнал изменений.
+
+    record пишет в журнал только поля, изменившиеся с прошлой записи (сравнение с теневой копией),
+    поэтому стоимость записи — O(изменений), а не O(всех сделок). Строки журнала сбрасываются в ОС сразу,
+    fsync — пачкой (open/close — немедленно). Компакция атомарно переписывает снимок открытых сделок,
+    переносит закрытые в архив и обнуляет журнал. load = снимок + события с seq больше journal_seq снимка.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: str | os.PathLike,
+        journal_path: str | os.PathLike | None = None,
+        archive_path: str | os.PathLike | None = None,
+        fsync_batch_size: int = TRADE_JOURNAL_FSYNC_BATCH_SIZE,
+        fsync_interval_seconds: float = TRADE_JOURNAL_FSYNC_INTERVAL_SECONDS,
+        compact_events: int = TRADE_JOURNAL_COMPACT_EVENTS,
+        compact_interval_seconds: float = TRADE_JOURNAL_COMPACT_INTERVAL_SECONDS,
+    ):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = Path(journal_path) if journal_path else self.snapshot_path.with_suffix('.journal.jsonl')
+        self.archive_path = Path(archive_path) if archive_path else self.snapshot_path.with_name('closed_trades.jsonl')
+        self.fsync_batch_size = max(1, int(fsync_batch_size))
+        self.fsync_interval_seconds = max(0.0, float(fsync_interval_seconds))
+        self.compact_events = max(1, int(compact_events))
+        self.compact_interval_seconds = float(compact_interval_seconds)
+
+        self._lock = threading.RLock()
+        # Последнее записанное в журнал состояние каждой сделки.
+        self._journaled: dict[str, dict[str, Any]] = {}
+        self._seq = 0
+        self._handle = None
+        self._unsynced = 0
+        self._timer: threading.Timer | None = None
+        self._events_since_compaction = 0
+        self._last_compaction_at = time.monotonic()
+
+    def _read_snapshot(self) -> tuple[dict[str, Any], int]:
+        if not self.snapshot_path.exists():
+            return {}, 0
+        try:
+            payload = json.loads(self.snapshot_path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError) as error:
+            logging.error(f"Не удалось загрузить снимок active trades: {error}")
+            return {}, 0
+        if not isinstance(payload, dict):
+            return {}, 0
+        # Старый формат без journal_seq — тот же файл, журнал к нему еще не писался.
+        trades = payload.get('trades', payload)
+        return (trades if isinstance(trades, dict) else {}), int(payload.get('journal_seq', 0) or 0)
+
+    def _replay_journal(self, trades: dict[str, Any], snapshot_seq: int) -> int:
+        last_seq = snapshot_seq
+        if not self.journal_path.exists():
+            return last_seq
+        with open(self.journal_path, 'r', encoding='utf-8') as file_handle:
+            for line_number, line in enumerate(file_handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # Строка пишется одним write с flush, поэтому недописанной может быть только последняя.
+                    # Битая строка в середине — повреждение файла: события после нее применялись бы
+                    # к сделке без пропущенного изменения, поэтому replay останавливается на ней.
+                    dropped = sum(1 for rest in file_handle if rest.strip())
+                    if dropped:
+                        logging.error(
+                            f"Журнал сделок: битая строка {line_number}, {dropped} событий после нее не применены "
+                            f"(последний seq {last_seq})"
+                        )
+                    else:
+                        logging.warning(f"Журнал сделок: недописанная последняя строка {line_number} отброшена")
+                    break
+                seq = int(event.get('seq', 0))
+                if seq <= snapshot_seq:
+                    continue
+                symbol = event.get('symbol')
+                if event.get('type') == TRADE_EVENT_OPEN or symbol not in trades:
+                    trades[symbol] = dict(event.get('changes') or {})
+                else:
+                    trades[symbol].update(event.get('changes') or {})
+                last_seq = max(last_seq, seq)
+        return last_seq
+
+    def load(self) -> dict[str, Any]:
+        """Восстанавливает реестр: снимок + хвост журнала, затем компакция."""
+        with self._lock:
+            trades, snapshot_seq = self._read_snapshot()
+            self._seq = self._replay_journal(trades, snapshot_seq)
+            self._journaled = {symbol: dict(trade) for symbol, trade in trades.items()}
+            if self._seq > snapshot_seq or any(trade.get('status') == 'CLOSED' for trade in trades.values()):
+                self.compact(trades)
+            return trades
+
+    def record(self, active_trades: dict[str, Any]) -> int:
+        """Дописывает в журнал изменения сделок с прошлой записи; возвращает число событий."""
+        with self._lock:
+            events = 0
+            for symbol, trade in active_trades.items():
+                previous = self._journaled.get(symbol)
+                if previous == trade:
+                    continue
+                if previous is None:
+                    changes = dict(trade)
+                else:
+                    changes = {key: value for key, value in trade.items() if previous.get(key, _MISSING) != value}
+                event_type = classify_trade_change(previous, trade, changes)
+                if event_type == TRADE_EVENT_OPEN:
+                    changes = dict(trade)
+                    if previous is not None and previous.get('status') == 'CLOSED':
+                        # Новая сделка заменила закрытую до компакции — закрытую сразу в архив.
+                        self._archive({symbol: previous})
+                self._append(event_type, symbol, changes)
+                self._journaled[symbol] = dict(trade)
+                events += 1
+
+            if events:
+                self._events_since_compaction += events
+                if (
+                    self._events_since_compaction >= self.compact_events
+                    or time.monotonic() - self._last_compaction_at >= self.compact_interval_seconds
+                ):
+                    self.compact(active_trades)
+            return events
+
+    def _append(self, event_type: str, symbol: str, changes: dict[str, Any]) -> None:
+        if self._handle is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = open(self.journal_path, 'a', encoding='utf-8')
+        self._seq += 1
+        event = {'seq': self._seq, 'ts': time.time(), 'type': event_type, 'symbol': symbol, 'changes': changes}
+        self._handle.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self._handle.flush()
+        self._unsynced += 1
+
+        if event_type in DURABLE_TRADE_EVENTS or self._unsynced >= self.fsync_batch_size:
+            self._fsync_locked()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.fsync_interval_seconds, self.sync)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fsync_locked(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._handle is not None and self._unsynced:
+            os.fsync(self._handle.fileno())
+        self._unsynced = 0
+
+    def sync(self) -> None:
+        """fsync отложенных строк журнала."""
+        with self._lock:
+            self._fsync_locked()
+
+    def compact(self, active_trades: dict[str, Any]) -> None:
+        """Закрытые сделки — в архив, открытые — в новый снимок; журнал обнуляется.
+
+        Закрытые сделки удаляются из active_trades. При падении между архивом и снимком сделка
+        может попасть в архив повторно: archive_id (symbol:opened_at) позволяет отбросить дубль.
+        """
+        with self._lock:
+            closed = {symbol: trade for symbol, trade in active_trades.items() if trade.get('status') == 'CLOSED'}
+            remaining = {symbol: trade for symbol, trade in active_trades.items() if symbol not in closed}
+
+            self._archive(closed)
+            self._write_snapshot(remaining)
+
+            if self._handle is not None:
+                self._fsync_locked()
+                self._handle.close()
+                self._handle = None
+            with open(self.journal_path, 'w', encoding='utf-8'):
+                pass
+
+            for symbol in closed:
+                active_trades.pop(symbol, None)
+                self._journaled.pop(symbol, None)
+            self._events_since_compaction = 0
+            self._last_compaction_at = time.monotonic()
+
+    def _archive(self, closed: dict[str, Any]) -> None:
+        if not closed:
+            return
+        self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.archive_path, 'a', encoding='utf-8') as archive:
+            for symbol, trade in closed.items():
+                record = {'archive_id': f"{symbol}:{trade.get('opened_at')}", **trade}
+                archive.write(json.dumps(record, ensure_ascii=False) + '\n')
+            archive.flush()
+            os.fsync(archive.fileno())
+
+    def _write_snapshot(self, trades: dict[str, Any]) -> None:
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'updated_at': pd.Timestamp.now(tz='UTC').isoformat(),
+            'journal_seq': self._seq,
+            'trades': trades,
+        }
+        temp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as file_handle:
+            json.dump(payload, file_handle, ensure_ascii=False, indent=2)
+            file_handle.flush()
+            os.fsync(file_handle.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._fsync_locked()
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+
+_journals: dict[str, TradeJournal] = {}
+_journals_guard = threading.Lock()
+
+
+def get_trade_journal(snapshot_path: str | os.PathLike) -> TradeJournal:
+    """Общий журнал для файла снимка (один на процесс)."""
+    resolved = os.path.abspath(snapshot_path)
+    with _journals_guard:
+        journal = _journals.get(resolved)
+        if journal is None:
+            journal = TradeJournal(snapshot_path)
+            _journals[resolved] = journal
+        return journal
+
+
+@atexit.register
+def _close_journals() -> None:
+    with _journals_guard:
+        journals = list(_journals.values())
+    for journal in journals:
+        journal.close()
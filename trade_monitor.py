@@ -1,15 +1,18 @@
-import json
 import logging
-import os
+import threading
 
 import pandas as pd
 
 from bybit_client_v2 import bybit_client
 from config import SPOT_POSITION_MIN_USD_VALUE
-from telegram_utils import send_emergency_alert, send_telegram_message
+from telegram_utils import send_telegram_message
+from trade_journal import get_trade_journal
 
 
+# Снимок открытых сделок; изменения между компакциями — в data/active_trades.journal.jsonl.
 ACTIVE_TRADES_FILE = 'data/active_trades.json'
+# Реестр сделок меняют и мониторинг, и параллельные воркеры анализа символов.
+ACTIVE_TRADES_LOCK = threading.RLock()
 
 
 def utc_now_iso():
@@ -32,30 +35,15 @@ def format_price(price, reference_price):
 
 
 def load_active_trades(file_path=ACTIVE_TRADES_FILE):
-    """Загружает активные сделки из JSON-файла."""
-    if not os.path.exists(file_path):
-        return {}
-
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file_handle:
-            payload = json.load(file_handle)
-    except (OSError, json.JSONDecodeError) as error:
-        logging.error(f"Не удалось загрузить active trades: {error}")
-        return {}
-
-    trades = payload.get('trades', payload)
-    return trades if isinstance(trades, dict) else {}
+    """Загружает активные сделки: снимок + события журнала после него (закрытые уходят в архив)."""
+    with ACTIVE_TRADES_LOCK:
+        return get_trade_journal(file_path).load()
 
 
 def save_active_trades(active_trades, file_path=ACTIVE_TRADES_FILE):
-    """Сохраняет состояние активных сделок в JSON-файл."""
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    payload = {
-        'updated_at': utc_now_iso(),
-        'trades': active_trades,
-    }
-    with open(file_path, 'w', encoding='utf-8') as file_handle:
-        json.dump(payload, file_handle, ensure_ascii=False, indent=2)
+    """Дописывает в журнал изменения сделок с прошлого сохранения (снимок — при компакции)."""
+    with ACTIVE_TRADES_LOCK:
+        get_trade_journal(file_path).record(active_trades)
 
 
 def calculate_trade_pnl_percent(direction, entry_price, current_price):
@@ -119,33 +107,34 @@ def register_active_trade(
     note=None,
 ):
     """Регистрирует новую активную сделку и не дублирует уже открытую по символу."""
-    existing_trade = active_trades.get(symbol)
-    if existing_trade and existing_trade.get('status') == 'OPEN':
-        return False, existing_trade
-
-    trade = {
-        'symbol': symbol,
-        'strategy': strategy,
-        'direction': direction,
-        'entry_price': entry_price,
-        'stop_loss': stop_loss,
-        'take_profit': take_profit,
-        'risk_percent': risk_percent,
-        'reward_risk': reward_risk,
-        'note': note,
-        'status': 'OPEN',
-        'opened_at': utc_now_iso(),
-        'closed_at': None,
-        'close_reason': None,
-        'close_price': None,
-        'last_price': entry_price,
-        'last_checked_at': None,
-        'current_pnl_percent': 0.0,
-        'max_favorable_pnl_percent': 0.0,
-    }
-    active_trades[symbol] = trade
-    save_active_trades(active_trades)
-    return True, trade
+    with ACTIVE_TRADES_LOCK:
+        existing_trade = active_trades.get(symbol)
+        if existing_trade and existing_trade.get('status') == 'OPEN':
+            return False, existing_trade
+
+        trade = {
+            'symbol': symbol,
+            'strategy': strategy,
+            'direction': direction,
+            'entry_price': entry_price,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'risk_percent': risk_percent,
+            'reward_risk': reward_risk,
+            'note': note,
+            'status': 'OPEN',
+            'opened_at': utc_now_iso(),
+            'closed_at': None,
+            'close_reason': None,
+            'close_price': None,
+            'last_price': entry_price,
+            'last_checked_at': None,
+            'current_pnl_percent': 0.0,
+            'max_favorable_pnl_percent': 0.0,
+        }
+        active_trades[symbol] = trade
+        save_active_trades(active_trades)
+        return True, trade
 
 
 def format_monitor_status_line(trade, current_price, pnl_percent):
@@ -190,12 +179,14 @@ def notify_exchange_trade_open(trade, tf_loggers):
         f"{trade.get('symbol')} | EXCHANGE_OPEN_CONFIRMED | source={trade.get('exchange_sync_source')}"
     )
 
-    if not send_telegram_message(message):
-        send_emergency_alert(
-            'TELEGRAM',
-            symbol=trade.get('symbol'),
-            details='exchange open confirmation notification failed',
-        )
+    send_telegram_message(
+        message,
+        failure_alert={
+            'error_type': 'TELEGRAM',
+            'symbol': trade.get('symbol'),
+            'details': 'exchange open confirmation notification failed',
+        },
+    )
 
 
 def notify_exchange_trade_pending(trade, tf_loggers):
@@ -221,12 +212,14 @@ def notify_exchange_trade_pending(trade, tf_loggers):
         f"{trade.get('symbol')} | EXCHANGE_PENDING_CONFIRMED | source={trade.get('exchange_sync_source')}"
     )
 
-    if not send_telegram_message(message):
-        send_emergency_alert(
-            'TELEGRAM',
-            symbol=trade.get('symbol'),
-            details='exchange pending confirmation notification failed',
-        )
+    send_telegram_message(
+        message,
+        failure_alert={
+            'error_type': 'TELEGRAM',
+            'symbol': trade.get('symbol'),
+            'details': 'exchange pending confirmation notification failed',
+        },
+    )
 
 
 def should_use_spot_wallet_sync(trade):
@@ -365,16 +358,23 @@ def finalize_trade_close(trade, *, close_reason, current_price, pnl_percent, tf_
         f"{trade.get('symbol')} | CLOSED | reason={close_reason} | price={current_price} | pnl={pnl_percent}"
     )
 
-    if not send_telegram_message(message):
-        send_emergency_alert(
-            'TELEGRAM',
-            symbol=trade.get('symbol'),
-            details=f'trade monitor close notification failed: {close_reason}',
-        )
+    send_telegram_message(
+        message,
+        failure_alert={
+            'error_type': 'TELEGRAM',
+            'symbol': trade.get('symbol'),
+            'details': f'trade monitor close notification failed: {close_reason}',
+        },
+    )
 
 
 def monitor_active_trades(active_trades, tf_loggers):
     """Постоянно отслеживает уже открытые сделки и закрывает их локальный статус по TP/SL."""
+    with ACTIVE_TRADES_LOCK:
+        _monitor_active_trades(active_trades, tf_loggers)
+
+
+def _monitor_active_trades(active_trades, tf_loggers):
     open_symbols = [
         symbol
         for symbol, trade in active_trades.items()
@@ -1,6 +1,6 @@
 import logging
 
-from telegram_utils import send_emergency_alert, send_telegram_message
+from telegram_utils import send_telegram_message
 from trade_monitor import format_price, register_active_trade
 
 
@@ -41,9 +41,10 @@ def register_and_notify_trade(
         )
         return False, active_trade
 
-    success = send_telegram_message(notification_message)
-    if not success:
-        send_emergency_alert(emergency_channel, symbol=symbol, details=emergency_details)
+    send_telegram_message(
+        notification_message,
+        failure_alert={'error_type': emergency_channel, 'symbol': symbol, 'details': emergency_details},
+    )
     return True, active_trade
 
 
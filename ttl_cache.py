@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+import threading
+import time
+from typing import Any
+
+
+@dataclass(slots=True)
+class _TTLEntry:
+    value: Any
+    expires_at: float
+    ttl: float
+    # Номер записи: по нему очередь отличает актуальную запись ключа от перезаписанной.
+    seq: int
+
+
+class TTLCache:
+    """Словарь с временем жизни записей и вытеснением просроченных за амортизированное O(1).
+
+    Для каждого значения TTL держится своя FIFO-очередь (expires_at, key, seq): внутри одного TTL
+    порядок вставки совпадает с порядком истечения, поэтому очистка снимает только головы очередей.
+    Перезаписанные ключи остаются в очереди до своей головы и пропускаются по seq.
+    Число разных TTL предполагается небольшим (значения из конфига).
+    """
+
+    def __init__(
+        self,
+        default_ttl: float,
+        max_entries: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.default_ttl = float(default_ttl)
+        self.max_entries = max(1, int(max_entries)) if max_entries is not None else None
+        self.clock = clock
+        self._entries: dict[Hashable, _TTLEntry] = {}
+        self._queues: dict[float, deque[tuple[float, Hashable, int]]] = {}
+        self._seq = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def _purge_locked(self, now: float) -> None:
+        for ttl, queue in list(self._queues.items()):
+            while queue and queue[0][0] <= now:
+                _, key, seq = queue.popleft()
+                entry = self._entries.get(key)
+                if entry is not None and entry.seq == seq:
+                    del self._entries[key]
+                    self.expirations += 1
+            if not queue:
+                del self._queues[ttl]
+
+    def _evict_oldest_locked(self) -> None:
+        """Вытесняет запись, которая истекла бы первой (при переполнении max_entries)."""
+        while self._queues:
+            ttl = min(self._queues, key=lambda item: self._queues[item][0][0])
+            queue = self._queues[ttl]
+            _, key, seq = queue.popleft()
+            if not queue:
+                del self._queues[ttl]
+            entry = self._entries.get(key)
+            if entry is not None and entry.seq == seq:
+                del self._entries[key]
+                self.evictions += 1
+                return
+
+    def _live_entry_locked(self, key: Hashable, now: float) -> _TTLEntry | None:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= now:
+            return None
+        return entry
+
+    def _set_locked(self, key: Hashable, value: Any, ttl: float | None, now: float, expires_in: float | None = None) -> None:
+        ttl = self.default_ttl if ttl is None else float(ttl)
+        self._seq += 1
+        expires_at = now + (ttl if expires_in is None else min(float(expires_in), ttl))
+        self._entries[key] = _TTLEntry(value, expires_at, ttl, self._seq)
+        self._queues.setdefault(ttl, deque()).append((expires_at, key, self._seq))
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest_locked()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            now = self.clock()
+            self._purge_locked(now)
+            entry = self._live_entry_locked(key, now)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, expires_in: float | None = None) -> None:
+        """Кладет значение на ttl секунд (по умолчанию default_ttl); срок отсчитывается заново.
+
+        expires_in (не больше ttl) — остаток срока при восстановлении записи, например из снимка.
+        Такие записи стоит класть в порядке истечения, иначе они задержатся в очереди до своей головы.
+        """
+        with self._lock:
+            now = self.clock()
+            self._purge_locked(now)
+            self._set_locked(key, value, ttl, now, expires_in)
+
+    def add(self, key: Hashable, value: Any, ttl: float | None = None) -> bool:
+        """Кладет значение, только если живой записи с таким ключом нет; True — запись добавлена.
+
+        Атомарная проверка-и-вставка для дедупликации: повторный add в пределах TTL вернет False.
+        """
+        with self._lock:
+            now = self.clock()
+            self._purge_locked(now)
+            if self._live_entry_locked(key, now) is not None:
+                self.hits += 1
+                return False
+            self.misses += 1
+            self._set_locked(key, value, ttl, now)
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry.expires_at <= self.clock():
+                return default
+            return entry.value
+
+    def expires_in(self, key: Hashable) -> float | None:
+        """Сколько секунд осталось жить записи; None — записи нет."""
+        with self._lock:
+            now = self.clock()
+            entry = self._live_entry_locked(key, now)
+            return None if entry is None else entry.expires_at - now
+
+    def items(self) -> list[tuple[Hashable, Any, float, float]]:
+        """Живые записи как (key, value, секунд до истечения, ttl записи)."""
+        with self._lock:
+            now = self.clock()
+            self._purge_locked(now)
+            return [(key, entry.value, entry.expires_at - now, entry.ttl) for key, entry in self._entries.items()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._queues.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._live_entry_locked(key, self.clock()) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge_locked(self.clock())
+            return len(self._entries)
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._purge_locked(self.clock())
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }